@@ -32,6 +32,9 @@ from __future__ import annotations
 import bz2
 import sys
 import time
+import queue
+import collections
+import asyncio
 import threading
 from threading import RLock
 import struct
@@ -110,6 +113,20 @@ class RawChannelReader(RawIOBase, AbstractContextManager):
       object, see the Python documentation for
       ``RawIOBase``.
     """
+    # Ready callbacks of all readers are run by a
+    # shared pool of worker threads. The pool grows
+    # when all workers are busy, and shrinks again
+    # down to the minimum when workers are idle.
+    CALLBACK_WORKERS_MIN  = 2
+    CALLBACK_IDLE_TIMEOUT = 30
+
+    INITIAL_CAPACITY = 1024*16
+
+    _callback_queue   = queue.SimpleQueue()
+    _callback_lock    = threading.Lock()
+    _callback_workers = 0
+    _callback_idle    = 0
+
     def __init__(self, stream_id: int, channel: Channel):
         """
         Create a raw channel reader.
@@ -120,8 +137,15 @@ class RawChannelReader(RawIOBase, AbstractContextManager):
         self._stream_id = stream_id
         self._channel = channel
         self._lock = RLock()
-        self._buffer = bytearray()
+        self._ring = bytearray(RawChannelReader.INITIAL_CAPACITY)
+        self._head = 0
+        self._size = 0
+        self._received = 0
+        self._readable = 0
+        self._consumed = 0
         self._eof = False
+        self._ready_events = collections.deque()
+        self._dispatching = False
         self._channel._register_message_type(StreamDataMessage, is_system_type=True)
         self._channel.add_message_handler(self._handle_message)
         self._listeners: [Callable[[int], None]] = []
@@ -131,6 +155,9 @@ class RawChannelReader(RawIOBase, AbstractContextManager):
         Add a function to be called when new data is available.
         The function should have the signature ``(ready_bytes: int) -> None``
 
+        Callbacks are run in order on a shared pool of worker
+        threads, once for every message received on the stream.
+
         :param cb: function to call
         """
         with self._lock:
@@ -144,34 +171,126 @@ class RawChannelReader(RawIOBase, AbstractContextManager):
         """
         with self._lock:
             self._listeners.remove(cb)
+            if len(self._listeners) == 0:
+                self._readable = self._received
+
+    @staticmethod
+    def _run_callback(job: Callable[[], None]):
+        with RawChannelReader._callback_lock:
+            if RawChannelReader._callback_idle == 0:
+                RawChannelReader._callback_workers += 1
+                RawChannelReader._callback_idle += 1
+                threading.Thread(target=RawChannelReader._callback_worker, name="Buffer Callback", daemon=True).start()
+            RawChannelReader._callback_idle -= 1
+            RawChannelReader._callback_queue.put(job)
+
+    @staticmethod
+    def _callback_worker():
+        while True:
+            try:
+                job = RawChannelReader._callback_queue.get(timeout=RawChannelReader.CALLBACK_IDLE_TIMEOUT)
+            except queue.Empty:
+                with RawChannelReader._callback_lock:
+                    if RawChannelReader._callback_workers > RawChannelReader.CALLBACK_WORKERS_MIN and RawChannelReader._callback_idle > 0:
+                        RawChannelReader._callback_workers -= 1
+                        RawChannelReader._callback_idle -= 1
+                        return
+                continue
+
+            try:
+                job()
+            except Exception as e:
+                RNS.log("Error while running buffer callback: "+str(e), RNS.LOG_ERROR)
+            finally:
+                with RawChannelReader._callback_lock:
+                    RawChannelReader._callback_idle += 1
+
+    def _dispatch_ready(self):
+        while True:
+            with self._lock:
+                if len(self._ready_events) == 0:
+                    self._dispatching = False
+                    return
+
+                # Data from later messages is held back until
+                # their own callbacks run, so reads from this
+                # callback see the same bytes as if it had run
+                # synchronously when the message arrived.
+                received = self._ready_events.popleft()
+                self._readable = max(self._readable, received)
+                ready = self._readable - self._consumed
+                listeners = list(self._listeners)
+
+            for listener in listeners:
+                try:
+                    listener(ready)
+                except Exception as ex:
+                    RNS.log("Error calling RawChannelReader(" + str(self._stream_id) + ") callback: " + str(ex), RNS.LOG_ERROR)
+
+    def _append(self, data: bytes):
+        length = len(data)
+        capacity = len(self._ring)
+        if self._size + length > capacity:
+            while self._size + length > capacity:
+                capacity *= 2
+            ring = bytearray(capacity)
+            self._size = self._copy_out(memoryview(ring), self._size)
+            self._ring = ring
+            self._head = 0
+
+        tail = (self._head + self._size) % capacity
+        first = min(length, capacity - tail)
+        view = memoryview(data)
+        self._ring[tail:tail+first] = view[:first]
+        if first < length:
+            self._ring[:length-first] = view[first:]
+        self._size += length
+        self._received += length
+
+    def _copy_out(self, target: memoryview, size: int) -> int:
+        capacity = len(self._ring)
+        first = min(size, capacity - self._head)
+        target[:first] = memoryview(self._ring)[self._head:self._head+first]
+        if first < size:
+            target[first:size] = memoryview(self._ring)[:size-first]
+        return size
 
     def _handle_message(self, message: MessageBase):
         if isinstance(message, StreamDataMessage):
             if message.stream_id == self._stream_id:
+                dispatch = False
                 with self._lock:
                     if message.data is not None:
-                        self._buffer.extend(message.data)
+                        self._append(message.data)
                     if message.eof:
                         self._eof = True
-                    for listener in self._listeners:
-                        try:
-                            threading.Thread(target=listener, name="Message Callback", args=[len(self._buffer)], daemon=True).start()
-                        except Exception as ex:
-                            RNS.log("Error calling RawChannelReader(" + str(self._stream_id) + ") callback: " + str(ex), RNS.LOG_ERROR)
-                    return True
+                    if len(self._listeners) == 0:
+                        self._readable = self._received
+                    else:
+                        self._ready_events.append(self._received)
+                        if not self._dispatching:
+                            self._dispatching = True
+                            dispatch = True
+
+                if dispatch:
+                    RawChannelReader._run_callback(self._dispatch_ready)
+                return True
         return False
 
-    def _read(self, __size: int) -> bytes | None:
-        with self._lock:
-            result = self._buffer[:__size]
-            self._buffer = self._buffer[__size:]
-            return result if len(result) > 0 or self._eof else None
-
     def readinto(self, __buffer: bytearray) -> int | None:
-        ready = self._read(len(__buffer))
-        if ready is not None:
-            __buffer[:len(ready)] = ready
-        return len(ready) if ready is not None else None
+        with self._lock:
+            available = min(self._size, self._readable - self._consumed)
+            if available <= 0:
+                return 0 if self._eof and self._size == 0 else None
+
+            target = memoryview(__buffer).cast("B")
+            size = self._copy_out(target, min(len(target), available))
+            self._head = (self._head + size) % len(self._ring)
+            self._size -= size
+            self._consumed += size
+            if self._size == 0:
+                self._head = 0
+            return size
 
     def writable(self) -> bool:
         return False
@@ -214,46 +333,81 @@ class RawChannelWriter(RawIOBase, AbstractContextManager):
     MAX_CHUNK_LEN     = 1024*16
     COMPRESSION_TRIES = 4
 
-    def __init__(self, stream_id: int, channel: Channel):
+    # After data failed to compress, compression is
+    # skipped for an increasing number of writes, up
+    # to this limit, before it is attempted again.
+    COMPRESSION_BACKOFF_MAX = 64
+
+    def __init__(self, stream_id: int, channel: Channel, blocking: bool = False):
         """
         Create a raw channel writer.
 
         :param stream_id: remote stream id to sent do
         :param channel: ``Channel`` object to send on
+        :param blocking: whether writes should wait for the ``Channel`` to become ready to send, defaults to ``False``
         """
         self._stream_id = stream_id
         self._channel = channel
         self._eof = False
+        self._blocking = blocking
         self._mdu = channel.mdu - StreamDataMessage.OVERHEAD
+        self._compression_backoff = 0
+        self._compression_skip = 0
 
-    def write(self, __b: bytes) -> int | None:
+    def write(self, __b: bytes) -> int:
+        """
+        Write data to the stream. By default, ``0`` is returned
+        if the ``Channel`` is not ready to send. In blocking
+        mode, this waits until the ``Channel`` is ready to send.
+
+        :param __b: bytes-like object to write
+        :return: the number of bytes written
+        """
+        if self._blocking:
+            # Another writer on the same channel can take the
+            # send window between waking up and sending, in
+            # which case the write waits again.
+            while True:
+                written = self._write(__b, timeout=None)
+                if written is not None:
+                    return written
+        else:
+            return self._write(__b, timeout=0) or 0
+
+    async def write_async(self, __b: bytes) -> int:
+        """
+        Write data to the stream from a coroutine. This waits
+        until the ``Channel`` is ready to send, without blocking
+        the event loop, regardless of whether the writer was
+        created in blocking mode.
+
+        :param __b: bytes-like object to write
+        :return: the number of bytes written
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            written = self._write(__b, timeout=0)
+            if written is not None:
+                return written
+            await loop.run_in_executor(None, self._channel.wait_ready)
+
+    def _write(self, __b: bytes, timeout: float | None) -> int | None:
         try:
-            comp_tries = RawChannelWriter.COMPRESSION_TRIES
-            comp_try = 1
-            comp_success = False
-            chunk_len = len(__b)
-            if chunk_len > RawChannelWriter.MAX_CHUNK_LEN:
-                chunk_len = RawChannelWriter.MAX_CHUNK_LEN
-                __b = __b[:RawChannelWriter.MAX_CHUNK_LEN]
-            chunk_segment = None
-            while chunk_len > 32 and comp_try < comp_tries:
-                chunk_segment_length = int(chunk_len/comp_try)
-                compressed_chunk = bz2.compress(__b[:chunk_segment_length])
-                compressed_length = len(compressed_chunk)
-                if compressed_length < StreamDataMessage.MAX_DATA_LEN and compressed_length < chunk_segment_length:
-                    comp_success = True
-                    break
-                else:
-                    comp_try += 1
-
-            if comp_success:
+            if not self._channel.wait_ready(timeout):
+                return None
+
+            data = memoryview(__b).cast("B")
+            if len(data) > RawChannelWriter.MAX_CHUNK_LEN:
+                data = data[:RawChannelWriter.MAX_CHUNK_LEN]
+
+            compressed_chunk, processed_length = self._compress(data)
+            if compressed_chunk is not None:
                 chunk = compressed_chunk
-                processed_length = chunk_segment_length
             else:
-                chunk = bytes(__b[:StreamDataMessage.MAX_DATA_LEN])
+                chunk = bytes(data[:StreamDataMessage.MAX_DATA_LEN])
                 processed_length = len(chunk)
 
-            message = StreamDataMessage(self._stream_id, chunk, self._eof, comp_success)
+            message = StreamDataMessage(self._stream_id, chunk, self._eof, compressed_chunk is not None)
             
             self._channel.send(message)
             return processed_length
@@ -261,20 +415,47 @@ class RawChannelWriter(RawIOBase, AbstractContextManager):
         except RNS.Channel.ChannelException as cex:
             if cex.type != RNS.Channel.CEType.ME_LINK_NOT_READY:
                 raise
-        return 0
+        return None
+
+    def _compress(self, data: memoryview) -> tuple[bytes | None, int]:
+        chunk_len = len(data)
+        if chunk_len <= 32:
+            return None, 0
+
+        if self._compression_skip > 0:
+            self._compression_skip -= 1
+            return None, 0
+
+        comp_try = 1
+        while comp_try < RawChannelWriter.COMPRESSION_TRIES:
+            chunk_segment_length = int(chunk_len/comp_try)
+            compressed_chunk = bz2.compress(data[:chunk_segment_length])
+            compressed_length = len(compressed_chunk)
+            if compressed_length < StreamDataMessage.MAX_DATA_LEN and compressed_length < chunk_segment_length:
+                self._compression_backoff = 0
+                return compressed_chunk, chunk_segment_length
+            else:
+                comp_try += 1
+
+        # Only back off when the write was large enough that
+        # compression could have succeeded, so small writes
+        # of otherwise compressible data are not penalised.
+        if chunk_len >= StreamDataMessage.MAX_DATA_LEN:
+            self._compression_backoff = min(max(self._compression_backoff*2, 1), RawChannelWriter.COMPRESSION_BACKOFF_MAX)
+            self._compression_skip = self._compression_backoff
+
+        return None, 0
 
     def close(self):
         try:
             link_rtt = self._channel._outlet.link.rtt
-            timeout = time.time() + (link_rtt * len(self._channel._tx_ring) * 1)
+            timeout = link_rtt * len(self._channel._tx_ring) * 1
         except Exception as e:
-            timeout = time.time() + 15
-
-        while time.time() < timeout and not self._channel.is_ready_to_send():
-            time.sleep(0.05)
+            timeout = 15
 
+        self._channel.wait_ready(timeout)
         self._eof = True
-        self.write(bytes())
+        self._write(bytes(), timeout=0)
 
     def __enter__(self):
         return self
@@ -326,10 +507,11 @@ class Buffer:
         return BufferedReader(reader)
 
     @staticmethod
-    def create_writer(stream_id: int, channel: Channel) -> BufferedWriter:
+    def create_writer(stream_id: int, channel: Channel, blocking: bool = False) -> BufferedWriter:
         """
         Create a buffered writer that writes binary data over
-        a ``Channel``.
+        a ``Channel``. By default, writes do not wait for the
+        ``Channel`` to become ready to send.
 
         For more information on the writer-specific functions
         of this object, see the Python documentation for
@@ -337,14 +519,16 @@ class Buffer:
 
         :param stream_id: the remote stream id to send to
         :param channel: the channel to send on
+        :param blocking: whether writes should wait for the channel to become ready to send
         :return: a BufferedWriter object
         """
-        writer = RawChannelWriter(stream_id, channel)
+        writer = RawChannelWriter(stream_id, channel, blocking=blocking)
         return BufferedWriter(writer)
 
     @staticmethod
     def create_bidirectional_buffer(receive_stream_id: int, send_stream_id: int, channel: Channel,
-                                    ready_callback: Callable[[int], None] | None = None) -> BufferedRWPair:
+                                    ready_callback: Callable[[int], None] | None = None,
+                                    blocking: bool = False) -> BufferedRWPair:
         """
         Create a buffered reader/writer pair that reads and
         writes binary data over a ``Channel``, with an
@@ -360,10 +544,11 @@ class Buffer:
         :param send_stream_id:  the remote stream id to send to
         :param channel: the channel to send and receive on
         :param ready_callback: function to call when new data is available
+        :param blocking: whether writes should wait for the channel to become ready to send
         :return: a BufferedRWPair object
         """
         reader = RawChannelReader(receive_stream_id, channel)
         if ready_callback:
             reader.add_ready_callback(ready_callback)
-        writer = RawChannelWriter(send_stream_id, channel)
+        writer = RawChannelWriter(send_stream_id, channel, blocking=blocking)
         return BufferedRWPair(reader, writer)
@@ -43,7 +43,9 @@ from abc import ABC, abstractmethod
 TPacket = TypeVar("TPacket")
 
 class SystemMessageTypes(enum.IntEnum):
-    SMT_STREAM_DATA = 0xff00
+    SMT_STREAM_DATA     = 0xff00
+    SMT_SESSION_DATA    = 0xff01
+    SMT_SESSION_CONTROL = 0xff02
 
 class ChannelOutletBase(ABC, Generic[TPacket]):
     """
@@ -101,6 +103,16 @@ class ChannelOutletBase(ABC, Generic[TPacket]):
     def get_packet_id(self, packet: TPacket) -> any:
         raise NotImplemented()
 
+    @property
+    def supports_batch_ack(self) -> bool:
+        return False
+
+    def send_ack(self, raw: bytes):
+        raise NotImplemented()
+
+    def set_packet_acknowledged(self, packet: TPacket):
+        raise NotImplemented()
+
 
 class CEType(enum.IntEnum):
     """
@@ -278,6 +290,44 @@ class Channel(contextlib.AbstractContextManager):
     SEQ_MAX     = 0xFFFF
     SEQ_MODULUS = SEQ_MAX+1
 
+    # Number of slots in the sequence-indexed receive
+    # ring. Must be a power of two that divides the
+    # sequence modulus, and larger than the maximum
+    # window. Envelopes further ahead of the next
+    # expected sequence than this are dropped, and
+    # will be retransmitted by the sender.
+    RX_RING_SIZE = 64
+
+    # When cumulative acknowledgements have been
+    # negotiated, an acknowledgement is sent after
+    # this many received envelopes, or at the latest
+    # after the acknowledgement delay.
+    ACK_BATCH_SIZE = 8
+    ACK_DELAY_MIN  = 0.005
+    ACK_DELAY_MAX  = 0.1
+
+    # The default time an envelope may be held back
+    # to be coalesced with other envelopes into a
+    # single packet, when coalescing is enabled.
+    COALESCE_LATENCY = 0.01
+
+    # Channel control frames are sent in link packets
+    # with the CHANNEL_ACK context, which peers without
+    # support for them ignore. Capability offers carry
+    # a flags byte, and cumulative acknowledgements carry
+    # the next expected sequence and a selective bitmap.
+    CTRL_CAPABILITIES = 0x00
+    CTRL_ACK          = 0x01
+
+    # Accepts cumulative acknowledgements
+    CAP_BATCH_ACK     = 0x01
+    # Can receive coalesced envelopes
+    CAP_COALESCE      = 0x02
+    # Requests the capabilities of the remote
+    CAP_REQUEST       = 0x80
+
+    CAPABILITIES_INTERVAL = 2.5
+
     def __init__(self, outlet: ChannelOutletBase):
         """
 
@@ -285,8 +335,9 @@ class Channel(contextlib.AbstractContextManager):
         """
         self._outlet = outlet
         self._lock = threading.RLock()
+        self._ready_condition = threading.Condition(self._lock)
         self._tx_ring: collections.deque[Envelope] = collections.deque()
-        self._rx_ring: collections.deque[Envelope] = collections.deque()
+        self._rx_ring: list[Envelope | None] = [None] * Channel.RX_RING_SIZE
         self._message_callbacks: [MessageCallbackType] = []
         self._next_sequence = 0
         self._next_rx_sequence = 0
@@ -295,6 +346,19 @@ class Channel(contextlib.AbstractContextManager):
         self.fast_rate_rounds    = 0
         self.medium_rate_rounds  = 0
 
+        self._ack_batching       = False
+        self._ack_offered        = False
+        self._ack_confirmed      = False
+        self._ack_pending        = 0
+        self._ack_timer          = None
+        self._remote_caps        = None
+        self._caps_sent_at       = 0
+        self._coalescing         = False
+        self._coalesce_latency   = Channel.COALESCE_LATENCY
+        self._coalesce_pending: list[Envelope] = []
+        self._coalesce_size      = 0
+        self._coalesce_timer     = None
+
         if self._outlet.rtt > Channel.RTT_SLOW:
             self.window              = 1
             self.window_max          = 1
@@ -383,7 +447,16 @@ class Channel(contextlib.AbstractContextManager):
                     self._outlet.set_packet_timeout_callback(envelope.packet, None)
                     self._outlet.set_packet_delivered_callback(envelope.packet, None)
             self._tx_ring.clear()
-            self._rx_ring.clear()
+            self._rx_ring = [None] * Channel.RX_RING_SIZE
+            self._coalesce_pending.clear()
+            self._coalesce_size = 0
+            if self._ack_timer is not None:
+                self._ack_timer.cancel()
+                self._ack_timer = None
+            if self._coalesce_timer is not None:
+                self._coalesce_timer.cancel()
+                self._coalesce_timer = None
+            self._ready_condition.notify_all()
 
     def _emplace_envelope(self, envelope: Envelope, ring: collections.deque[Envelope]) -> bool:
         with self._lock:
@@ -419,50 +492,187 @@ class Channel(contextlib.AbstractContextManager):
                 RNS.log("Channel "+str(self)+" experienced an error while running a message callback. The contained exception was: "+str(e), RNS.LOG_ERROR)
 
     def _receive(self, raw: bytes):
+        # A packet can contain several coalesced envelopes,
+        # each of which is delimited by its length field.
+        offset = 0
+        while len(raw) - offset >= 6:
+            length = (raw[offset+4] << 8) | raw[offset+5]
+            end = offset + 6 + length
+            self._receive_envelope(raw[offset:end])
+            offset = end
+
+    def _receive_envelope(self, raw: bytes):
         try:
             envelope = Envelope(outlet=self._outlet, raw=raw)
             with self._lock:
                 message = envelope.unpack(self._message_factories)
 
-                if envelope.sequence < self._next_rx_sequence:
-                    window_overflow = (self._next_rx_sequence+Channel.WINDOW_MAX) % Channel.SEQ_MODULUS
-                    if window_overflow < self._next_rx_sequence:
-                        if envelope.sequence > window_overflow:
-                            RNS.log("Invalid packet sequence ("+str(envelope.sequence)+") received on channel "+str(self), RNS.LOG_EXTREME)
-                            return
+                offset = (envelope.sequence - self._next_rx_sequence) % Channel.SEQ_MODULUS
+                if offset >= Channel.RX_RING_SIZE:
+                    RNS.log("Invalid packet sequence ("+str(envelope.sequence)+") received on channel "+str(self), RNS.LOG_EXTREME)
+                    if self._ack_batching: self._schedule_ack()
+                    return
+
+                slot = envelope.sequence % Channel.RX_RING_SIZE
+                if self._rx_ring[slot] is not None:
+                    RNS.log("Duplicate message received on channel "+str(self), RNS.LOG_EXTREME)
+                    if self._ack_batching: self._schedule_ack()
+                    return
+
+                envelope.tracked = True
+                self._rx_ring[slot] = envelope
+
+                contigous = []
+                slot = self._next_rx_sequence % Channel.RX_RING_SIZE
+                while self._rx_ring[slot] is not None:
+                    contigous.append(self._rx_ring[slot])
+                    self._rx_ring[slot] = None
+                    self._next_rx_sequence = (self._next_rx_sequence + 1) % Channel.SEQ_MODULUS
+                    slot = self._next_rx_sequence % Channel.RX_RING_SIZE
+
+                if self._ack_batching: self._schedule_ack()
+
+                for e in contigous:
+                    if not e.unpacked:
+                        m = e.unpack(self._message_factories)
                     else:
-                        RNS.log("Invalid packet sequence ("+str(envelope.sequence)+") received on channel "+str(self), RNS.LOG_EXTREME)
-                        return
+                        m = e.message
+
+                    e.tracked = False
+                    self._run_callbacks(m)
+
+        except Exception as e:
+            RNS.log("An error ocurred while receiving data on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
 
-                is_new = self._emplace_envelope(envelope, self._rx_ring)
+    def enable_batch_ack(self):
+        """
+        Offer to accept cumulative acknowledgements from the
+        remote end of the ``Channel``, instead of an individual
+        proof for every received message. If the remote end
+        supports cumulative acknowledgements, it will start
+        acknowledging messages in batches, which significantly
+        reduces the number of packets needed per message.
+        Remote ends that do not support cumulative
+        acknowledgements will ignore the offer.
+        """
+        if self._outlet.supports_batch_ack:
+            with self._lock:
+                self._ack_offered = True
+            self._send_capabilities()
 
-            if not is_new:
-                RNS.log("Duplicate message received on channel "+str(self), RNS.LOG_EXTREME)
+    def enable_coalescing(self, latency: float = None):
+        """
+        Allow several small messages to be coalesced into a
+        single packet. Messages may be held back for up to
+        *latency* seconds, while waiting for further messages
+        to fill the packet. Coalescing only starts once the
+        remote end of the ``Channel`` has signalled that it
+        can receive coalesced messages.
+
+        :param latency: Optional maximum time in seconds to hold back messages.
+        """
+        if self._outlet.supports_batch_ack:
+            with self._lock:
+                self._coalescing = True
+                if latency is not None:
+                    self._coalesce_latency = latency
+            self._send_capabilities()
+
+    def _capabilities(self) -> int:
+        caps = Channel.CAP_COALESCE
+        if self._ack_offered: caps |= Channel.CAP_BATCH_ACK
+        return caps
+
+    def _send_capabilities(self, request: bool = None):
+        if request is None:
+            request = self._remote_caps is None
+        flags = self._capabilities()
+        if request: flags |= Channel.CAP_REQUEST
+        self._caps_sent_at = time.time()
+        self._outlet.send_ack(bytes([Channel.CTRL_CAPABILITIES, flags]))
+
+    def _should_send_capabilities(self) -> bool:
+        if time.time() < self._caps_sent_at + max(self._outlet.rtt*4, Channel.CAPABILITIES_INTERVAL):
+            return False
+        if self._ack_offered and not self._ack_confirmed:
+            return True
+        if self._coalescing and self._remote_caps is None:
+            return True
+        return False
+
+    def _ack_delay(self) -> float:
+        return min(max(self._outlet.rtt*0.25, Channel.ACK_DELAY_MIN), Channel.ACK_DELAY_MAX)
+
+    def _schedule_ack(self):
+        self._ack_pending += 1
+        if self._ack_pending >= Channel.ACK_BATCH_SIZE:
+            self._send_ack()
+        elif self._ack_timer is None:
+            self._ack_timer = RNS.Scheduler.call_later(self._ack_delay(), self._ack_due)
+
+    def _ack_due(self):
+        # Sending may block, so it is not done on the scheduler thread
+        RNS.Scheduler.dispatch(self._send_ack)
+
+    def _send_ack(self):
+        with self._lock:
+            if self._ack_timer is not None:
+                self._ack_timer.cancel()
+                self._ack_timer = None
+
+            if self._ack_pending == 0:
                 return
-            else:
+
+            self._ack_pending = 0
+            received = 0
+            for offset in range(1, Channel.RX_RING_SIZE):
+                if self._rx_ring[(self._next_rx_sequence + offset) % Channel.RX_RING_SIZE] is not None:
+                    received |= 1 << offset
+
+            raw = struct.pack(">BHQ", Channel.CTRL_ACK, self._next_rx_sequence, received)
+
+        try:
+            self._outlet.send_ack(raw)
+        except Exception as e:
+            RNS.log("An error ocurred while sending acknowledgement on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+
+    def _receive_ack(self, raw: bytes):
+        try:
+            if raw[0] == Channel.CTRL_CAPABILITIES:
+                flags = raw[1]
                 with self._lock:
-                    contigous = []
-                    for e in self._rx_ring:
-                        if e.sequence == self._next_rx_sequence:
-                            contigous.append(e)
-                            self._next_rx_sequence = (self._next_rx_sequence + 1) % Channel.SEQ_MODULUS
-                            if self._next_rx_sequence == 0:
-                                for e in self._rx_ring:
-                                    if e.sequence == self._next_rx_sequence:
-                                        contigous.append(e)
-                                        self._next_rx_sequence = (self._next_rx_sequence + 1) % Channel.SEQ_MODULUS
-
-                    for e in contigous:
-                        if not e.unpacked:
-                            m = e.unpack(self._message_factories)
-                        else:
-                            m = e.message
-                            
-                        self._rx_ring.remove(e)
-                        self._run_callbacks(m)
+                    self._remote_caps = flags
+                    if flags & Channel.CAP_BATCH_ACK and not self._ack_batching:
+                        RNS.log("Remote accepts cumulative acknowledgements on "+str(self), RNS.LOG_DEBUG)
+                        self._ack_batching = True
+
+                if flags & Channel.CAP_REQUEST:
+                    self._send_capabilities(request=False)
+
+            elif raw[0] == Channel.CTRL_ACK:
+                _, next_sequence, received = struct.unpack(">BHQ", raw[:11])
+                packets = {}
+                with self._lock:
+                    self._ack_confirmed = True
+                    for envelope in self._tx_ring:
+                        if envelope.packet is not None:
+                            offset = (envelope.sequence - next_sequence) % Channel.SEQ_MODULUS
+                            acknowledged = offset > Channel.SEQ_MAX//2 or (offset < Channel.RX_RING_SIZE and (received >> offset) & 1)
+
+                            # A packet carrying coalesced envelopes is only
+                            # acknowledged once all of them have been received.
+                            packet_id = self._outlet.get_packet_id(envelope.packet)
+                            if packet_id in packets:
+                                packets[packet_id][1] = packets[packet_id][1] and acknowledged
+                            else:
+                                packets[packet_id] = [envelope.packet, acknowledged]
+
+                for packet, acknowledged in packets.values():
+                    if acknowledged and self._outlet.get_packet_state(packet) != MessageState.MSGSTATE_DELIVERED:
+                        self._outlet.set_packet_acknowledged(packet)
 
         except Exception as e:
-            RNS.log("An error ocurred while receiving data on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+            RNS.log("An error ocurred while receiving acknowledgement on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
 
     def is_ready_to_send(self) -> bool:
         """
@@ -474,27 +684,65 @@ class Channel(contextlib.AbstractContextManager):
             return False
 
         with self._lock:
-            outstanding = 0
-            for envelope in self._tx_ring:
-                if envelope.outlet == self._outlet: 
-                    if not envelope.packet or not self._outlet.get_packet_state(envelope.packet) == MessageState.MSGSTATE_DELIVERED:
-                        outstanding += 1
+            if self._is_coalescing():
+                # When coalescing, the window limits the number of
+                # packets in flight, while the number of envelopes
+                # in flight is limited by the remote receive ring.
+                if len(self._tx_ring) >= Channel.RX_RING_SIZE-1:
+                    return False
+
+                packets = set()
+                for envelope in self._tx_ring:
+                    if envelope.outlet == self._outlet and envelope.packet:
+                        if not self._outlet.get_packet_state(envelope.packet) == MessageState.MSGSTATE_DELIVERED:
+                            packets.add(self._outlet.get_packet_id(envelope.packet))
+
+                outstanding = len(packets)
+                if len(self._coalesce_pending) > 0: outstanding += 1
+
+            else:
+                outstanding = 0
+                for envelope in self._tx_ring:
+                    if envelope.outlet == self._outlet: 
+                        if not envelope.packet or not self._outlet.get_packet_state(envelope.packet) == MessageState.MSGSTATE_DELIVERED:
+                            outstanding += 1
 
             if outstanding >= self.window:
                 return False
 
         return True
 
+    def wait_ready(self, timeout: float = None) -> bool:
+        """
+        Wait until the ``Channel`` is ready to send. This
+        blocks until an outstanding message has been delivered
+        and the send window allows for a new message, without
+        polling :func:`RNS.Channel.Channel.is_ready_to_send()`.
+
+        :param timeout: Optional maximum time in seconds to wait.
+        :return: ``True`` if the ``Channel`` is ready to send, otherwise ``False``.
+        """
+        with self._ready_condition:
+            return self._ready_condition.wait_for(self.is_ready_to_send, timeout)
+
     def _packet_tx_op(self, packet: TPacket, op: Callable[[TPacket], bool]):
         with self._lock:
-            envelope = next(filter(lambda e: self._outlet.get_packet_id(e.packet) == self._outlet.get_packet_id(packet),
-                                   self._tx_ring), None)
+            # Coalesced envelopes share a single packet, and
+            # are retried and concluded together with it.
+            packet_id = self._outlet.get_packet_id(packet)
+            envelopes = [e for e in self._tx_ring if e.packet is not None and self._outlet.get_packet_id(e.packet) == packet_id]
+            envelope = envelopes[0] if len(envelopes) > 0 else None
 
             if envelope and op(envelope):
-                envelope.tracked = False
-                if envelope in self._tx_ring:
-                    self._tx_ring.remove(envelope)
-
+                removed = False
+                for e in envelopes:
+                    e.tracked = False
+                    if e in self._tx_ring:
+                        self._tx_ring.remove(e)
+                        removed = True
+
+                if removed:
+                    self._ready_condition.notify_all()
                     if self.window < self.window_max:
                         self.window += 1
 
@@ -529,6 +777,11 @@ class Channel(contextlib.AbstractContextManager):
 
                 else:
                     RNS.log("Envelope not found in TX ring for "+str(self), RNS.LOG_EXTREME)
+
+            elif envelope:
+                for e in envelopes[1:]:
+                    e.tries = envelope.tries
+
         if not envelope:
             RNS.log("Spurious message received on "+str(self), RNS.LOG_EXTREME)
 
@@ -601,6 +854,13 @@ class Channel(contextlib.AbstractContextManager):
         if len(envelope.raw) > self._outlet.mdu:
             raise ChannelException(CEType.ME_TOO_BIG, f"Packed message too big for packet: {len(envelope.raw)} > {self._outlet.mdu}")
         
+        if self._should_send_capabilities():
+            self._send_capabilities()
+
+        if self._is_coalescing():
+            self._coalesce(envelope)
+            return envelope
+
         envelope.packet = self._outlet.send(envelope.raw)
         envelope.tries += 1
         self._outlet.set_packet_delivered_callback(envelope.packet, self._packet_delivered)
@@ -609,6 +869,65 @@ class Channel(contextlib.AbstractContextManager):
 
         return envelope
 
+    def _is_coalescing(self) -> bool:
+        return self._coalescing and self._remote_caps is not None and self._remote_caps & Channel.CAP_COALESCE
+
+    def _coalesce(self, envelope: Envelope):
+        flush_now = False
+        flush_pending = False
+        with self._lock:
+            if len(self._coalesce_pending) > 0 and self._coalesce_size + len(envelope.raw) > self._outlet.mdu:
+                flush_pending = True
+            else:
+                self._coalesce_pending.append(envelope)
+                self._coalesce_size += len(envelope.raw)
+                # Flush right away if not even an empty
+                # envelope would fit in the packet now
+                flush_now = self._coalesce_size + 6 > self._outlet.mdu
+
+        if flush_pending:
+            self._flush_coalesced()
+            self._coalesce(envelope)
+
+        elif flush_now:
+            self._flush_coalesced()
+
+        else:
+            with self._lock:
+                if self._coalesce_timer is None and len(self._coalesce_pending) > 0:
+                    self._coalesce_timer = RNS.Scheduler.call_later(self._coalesce_latency, self._coalesce_due)
+
+    def _coalesce_due(self):
+        # Sending may block, so it is not done on the scheduler thread
+        RNS.Scheduler.dispatch(self._flush_coalesced)
+
+    def _flush_coalesced(self):
+        with self._lock:
+            if self._coalesce_timer is not None:
+                self._coalesce_timer.cancel()
+                self._coalesce_timer = None
+
+            envelopes = self._coalesce_pending
+            self._coalesce_pending = []
+            self._coalesce_size = 0
+
+        if len(envelopes) == 0:
+            return
+
+        try:
+            packet = self._outlet.send(b"".join([e.raw for e in envelopes]))
+            with self._lock:
+                for e in envelopes:
+                    e.packet = packet
+                    e.tries += 1
+
+            self._outlet.set_packet_delivered_callback(packet, self._packet_delivered)
+            self._outlet.set_packet_timeout_callback(packet, self._packet_timeout, self._get_packet_timeout_time(envelopes[0].tries))
+            self._update_packet_timeouts()
+
+        except Exception as e:
+            RNS.log("An error occurred while sending coalesced messages on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+
     @property
     def mdu(self):
         """
@@ -703,3 +1022,25 @@ class LinkChannelOutlet(ChannelOutletBase):
             return packet.get_hash()
         else:
             return None
+
+    @property
+    def supports_batch_ack(self) -> bool:
+        return True
+
+    def send_ack(self, raw: bytes):
+        if self.link.status == RNS.Link.ACTIVE:
+            RNS.Packet(self.link, raw, context=RNS.Packet.CHANNEL_ACK, create_receipt=False).send()
+
+    def set_packet_acknowledged(self, packet: RNS.Packet):
+        receipt = packet.receipt
+        if receipt and receipt.status == RNS.PacketReceipt.SENT:
+            receipt.status = RNS.PacketReceipt.DELIVERED
+            receipt.proved = True
+            receipt.concluded_at = time.time()
+            self.link.last_proof = receipt.concluded_at
+
+            if receipt.callbacks.delivery != None:
+                try:
+                    receipt.callbacks.delivery(receipt)
+                except Exception as e:
+                    RNS.log("An error occurred while evaluating delivery callback for "+str(self.link)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
@@ -31,81 +31,79 @@
 import RNS.Cryptography.Provider as cp
 import RNS.vendor.platformutils as pu
 
-if cp.PROVIDER == cp.PROVIDER_INTERNAL:
-    from .aes import AES128
-    from .aes import AES256
-    
-elif cp.PROVIDER == cp.PROVIDER_PYCA:
+from .aes import AES128
+from .aes import AES256
+
+if cp.use_pyca:
     from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
     if pu.cryptography_old_api(): from cryptography.hazmat.backends import default_backend
 
 
+class CBCCipher:
+    """
+    AES-CBC cipher bound to a single key. The key schedule is only
+    prepared once, and the cipher can then be used for any number
+    of messages, each with their own IV. Instances hold no state
+    between messages, and can be shared between threads.
+    """
+    def __init__(self, key, provider=None):
+        if len(key) != 16 and len(key) != 32: raise ValueError(f"Invalid key length {len(key)*8} for AES-CBC")
+        self.provider = provider if provider != None else cp.backend_for("aes_cbc")
+
+        if self.provider == cp.BACKEND_INTERNAL or self.provider == cp.PROVIDER_INTERNAL:
+            if len(key) == 16:
+                cipher = AES128(key)
+                self.encrypt = cipher.encrypt
+                self.decrypt = cipher.decrypt
+            else:
+                cipher = AES256(key)
+                self.encrypt = cipher.encrypt_cbc
+                self.decrypt = cipher.decrypt_cbc
+
+        elif self.provider == cp.BACKEND_PYCA or self.provider == cp.PROVIDER_PYCA:
+            self.__algorithm = algorithms.AES(key)
+            self.encrypt = self.__pyca_encrypt
+            self.decrypt = self.__pyca_decrypt
+
+        else: raise TypeError(f"Invalid cryptography provider: {self.provider}")
+
+    def __pyca_cipher(self, iv):
+        if not pu.cryptography_old_api(): return Cipher(self.__algorithm, modes.CBC(iv))
+        else:                             return Cipher(self.__algorithm, modes.CBC(iv), backend=default_backend())
+
+    def __pyca_encrypt(self, plaintext, iv):
+        encryptor = self.__pyca_cipher(iv).encryptor()
+        return encryptor.update(plaintext) + encryptor.finalize()
+
+    def __pyca_decrypt(self, ciphertext, iv):
+        decryptor = self.__pyca_cipher(iv).decryptor()
+        return decryptor.update(ciphertext) + decryptor.finalize()
+
+
 class AES_128_CBC:
     @staticmethod
-    def encrypt(plaintext, key, iv):
-        if len(key) != 16: raise ValueError(f"Invalid key length {len(key)*8} for {self}")
-        if cp.PROVIDER == cp.PROVIDER_INTERNAL:
-            cipher = AES128(key)
-            return cipher.encrypt(plaintext, iv)
-
-        elif cp.PROVIDER == cp.PROVIDER_PYCA:
-            if not pu.cryptography_old_api():
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-            else:
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+    def cipher(key):
+        if len(key) != 16: raise ValueError(f"Invalid key length {len(key)*8} for AES-128-CBC")
+        return CBCCipher(key)
 
-            encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(plaintext) + encryptor.finalize()
-            return ciphertext
+    @staticmethod
+    def encrypt(plaintext, key, iv):
+        return AES_128_CBC.cipher(key).encrypt(plaintext, iv)
 
     @staticmethod
     def decrypt(ciphertext, key, iv):
-        if len(key) != 16: raise ValueError(f"Invalid key length {len(key)*8} for {self}")
-        if cp.PROVIDER == cp.PROVIDER_INTERNAL:
-            cipher = AES128(key)
-            return cipher.decrypt(ciphertext, iv)
-
-        elif cp.PROVIDER == cp.PROVIDER_PYCA:
-            if not pu.cryptography_old_api():
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-            else:
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-
-            decryptor = cipher.decryptor()
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-            return plaintext
+        return AES_128_CBC.cipher(key).decrypt(ciphertext, iv)
 
 class AES_256_CBC:
+    @staticmethod
+    def cipher(key):
+        if len(key) != 32: raise ValueError(f"Invalid key length {len(key)*8} for AES-256-CBC")
+        return CBCCipher(key)
+
     @staticmethod
     def encrypt(plaintext, key, iv):
-        if len(key) != 32: raise ValueError(f"Invalid key length {len(key)*8} for {self}")
-        if cp.PROVIDER == cp.PROVIDER_INTERNAL:
-            cipher = AES256(key)
-            return cipher.encrypt_cbc(plaintext, iv)
-
-        elif cp.PROVIDER == cp.PROVIDER_PYCA:
-            if not pu.cryptography_old_api():
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-            else:
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-            
-            encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(plaintext) + encryptor.finalize()
-            return ciphertext
+        return AES_256_CBC.cipher(key).encrypt(plaintext, iv)
 
     @staticmethod
     def decrypt(ciphertext, key, iv):
-        if len(key) != 32: raise ValueError(f"Invalid key length {len(key)*8} for {self}")
-        if cp.PROVIDER == cp.PROVIDER_INTERNAL:
-            cipher = AES256(key)
-            return cipher.decrypt_cbc(ciphertext, iv)
-
-        elif cp.PROVIDER == cp.PROVIDER_PYCA:
-            if not pu.cryptography_old_api():
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-            else:
-                cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-
-            decryptor = cipher.decryptor()
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-            return plaintext
+        return AES_256_CBC.cipher(key).decrypt(ciphertext, iv)
@@ -5,6 +5,8 @@
 
 import warnings as _warnings
 import hashlib as _hashlib
+import hmac as _hmac
+import RNS.Cryptography.Provider as cp
 
 trans_5C = bytes((x ^ 0x5C) for x in range(256))
 trans_36 = bytes((x ^ 0x36) for x in range(256))
@@ -151,7 +153,8 @@ def new(key, msg=None, digestmod=_hashlib.sha256):
     method, and can ask for the hash value at any time by calling its digest()
     or hexdigest() methods.
     """
-    return HMAC(key, msg, digestmod)
+    if cp.backend_for("hmac") == cp.BACKEND_HASHLIB: return _hmac.new(key, msg, digestmod)
+    else:                                             return HMAC(key, msg, digestmod)
 
 
 def digest(key, msg, digest):
@@ -162,6 +165,8 @@ def digest(key, msg, digest):
             A hashlib constructor returning a new hash object. *OR*
             A module supporting PEP 247.
     """
+    if cp.backend_for("hmac") == cp.BACKEND_HASHLIB: return _hmac.digest(key, msg, digest)
+
     if callable(digest):
         digest_cons = digest
     elif isinstance(digest, str):
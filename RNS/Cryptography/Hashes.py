@@ -44,21 +44,26 @@ if hasattr(hashlib, "sha256"):
 else:
     from .SHA256 import sha256 as ext_sha256
 
+import RNS.Cryptography.Provider as cp
+
 """
 The SHA primitives are abstracted here to allow platform-
-aware hardware acceleration in the future. Currently only
-uses Python's internal SHA-256 implementation. All SHA-256
+aware hardware acceleration. The implementation used is the
+one selected for each primitive in the provider registry,
+which prefers Python's hashlib. All SHA-256 and SHA-512
 calls in RNS end up here.
 """
 
 def sha256(data):
-    digest = ext_sha256()
+    if cp.selected["sha256"] == cp.BACKEND_HASHLIB: digest = ext_sha256()
+    else:                                           digest = cp.implementation("sha256")()
     digest.update(data)
 
     return digest.digest()
 
 def sha512(data):
-    digest = ext_sha512()
+    if cp.selected["sha512"] == cp.BACKEND_HASHLIB: digest = ext_sha512()
+    else:                                           digest = cp.implementation("sha512")()
     digest.update(data)
 
     return digest.digest()
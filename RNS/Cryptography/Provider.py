@@ -28,6 +28,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
+import time
+import platform
 import importlib.util
 
 PROVIDER_NONE     = 0x00
@@ -66,4 +69,236 @@ def backend():
     elif PROVIDER == PROVIDER_INTERNAL:
         return "internal"
     elif PROVIDER == PROVIDER_PYCA:
-        return "openssl, PyCA "+str(pyca_v)
\ No newline at end of file
+        return "openssl, PyCA "+str(pyca_v)
+
+# Besides the overall provider above, each primitive can be
+# served by its own backend. The registry below tracks which
+# backends are available for each primitive, and which one is
+# currently selected. Selections default to a static preference
+# order, and can be refined by benchmarking the backends at
+# runtime with select_fastest().
+
+BACKEND_INTERNAL = "internal"
+BACKEND_HASHLIB  = "hashlib"
+BACKEND_PYCA     = "pyca"
+BACKEND_SODIUM   = "libsodium"
+
+PRIMITIVES = ["sha256", "sha512", "hmac", "aes_cbc", "x25519", "ed25519"]
+
+# Backends that release the interpreter lock while
+# running, and can be used from several threads at
+# once for real parallelism.
+RELEASES_GIL = [BACKEND_SODIUM]
+BENCHMARK_DURATION = 0.05
+
+# libsodium rejects non-canonical signatures, and small-order
+# keys and signature components, that the internal and PyCA
+# Ed25519 implementations accept. Selecting it for signatures
+# would make the validity of a signature depend on the backend
+# in use, so it is only offered for ed25519 if explicitly
+# enabled here. It is always offered for x25519.
+SODIUM_SIGNATURES = False
+
+sodium_v = None
+use_sodium = False
+sodium_probed = False
+Sodium = None
+
+def sodium_available():
+    """
+    Looks for libsodium on the first call, and returns whether
+    it is available. The library is never loaded on import of
+    this module, only once a backend lookup needs it.
+    """
+    global Sodium, sodium_v, use_sodium, sodium_probed
+    if not sodium_probed:
+        try:
+            if not FORCE_INTERNAL:
+                import RNS.Cryptography.Sodium as Sodium
+                if Sodium.available():
+                    sodium_v = Sodium.version()
+                    use_sodium = True
+
+        except Exception as e:
+            use_sodium = False
+
+        sodium_probed = True
+
+    return use_sodium
+
+try:
+    import hashlib
+    import hmac
+    use_hashlib = hasattr(hashlib, "sha256") and hasattr(hashlib, "sha512")
+except Exception as e:
+    use_hashlib = False
+
+def available(primitive, probe=True):
+    """
+    Returns the backends available for a primitive, in order of
+    static preference. If probe is False, optional libraries that
+    have not been loaded yet are left out instead of loaded.
+    """
+    if not primitive in PRIMITIVES: raise KeyError(f"Unknown cryptographic primitive {primitive}")
+    backends = []
+    if primitive in ["sha256", "sha512", "hmac"]:
+        if use_hashlib: backends.append(BACKEND_HASHLIB)
+    elif primitive == "aes_cbc":
+        if use_pyca: backends.append(BACKEND_PYCA)
+    else:
+        if use_pyca: backends.append(BACKEND_PYCA)
+        if primitive == "x25519" or SODIUM_SIGNATURES:
+            if (probe or sodium_probed) and sodium_available(): backends.append(BACKEND_SODIUM)
+
+    backends.append(BACKEND_INTERNAL)
+    return backends
+
+selected = {}
+ops = {}
+for primitive in PRIMITIVES: selected[primitive] = available(primitive, probe=False)[0]
+
+def backend_for(primitive):
+    backend = selected[primitive]
+    if backend == BACKEND_PYCA and PROVIDER != PROVIDER_PYCA: return BACKEND_INTERNAL
+    else: return backend
+
+def select(primitive, backend):
+    if not backend in available(primitive): raise ValueError(f"The {backend} backend is not available for {primitive}")
+    selected[primitive] = backend
+
+def implementation(primitive, backend=None):
+    """
+    Returns the implementation of a primitive for the specified
+    backend, or for the currently selected one. Hashes and HMAC
+    are returned as constructors, AES-CBC as a cipher factory
+    taking a key, and the curve primitives as a tuple of private
+    and public key classes.
+    """
+    if backend == None: backend = backend_for(primitive)
+    if primitive == "sha256":
+        if backend == BACKEND_HASHLIB: return hashlib.sha256
+        else:
+            from RNS.Cryptography.SHA256 import sha256
+            return sha256
+
+    elif primitive == "sha512":
+        if backend == BACKEND_HASHLIB: return hashlib.sha512
+        else:
+            from RNS.Cryptography.SHA512 import sha512
+            return sha512
+
+    elif primitive == "hmac":
+        if backend == BACKEND_HASHLIB: return hmac.new
+        else:
+            from RNS.Cryptography.HMAC import HMAC
+            return HMAC
+
+    elif primitive == "aes_cbc":
+        from RNS.Cryptography.AES import CBCCipher
+        return lambda key: CBCCipher(key, provider=backend)
+
+    elif primitive == "x25519":
+        if backend == BACKEND_PYCA:
+            from RNS.Cryptography.Proxies import X25519PrivateKeyProxy, X25519PublicKeyProxy
+            return X25519PrivateKeyProxy, X25519PublicKeyProxy
+        elif backend == BACKEND_SODIUM: return Sodium.X25519PrivateKey, Sodium.X25519PublicKey
+        else:
+            from RNS.Cryptography.X25519 import X25519PrivateKey, X25519PublicKey
+            return X25519PrivateKey, X25519PublicKey
+
+    elif primitive == "ed25519":
+        if backend == BACKEND_PYCA:
+            from RNS.Cryptography.Proxies import Ed25519PrivateKeyProxy, Ed25519PublicKeyProxy
+            return Ed25519PrivateKeyProxy, Ed25519PublicKeyProxy
+        elif backend == BACKEND_SODIUM: return Sodium.Ed25519PrivateKey, Sodium.Ed25519PublicKey
+        else:
+            from RNS.Cryptography.Ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+            return Ed25519PrivateKey, Ed25519PublicKey
+
+    raise KeyError(f"Unknown cryptographic primitive {primitive}")
+
+def benchmark(primitive, backend, duration=BENCHMARK_DURATION):
+    """
+    Runs the operation that dominates the cost of a primitive in
+    RNS for at least the specified duration, and returns the
+    measured number of operations per second.
+    """
+    impl = implementation(primitive, backend)
+    key  = os.urandom(32)
+    data = os.urandom(64)
+
+    if primitive == "sha256" or primitive == "sha512":
+        def op(): impl(data).digest()
+
+    elif primitive == "hmac":
+        def op(): impl(key, data, hashlib.sha256).digest()
+
+    elif primitive == "aes_cbc":
+        cipher = impl(key); iv = key[:16]
+        def op(): cipher.encrypt(data, iv)
+
+    elif primitive == "x25519":
+        prv = impl[0].generate(); pub = impl[0].generate().public_key()
+        def op(): prv.exchange(pub)
+
+    elif primitive == "ed25519":
+        prv = impl[0].generate(); pub = prv.public_key(); signature = prv.sign(data)
+        def op(): pub.verify(signature, data)
+
+    rounds = 0
+    started = time.perf_counter()
+    while True:
+        op(); rounds += 1
+        elapsed = time.perf_counter()-started
+        if elapsed >= duration: break
+
+    return rounds/elapsed
+
+def fingerprint():
+    sodium_available()
+    return f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}, PyCA {pyca_v if use_pyca else None}, libsodium {sodium_v}, libsodium signatures {SODIUM_SIGNATURES}"
+
+def select_fastest(cache_path=None):
+    """
+    Selects the fastest available backend for every primitive.
+    If a cache path is specified, previous benchmark results are
+    reused as long as the runtime and backend versions match,
+    and new results are written to it.
+    """
+    import RNS.vendor.umsgpack as umsgpack
+    results = None
+    if cache_path != None and os.path.isfile(cache_path):
+        try:
+            with open(cache_path, "rb") as file: cached = umsgpack.unpackb(file.read())
+            if cached["fingerprint"] == fingerprint(): results = cached["results"]
+        except Exception as e:
+            results = None
+
+    if results == None or not all(results.get(primitive) and results[primitive][0] in available(primitive) for primitive in PRIMITIVES):
+        results = {}
+        for primitive in PRIMITIVES:
+            measured = {}
+            for backend in available(primitive):
+                if backend == BACKEND_PYCA and PROVIDER != PROVIDER_PYCA: continue
+                try: measured[backend] = benchmark(primitive, backend)
+                except Exception as e: pass
+
+            fastest = max(measured, key=measured.get)
+            results[primitive] = [fastest, measured[fastest]]
+
+        if cache_path != None:
+            try:
+                tmp_path = f"{cache_path}.tmp"
+                with open(tmp_path, "wb") as file: file.write(umsgpack.packb({"fingerprint": fingerprint(), "results": results}))
+                os.replace(tmp_path, cache_path)
+            except Exception as e:
+                pass
+
+    for primitive in PRIMITIVES:
+        selected[primitive] = results[primitive][0]
+        ops[primitive] = results[primitive][1]
+
+    return stats()
+
+def stats():
+    return {primitive: {"backend": backend_for(primitive), "ops": ops.get(primitive)} for primitive in PRIMITIVES}
\ No newline at end of file
@@ -58,6 +58,9 @@ class X25519PrivateKeyProxy:
         return X25519PublicKeyProxy(self.real.public_key())
 
     def exchange(self, peer_public_key):
+        if not isinstance(peer_public_key, X25519PublicKeyProxy):
+            peer_public_key = X25519PublicKeyProxy.from_public_bytes(peer_public_key.public_bytes())
+
         return self.real.exchange(peer_public_key.real)
 
 
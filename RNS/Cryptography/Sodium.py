@@ -0,0 +1,177 @@
+# Reticulum License
+#
+# Copyright (c) 2016-2025 Mark Qvist
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# - The Software shall not be used in any kind of system which includes amongst
+#   its functions the ability to purposefully do harm to human beings.
+#
+# - The Software shall not be used, directly or indirectly, in the creation of
+#   an artificial intelligence, machine learning or language model training
+#   dataset, including but not limited to any use that contributes to the
+#   training or development of such a model or algorithm.
+#
+# - The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import ctypes
+import ctypes.util
+import threading
+
+# Optional X25519 and Ed25519 primitives from libsodium, loaded
+# through ctypes if the library is present on the system. These
+# classes expose the same API as the internal and PyCA primitives.
+# The library is only looked up and loaded the first time it is
+# needed, never when this module is imported.
+
+LIBRARY_NAMES = ["sodium", "libsodium"]
+LIBRARY_FILES = ["libsodium.so", "libsodium.so.26", "libsodium.so.23", "libsodium.dylib", "libsodium.dll"]
+
+_lib = None
+_loaded = False
+_load_lock = threading.Lock()
+
+def __load():
+    candidates = [ctypes.util.find_library(name) for name in LIBRARY_NAMES]+LIBRARY_FILES
+    for candidate in candidates:
+        if candidate == None: continue
+        try:
+            lib = ctypes.CDLL(candidate)
+            if lib.sodium_init() < 0: continue
+
+            lib.sodium_version_string.restype = ctypes.c_char_p
+            lib.crypto_scalarmult_curve25519.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
+            lib.crypto_scalarmult_curve25519_base.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
+            lib.crypto_sign_ed25519_seed_keypair.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
+            lib.crypto_sign_ed25519_detached.argtypes = [ctypes.c_char_p, ctypes.c_void_p, ctypes.c_char_p, ctypes.c_ulonglong, ctypes.c_char_p]
+            lib.crypto_sign_ed25519_verify_detached.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulonglong, ctypes.c_char_p]
+            return lib
+
+        except Exception as e:
+            pass
+
+    return None
+
+def library():
+    global _lib, _loaded
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                _lib = __load()
+                _loaded = True
+
+    return _lib
+
+def available():
+    return library() != None
+
+def version():
+    if library() == None: return None
+    return _lib.sodium_version_string().decode("utf-8")
+
+
+class X25519PrivateKey:
+    def __init__(self, a):
+        if len(a) != 32: raise ValueError("X25519 private keys must be 32 bytes")
+        self.a = bytes(a)
+
+    @classmethod
+    def generate(cls):
+        return cls(os.urandom(32))
+
+    @classmethod
+    def from_private_bytes(cls, data):
+        return cls(data)
+
+    def private_bytes(self):
+        return self.a
+
+    def public_key(self):
+        q = ctypes.create_string_buffer(32)
+        if library().crypto_scalarmult_curve25519_base(q, self.a) != 0: raise ValueError("Could not derive X25519 public key")
+        return X25519PublicKey(q.raw)
+
+    def exchange(self, peer_public_key):
+        if isinstance(peer_public_key, (bytes, bytearray)): peer_public_key = bytes(peer_public_key)
+        else:                                               peer_public_key = peer_public_key.public_bytes()
+
+        q = ctypes.create_string_buffer(32)
+        if library().crypto_scalarmult_curve25519(q, self.a, peer_public_key) != 0: raise ValueError("Invalid X25519 peer public key")
+        return q.raw
+
+
+class X25519PublicKey:
+    def __init__(self, q):
+        if len(q) != 32: raise ValueError("X25519 public keys must be 32 bytes")
+        self.q = bytes(q)
+
+    @classmethod
+    def from_public_bytes(cls, data):
+        return cls(data)
+
+    def public_bytes(self):
+        return self.q
+
+
+class Ed25519PrivateKey:
+    def __init__(self, seed):
+        if len(seed) != 32: raise ValueError("Ed25519 private keys must be 32 bytes")
+        self.seed = bytes(seed)
+        pk = ctypes.create_string_buffer(32)
+        sk = ctypes.create_string_buffer(64)
+        library().crypto_sign_ed25519_seed_keypair(pk, sk, self.seed)
+        self.pk = pk.raw
+        self.sk = sk.raw
+
+    @classmethod
+    def generate(cls):
+        return cls.from_private_bytes(os.urandom(32))
+
+    @classmethod
+    def from_private_bytes(cls, data):
+        return cls(seed=data)
+
+    def private_bytes(self):
+        return self.seed
+
+    def public_key(self):
+        return Ed25519PublicKey.from_public_bytes(self.pk)
+
+    def sign(self, message):
+        message = bytes(message)
+        signature = ctypes.create_string_buffer(64)
+        library().crypto_sign_ed25519_detached(signature, None, message, len(message), self.sk)
+        return signature.raw
+
+
+class Ed25519PublicKey:
+    def __init__(self, seed):
+        if len(seed) != 32: raise ValueError("Ed25519 public keys must be 32 bytes")
+        self.seed = bytes(seed)
+
+    @classmethod
+    def from_public_bytes(cls, data):
+        return cls(data)
+
+    def public_bytes(self):
+        return self.seed
+
+    def verify(self, signature, message):
+        signature = bytes(signature); message = bytes(message)
+        if len(signature) != 64 or library().crypto_sign_ed25519_verify_detached(signature, message, len(message), self.seed) != 0:
+            raise ValueError("Invalid Ed25519 signature")
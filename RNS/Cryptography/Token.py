@@ -73,12 +73,24 @@ class Token():
 
         else: raise TypeError(f"Invalid token mode: {mode}")
 
+        # The AES key schedule and the keyed HMAC state are
+        # prepared once, and reused for every token, instead
+        # of being derived from the keys again on each call.
+        self._cipher = self.mode.cipher(self._encryption_key)
+        self._hmac = HMAC.new(self._signing_key)
+
+
+    def __hmac(self, data):
+        hmac = self._hmac.copy()
+        hmac.update(data)
+        return hmac.digest()
+
 
     def verify_hmac(self, token):
         if len(token) <= 32: raise ValueError("Cannot verify HMAC on token of only "+str(len(token))+" bytes")
         else:
             received_hmac = token[-32:]
-            expected_hmac = HMAC.new(self._signing_key, token[:-32]).digest()
+            expected_hmac = self.__hmac(token[:-32])
 
             if received_hmac == expected_hmac: return True
             else: return False
@@ -88,13 +100,10 @@ class Token():
         if not isinstance(data, bytes): raise TypeError("Token plaintext input must be bytes")
         iv = os.urandom(16)
 
-        ciphertext = self.mode.encrypt(
-            plaintext = PKCS7.pad(data),
-            key = self._encryption_key,
-            iv = iv)
+        ciphertext = self._cipher.encrypt(PKCS7.pad(data), iv)
 
         signed_parts = iv+ciphertext
-        return signed_parts + HMAC.new(self._signing_key, signed_parts).digest()
+        return signed_parts + self.__hmac(signed_parts)
 
 
     def decrypt(self, token = None):
@@ -104,11 +113,31 @@ class Token():
         iv = token[:16]
         ciphertext = token[16:-32]
 
-        try:
-            return PKCS7.unpad(
-                self.mode.decrypt(
-                    ciphertext = ciphertext,
-                    key = self._encryption_key,
-                    iv = iv))
-
+        try: return PKCS7.unpad(self._cipher.decrypt(ciphertext, iv))
         except Exception as e: raise ValueError(f"Could not decrypt token: {e}")
+
+
+    def encrypt_many(self, plaintexts):
+        """
+        Encrypts a list of plaintexts, returning a list of tokens
+        in the same order. Each token has its own IV.
+        """
+        ivs = os.urandom(16*len(plaintexts))
+        encrypt = self._cipher.encrypt
+        tokens = []
+        for i, data in enumerate(plaintexts):
+            if not isinstance(data, bytes): raise TypeError("Token plaintext input must be bytes")
+            iv = ivs[i*16:(i+1)*16]
+            signed_parts = iv+encrypt(PKCS7.pad(data), iv)
+            tokens.append(signed_parts + self.__hmac(signed_parts))
+
+        return tokens
+
+
+    def decrypt_many(self, tokens):
+        """
+        Decrypts a list of tokens, returning a list of plaintexts
+        in the same order. Raises ``ValueError`` if any of the tokens
+        are invalid.
+        """
+        return [self.decrypt(token) for token in tokens]
@@ -40,15 +40,31 @@ from .Provider import backend
 
 import RNS.Cryptography.Provider as cp
 
-if cp.PROVIDER == cp.PROVIDER_INTERNAL:
-    from RNS.Cryptography.X25519 import X25519PrivateKey, X25519PublicKey
-    from RNS.Cryptography.Ed25519 import Ed25519PrivateKey, Ed25519PublicKey
-
-elif cp.PROVIDER == cp.PROVIDER_PYCA:
-    from RNS.Cryptography.Proxies import X25519PrivateKeyProxy as X25519PrivateKey
-    from RNS.Cryptography.Proxies import X25519PublicKeyProxy as X25519PublicKey
-    from RNS.Cryptography.Proxies import Ed25519PrivateKeyProxy as Ed25519PrivateKey
-    from RNS.Cryptography.Proxies import Ed25519PublicKeyProxy as Ed25519PublicKey
+# The curve primitives dispatch to the backend selected in the
+# provider registry at call time, so that the selection can be
+# changed after this module has been imported.
+
+class X25519PrivateKey:
+    @staticmethod
+    def generate(): return cp.implementation("x25519")[0].generate()
+
+    @staticmethod
+    def from_private_bytes(data): return cp.implementation("x25519")[0].from_private_bytes(data)
+
+class X25519PublicKey:
+    @staticmethod
+    def from_public_bytes(data): return cp.implementation("x25519")[1].from_public_bytes(data)
+
+class Ed25519PrivateKey:
+    @staticmethod
+    def generate(): return cp.implementation("ed25519")[0].generate()
+
+    @staticmethod
+    def from_private_bytes(data): return cp.implementation("ed25519")[0].from_private_bytes(data)
+
+class Ed25519PublicKey:
+    @staticmethod
+    def from_public_bytes(data): return cp.implementation("ed25519")[1].from_public_bytes(data)
 
 py_modules  = glob.glob(os.path.dirname(__file__)+"/*.py")
 pyc_modules = glob.glob(os.path.dirname(__file__)+"/*.pyc")
@@ -31,7 +31,9 @@
 import os
 import math
 import time
+import inspect
 import threading
+import collections
 import RNS
 
 from RNS.Cryptography import Token
@@ -43,6 +45,110 @@ class Callbacks:
         self.packet = None
         self.proof_requested = None
 
+class RequestExecutor:
+    """
+    A bounded pool of worker threads for running request handlers. Worker
+    threads are started as requests arrive, up to the configured limit, and
+    exit again after being idle for a while. Requests that arrive while all
+    workers are busy are queued, and if the queue is full, the rejection
+    policy decides which request is dropped. With a queue limit of ``0``,
+    requests are only accepted while a worker is available.
+
+    A ``RequestExecutor`` can be passed to :ref:`RNS.Destination<api-destination>`
+    request handler registration, and can be shared between several
+    handlers and destinations.
+
+    :param workers: The maximum number of requests handled concurrently.
+    :param queue_limit: The maximum number of requests waiting for a worker.
+    :param policy: ``RNS.RequestExecutor.DROP_NEWEST`` to reject incoming requests when the queue is full, or ``RNS.RequestExecutor.DROP_OLDEST`` to drop the longest waiting request instead.
+    """
+
+    DROP_NEWEST  = 0x00
+    DROP_OLDEST  = 0x01
+    policies     = [DROP_NEWEST, DROP_OLDEST]
+
+    WORKERS      = 8
+    QUEUE_LIMIT  = 1024
+    IDLE_TIMEOUT = 30
+
+    def __init__(self, workers=WORKERS, queue_limit=QUEUE_LIMIT, policy=DROP_NEWEST):
+        if not type(workers) == int or workers < 1: raise ValueError("Invalid worker count for request executor")
+        if not type(queue_limit) == int or queue_limit < 0: raise ValueError("Invalid queue limit for request executor")
+        if not policy in RequestExecutor.policies: raise ValueError("Invalid rejection policy for request executor")
+
+        self.workers     = workers
+        self.queue_limit = queue_limit
+        self.policy      = policy
+        self.queue       = collections.deque()
+        self.condition   = threading.Condition()
+        self.running     = 0
+        self.idle        = 0
+        self.rejected    = 0
+
+    def submit(self, job, rejected=None):
+        """
+        Submits a job for execution.
+
+        :param job: A function with no arguments.
+        :param rejected: An optional function with no arguments, that will be called if the job is dropped by the rejection policy.
+        :returns: ``True`` if the job was queued, otherwise ``False``.
+        """
+        accepted = True
+        dropped  = None
+        with self.condition:
+            # Jobs that an idle or not yet started worker
+            # will pick up are not counted as waiting
+            available = self.idle + self.workers - self.running
+            if len(self.queue) >= self.queue_limit + available:
+                self.rejected += 1
+                if self.policy == RequestExecutor.DROP_OLDEST and len(self.queue) > available:
+                    _, dropped = self.queue.popleft()
+                else:
+                    accepted = False
+                    dropped  = rejected
+
+            if accepted:
+                self.queue.append((job, rejected))
+                if self.running < self.workers and len(self.queue) > self.idle:
+                    self.running += 1
+                    threading.Thread(target=self.__worker, name="Request Worker", daemon=True).start()
+                else:
+                    self.condition.notify()
+
+        if dropped != None:
+            try:
+                dropped()
+            except Exception as e:
+                RNS.log("Error while running request rejection callback. The contained exception was: "+str(e), RNS.LOG_ERROR)
+
+        return accepted
+
+    def pending(self):
+        """
+        :returns: The number of jobs waiting for a worker.
+        """
+        with self.condition:
+            return len(self.queue)
+
+    def __worker(self):
+        while True:
+            with self.condition:
+                while len(self.queue) == 0:
+                    self.idle += 1
+                    notified = self.condition.wait(RequestExecutor.IDLE_TIMEOUT)
+                    self.idle -= 1
+                    if not notified and len(self.queue) == 0:
+                        self.running -= 1
+                        return
+
+                job, _ = self.queue.popleft()
+
+            try:
+                job()
+            except Exception as e:
+                RNS.log("Error while handling request. The contained exception was: "+str(e), RNS.LOG_ERROR)
+
+
 class Destination:
     """
     A class used to describe endpoints in a Reticulum Network. Destination
@@ -76,6 +182,10 @@ class Destination:
     ALLOW_LIST = 0x02
     request_policies = [ALLOW_NONE, ALLOW_ALL, ALLOW_LIST]
 
+    # Upper bounds in seconds of the request
+    # latency histogram buckets
+    REQUEST_LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0]
+
     IN         = 0x11;
     OUT        = 0x12;
     directions = [IN, OUT]
@@ -155,6 +265,9 @@ class Destination:
         self.accept_link_requests = True
         self.callbacks = Callbacks()
         self.request_handlers = {}
+        self.request_executor = None
+        self.request_stats = {}
+        self.request_stats_lock = threading.Lock()
         self.type = type
         self.direction = direction
         self.proof_strategy = Destination.PROVE_NONE
@@ -377,23 +490,37 @@ class Destination:
         else:
             self.proof_strategy = proof_strategy
 
-    def register_request_handler(self, path, response_generator = None, allow = ALLOW_NONE, allowed_list = None, auto_compress = True):
+    def register_request_handler(self, path, response_generator = None, allow = ALLOW_NONE, allowed_list = None, auto_compress = True, executor = None, concurrency = None):
         """
         Registers a request handler.
 
         :param path: The path for the request handler to be registered.
-        :param response_generator: A function or method with the signature *response_generator(path, data, request_id, link_id, remote_identity, requested_at)* to be called. Whatever this funcion returns will be sent as a response to the requester. If the function returns ``None``, no response will be sent.
+        :param response_generator: A function or method with the signature *response_generator(path, data, request_id, link_id, remote_identity, requested_at)* to be called. Whatever this funcion returns will be sent as a response to the requester. If the function returns ``None`` or raises an exception, no response will be sent, and the request will time out on the requesting side.
         :param allow: One of ``RNS.Destination.ALLOW_NONE``, ``RNS.Destination.ALLOW_ALL`` or ``RNS.Destination.ALLOW_LIST``. If ``RNS.Destination.ALLOW_LIST`` is set, the request handler will only respond to requests for identified peers in the supplied list.
         :param allowed_list: A list of *bytes-like* :ref:`RNS.Identity<api-identity>` hashes.
         :param auto_compress: If ``True`` or ``False``, determines whether automatic compression of responses should be carried out. If set to an integer value, responses will only be auto-compressed if under this size in bytes. If omitted, the default compression settings will be followed.
+        :param executor: An optional :ref:`RNS.RequestExecutor<api-requestexecutor>` or ``concurrent.futures.Executor`` to run the handler on. If omitted, requests are run on a worker pool shared by all handlers of this destination.
+        :param concurrency: An optional integer limiting the number of concurrently running requests for this handler, using a dedicated :ref:`RNS.RequestExecutor<api-requestexecutor>`.
         :raises: ``ValueError`` if any of the supplied arguments are invalid.
         """
         if path == None or path == "": raise ValueError("Invalid path specified")
         elif not callable(response_generator): raise ValueError("Invalid response generator specified")
         elif not allow in Destination.request_policies: raise ValueError("Invalid request policy")
+        elif executor != None and concurrency != None: raise ValueError("Either an executor or a concurrency limit can be specified, not both")
+        elif executor != None and not callable(getattr(executor, "submit", None)): raise ValueError("Invalid executor specified")
         else:
+            # The signature of the response generator is resolved
+            # once here, instead of on every handled request.
+            try:
+                parameters = len(inspect.signature(response_generator).parameters)
+            except Exception as e:
+                raise ValueError("Could not inspect signature of response generator: "+str(e))
+            if not parameters in [5, 6]: raise ValueError("Invalid signature for response generator callback")
+
+            if concurrency != None: executor = RequestExecutor(workers=concurrency)
+
             path_hash = RNS.Identity.truncated_hash(path.encode("utf-8"))
-            request_handler = [path, response_generator, allow, allowed_list, auto_compress]
+            request_handler = [path, response_generator, allow, allowed_list, auto_compress, parameters, executor]
             self.request_handlers[path_hash] = request_handler
 
     def deregister_request_handler(self, path):
@@ -410,6 +537,83 @@ class Destination:
         else:
             return False
 
+    def submit_request(self, request_handler, job):
+        path       = request_handler[0]
+        executor   = request_handler[6]
+        started_at = time.time()
+
+        def handle():
+            failed = False
+            try:
+                job()
+            except Exception as e:
+                # No response is sent for a failed request, which
+                # then times out on the requesting side
+                failed = True
+                RNS.log("Error while handling request for "+str(path)+" on "+str(self)+", no response will be sent. The contained exception was: "+str(e), RNS.LOG_ERROR)
+            finally:
+                self.record_request(path, time.time()-started_at, failed=failed)
+
+        def rejected():
+            RNS.log("Request queue for "+str(path)+" on "+str(self)+" is full, dropping request", RNS.LOG_WARNING)
+            self.record_request(path, None)
+
+        if executor == None:
+            if self.request_executor == None:
+                self.request_executor = RequestExecutor()
+            executor = self.request_executor
+
+        if isinstance(executor, RequestExecutor):
+            executor.submit(handle, rejected=rejected)
+        else:
+            try:
+                executor.submit(handle)
+            except Exception as e:
+                RNS.log("Could not submit request to executor. The contained exception was: "+str(e), RNS.LOG_ERROR)
+                rejected()
+
+    def record_request(self, path, latency, failed=False):
+        with self.request_stats_lock:
+            if not path in self.request_stats:
+                self.request_stats[path] = {"handled": 0, "rejected": 0, "failed": 0, "total_latency": 0.0, "max_latency": 0.0,
+                                            "buckets": [0]*(len(Destination.REQUEST_LATENCY_BUCKETS)+1)}
+            stats = self.request_stats[path]
+            if latency == None:
+                stats["rejected"] += 1
+            else:
+                stats["handled"] += 1
+                if failed: stats["failed"] += 1
+                stats["total_latency"] += latency
+                if latency > stats["max_latency"]: stats["max_latency"] = latency
+                bucket = 0
+                while bucket < len(Destination.REQUEST_LATENCY_BUCKETS) and latency > Destination.REQUEST_LATENCY_BUCKETS[bucket]:
+                    bucket += 1
+                stats["buckets"][bucket] += 1
+
+    def get_request_stats(self):
+        """
+        Returns request handling statistics for each registered path. Latency
+        is measured from when a request is received until its handler returns,
+        including any time spent waiting for a worker.
+
+        :returns: A dictionary keyed by path, each containing the number of handled, rejected and failed requests, the mean and maximum latency in seconds, and a latency histogram as a list of ``(upper_bound, count)`` tuples, where the last upper bound is ``None``.
+        """
+        request_stats = {}
+        with self.request_stats_lock:
+            for path in self.request_stats:
+                stats = self.request_stats[path]
+                bounds = Destination.REQUEST_LATENCY_BUCKETS+[None]
+                request_stats[path] = {
+                    "handled": stats["handled"],
+                    "rejected": stats["rejected"],
+                    "failed": stats["failed"],
+                    "mean_latency": stats["total_latency"]/stats["handled"] if stats["handled"] > 0 else 0.0,
+                    "max_latency": stats["max_latency"],
+                    "histogram": [(bounds[i], stats["buckets"][i]) for i in range(0, len(bounds))],
+                }
+
+        return request_stats
+
     def receive(self, packet):
         if packet.packet_type == RNS.Packet.LINKREQUEST:
             plaintext = packet.data
@@ -430,9 +634,7 @@ class Destination:
 
     def incoming_link_request(self, data, packet):
         if self.accept_link_requests:
-            link = RNS.Link.validate_request(self, data, packet)
-            if link != None:
-                self.links.append(link)
+            RNS.Link.offload_request(self, data, packet, self.links.append)
 
     def _reload_ratchets(self, ratchets_path):
         if os.path.isfile(ratchets_path):
@@ -89,12 +89,33 @@ class Identity:
     DERIVED_KEY_LENGTH        = 512//8
     DERIVED_KEY_LENGTH_LEGACY = 256//8
 
+    # Announce signature validity is memoised by packet
+    # hash, so an announce that is heard several times,
+    # or checked at several stages of inbound processing,
+    # only has its signature verified once.
+    ANNOUNCE_SIGNATURE_CACHE = 8192
+
+    # Batches of announce signatures are verified using
+    # the batch API of the signature backend if it has
+    # one, and otherwise spread over a pool of workers.
+    # Backends that release the interpreter lock use
+    # threads, others use a pool of processes. Batches
+    # smaller than two chunks are verified in-line.
+    BATCH_VERIFY_WORKERS   = os.cpu_count() or 1
+    BATCH_VERIFY_MIN_CHUNK = 8
+
     # Storage
     known_destinations = {}
     known_ratchets = {}
 
     ratchet_persist_lock = threading.Lock()
 
+    announce_signatures      = {}
+    announces_verified       = 0
+    announce_signature_hits  = 0
+    batch_verify_executor    = None
+    batch_verify_lock        = threading.Lock()
+
     @staticmethod
     def remember(packet_hash, destination_hash, public_key, app_data = None):
         if len(public_key) != Identity.KEYSIZE//8:
@@ -136,12 +157,12 @@ class Identity:
                 identity.app_data = identity_data[3]
                 return identity
             else:
-                for registered_destination in RNS.Transport.destinations:
-                    if target_hash == registered_destination.hash:
-                        identity = Identity(create_keys=False)
-                        identity.load_public_key(registered_destination.identity.get_public_key())
-                        identity.app_data = None
-                        return identity
+                registered_destination = RNS.Transport.destination_index.get(target_hash, None)
+                if registered_destination != None:
+                    identity = Identity(create_keys=False)
+                    identity.load_public_key(registered_destination.identity.get_public_key())
+                    identity.app_data = None
+                    return identity
 
                 return None
 
@@ -388,44 +409,159 @@ class Identity:
             return None
 
     @staticmethod
-    def validate_announce(packet, only_validate_signature=False):
-        try:
-            if packet.packet_type == RNS.Packet.ANNOUNCE:
-                keysize       = Identity.KEYSIZE//8
-                ratchetsize   = Identity.RATCHETSIZE//8
-                name_hash_len = Identity.NAME_HASH_LENGTH//8
-                sig_len       = Identity.SIGLENGTH//8
-                destination_hash = packet.destination_hash
+    def _unpack_announce(packet):
+        keysize       = Identity.KEYSIZE//8
+        ratchetsize   = Identity.RATCHETSIZE//8
+        name_hash_len = Identity.NAME_HASH_LENGTH//8
+        sig_len       = Identity.SIGLENGTH//8
+
+        # Get public key bytes from announce
+        public_key = packet.data[:keysize]
+
+        # If the packet context flag is set,
+        # this announce contains a new ratchet
+        if packet.context_flag == RNS.Packet.FLAG_SET:
+            name_hash   = packet.data[keysize:keysize+name_hash_len ]
+            random_hash = packet.data[keysize+name_hash_len:keysize+name_hash_len+10]
+            ratchet     = packet.data[keysize+name_hash_len+10:keysize+name_hash_len+10+ratchetsize]
+            signature   = packet.data[keysize+name_hash_len+10+ratchetsize:keysize+name_hash_len+10+ratchetsize+sig_len]
+            app_data    = b""
+            if len(packet.data) > keysize+name_hash_len+10+sig_len+ratchetsize:
+                app_data = packet.data[keysize+name_hash_len+10+sig_len+ratchetsize:]
+
+        # If the packet context flag is not set,
+        # this announce does not contain a ratchet
+        else:
+            ratchet     = b""
+            name_hash   = packet.data[keysize:keysize+name_hash_len]
+            random_hash = packet.data[keysize+name_hash_len:keysize+name_hash_len+10]
+            signature   = packet.data[keysize+name_hash_len+10:keysize+name_hash_len+10+sig_len]
+            app_data    = b""
+            if len(packet.data) > keysize+name_hash_len+10+sig_len:
+                app_data = packet.data[keysize+name_hash_len+10+sig_len:]
+
+        signed_data = packet.destination_hash+public_key+name_hash+random_hash+ratchet+app_data
+
+        if not len(packet.data) > Identity.KEYSIZE//8+Identity.NAME_HASH_LENGTH//8+10+Identity.SIGLENGTH//8:
+            app_data = None
+
+        return public_key, name_hash, random_hash, ratchet, signature, app_data, signed_data
+
+    @staticmethod
+    def _announce_signature_key(packet):
+        # The packet hash does not cover the context flag,
+        # which determines how the announce is parsed
+        return packet.get_hash()+bytes([packet.context_flag])
+
+    @staticmethod
+    def _remember_announce_signature(key, valid):
+        Identity.announce_signatures[key] = valid
+        while len(Identity.announce_signatures) > Identity.ANNOUNCE_SIGNATURE_CACHE:
+            Identity.announce_signatures.pop(next(iter(Identity.announce_signatures)), None)
+
+    @staticmethod
+    def _announce_signature_valid(packet, announced_identity, signature, signed_data):
+        key = Identity._announce_signature_key(packet)
+        valid = Identity.announce_signatures.get(key, None)
+        if valid != None:
+            Identity.announce_signature_hits += 1
+            return valid
+
+        valid = announced_identity.validate(signature, signed_data)
+        Identity.announces_verified += 1
+        Identity._remember_announce_signature(key, valid)
+        return valid
+
+    @staticmethod
+    def _verify_signatures(entries):
+        results = []
+        for public_key, signature, message in entries:
+            try:
+                Ed25519PublicKey.from_public_bytes(public_key).verify(signature, message)
+                results.append(True)
+            except Exception as e:
+                results.append(False)
+
+        return results
 
-                # Get public key bytes from announce
-                public_key = packet.data[:keysize]
-
-                # If the packet context flag is set,
-                # this announce contains a new ratchet
-                if packet.context_flag == RNS.Packet.FLAG_SET:
-                    name_hash   = packet.data[keysize:keysize+name_hash_len ]
-                    random_hash = packet.data[keysize+name_hash_len:keysize+name_hash_len+10]
-                    ratchet     = packet.data[keysize+name_hash_len+10:keysize+name_hash_len+10+ratchetsize]
-                    signature   = packet.data[keysize+name_hash_len+10+ratchetsize:keysize+name_hash_len+10+ratchetsize+sig_len]
-                    app_data    = b""
-                    if len(packet.data) > keysize+name_hash_len+10+sig_len+ratchetsize:
-                        app_data = packet.data[keysize+name_hash_len+10+sig_len+ratchetsize:]
-
-                # If the packet context flag is not set,
-                # this announce does not contain a ratchet
+    @staticmethod
+    def _verify_batch(entries):
+        implementation = RNS.Cryptography.Provider.implementation("ed25519")[1]
+        if hasattr(implementation, "verify_batch"): return implementation.verify_batch(entries)
+
+        workers = min(Identity.BATCH_VERIFY_WORKERS, len(entries)//Identity.BATCH_VERIFY_MIN_CHUNK)
+        if workers < 2: return Identity._verify_signatures(entries)
+
+        with Identity.batch_verify_lock:
+            backend = RNS.Cryptography.Provider.backend_for("ed25519")
+            if Identity.batch_verify_executor == None or Identity.batch_verify_executor[0] != backend:
+                import concurrent.futures
+                if Identity.batch_verify_executor != None: Identity.batch_verify_executor[1].shutdown(wait=False)
+                if backend in RNS.Cryptography.Provider.RELEASES_GIL:
+                    executor = concurrent.futures.ThreadPoolExecutor(max_workers=Identity.BATCH_VERIFY_WORKERS)
                 else:
-                    ratchet     = b""
-                    name_hash   = packet.data[keysize:keysize+name_hash_len]
-                    random_hash = packet.data[keysize+name_hash_len:keysize+name_hash_len+10]
-                    signature   = packet.data[keysize+name_hash_len+10:keysize+name_hash_len+10+sig_len]
-                    app_data    = b""
-                    if len(packet.data) > keysize+name_hash_len+10+sig_len:
-                        app_data = packet.data[keysize+name_hash_len+10+sig_len:]
+                    import multiprocessing
+                    executor = concurrent.futures.ProcessPoolExecutor(max_workers=Identity.BATCH_VERIFY_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+                Identity.batch_verify_executor = [backend, executor]
+
+            executor = Identity.batch_verify_executor[1]
+
+        chunk_size = math.ceil(len(entries)/workers)
+        chunks = [entries[i:i+chunk_size] for i in range(0, len(entries), chunk_size)]
+        try:
+            results = []
+            for chunk_results in executor.map(Identity._verify_signatures, chunks): results.extend(chunk_results)
+            return results
+
+        except Exception as e:
+            RNS.log(f"Batch signature verification workers failed, verifying signatures in-line from now on. The contained exception was: {e}", RNS.LOG_ERROR)
+            with Identity.batch_verify_lock:
+                Identity.BATCH_VERIFY_WORKERS = 1
+                Identity.batch_verify_executor = None
+                executor.shutdown(wait=False)
 
-                signed_data = destination_hash+public_key+name_hash+random_hash+ratchet+app_data
+            return Identity._verify_signatures(entries)
 
-                if not len(packet.data) > Identity.KEYSIZE//8+Identity.NAME_HASH_LENGTH//8+10+Identity.SIGLENGTH//8:
-                    app_data = None
+    @staticmethod
+    def verify_announce_signatures(packets):
+        """
+        Verifies the signatures of a number of announces in one batch. The results
+        are memoised, so that subsequent validation of the announces with
+        ``validate_announce`` does not verify the signatures again.
+
+        :param packets: A list of unpacked announce packets.
+        :returns: A list of *True* or *False* for each packet, in the same order.
+        """
+        results = [None]*len(packets)
+        pending = []
+        for i in range(0, len(packets)):
+            packet = packets[i]
+            key = Identity._announce_signature_key(packet)
+            valid = Identity.announce_signatures.get(key, None)
+            if valid != None:
+                Identity.announce_signature_hits += 1
+                results[i] = valid
+            else:
+                public_key, _, _, _, signature, _, signed_data = Identity._unpack_announce(packet)
+                pending.append((i, key, (public_key[Identity.KEYSIZE//8//2:], signature, signed_data)))
+
+        if len(pending) > 0:
+            verified = Identity._verify_batch([entry for _, _, entry in pending])
+            Identity.announces_verified += len(pending)
+            for j in range(0, len(pending)):
+                i, key, _ = pending[j]
+                results[i] = verified[j]
+                Identity._remember_announce_signature(key, verified[j])
+
+        return results
+
+    @staticmethod
+    def validate_announce(packet, only_validate_signature=False):
+        try:
+            if packet.packet_type == RNS.Packet.ANNOUNCE:
+                destination_hash = packet.destination_hash
+                public_key, name_hash, random_hash, ratchet, signature, app_data, signed_data = Identity._unpack_announce(packet)
 
                 announced_identity = Identity(create_keys=False)
                 announced_identity.load_public_key(public_key)
@@ -435,7 +571,7 @@ class Identity:
                         RNS.log(f"Invalidated and dropped announce from blackholed identity {RNS.prettyhexrep(announced_identity.hash)}", RNS.LOG_EXTREME)
                         return False
 
-                if announced_identity.pub != None and announced_identity.validate(signature, signed_data):
+                if announced_identity.pub != None and Identity._announce_signature_valid(packet, announced_identity, signature, signed_data):
                     if only_validate_signature:
                         del announced_identity
                         return True
@@ -30,6 +30,8 @@
 
 import RNS
 import time
+import heapq
+import itertools
 import threading
 from collections import deque
 from RNS.vendor.configobj import ConfigObj
@@ -243,45 +245,47 @@ class Interface:
 
             return avg
 
+    # Wakeups for the announce queues are armed both from the
+    # Transport threads and from the workers draining the queues.
+    announce_timer_lock = threading.Lock()
+
+    def schedule_announce_queue(self, wait_time):
+        # Only one wakeup is armed per interface at any time. The
+        # handle is cleared once the queue is being processed, so
+        # a new wakeup can be armed from there.
+        with Interface.announce_timer_lock:
+            if not hasattr(self, "announce_queue_timer") or self.announce_queue_timer == None:
+                self.announce_queue_timer = RNS.Scheduler.call_later(wait_time, self.__announce_queue_due)
+
+    def __announce_queue_due(self):
+        # Transmitting can block on the interface, so the queue is
+        # processed on a worker rather than the scheduler thread.
+        RNS.Scheduler.dispatch(self.process_announce_queue)
+
     def process_announce_queue(self):
+        with Interface.announce_timer_lock:
+            self.announce_queue_timer = None
+
         if not hasattr(self, "announce_cap"):
             self.announce_cap = RNS.Reticulum.ANNOUNCE_CAP
 
         if hasattr(self, "announce_queue"):
             try:
                 now = time.time()
-                stale = []
-                for a in self.announce_queue:
-                    if now > a["time"]+RNS.Reticulum.QUEUED_ANNOUNCE_LIFE:
-                        stale.append(a)
-
-                for s in stale:
-                    if s in self.announce_queue:
-                        self.announce_queue.remove(s)
-
-                if len(self.announce_queue) > 0:
-                    min_hops = min(entry["hops"] for entry in self.announce_queue)
-                    entries = list(filter(lambda e: e["hops"] == min_hops, self.announce_queue))
-                    entries.sort(key=lambda e: e["time"])
-                    selected = entries[0]
-
-                    now       = time.time()
-                    tx_time   = (len(selected["raw"])*8) / self.bitrate
+                raw = self.announce_queue.pop(now)
+                if raw != None:
+                    tx_time   = (len(raw)*8) / self.bitrate
                     wait_time = (tx_time / self.announce_cap)
                     self.announce_allowed_at = now + wait_time
 
-                    self.process_outgoing(selected["raw"])
+                    self.process_outgoing(raw)
                     self.sent_announce()
 
-                    if selected in self.announce_queue:
-                        self.announce_queue.remove(selected)
-
                     if len(self.announce_queue) > 0:
-                        timer = threading.Timer(wait_time, self.process_announce_queue)
-                        timer.start()
+                        self.schedule_announce_queue(wait_time)
 
             except Exception as e:
-                self.announce_queue = []
+                self.announce_queue = AnnounceQueue()
                 RNS.log("Error while processing announce queue on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
                 RNS.log("The announce queue for this interface has been cleared.", RNS.LOG_ERROR)
 
@@ -300,4 +304,106 @@ class Interface:
                 return ConfigObj(config_in)
             except Exception as e:
                 RNS.log(f"Could not parse supplied configuration data. The contained exception was: {e}", RNS.LOG_ERROR)
-                raise SystemError("Invalid configuration data supplied")
\ No newline at end of file
+                raise SystemError("Invalid configuration data supplied")
+
+
+class QueuedAnnounce:
+    __slots__ = ("destination_hash", "time", "hops", "emitted", "raw")
+
+    def __init__(self, destination_hash, time, hops, emitted, raw):
+        self.destination_hash = destination_hash
+        self.time             = time
+        self.hops             = hops
+        self.emitted          = emitted
+        self.raw              = raw
+
+class AnnounceQueue:
+    """
+    Holds announces waiting to be sent on an interface, once its
+    announce cap allows it. Announces with the fewest hops are sent
+    first, and among those, the one that has been queued the longest.
+    Entries are kept in a heap ordered by hops and queue time, and
+    entries that have been replaced or have expired are discarded
+    when they reach the top of the heap.
+    """
+
+    # Superseded entries are left in the heap until they are
+    # popped. If they start to make up most of it, it is compacted.
+    COMPACT_THRESHOLD = 256
+
+    def __init__(self):
+        self.entries = {}
+        self.heap    = []
+        self.expiry  = deque()
+        self.counter = itertools.count()
+        self.lock    = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, destination_hash, hops, emitted, raw, now):
+        """
+        Queues an announce. If an announce for the destination is
+        already queued, it is replaced if the new one was emitted later.
+
+        :returns: *True* if the announce was added as a new entry, otherwise *False*.
+        """
+        with self.lock:
+            self.expire(now)
+            entry = self.entries.get(destination_hash, None)
+            if entry != None:
+                if emitted > entry.emitted:
+                    entry.time    = now
+                    entry.hops    = hops
+                    entry.emitted = emitted
+                    entry.raw     = raw
+                    self.push(entry)
+
+                return False
+
+            entry = QueuedAnnounce(destination_hash, now, hops, emitted, raw)
+            self.entries[destination_hash] = entry
+            self.push(entry)
+            return True
+
+    def pop(self, now):
+        """
+        Removes the next announce to send from the queue.
+
+        :returns: The raw announce, or *None* if the queue is empty.
+        """
+        with self.lock:
+            self.expire(now)
+            while len(self.heap) > 0:
+                hops, queued_at, _, entry = heapq.heappop(self.heap)
+                if self.current(entry, hops, queued_at):
+                    self.entries.pop(entry.destination_hash)
+                    return entry.raw
+
+            return None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.heap.clear()
+            self.expiry.clear()
+
+    def push(self, entry):
+        with self.lock:
+            heapq.heappush(self.heap, (entry.hops, entry.time, next(self.counter), entry))
+            self.expiry.append((entry.time, entry))
+            if len(self.heap) > self.COMPACT_THRESHOLD and len(self.heap) > 2*len(self.entries):
+                self.heap = [e for e in self.heap if self.current(e[3], e[0], e[1])]
+                heapq.heapify(self.heap)
+
+    def current(self, entry, hops, queued_at):
+        return self.entries.get(entry.destination_hash, None) is entry and entry.hops == hops and entry.time == queued_at
+
+    def expire(self, now):
+        # Entries are only ever queued or updated with the current
+        # time, so the expiry deque is always ordered by time.
+        with self.lock:
+            while len(self.expiry) > 0 and now > self.expiry[0][0]+RNS.Reticulum.QUEUED_ANNOUNCE_LIFE:
+                queued_at, entry = self.expiry.popleft()
+                if self.entries.get(entry.destination_hash, None) is entry and entry.time == queued_at:
+                    self.entries.pop(entry.destination_hash)
@@ -31,11 +31,11 @@
 from RNS.Cryptography import X25519PrivateKey, X25519PublicKey, Ed25519PrivateKey, Ed25519PublicKey
 from RNS.Cryptography import Token
 from RNS.Channel import Channel, LinkChannelOutlet
+from RNS.Session import Multiplexer
 
 from time import sleep
 from .vendor import umsgpack as umsgpack
 import threading
-import inspect
 import struct
 import math
 import time
@@ -95,6 +95,32 @@ class Link:
     """
     Default interval for sending keep-alive packets on established links in seconds.
     """
+    KEEPALIVE_IDLE = None
+    """
+    If set, the keep-alive interval of links initiated by this instance
+    is gradually extended up to this many seconds while the link carries
+    no data. Set from the ``idle_link_keepalive`` configuration option.
+    """
+
+    # Transport nodes forwarding a link drop it from their link
+    # table after LINK_TIMEOUT without traffic, which with the
+    # default configuration is STALE_FACTOR*1.25 times the default
+    # keep-alive interval. Idle links must keep refreshing these
+    # entries, so their interval is never extended beyond this.
+    KEEPALIVE_IDLE_MAX = KEEPALIVE_MAX
+
+    # The keep-alive interval of an idle link grows by this
+    # factor per keep-alive. It must stay below STALE_FACTOR,
+    # since the remote end extends its stale time from the
+    # last interval it observed.
+    KEEPALIVE_IDLE_GROWTH = 1.5
+
+    # When a keep-alive is sent, keep-alives for other links
+    # on the same interface that are due within this fraction
+    # of their interval are sent along with it, so the links
+    # on an interface settle into a shared schedule.
+    KEEPALIVE_COALESCE = 0.25
+
     STALE_FACTOR = 2
     STALE_TIME = STALE_FACTOR*KEEPALIVE
     """
@@ -107,6 +133,20 @@ class Link:
 
     WATCHDOG_MAX_SLEEP  = 5
 
+    # Incoming link requests are validated, and their
+    # key exchange and proof signing carried out, on a
+    # pool of handshake workers instead of in the inbound
+    # packet path. Requests arriving while the maximum
+    # number of handshakes are pending are dropped. The
+    # handshake cryptography holds the interpreter lock
+    # for most of its run time, so additional workers
+    # only add contention with the inbound path.
+    HANDSHAKE_WORKERS      = 1
+    MAX_PENDING_HANDSHAKES = 256
+
+    handshake_executor  = None
+    handshake_lock      = threading.Lock()
+
     PENDING             = 0x00
     HANDSHAKE           = 0x01
     ACTIVE              = 0x02
@@ -182,6 +222,21 @@ class Link:
             return mode
         else: return Link.MODE_DEFAULT
 
+    @staticmethod
+    def offload_request(owner, data, packet, callback):
+        with Link.handshake_lock:
+            if Link.handshake_executor == None:
+                Link.handshake_executor = RNS.RequestExecutor(workers=Link.HANDSHAKE_WORKERS, queue_limit=Link.MAX_PENDING_HANDSHAKES)
+
+        def job():
+            link = Link.validate_request(owner, data, packet)
+            if link != None: callback(link)
+
+        def rejected():
+            RNS.log(f"Pending handshake limit reached, dropping link request for {owner}", RNS.LOG_WARNING)
+
+        Link.handshake_executor.submit(job, rejected=rejected)
+
     @staticmethod
     def validate_request(owner, data, packet):
         if len(data) == Link.ECPUBSIZE or len(data) == Link.ECPUBSIZE+Link.LINK_MTU_SIZE:
@@ -211,9 +266,12 @@ class Link:
                 RNS.log(f"Establishment timeout is {RNS.prettytime(link.establishment_timeout)} for incoming link request "+RNS.prettyhexrep(link.link_id), RNS.LOG_EXTREME)
                 link.handshake()
                 link.attached_interface = packet.receiving_interface
-                link.prove()
                 link.request_time = time.time()
+                # The link is registered before the proof is sent,
+                # so the initiator's RTT packet can never arrive
+                # before the link is known to transport.
                 RNS.Transport.register_link(link)
+                link.prove()
                 link.last_inbound = time.time()
                 link.__update_phy_stats(packet, force_update=True)
                 link.start_watchdog()
@@ -249,6 +307,8 @@ class Link:
         self.last_outbound = 0
         self.last_keepalive = 0
         self.last_proof = 0
+        self.keepalives = 0
+        self.keepalive_extended = False
         self.last_data = 0
         self.tx = 0
         self.rx = 0
@@ -262,6 +322,7 @@ class Link:
         self.keepalive = Link.KEEPALIVE
         self.stale_time = Link.STALE_TIME
         self.watchdog_lock = False
+        self.watchdog_timer = None
         self.status = Link.PENDING
         self.activated_at = None
         self.type = RNS.Destination.LINK
@@ -272,6 +333,7 @@ class Link:
         self.__remote_identity = None
         self.__track_phy_stats = False
         self._channel = None
+        self._multiplexer = None
 
         if self.destination == None:
             self.initiator = False
@@ -722,10 +784,16 @@ class Link:
             pass
 
     def link_closed(self):
+        if self.watchdog_timer != None:
+            self.watchdog_timer.cancel()
+            self.watchdog_timer = None
+
         for resource in self.incoming_resources:
             resource.cancel()
         for resource in self.outgoing_resources:
             resource.cancel()
+        if self._multiplexer:
+            self._multiplexer._shutdown()
         if self._channel:
             self._channel._shutdown()
             
@@ -735,6 +803,12 @@ class Link:
         self.shared_key = None
         self.derived_key = None
 
+        # A link initiated here that was never established is
+        # left in the pending table, so that Transport can expire
+        # the path to the destination and try to rediscover it.
+        if not (self.initiator and self.activated_at == None):
+            RNS.Transport.deregister_link(self)
+
         if self.destination != None:
             if self.destination.direction == RNS.Destination.IN:
                 if self in self.destination.links:
@@ -748,86 +822,112 @@ class Link:
 
 
     def start_watchdog(self):
-        thread = threading.Thread(target=self.__watchdog_job)
-        thread.daemon = True
-        thread.start()
+        self.__schedule_watchdog(0)
+
+    def __schedule_watchdog(self, delay):
+        if self.watchdog_timer != None:
+            self.watchdog_timer.cancel()
+        self.watchdog_timer = RNS.Scheduler.call_later(delay, self.__watchdog_job)
+
+    def __watchdog_closed(self):
+        # The closed callback may run user code, so it is
+        # kept off the scheduler thread
+        RNS.Scheduler.dispatch(self.link_closed)
+
+    def __watchdog_teardown(self):
+        if self.status != Link.CLOSED:
+            self.__teardown_packet()
+            self.status = Link.CLOSED
+            self.teardown_reason = Link.TIMEOUT
+            self.link_closed()
 
     def __watchdog_job(self):
-        while not self.status == Link.CLOSED:
-            while (self.watchdog_lock):
-                rtt_wait = 0.025
-                if hasattr(self, "rtt") and self.rtt:
-                    rtt_wait = self.rtt
-
-                sleep(max(rtt_wait, 0.025))
-
-            if not self.status == Link.CLOSED:
-                # Link was initiated, but no response
-                # from destination yet
-                if self.status == Link.PENDING:
-                    next_check = self.request_time + self.establishment_timeout
-                    sleep_time = next_check - time.time()
-                    if time.time() >= self.request_time + self.establishment_timeout:
-                        RNS.log("Link establishment timed out", RNS.LOG_VERBOSE)
-                        self.status = Link.CLOSED
-                        self.teardown_reason = Link.TIMEOUT
-                        self.link_closed()
-                        sleep_time = 0.001
-
-                elif self.status == Link.HANDSHAKE:
-                    next_check = self.request_time + self.establishment_timeout
-                    sleep_time = next_check - time.time()
-                    if time.time() >= self.request_time + self.establishment_timeout:
-                        self.status = Link.CLOSED
-                        self.teardown_reason = Link.TIMEOUT
-                        self.link_closed()
-                        sleep_time = 0.001
-
-                        if self.initiator:
-                            RNS.log("Timeout waiting for link request proof", RNS.LOG_DEBUG)
-                        else:
-                            RNS.log("Timeout waiting for RTT packet from link initiator", RNS.LOG_DEBUG)
+        self.watchdog_timer = None
+        if self.status == Link.CLOSED:
+            return
+
+        if self.watchdog_lock:
+            rtt_wait = 0.025
+            if hasattr(self, "rtt") and self.rtt:
+                rtt_wait = self.rtt
+
+            self.__schedule_watchdog(max(rtt_wait, 0.025))
+            return
+
+        sleep_time = None
+
+        # Link was initiated, but no response
+        # from destination yet
+        if self.status == Link.PENDING:
+            next_check = self.request_time + self.establishment_timeout
+            sleep_time = next_check - time.time()
+            if time.time() >= self.request_time + self.establishment_timeout:
+                RNS.log("Link establishment timed out", RNS.LOG_VERBOSE)
+                self.status = Link.CLOSED
+                self.teardown_reason = Link.TIMEOUT
+                self.__watchdog_closed()
+                sleep_time = 0.001
+
+        elif self.status == Link.HANDSHAKE:
+            next_check = self.request_time + self.establishment_timeout
+            sleep_time = next_check - time.time()
+            if time.time() >= self.request_time + self.establishment_timeout:
+                self.status = Link.CLOSED
+                self.teardown_reason = Link.TIMEOUT
+                self.__watchdog_closed()
+                sleep_time = 0.001
 
-                elif self.status == Link.ACTIVE:
-                    activated_at = self.activated_at if self.activated_at != None else 0
-                    last_inbound = max(max(self.last_inbound, self.last_proof), activated_at)
-                    now = time.time()
+                if self.initiator:
+                    RNS.log("Timeout waiting for link request proof", RNS.LOG_DEBUG)
+                else:
+                    RNS.log("Timeout waiting for RTT packet from link initiator", RNS.LOG_DEBUG)
 
-                    if now >= last_inbound + self.keepalive:
-                        if self.initiator and now >= self.last_keepalive + self.keepalive:
-                            self.send_keepalive()
+        elif self.status == Link.ACTIVE:
+            activated_at = self.activated_at if self.activated_at != None else 0
+            last_inbound = max(max(self.last_inbound, self.last_proof), activated_at)
+            now = time.time()
 
-                        if time.time() >= last_inbound + self.stale_time:
-                            sleep_time = self.rtt * self.keepalive_timeout_factor + Link.STALE_GRACE
-                            self.status = Link.STALE
-                        else:
-                            sleep_time = self.keepalive
-                    
-                    else:
-                        sleep_time = (last_inbound + self.keepalive) - time.time()
+            # Data has moved since the keep-alive interval was
+            # extended, so return to the interval given by RTT
+            if self.initiator and self.keepalive_extended and self.last_data > self.last_keepalive:
+                self.__update_keepalive()
+
+            if now >= last_inbound + self.keepalive:
+                if self.initiator and self.__keepalive_due(now):
+                    self.__scheduled_keepalive()
+                    self.__coalesce_keepalives(now)
 
-                elif self.status == Link.STALE:
-                    sleep_time = 0.001
-                    self.__teardown_packet()
-                    self.status = Link.CLOSED
-                    self.teardown_reason = Link.TIMEOUT
-                    self.link_closed()
+                if time.time() >= last_inbound + self.stale_time:
+                    sleep_time = self.rtt * self.keepalive_timeout_factor + Link.STALE_GRACE
+                    self.status = Link.STALE
+                else:
+                    sleep_time = self.keepalive
+            
+            else:
+                sleep_time = (last_inbound + self.keepalive) - time.time()
 
+        elif self.status == Link.STALE:
+            # The teardown packet is sent off the scheduler
+            # thread, and the link is closed once it has been
+            # sent, so the watchdog is not scheduled again.
+            RNS.Scheduler.dispatch(self.__watchdog_teardown)
+            return
 
-                if sleep_time == 0:
-                    RNS.log("Warning! Link watchdog sleep time of 0!", RNS.LOG_ERROR)
-                if sleep_time == None or sleep_time < 0:
-                    RNS.log("Timing error! Tearing down link "+str(self)+" now.", RNS.LOG_ERROR)
-                    self.teardown()
-                    sleep_time = 0.1
 
-                sleep_time = min(sleep_time, Link.WATCHDOG_MAX_SLEEP)
-                sleep(sleep_time)
+        if sleep_time == 0:
+            RNS.log("Warning! Link watchdog sleep time of 0!", RNS.LOG_ERROR)
+        if sleep_time == None or sleep_time < 0:
+            RNS.log("Timing error! Tearing down link "+str(self)+" now.", RNS.LOG_ERROR)
+            RNS.Scheduler.dispatch(self.teardown)
+            sleep_time = 0.1
 
-                if not self.__track_phy_stats:
-                    self.rssi = None
-                    self.snr  = None
-                    self.q    = None
+        if not self.__track_phy_stats:
+            self.rssi = None
+            self.snr  = None
+            self.q    = None
+
+        if not self.status == Link.CLOSED:
+            self.__schedule_watchdog(min(sleep_time, Link.WATCHDOG_MAX_SLEEP))
 
 
     def __update_phy_stats(self, packet, query_shared = True, force_update = False):
@@ -848,12 +948,75 @@ class Link:
     def __update_keepalive(self):
         self.keepalive = max(min(self.rtt*(Link.KEEPALIVE_MAX/Link.KEEPALIVE_MAX_RTT), Link.KEEPALIVE_MAX), Link.KEEPALIVE_MIN)
         self.stale_time = self.keepalive * Link.STALE_FACTOR
-    
+        self.keepalive_extended = False
+
+    def __keepalive_due(self, now, slack=0):
+        activated_at = self.activated_at if self.activated_at != None else 0
+        last_inbound = max(max(self.last_inbound, self.last_proof), activated_at)
+        if now < last_inbound + self.keepalive - slack or now < self.last_keepalive + self.keepalive - slack:
+            return False
+
+        # Outbound data already tells the remote end that this
+        # end is alive, so while data is being sent, keep-alives
+        # are held back until the link is about to become stale.
+        if now < self.last_data + self.keepalive - slack and now < last_inbound + self.stale_time:
+            return False
+
+        return True
+
+    def __scheduled_keepalive(self):
+        if Link.KEEPALIVE_IDLE != None and self.last_keepalive > 0 and self.last_data < self.last_keepalive:
+            # No data since the last keep-alive, extend the interval
+            keepalive_idle = min(Link.KEEPALIVE_IDLE, Link.KEEPALIVE_IDLE_MAX)
+            self.keepalive = min(self.keepalive*Link.KEEPALIVE_IDLE_GROWTH, max(keepalive_idle, self.keepalive))
+            self.stale_time = self.keepalive * Link.STALE_FACTOR
+            self.keepalive_extended = True
+
+        # The keep-alive is sent off the scheduler thread, but is
+        # counted as sent right away, so a coalescing link does
+        # not schedule it again before it has gone out.
+        self.last_keepalive = time.time()
+        RNS.Scheduler.dispatch(self.send_keepalive)
+
+    def __coalesce_keepalives(self, now):
+        # Only links initiated here over the same interface
+        # are considered, so this does not scale with the
+        # total number of active links.
+        interface_links = RNS.Transport.initiator_links.get(self.attached_interface, None)
+        if interface_links == None: return
+        for link in list(interface_links.values()):
+            if link != self and link.status == Link.ACTIVE:
+                if link.__keepalive_due(now, slack=link.keepalive*Link.KEEPALIVE_COALESCE):
+                    link.__scheduled_keepalive()
+
+    def __track_keepalive_gap(self, gap):
+        # The initiator may be extending its keep-alive interval
+        # while the link is idle, so allow for the interval seen.
+        if gap*Link.STALE_FACTOR > self.stale_time:
+            self.stale_time = gap*Link.STALE_FACTOR
+            self.keepalive_extended = True
+
     def send_keepalive(self):
         keepalive_packet = RNS.Packet(self, bytes([0xFF]), context=RNS.Packet.KEEPALIVE)
         keepalive_packet.send()
+        self.keepalives += 1
         self.had_outbound(is_keepalive = True)
 
+    def get_keepalive_rate(self):
+        """
+        :returns: The number of keep-alive packets sent and received on the link per hour since it was established, or ``None`` if the link is not yet established.
+        """
+        if self.activated_at == None:
+            return None
+        return self.keepalives*3600 / max(time.time()-self.activated_at, Link.KEEPALIVE_MIN)
+
+    def dispatch_request(self, request_id, unpacked_request):
+        path_hash = unpacked_request[1]
+        if path_hash in self.destination.request_handlers:
+            request_handler = self.destination.request_handlers[path_hash]
+            def job(): self.handle_request(request_id, unpacked_request)
+            self.destination.submit_request(request_handler, job)
+
     def handle_request(self, request_id, unpacked_request):
         if self.status == Link.ACTIVE:
             requested_at = unpacked_request[0]
@@ -867,6 +1030,7 @@ class Link:
                 allow              = request_handler[2]
                 allowed_list       = request_handler[3]
                 auto_compress      = request_handler[4]
+                parameters         = request_handler[5]
 
                 allowed = False
                 if not allow == RNS.Destination.ALLOW_NONE:
@@ -878,12 +1042,10 @@ class Link:
 
                 if allowed:
                     RNS.log("Handling request "+RNS.prettyhexrep(request_id)+" for: "+str(path), RNS.LOG_DEBUG)
-                    if len(inspect.signature(response_generator).parameters) == 5:
+                    if parameters == 5:
                         response = response_generator(path, request_data, request_id, self.__remote_identity, requested_at)
-                    elif len(inspect.signature(response_generator).parameters) == 6:
-                        response = response_generator(path, request_data, request_id, self.link_id, self.__remote_identity, requested_at)
                     else:
-                        raise TypeError("Invalid signature for response generator callback")
+                        response = response_generator(path, request_data, request_id, self.link_id, self.__remote_identity, requested_at)
 
                     file_response = False
                     file_handle   = None
@@ -933,10 +1095,7 @@ class Link:
             packed_request    = resource.data.read()
             unpacked_request  = umsgpack.unpackb(packed_request)
             request_id        = RNS.Identity.truncated_hash(packed_request)
-            request_data      = unpacked_request
-
-            def job(): self.handle_request(request_id, request_data)
-            threading.Thread(target=job, daemon=True).start()
+            self.dispatch_request(request_id, unpacked_request)
         else:
             RNS.log("Incoming request resource failed with status: "+RNS.hexrep([resource.status]), RNS.LOG_DEBUG)
 
@@ -973,15 +1132,33 @@ class Link:
             self._channel = Channel(LinkChannelOutlet(self))
         return self._channel
 
+    def get_multiplexer(self):
+        """
+        Get the session ``Multiplexer`` for this link, which can carry
+        many independent sessions over the link's ``Channel``.
+
+        :return: :ref:`RNS.Multiplexer<api-multiplexer>` object
+        """
+        if self._multiplexer is None:
+            self._multiplexer = Multiplexer(self.get_channel(), self.initiator)
+        return self._multiplexer
+
     def receive(self, packet):
         self.watchdog_lock = True
         if not self.status == Link.CLOSED and not (self.initiator and packet.context == RNS.Packet.KEEPALIVE and packet.data == bytes([0xFF])):
             if packet.receiving_interface != self.attached_interface:
                 RNS.log(f"Link-associated packet received on unexpected interface {packet.receiving_interface} instead of {self.attached_interface}! Someone might be trying to manipulate your communication!", RNS.LOG_ERROR)
             else:
-                self.last_inbound = time.time()
+                now = time.time()
                 if packet.context != RNS.Packet.KEEPALIVE:
-                    self.last_data = self.last_inbound
+                    self.last_data = now
+                    if self.keepalive_extended and not self.initiator and self.rtt != None:
+                        self.__update_keepalive()
+                else:
+                    self.keepalives += 1
+                    if not self.initiator and self.activated_at != None:
+                        self.__track_keepalive_gap(now - max(self.last_inbound, self.activated_at))
+                self.last_inbound = now
                 self.rx += 1
                 self.rxbytes += len(packet.data)
                 if self.status == Link.STALE:
@@ -1037,8 +1214,7 @@ class Link:
                             packed_request = self.decrypt(packet.data)
                             if packed_request != None:
                                 unpacked_request = umsgpack.unpackb(packed_request)
-                                def job(): self.handle_request(request_id, unpacked_request)
-                                threading.Thread(target=job, daemon=True).start()
+                                self.dispatch_request(request_id, unpacked_request)
                                 self.__update_phy_stats(packet, query_shared=True)
                         except Exception as e:
                             RNS.log("Error occurred while handling request. The contained exception was: "+str(e), RNS.LOG_ERROR)
@@ -1154,6 +1330,7 @@ class Link:
                         if not self.initiator and packet.data == bytes([0xFF]):
                             keepalive_packet = RNS.Packet(self, bytes([0xFE]), context=RNS.Packet.KEEPALIVE)
                             keepalive_packet.send()
+                            self.keepalives += 1
                             self.had_outbound(is_keepalive = True)
 
 
@@ -1170,12 +1347,19 @@ class Link:
                         if not self._channel:
                             RNS.log(f"Channel data received without open channel", RNS.LOG_DEBUG)
                         else:
-                            packet.prove()
+                            if not self._channel._ack_batching: packet.prove()
                             plaintext = self.decrypt(packet.data)
                             if plaintext != None:
                                 self.__update_phy_stats(packet)
                                 self._channel._receive(plaintext)
 
+                    elif packet.context == RNS.Packet.CHANNEL_ACK:
+                        if self._channel:
+                            plaintext = self.decrypt(packet.data)
+                            if plaintext != None:
+                                self.__update_phy_stats(packet)
+                                self._channel._receive_ack(plaintext)
+
                 elif packet.packet_type == RNS.Packet.PROOF:
                     if packet.context == RNS.Packet.RESOURCE_PRF:
                         resource_hash = packet.data[0:RNS.Identity.HASHLENGTH//8]
@@ -1213,6 +1397,28 @@ class Link:
             return None
 
 
+    def encrypt_many(self, plaintexts):
+        try:
+            if not self.token: self.token = Token(self.derived_key)
+            return self.token.encrypt_many(plaintexts)
+
+        except Exception as e:
+            RNS.log("Encryption on link "+str(self)+" failed. The contained exception was: "+str(e), RNS.LOG_ERROR)
+            raise e
+
+
+    def decrypt_many(self, ciphertexts):
+        if not self.token: self.token = Token(self.derived_key)
+        plaintexts = []
+        for ciphertext in ciphertexts:
+            try: plaintexts.append(self.token.decrypt(ciphertext))
+            except Exception as e:
+                RNS.log("Decryption failed on link "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+                plaintexts.append(None)
+
+        return plaintexts
+
+
     def sign(self, message):
         return self.sig_prv.sign(message)
 
@@ -1434,7 +1640,10 @@ class RequestReceipt():
 
 
     def request_timed_out(self, packet_receipt):
-        if self in self.link.pending_requests and self.status == RequestReceipt.DELIVERED:
+        # Requests sent as a single packet time out from the
+        # packet receipt while still in the sent state, and
+        # requests sent as a resource once it was delivered
+        if self in self.link.pending_requests and self.status in [RequestReceipt.SENT, RequestReceipt.DELIVERED]:
             self.status = RequestReceipt.FAILED
             self.concluded_at = time.time()
             self.link.pending_requests.remove(self)
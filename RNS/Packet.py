@@ -84,6 +84,7 @@ class Packet:
     COMMAND        = 0x0C   # Packet is a command
     COMMAND_STATUS = 0x0D   # Packet is a status of an executed command
     CHANNEL        = 0x0E   # Packet contains link channel data
+    CHANNEL_ACK    = 0x0F   # Packet contains a cumulative link channel acknowledgement
     KEEPALIVE      = 0xFA   # Packet is a keepalive packet
     LINKIDENTIFY   = 0xFB   # Packet is a link peer identification proof
     LINKCLOSE      = 0xFC   # Packet is a link close message
@@ -115,13 +116,14 @@ class Packet:
     TIMEOUT_PER_HOP = RNS.Reticulum.DEFAULT_PER_HOP_TIMEOUT
 
     __slots__  = "hops", "header", "header_type", "packet_type", "transport_type", "context", "context_flag", "destination"
-    __slots__ += "transport_id", "data", "flags", "raw", "packed", "sent", "create_receipt", "receipt", "fromPacked", "MTU"
-    __slots__ += "sent_at", "packet_hash", "ratchet_id", "attached_interface", "receiving_interface", "rssi", "snr", "q"
+    __slots__ += "transport_id", "_data", "_data_offset", "flags", "raw", "packed", "sent", "create_receipt", "receipt", "fromPacked", "MTU"
+    __slots__ += "sent_at", "_packet_hash", "ratchet_id", "attached_interface", "receiving_interface", "rssi", "snr", "q"
     __slots__ += "ciphertext", "plaintext", "destination_hash", "destination_type", "link", "map_hash"
 
     def __init__(self, destination, data, packet_type = DATA, context = NONE, transport_type = RNS.Transport.BROADCAST,
                  header_type = HEADER_1, transport_id = None, attached_interface = None, create_receipt = True, context_flag=FLAG_UNSET):
 
+        self._data_offset = None
         if destination != None:
             if transport_type == None:
                 transport_type = RNS.Transport.BROADCAST
@@ -155,8 +157,8 @@ class Packet:
         else:
             self.MTU     = RNS.Reticulum.MTU
 
-        self.sent_at     = None
-        self.packet_hash = None
+        self.sent_at      = None
+        self._packet_hash = None
         self.ratchet_id  = None
 
         self.attached_interface = attached_interface
@@ -251,19 +253,23 @@ class Packet:
 
             DST_LEN = RNS.Reticulum.TRUNCATED_HASHLENGTH//8
 
+            # The payload and packet hash are only produced
+            # when accessed, since most packets that are just
+            # forwarded or filtered as duplicates never need
+            # the payload copied out of the raw frame.
             if self.header_type == Packet.HEADER_2:
                 self.transport_id = self.raw[2:DST_LEN+2]
                 self.destination_hash = self.raw[DST_LEN+2:2*DST_LEN+2]
-                self.context = ord(self.raw[2*DST_LEN+2:2*DST_LEN+3])
-                self.data = self.raw[2*DST_LEN+3:]
+                self.context = self.raw[2*DST_LEN+2]
+                self._data_offset = 2*DST_LEN+3
             else:
                 self.transport_id = None
                 self.destination_hash = self.raw[2:DST_LEN+2]
-                self.context = ord(self.raw[DST_LEN+2:DST_LEN+3])
-                self.data = self.raw[DST_LEN+3:]
+                self.context = self.raw[DST_LEN+2]
+                self._data_offset = DST_LEN+3
 
             self.packed = False
-            self.update_hash()
+            self._packet_hash = None
             return True
 
         except Exception as e:
@@ -286,6 +292,7 @@ class Packet:
 
                 else:
                     self.destination.last_outbound = time.time()
+                    if self.context != Packet.KEEPALIVE: self.destination.last_data = self.destination.last_outbound
                     self.destination.tx += 1
                     self.destination.txbytes += len(self.data)
 
@@ -342,23 +349,42 @@ class Packet:
     def validate_proof(self, proof):
         return self.receipt.validate_proof(proof)
 
+    @property
+    def data(self):
+        if self._data_offset != None:
+            self._data = self.raw[self._data_offset:]
+            self._data_offset = None
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self._data_offset = None
+
+    @property
+    def packet_hash(self):
+        if self._packet_hash == None and self.raw != None:
+            self._packet_hash = self.get_hash()
+        return self._packet_hash
+
+    @packet_hash.setter
+    def packet_hash(self, packet_hash):
+        self._packet_hash = packet_hash
+
     def update_hash(self):
-        self.packet_hash = self.get_hash()
+        self._packet_hash = self.get_hash()
 
     def get_hash(self):
         return RNS.Identity.full_hash(self.get_hashable_part())
 
     def getTruncatedHash(self):
-        return RNS.Identity.truncated_hash(self.get_hashable_part())
+        return self.packet_hash[:RNS.Identity.TRUNCATED_HASHLENGTH//8]
 
     def get_hashable_part(self):
-        hashable_part = bytes([self.raw[0] & 0b00001111])
         if self.header_type == Packet.HEADER_2:
-            hashable_part += self.raw[(RNS.Identity.TRUNCATED_HASHLENGTH//8)+2:]
+            return bytes([self.raw[0] & 0b00001111]) + memoryview(self.raw)[(RNS.Identity.TRUNCATED_HASHLENGTH//8)+2:]
         else:
-            hashable_part += self.raw[2:]
-
-        return hashable_part
+            return bytes([self.raw[0] & 0b00001111]) + memoryview(self.raw)[2:]
 
     def get_rssi(self):
         """
@@ -432,6 +458,28 @@ class PacketReceipt:
             self.timeout    = RNS.Reticulum.get_instance().get_first_hop_timeout(self.destination.hash)
             self.timeout   += Packet.TIMEOUT_PER_HOP * RNS.Transport.hops_to(self.destination.hash)
 
+        self.timeout_timer  = None
+        self.__schedule_timeout()
+
+    def __schedule_timeout(self):
+        if self.timeout_timer != None:
+            self.timeout_timer.cancel()
+            self.timeout_timer = None
+
+        if self.status == PacketReceipt.SENT:
+            # Timeouts are rounded up to the receipt timeout
+            # resolution, which is the resolution receipts
+            # were timed out at by the transport job loop.
+            resolution = RNS.Transport.receipts_timeout_resolution
+            deadline = math.ceil((self.sent_at+self.timeout)/resolution)*resolution
+            self.timeout_timer = RNS.Scheduler.call_at(deadline, self.__timeout_job)
+
+    def __timeout_job(self):
+        self.timeout_timer = None
+        self.check_timeout()
+        if self.status != PacketReceipt.SENT:
+            RNS.Transport.remove_receipt(self)
+
     def get_status(self):
         """
         :returns: The status of the associated :ref:`RNS.Packet<api-packet>` instance. Can be one of ``RNS.PacketReceipt.SENT``, ``RNS.PacketReceipt.DELIVERED``, ``RNS.PacketReceipt.FAILED`` or ``RNS.PacketReceipt.CULLED``. 
@@ -564,6 +612,9 @@ class PacketReceipt:
                 self.status = PacketReceipt.FAILED
 
             self.concluded_at = time.time()
+            if self.timeout_timer != None:
+                self.timeout_timer.cancel()
+                self.timeout_timer = None
 
             if self.callbacks.timeout:
                 thread = threading.Thread(target=self.callbacks.timeout, args=(self,))
@@ -578,6 +629,7 @@ class PacketReceipt:
         :param timeout: The timeout in seconds.
         """
         self.timeout = float(timeout)
+        self.__schedule_timeout()
 
     def set_delivery_callback(self, callback):
         """
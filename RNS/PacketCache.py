@@ -0,0 +1,305 @@
+# Reticulum License
+#
+# Copyright (c) 2016-2025 Mark Qvist
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# - The Software shall not be used in any kind of system which includes amongst
+#   its functions the ability to purposefully do harm to human beings.
+#
+# - The Software shall not be used, directly or indirectly, in the creation of
+#   an artificial intelligence, machine learning or language model training
+#   dataset, including but not limited to any use that contributes to the
+#   training or development of such a model or algorithm.
+#
+# - The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import RNS
+import time
+import struct
+import threading
+from collections import deque, OrderedDict
+from RNS.vendor import umsgpack as umsgpack
+
+class CacheEntry:
+    __slots__ = ("segment", "offset", "length", "kind", "timestamp")
+
+    def __init__(self, segment, offset, length, kind, timestamp):
+        self.segment   = segment
+        self.offset    = offset
+        self.length    = length
+        self.kind      = kind
+        self.timestamp = timestamp
+
+class Segment:
+    __slots__ = ("id", "path", "fd", "size", "live")
+
+    def __init__(self, id, path, fd, size):
+        self.id   = id
+        self.path = path
+        self.fd   = fd
+        self.size = size
+        self.live = 0
+
+class PacketCache:
+    """
+    A two-tier cache of raw packets, keyed by packet hash. Recently
+    stored or retrieved packets are kept in a bounded in-memory LRU,
+    and all cached packets are appended to segment files on disk,
+    with an in-memory index of where each packet is stored. Removing
+    a packet appends a tombstone record, and segments are compacted
+    oldest first, once most of the stored data is no longer live.
+
+    Packets of kind ``PACKET`` expire after a maximum age, and at
+    most ``max_packets`` of them are kept on disk, evicting the
+    oldest first. Packets of kind ``ANNOUNCE`` are kept until
+    explicitly removed, since they are needed for as long as a
+    path refers to them.
+
+    If no path is given, only the in-memory tier is used.
+    """
+    PACKET         = 0x00
+    ANNOUNCE       = 0x01
+
+    MEMORY_ENTRIES = 1024
+    MEMORY_BYTES   = 512*1024
+    MAX_PACKETS    = 32*1024
+    SEGMENT_SIZE   = 4*1024*1024
+    SEGMENT_SUFFIX = ".seg"
+
+    HEADER         = struct.Struct("!I")
+
+    def __init__(self, path=None, memory_entries=MEMORY_ENTRIES, memory_bytes=MEMORY_BYTES, segment_size=SEGMENT_SIZE, max_packets=MAX_PACKETS):
+        self.path           = path
+        self.memory_entries = memory_entries
+        self.memory_bytes   = memory_bytes
+        self.segment_size   = segment_size
+        self.max_packets    = max_packets
+        self.packets        = 0
+        self.lock           = threading.RLock()
+        self.memory         = OrderedDict()
+        self.memory_size    = 0
+        self.index          = {}
+        self.segments       = OrderedDict()
+        self.active         = None
+        self.expiry         = deque()
+
+        if self.path != None:
+            if not os.path.isdir(self.path): os.makedirs(self.path)
+            self.load()
+
+    def __len__(self):
+        if self.path == None: return len(self.memory)
+        else:                 return len(self.index)
+
+    def __contains__(self, packet_hash):
+        return packet_hash in self.memory or packet_hash in self.index
+
+    def store(self, packet_hash, raw, interface_hash=None, kind=PACKET, timestamp=None):
+        """
+        Stores a raw packet in the cache. If the packet is already
+        cached, it is only moved to the front of the in-memory tier.
+        """
+        if timestamp == None: timestamp = time.time()
+        with self.lock:
+            self.remember(packet_hash, raw, interface_hash)
+            if self.path != None and not packet_hash in self.index:
+                record = umsgpack.packb([packet_hash, kind, interface_hash, timestamp, raw])
+                self.index[packet_hash] = self.append(record, kind, timestamp)
+                if kind == PacketCache.PACKET:
+                    self.expiry.append((timestamp, packet_hash))
+                    self.packets += 1
+                    self.evict()
+
+    def get(self, packet_hash):
+        """
+        :returns: A tuple of the raw packet and the hash of the interface it was received on, or *None* if the packet is not cached.
+        """
+        with self.lock:
+            if packet_hash in self.memory:
+                self.memory.move_to_end(packet_hash)
+                return self.memory[packet_hash]
+
+            entry = self.index.get(packet_hash, None)
+            if entry == None: return None
+
+            record = umsgpack.unpackb(os.pread(entry.segment.fd, entry.length, entry.offset))
+            raw = record[4]; interface_hash = record[2]
+            self.remember(packet_hash, raw, interface_hash)
+            return (raw, interface_hash)
+
+    def remove(self, packet_hash):
+        """
+        Removes a packet from both tiers of the cache.
+
+        :returns: *True* if the packet was cached, otherwise *False*.
+        """
+        with self.lock:
+            found = self.forget(packet_hash)
+            entry = self.index.pop(packet_hash, None)
+            if entry != None:
+                entry.segment.live -= PacketCache.HEADER.size+entry.length
+                if entry.kind == PacketCache.PACKET: self.packets -= 1
+                self.append(umsgpack.packb([packet_hash, entry.kind, None, time.time(), None]), None, None)
+                return True
+
+            return found
+
+    def hashes(self, kind):
+        """
+        :returns: A list of the hashes of all packets of the specified kind stored on disk.
+        """
+        with self.lock:
+            return [packet_hash for packet_hash in self.index if self.index[packet_hash].kind == kind]
+
+    def clean(self, max_age):
+        """
+        Removes packets of kind ``PACKET`` older than ``max_age``
+        seconds, and compacts segments on disk if most of their
+        data is no longer live.
+        """
+        with self.lock:
+            if self.path == None: return
+            now = time.time()
+            while len(self.expiry) > 0 and now > self.expiry[0][0]+max_age:
+                timestamp, packet_hash = self.expiry.popleft()
+                entry = self.index.get(packet_hash, None)
+                if entry != None and entry.timestamp == timestamp:
+                    self.remove(packet_hash)
+
+            self.compact()
+
+    def close(self):
+        with self.lock:
+            for segment in self.segments.values(): os.close(segment.fd)
+            self.segments.clear()
+            self.index.clear()
+            self.active  = None
+            self.packets = 0
+
+    def evict(self):
+        # Removes the oldest packets of kind PACKET until no more
+        # than the maximum number of them are stored on disk.
+        while self.packets > self.max_packets and len(self.expiry) > 0:
+            timestamp, packet_hash = self.expiry.popleft()
+            entry = self.index.get(packet_hash, None)
+            if entry != None and entry.timestamp == timestamp:
+                self.remove(packet_hash)
+
+    def remember(self, packet_hash, raw, interface_hash):
+        self.forget(packet_hash)
+        self.memory[packet_hash] = (raw, interface_hash)
+        self.memory_size += len(raw)
+        while len(self.memory) > self.memory_entries or self.memory_size > self.memory_bytes:
+            evicted_hash, evicted = self.memory.popitem(last=False)
+            self.memory_size -= len(evicted[0])
+
+    def forget(self, packet_hash):
+        cached = self.memory.pop(packet_hash, None)
+        if cached == None: return False
+        self.memory_size -= len(cached[0])
+        return True
+
+    def append(self, record, kind, timestamp):
+        if self.active == None or (self.active.size > 0 and self.active.size+PacketCache.HEADER.size+len(record) > self.segment_size):
+            self.active = self.open_segment(self.active.id+1 if self.active != None else 0)
+
+        segment = self.active
+        offset = segment.size+PacketCache.HEADER.size
+        os.write(segment.fd, PacketCache.HEADER.pack(len(record))+record)
+        segment.size += PacketCache.HEADER.size+len(record)
+        if kind == None: return None
+
+        segment.live += PacketCache.HEADER.size+len(record)
+        return CacheEntry(segment, offset, len(record), kind, timestamp)
+
+    def open_segment(self, segment_id):
+        path = os.path.join(self.path, f"{segment_id:08d}{PacketCache.SEGMENT_SUFFIX}")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        segment = Segment(segment_id, path, fd, os.fstat(fd).st_size)
+        self.segments[segment_id] = segment
+        return segment
+
+    def records(self, segment):
+        # Yields the offset, length and contents of every intact
+        # record in a segment. A partially written record at the
+        # end of the segment is truncated away.
+        data = os.pread(segment.fd, segment.size, 0)
+        position = 0
+        while position+PacketCache.HEADER.size <= len(data):
+            length = PacketCache.HEADER.unpack_from(data, position)[0]
+            offset = position+PacketCache.HEADER.size
+            if offset+length > len(data): break
+            try: record = umsgpack.unpackb(data[offset:offset+length])
+            except Exception: break
+            yield offset, length, record
+            position = offset+length
+
+        if position < segment.size:
+            RNS.log(f"Truncating {segment.size-position} bytes of incomplete data from packet cache segment {segment.path}", RNS.LOG_WARNING)
+            os.ftruncate(segment.fd, position)
+            segment.size = position
+
+    def load(self):
+        segment_ids = []
+        for filename in os.listdir(self.path):
+            if filename.endswith(PacketCache.SEGMENT_SUFFIX):
+                try: segment_ids.append(int(filename[:-len(PacketCache.SEGMENT_SUFFIX)]))
+                except ValueError: pass
+
+        for segment_id in sorted(segment_ids):
+            segment = self.open_segment(segment_id)
+            for offset, length, record in self.records(segment):
+                packet_hash, kind, interface_hash, timestamp, raw = record
+                entry = self.index.pop(packet_hash, None)
+                if entry != None: entry.segment.live -= PacketCache.HEADER.size+entry.length
+                if raw != None:
+                    segment.live += PacketCache.HEADER.size+length
+                    self.index[packet_hash] = CacheEntry(segment, offset, length, kind, timestamp)
+
+            self.active = segment
+
+        # Packets are appended in roughly chronological order, so
+        # sorting the loaded entries once restores expiry order.
+        self.expiry = deque(sorted((entry.timestamp, packet_hash) for packet_hash, entry in self.index.items() if entry.kind == PacketCache.PACKET))
+        self.packets = len(self.expiry)
+        self.evict()
+        self.compact()
+
+    def compact(self):
+        # Segments are only ever removed oldest first. A tombstone
+        # always refers to a record in its own or an older segment,
+        # so once all older segments are gone, it can be dropped.
+        while len(self.segments) > 1:
+            size = sum(s.size for s in self.segments.values())
+            live = sum(s.live for s in self.segments.values())
+            oldest = next(iter(self.segments.values()))
+            if oldest.live > 0 and live*2 > size: break
+            self.compact_segment(oldest)
+
+    def compact_segment(self, segment):
+        for offset, length, record in self.records(segment):
+            packet_hash = record[0]
+            entry = self.index.get(packet_hash, None)
+            if entry != None and entry.segment == segment and entry.offset == offset:
+                self.index[packet_hash] = self.append(umsgpack.packb(record), entry.kind, entry.timestamp)
+
+        del self.segments[segment.id]
+        os.close(segment.fd)
+        os.unlink(segment.path)
@@ -31,6 +31,7 @@
 import RNS
 import os
 import bz2
+import bisect
 import math
 import time
 import struct
@@ -162,6 +163,25 @@ class Resource:
             RNS.log(f"An error ocurred while rejecting advertised resource: {e}", RNS.LOG_ERROR)
             RNS.trace_exception(e)
 
+    @staticmethod
+    def resumable_segments(original_hash):
+        """
+        :param original_hash: The original (first-segment) hash of a split resource.
+        :returns: The number of segments of the resource that have already been received and persisted locally, or *None* if no resumable state exists.
+        """
+        try:
+            resume_path = RNS.Reticulum.resourcepath+"/"+original_hash.hex()+".resume"
+            if not os.path.isfile(resume_path):
+                return None
+            else:
+                with open(resume_path, "rb") as resume_file:
+                    state = umsgpack.unpackb(resume_file.read())
+                return state["s"]
+
+        except Exception as e:
+            RNS.log(f"Could not read resume state for resource {RNS.prettyhexrep(original_hash)}, the contained exception was: {e}", RNS.LOG_ERROR)
+            return None
+
     @staticmethod
     def accept(advertisement_packet, callback=None, progress_callback = None, request_id = None):
         try:
@@ -198,6 +218,7 @@ class Resource:
             resource.meta_storagepath     = resource.storagepath+".meta"
             resource.segment_index        = adv.i
             resource.total_segments       = adv.l
+            resource.resume_path          = resource.storagepath+".resume"
             
             if adv.l > 1: resource.split = True
             else: resource.split = False
@@ -205,6 +226,11 @@ class Resource:
             if adv.x: resource.has_metadata = True
             else:     resource.has_metadata = False
 
+            if adv.i > 1 and not resource.resume_segment():
+                RNS.log(f"Rejecting out-of-sequence segment {adv.i} of resource {RNS.prettyhexrep(resource.original_hash)}", RNS.LOG_DEBUG)
+                Resource.reject(advertisement_packet)
+                return None
+
             resource.hashmap = [None] * resource.total_parts
             resource.hashmap_height = 0
             resource.waiting_for_hmu = False
@@ -264,6 +290,11 @@ class Resource:
                 self.metadata = struct.pack(">I", metadata_size)[1:] + packed_metadata
                 self.metadata_size = len(self.metadata)
                 self.has_metadata = True
+
+                # When resuming a transfer from a later segment, the
+                # metadata was already sent with the first segment,
+                # and is only needed to calculate segment offsets.
+                if segment_index > 1: self.metadata = b""
         else:
             self.metadata = b""
             if sent_metadata_size > 0: self.has_metadata = True
@@ -344,7 +375,8 @@ class Resource:
         self.sender_grace_time = Resource.SENDER_GRACE_TIME
         self.hmu_retry_ok = False
         self.watchdog_lock = False
-        self.__watchdog_job_id = 0
+        self.watchdog_timer = None
+        self.watchdog_cancelled = False
         self.__progress_callback = progress_callback
         self.rtt = None
         self.rtt_rxd_bytes = 0
@@ -477,6 +509,49 @@ class Resource:
             self.receive_lock = Lock()
             
 
+    def resume_segment(self):
+        # If previous segments of this resource were persisted,
+        # possibly over an earlier link, the advertised segment
+        # must directly follow the last persisted one. The
+        # storage file is truncated to the recorded size to
+        # discard any partially written segment.
+        try:
+            if not os.path.isfile(self.resume_path):
+                return True
+            else:
+                with open(self.resume_path, "rb") as resume_file:
+                    state = umsgpack.unpackb(resume_file.read())
+
+                if state["s"] != self.segment_index-1 or state["l"] != self.total_segments:
+                    return False
+
+                if not os.path.isfile(self.storagepath) or os.path.getsize(self.storagepath) < state["b"]:
+                    return False
+
+                if os.path.getsize(self.storagepath) > state["b"]:
+                    os.truncate(self.storagepath, state["b"])
+
+                if self.has_metadata and not os.path.isfile(self.meta_storagepath):
+                    return False
+
+                return True
+
+        except Exception as e:
+            RNS.log(f"Could not validate resume state for {self}, the contained exception was: {e}", RNS.LOG_ERROR)
+            return False
+
+    def persist_segment(self):
+        # Record the number of persisted segments and the size
+        # of the storage file, so the transfer can be resumed
+        # from the next segment if the link is torn down.
+        try:
+            state = {"s": self.segment_index, "l": self.total_segments, "b": os.path.getsize(self.storagepath)}
+            with open(self.resume_path, "wb") as resume_file:
+                resume_file.write(umsgpack.packb(state))
+
+        except Exception as e:
+            RNS.log(f"Could not persist resume state for {self}, the contained exception was: {e}", RNS.LOG_ERROR)
+
     def hashmap_update_packet(self, plaintext):
         if not self.status == Resource.FAILED:
             self.last_activity = time.time()
@@ -521,7 +596,9 @@ class Resource:
             sleep(0.25)
 
         try:
-            self.advertisement_packet.send()
+            # The resource is registered before the advertisement
+            # is sent, since the remote end may reject it before
+            # the send returns.
             self.last_activity = time.time()
             self.started_transferring = self.last_activity
             self.adv_sent = self.last_activity
@@ -529,6 +606,7 @@ class Resource:
             self.status = Resource.ADVERTISED
             self.retries_left = self.max_adv_retries
             self.link.register_outgoing_resource(self)
+            self.advertisement_packet.send()
             RNS.log("Sent resource advertisement for "+RNS.prettyhexrep(self.hash), RNS.LOG_EXTREME)
         except Exception as e:
             RNS.log("Could not advertise resource, the contained exception was: "+str(e), RNS.LOG_ERROR)
@@ -555,115 +633,129 @@ class Resource:
         if self.link: self.link.expected_rate = self.eifr
 
     def watchdog_job(self):
-        thread = threading.Thread(target=self.__watchdog_job, daemon=True)
-        thread.start()
+        self.__schedule_watchdog(0)
 
-    def __watchdog_job(self):
-        self.__watchdog_job_id += 1
-        this_job_id = self.__watchdog_job_id
+    def __schedule_watchdog(self, delay):
+        if self.watchdog_timer != None:
+            self.watchdog_timer.cancel()
+        self.watchdog_timer = RNS.Scheduler.call_later(delay, self.__watchdog_job)
 
-        while self.status < Resource.ASSEMBLING and this_job_id == self.__watchdog_job_id:
-            while self.watchdog_lock:
-                sleep(0.025)
+    def __watchdog_cancel(self):
+        # Cancelling runs the resource callbacks, so it
+        # is kept off the scheduler thread
+        if not self.watchdog_cancelled:
+            self.watchdog_cancelled = True
+            RNS.Scheduler.dispatch(self.cancel)
 
-            sleep_time = None
-            if self.status == Resource.ADVERTISED:
-                sleep_time = (self.adv_sent+self.timeout+Resource.PROCESSING_GRACE)-time.time()
-                if sleep_time < 0:
-                    if self.retries_left <= 0:
-                        RNS.log("Resource transfer timeout after sending advertisement", RNS.LOG_DEBUG)
-                        self.cancel()
-                        sleep_time = 0.001
-                    else:
-                        try:
-                            RNS.log("No part requests received, retrying resource advertisement...", RNS.LOG_DEBUG)
-                            self.retries_left -= 1
-                            self.advertisement_packet = RNS.Packet(self.link, ResourceAdvertisement(self).pack(), context=RNS.Packet.RESOURCE_ADV)
-                            self.advertisement_packet.send()
-                            self.last_activity = time.time()
-                            self.adv_sent = self.last_activity
-                            sleep_time = 0.001
-                        except Exception as e:
-                            RNS.log("Could not resend advertisement packet, cancelling resource. The contained exception was: "+str(e), RNS.LOG_VERBOSE)
-                            self.cancel()
-                    
+    def __readvertise(self):
+        try:
+            self.advertisement_packet = RNS.Packet(self.link, ResourceAdvertisement(self).pack(), context=RNS.Packet.RESOURCE_ADV)
+            self.advertisement_packet.send()
+        except Exception as e:
+            RNS.log("Could not resend advertisement packet, cancelling resource. The contained exception was: "+str(e), RNS.LOG_VERBOSE)
+            self.__watchdog_cancel()
 
-            elif self.status == Resource.TRANSFERRING:
-                if not self.initiator:
-                    retries_used = self.max_retries - self.retries_left
-                    extra_wait = retries_used * Resource.PER_RETRY_DELAY
+    def __query_proof(self):
+        expected_data = self.hash + self.expected_proof
+        expected_proof_packet = RNS.Packet(self.link, expected_data, packet_type=RNS.Packet.PROOF, context=RNS.Packet.RESOURCE_PRF)
+        expected_proof_packet.pack()
+        RNS.Transport.cache_request(expected_proof_packet.packet_hash, self.link)
 
-                    self.update_eifr()
-                    expected_tof_remaining = (self.outstanding_parts*self.sdu*8)/self.eifr
+    def __watchdog_job(self):
+        self.watchdog_timer = None
+        if self.status >= Resource.ASSEMBLING or self.status == Resource.REJECTED or self.watchdog_cancelled:
+            return
 
-                    if self.req_resp_rtt_rate != 0:
-                        sleep_time = self.last_activity + self.part_timeout_factor*expected_tof_remaining + Resource.RETRY_GRACE_TIME + extra_wait - time.time()
-                    else:
-                        sleep_time = self.last_activity + self.part_timeout_factor*((3*self.sdu)/self.eifr) + Resource.RETRY_GRACE_TIME + extra_wait - time.time()
-                    
-                    # TODO: Remove debug at some point
-                    # RNS.log(f"EIFR {RNS.prettyspeed(self.eifr)}, ETOF {RNS.prettyshorttime(expected_tof_remaining)} ", RNS.LOG_DEBUG, pt=True)
-                    # RNS.log(f"Resource ST {RNS.prettyshorttime(sleep_time)}, RTT {RNS.prettyshorttime(self.rtt or self.link.rtt)}, {self.outstanding_parts} left", RNS.LOG_DEBUG, pt=True)
-                    
-                    if sleep_time < 0:
-                        if self.retries_left > 0:
-                            ms = "" if self.outstanding_parts == 1 else "s"
-                            RNS.log(f"Timed out waiting for {self.outstanding_parts} part{ms}, requesting retry on {self}", RNS.LOG_DEBUG)
-                            if self.window > self.window_min:
-                                self.window -= 1
-                                if self.window_max > self.window_min:
-                                    self.window_max -= 1
-                                    if (self.window_max - self.window) > (self.window_flexibility-1):
-                                        self.window_max -= 1
+        if self.watchdog_lock:
+            self.__schedule_watchdog(0.025)
+            return
 
-                            sleep_time = 0.001
-                            self.retries_left -= 1
-                            self.waiting_for_hmu = False
-                            self.request_next()
-                        else:
-                            self.cancel()
-                            sleep_time = 0.001
+        sleep_time = None
+        if self.status == Resource.ADVERTISED:
+            sleep_time = (self.adv_sent+self.timeout+Resource.PROCESSING_GRACE)-time.time()
+            if sleep_time < 0:
+                if self.retries_left <= 0:
+                    RNS.log("Resource transfer timeout after sending advertisement", RNS.LOG_DEBUG)
+                    self.__watchdog_cancel()
+                    sleep_time = 0.001
                 else:
-                    max_extra_wait = sum([(r+1) * Resource.PER_RETRY_DELAY for r in range(self.MAX_RETRIES)])
-                    max_wait = self.rtt * self.timeout_factor * self.max_retries + self.sender_grace_time + max_extra_wait
-                    sleep_time = self.last_activity + max_wait - time.time()
-                    if sleep_time < 0:
-                        RNS.log("Resource timed out waiting for part requests", RNS.LOG_DEBUG)
-                        self.cancel()
-                        sleep_time = 0.001
+                    # Packets are sent off the scheduler thread, while
+                    # the timing is kept here on the watchdog
+                    RNS.log("No part requests received, retrying resource advertisement...", RNS.LOG_DEBUG)
+                    self.retries_left -= 1
+                    self.last_activity = time.time()
+                    self.adv_sent = self.last_activity
+                    sleep_time = 0.001
+                    RNS.Scheduler.dispatch(self.__readvertise)
+
 
-            elif self.status == Resource.AWAITING_PROOF:
-                # Decrease timeout factor since proof packets are
-                # significantly smaller than full req/resp roundtrip
-                self.timeout_factor = Resource.PROOF_TIMEOUT_FACTOR
+        elif self.status == Resource.TRANSFERRING:
+            if not self.initiator:
+                retries_used = self.max_retries - self.retries_left
+                extra_wait = retries_used * Resource.PER_RETRY_DELAY
+
+                self.update_eifr()
+                expected_tof_remaining = (self.outstanding_parts*self.sdu*8)/self.eifr
+
+                if self.req_resp_rtt_rate != 0:
+                    sleep_time = self.last_activity + self.part_timeout_factor*expected_tof_remaining + Resource.RETRY_GRACE_TIME + extra_wait - time.time()
+                else:
+                    sleep_time = self.last_activity + self.part_timeout_factor*((3*self.sdu)/self.eifr) + Resource.RETRY_GRACE_TIME + extra_wait - time.time()
 
-                sleep_time = self.last_part_sent + (self.rtt*self.timeout_factor+self.sender_grace_time) - time.time()
                 if sleep_time < 0:
-                    if self.retries_left <= 0:
-                        RNS.log("Resource timed out waiting for proof", RNS.LOG_DEBUG)
-                        self.cancel()
+                    if self.retries_left > 0:
+                        ms = "" if self.outstanding_parts == 1 else "s"
+                        RNS.log(f"Timed out waiting for {self.outstanding_parts} part{ms}, requesting retry on {self}", RNS.LOG_DEBUG)
+                        if self.window > self.window_min:
+                            self.window -= 1
+                            if self.window_max > self.window_min:
+                                self.window_max -= 1
+                                if (self.window_max - self.window) > (self.window_flexibility-1):
+                                    self.window_max -= 1
+
                         sleep_time = 0.001
-                    else:
-                        RNS.log("All parts sent, but no resource proof received, querying network cache...", RNS.LOG_DEBUG)
                         self.retries_left -= 1
-                        expected_data = self.hash + self.expected_proof
-                        expected_proof_packet = RNS.Packet(self.link, expected_data, packet_type=RNS.Packet.PROOF, context=RNS.Packet.RESOURCE_PRF)
-                        expected_proof_packet.pack()
-                        RNS.Transport.cache_request(expected_proof_packet.packet_hash, self.link)
-                        self.last_part_sent = time.time()
+                        self.waiting_for_hmu = False
+                        self.last_activity = time.time()
+                        RNS.Scheduler.dispatch(self.request_next)
+                    else:
+                        self.__watchdog_cancel()
                         sleep_time = 0.001
-
-            elif self.status == Resource.REJECTED:
-                sleep_time = 0.001
-
-            if sleep_time == 0:
-                RNS.log("Warning! Link watchdog sleep time of 0!", RNS.LOG_DEBUG)
-            if sleep_time == None or sleep_time < 0:
-                RNS.log("Timing error, cancelling resource transfer.", RNS.LOG_ERROR)
-                self.cancel()
-            
-            if sleep_time != None:
-                sleep(min(sleep_time, Resource.WATCHDOG_MAX_SLEEP))
+            else:
+                max_extra_wait = sum([(r+1) * Resource.PER_RETRY_DELAY for r in range(self.MAX_RETRIES)])
+                max_wait = self.rtt * self.timeout_factor * self.max_retries + self.sender_grace_time + max_extra_wait
+                sleep_time = self.last_activity + max_wait - time.time()
+                if sleep_time < 0:
+                    RNS.log("Resource timed out waiting for part requests", RNS.LOG_DEBUG)
+                    self.__watchdog_cancel()
+                    sleep_time = 0.001
+
+        elif self.status == Resource.AWAITING_PROOF:
+            # Decrease timeout factor since proof packets are
+            # significantly smaller than full req/resp roundtrip
+            self.timeout_factor = Resource.PROOF_TIMEOUT_FACTOR
+
+            sleep_time = self.last_part_sent + (self.rtt*self.timeout_factor+self.sender_grace_time) - time.time()
+            if sleep_time < 0:
+                if self.retries_left <= 0:
+                    RNS.log("Resource timed out waiting for proof", RNS.LOG_DEBUG)
+                    self.__watchdog_cancel()
+                    sleep_time = 0.001
+                else:
+                    RNS.log("All parts sent, but no resource proof received, querying network cache...", RNS.LOG_DEBUG)
+                    self.retries_left -= 1
+                    self.last_part_sent = time.time()
+                    RNS.Scheduler.dispatch(self.__query_proof)
+                    sleep_time = 0.001
+
+        if sleep_time == 0:
+            RNS.log("Warning! Link watchdog sleep time of 0!", RNS.LOG_DEBUG)
+        if sleep_time == None or sleep_time < 0:
+            RNS.log("Timing error, cancelling resource transfer.", RNS.LOG_ERROR)
+            self.__watchdog_cancel()
+        
+        if sleep_time != None and self.status < Resource.ASSEMBLING and not self.watchdog_cancelled:
+            self.__schedule_watchdog(min(sleep_time, Resource.WATCHDOG_MAX_SLEEP))
 
     def assemble(self):
         if not self.status == Resource.FAILED:
@@ -681,6 +773,14 @@ class Resource:
                 else: self.data = data
 
                 calculated_hash = RNS.Identity.full_hash(self.data+self.random_hash)
+
+                # If the transfer was cancelled while assembling, for
+                # example because the link was torn down, nothing may
+                # be written to storage, since the segment can already
+                # be resumed by another resource over a new link.
+                if self.status == Resource.FAILED:
+                    return
+
                 if calculated_hash == self.hash:
                     if self.has_metadata and self.segment_index == 1:
                         # TODO: Add early metadata_ready callback
@@ -697,6 +797,7 @@ class Resource:
                     self.file = open(self.storagepath, "ab")
                     self.file.write(data)
                     self.file.close()
+                    if self.segment_index < self.total_segments: self.persist_segment()
                     self.status = Resource.COMPLETE
                     del data
                     self.prove()
@@ -731,6 +832,7 @@ class Resource:
                 try:
                     if hasattr(self.data, "close") and callable(self.data.close): self.data.close()
                     if os.path.isfile(self.storagepath): os.unlink(self.storagepath)
+                    if os.path.isfile(self.resume_path): os.unlink(self.resume_path)
 
                 except Exception as e:
                     RNS.log(f"Error while cleaning up resource files, the contained exception was: {e}", RNS.LOG_ERROR)
@@ -1212,6 +1314,461 @@ class Resource:
         return "<"+RNS.hexrep(self.hash,delimit=False)+"/"+RNS.hexrep(self.link.link_id,delimit=False)+">"
 
 
+
+class StripedResource:
+    """
+    The StripedResource class allows transferring a single payload
+    concurrently over several established links to the same destination,
+    for example over disjoint paths or interfaces. The payload is divided
+    into stripes, each of which is transferred as an ordinary resource on
+    one of the links. Stripes are sized according to the measured expected
+    rate of each link, and a link is handed a new stripe as soon as its
+    previous one concludes, so faster links carry a larger share of the
+    transfer. Completion is reported once for the entire payload.
+
+    On the receiving side, stripes arrive as ordinary resources, and must
+    be passed to :ref:`RNS.StripedResource.receive()<api-stripedresource>`
+    from the resource concluded callback of each link. Stripes are only
+    accepted from links identified as the same remote identity as the
+    first stripe, so senders should identify on all of their links. The
+    assembled data is verified against a hash of the entire payload
+    before the transfer is reported as complete.
+
+    :param data: The data to be transferred. Can be *bytes* or an open *file handle*.
+    :param links: A list of :ref:`RNS.Link<api-link>` instances to the same destination on which to transfer the data.
+    :param metadata: Optional. Metadata to be delivered along with the data.
+    :param auto_compress: Optional. Whether to auto-compress the stripes. Can be *True* or *False*.
+    :param callback: An optional *callable* with the signature *callback(striped_resource)*. Will be called when the transfer concludes.
+    :param progress_callback: An optional *callable* with the signature *callback(striped_resource)*. Will be called whenever the transfer progress is updated.
+    """
+
+    # The largest stripe handed to a single link. Stripes
+    # are kept within one resource segment.
+    STRIPE_MAX_SIZE = Resource.MAX_EFFICIENT_SIZE - 1024
+
+    # The smallest stripe handed to a single link, used
+    # for links that are much slower than the fastest one.
+    STRIPE_MIN_SIZE = 32 * 1024
+
+    # The number of times a single stripe will be retried
+    # before the entire transfer is considered failed.
+    MAX_STRIPE_RETRIES = Resource.MAX_ADV_RETRIES
+
+    # The largest striped resource that will be accepted
+    # by a receiver.
+    MAX_SIZE = 16*1024*1024*1024
+
+    HASH_CHUNK_SIZE = 1024*1024
+
+    METADATA_KEY = "stripe"
+
+    receiving = {}
+    receiving_lock = Lock()
+
+    @staticmethod
+    def is_stripe(resource):
+        """
+        :param resource: An incoming :ref:`RNS.Resource<api-resource>`.
+        :returns: *True* if the resource is a stripe of a striped resource, otherwise *False*.
+        """
+        return type(resource.metadata) == dict and StripedResource.METADATA_KEY in resource.metadata
+
+    @staticmethod
+    def receive(resource, callback=None, progress_callback=None):
+        """
+        Processes a concluded incoming resource, and assembles it into
+        its striped resource, if it is a stripe. When all stripes have
+        been received, *callback* will be called with the assembled
+        striped resource, the *data* of which will be an open file handle.
+
+        :param resource: A concluded incoming :ref:`RNS.Resource<api-resource>`.
+        :param callback: An optional *callable* with the signature *callback(striped_resource)*.
+        :param progress_callback: An optional *callable* with the signature *callback(striped_resource)*.
+        :returns: The :ref:`RNS.StripedResource<api-stripedresource>` the stripe belongs to, or *None* if the resource is not a valid stripe.
+        """
+        if not StripedResource.is_stripe(resource):
+            return None
+
+        try:
+            stripe_hash, offset, total_size, metadata, data_hash = resource.metadata[StripedResource.METADATA_KEY]
+            if not isinstance(stripe_hash, bytes) or len(stripe_hash) != RNS.Identity.TRUNCATED_HASHLENGTH//8:
+                raise ValueError("Invalid stripe hash")
+            if not isinstance(data_hash, bytes) or len(data_hash) != RNS.Identity.HASHLENGTH//8:
+                raise ValueError("Invalid data hash")
+            if type(total_size) != int or total_size <= 0 or total_size > StripedResource.MAX_SIZE:
+                raise ValueError(f"Invalid total size {total_size}")
+            if type(offset) != int or offset < 0 or offset >= total_size:
+                raise ValueError(f"Invalid stripe offset {offset}")
+
+            remote_identity = resource.link.get_remote_identity()
+            with StripedResource.receiving_lock:
+                StripedResource.__clean_receiving()
+                if stripe_hash in StripedResource.receiving:
+                    striped_resource = StripedResource.receiving[stripe_hash]
+                else:
+                    striped_resource = StripedResource(None, [])
+                    striped_resource.hash = stripe_hash
+                    striped_resource.total_size = total_size
+                    striped_resource.data_hash = data_hash
+                    striped_resource.remote_identity_hash = remote_identity.hash if remote_identity != None else None
+                    striped_resource.storagepath = RNS.Reticulum.resourcepath+"/"+stripe_hash.hex()+".stripe"
+                    StripedResource.receiving[stripe_hash] = striped_resource
+
+            if striped_resource.remote_identity_hash != (remote_identity.hash if remote_identity != None else None):
+                raise ValueError("Stripe was received from a different remote identity than the transfer was started by")
+            if striped_resource.total_size != total_size or striped_resource.data_hash != data_hash:
+                raise ValueError("Stripe does not match the transfer it belongs to")
+
+            striped_resource.callback = callback
+            striped_resource.progress_callback = progress_callback
+            if not striped_resource.receive_stripe(resource, offset, metadata): return None
+            return striped_resource
+
+        except Exception as e:
+            RNS.log(f"Rejected resource stripe {resource}, the contained exception was: {e}", RNS.LOG_ERROR)
+            return None
+
+    @staticmethod
+    def __hash_file(file):
+        digest = RNS.Cryptography.Provider.implementation("sha256")()
+        file.seek(0)
+        while True:
+            chunk = file.read(StripedResource.HASH_CHUNK_SIZE)
+            if not chunk: break
+            digest.update(chunk)
+
+        return digest.digest()
+
+    @staticmethod
+    def __clean_receiving():
+        now = time.time()
+        stale = [h for h, s in StripedResource.receiving.items() if now > s.last_activity+RNS.Reticulum.RESOURCE_CACHE]
+        for stripe_hash in stale:
+            striped_resource = StripedResource.receiving.pop(stripe_hash)
+            striped_resource.status = Resource.FAILED
+            try:
+                if os.path.isfile(striped_resource.storagepath): os.unlink(striped_resource.storagepath)
+            except Exception as e:
+                RNS.log(f"Error while cleaning up stale striped resource files, the contained exception was: {e}", RNS.LOG_ERROR)
+
+    def __init__(self, data, links, metadata=None, auto_compress=True, callback=None, progress_callback=None):
+        self.lock = threading.RLock()
+        self.links = []
+        self.callback = callback
+        self.progress_callback = progress_callback
+        self.metadata = metadata
+        self.auto_compress = auto_compress
+        self.hash = None
+        self.data_hash = None
+        self.data = None
+        self.total_size = 0
+        self.transferred_size = 0
+        self.last_activity = time.time()
+        self.status = Resource.NONE
+
+        if data == None:
+            self.initiator = False
+            self.received = {}
+            self.received_offsets = []
+            self.remote_identity_hash = None
+            self.status = Resource.TRANSFERRING
+
+        else:
+            self.initiator = True
+            if hasattr(data, "read"):
+                self.input_file = data
+                self.total_size = os.stat(data.name).st_size
+            elif isinstance(data, bytes):
+                self.input_file = tempfile.TemporaryFile()
+                self.input_file.write(data)
+                self.total_size = len(data)
+            else:
+                raise TypeError("Invalid data instance type passed to striped resource initialisation")
+
+            if self.total_size == 0:
+                raise ValueError("Cannot create striped resource from empty data")
+            if self.total_size > StripedResource.MAX_SIZE:
+                raise ValueError(f"Cannot create striped resource larger than {RNS.prettysize(StripedResource.MAX_SIZE)}")
+
+            destination_hashes = set([link.destination.hash for link in links])
+            if len(destination_hashes) > 1:
+                raise ValueError("All links of a striped resource must lead to the same destination")
+
+            self.hash = RNS.Identity.get_random_hash()
+            self.data_hash = StripedResource.__hash_file(self.input_file)
+            self.next_offset = 0
+            self.pending_stripes = []
+            self.outstanding = {}
+            self.retries = {}
+            self.status = Resource.QUEUED
+
+            for link in links: self.add_link(link)
+            if len(self.links) == 0:
+                raise ValueError("No active links available for striped resource")
+
+    def add_link(self, link):
+        """
+        Adds an established link to an ongoing outgoing striped
+        resource transfer. The link will immediately begin carrying
+        stripes of the transfer.
+
+        :param link: An active :ref:`RNS.Link<api-link>` to the destination of the striped resource.
+        """
+        if not self.initiator: return
+        with self.lock:
+            if link.status == RNS.Link.ACTIVE and not link in self.links and self.status < Resource.COMPLETE:
+                if len(self.links) > 0 and link.destination.hash != self.links[0].destination.hash:
+                    raise ValueError("All links of a striped resource must lead to the same destination")
+                self.links.append(link)
+                self.__dispatch(link)
+
+    def stripe_size(self, link):
+        rate = link.get_expected_rate()
+        rates = [l.get_expected_rate() for l in self.links if l.get_expected_rate() != None]
+        if rate == None or len(rates) == 0:
+            return StripedResource.STRIPE_MAX_SIZE
+        else:
+            share = rate/max(rates)
+            return max(StripedResource.STRIPE_MIN_SIZE, int(StripedResource.STRIPE_MAX_SIZE*share))
+
+    def __next_stripe(self, link):
+        if len(self.pending_stripes) > 0:
+            return self.pending_stripes.pop(0)
+        elif self.next_offset < self.total_size:
+            offset = self.next_offset
+            size = min(self.stripe_size(link), self.total_size-offset)
+            self.next_offset += size
+            return (offset, size)
+        else:
+            return None
+
+    def __dispatch(self, link):
+        stripe = self.__next_stripe(link)
+        if stripe == None:
+            return
+
+        offset, size = stripe
+        self.input_file.seek(offset)
+        stripe_data = self.input_file.read(size)
+        metadata = self.metadata if offset == 0 else None
+        stripe_metadata = {StripedResource.METADATA_KEY: [self.hash, offset, self.total_size, metadata, self.data_hash]}
+
+        try:
+            self.status = Resource.TRANSFERRING
+            resource = Resource(stripe_data, link, metadata=stripe_metadata, auto_compress=self.auto_compress,
+                                callback=self.__stripe_concluded, progress_callback=self.__stripe_progress)
+            self.outstanding[link] = (offset, size, resource)
+
+        except Exception as e:
+            RNS.log(f"Could not dispatch stripe of {self} on {link}, the contained exception was: {e}", RNS.LOG_ERROR)
+            self.pending_stripes.append(stripe)
+            self.links.remove(link)
+
+    def __stripe_concluded(self, resource):
+        concluded = False
+        with self.lock:
+            link = None
+            for l in self.outstanding:
+                if self.outstanding[l][2] == resource:
+                    link = l
+                    break
+
+            if link == None:
+                return
+
+            offset, size, _ = self.outstanding.pop(link)
+            self.last_activity = time.time()
+
+            if resource.status == Resource.COMPLETE:
+                self.transferred_size += size
+                self.__dispatch(link)
+
+            elif resource.status == Resource.REJECTED:
+                RNS.log(f"Stripe of {self} was rejected by the receiver, cancelling transfer", RNS.LOG_DEBUG)
+                self.__cancel_outstanding()
+                self.status = Resource.REJECTED
+                concluded = True
+
+            else:
+                retries = self.retries.get(offset, 0)+1
+                self.retries[offset] = retries
+                self.pending_stripes.append((offset, size))
+                if retries > StripedResource.MAX_STRIPE_RETRIES:
+                    RNS.log(f"Stripe of {self} failed too many times, cancelling transfer", RNS.LOG_DEBUG)
+                    self.__cancel_outstanding()
+                    self.status = Resource.FAILED
+                    concluded = True
+                elif link.status == RNS.Link.ACTIVE:
+                    self.__dispatch(link)
+                else:
+                    RNS.log(f"{link} closed during transfer of {self}, continuing on remaining links", RNS.LOG_DEBUG)
+                    self.links.remove(link)
+                    # Hand the failed stripe to any link that is idle
+                    for l in self.links:
+                        if not l in self.outstanding: self.__dispatch(l)
+
+            if not concluded:
+                if len(self.outstanding) == 0:
+                    if self.transferred_size == self.total_size:
+                        self.status = Resource.COMPLETE
+                    else:
+                        RNS.log(f"No links left to transfer {self}, cancelling transfer", RNS.LOG_DEBUG)
+                        self.status = Resource.FAILED
+                    concluded = True
+
+        self.__progress()
+        if concluded:
+            try: self.input_file.close()
+            except Exception as e: RNS.log(f"Error while closing striped resource input file: {e}", RNS.LOG_ERROR)
+
+            if self.callback != None:
+                try: self.callback(self)
+                except Exception as e: RNS.log(f"Error while executing striped resource concluded callback from {self}. The contained exception was: {e}", RNS.LOG_ERROR)
+
+    def __stripe_progress(self, resource):
+        self.__progress()
+
+    def __progress(self):
+        if self.progress_callback != None:
+            try: self.progress_callback(self)
+            except Exception as e: RNS.log(f"Error while executing progress callback from {self}. The contained exception was: {e}", RNS.LOG_ERROR)
+
+    def __cancel_outstanding(self):
+        outstanding = list(self.outstanding.values())
+        self.outstanding = {}
+        for offset, size, resource in outstanding:
+            resource.cancel()
+
+    def receive_stripe(self, resource, offset, metadata):
+        concluded = False
+        with self.lock:
+            if self.status != Resource.TRANSFERRING:
+                return False
+
+            self.last_activity = time.time()
+            if resource.status == Resource.COMPLETE:
+                resource.data.seek(0)
+                stripe_data = resource.data.read()
+
+                # A stripe that was already received, but whose proof
+                # was lost, can be sent again. Any other stripe must be
+                # within the payload, and not overlap received stripes.
+                if self.received.get(offset) == len(stripe_data):
+                    return True
+                if len(stripe_data) == 0 or offset+len(stripe_data) > self.total_size:
+                    RNS.log(f"Rejected stripe of {self} outside the bounds of the transfer", RNS.LOG_ERROR)
+                    return False
+
+                i = bisect.bisect_right(self.received_offsets, offset)
+                if i > 0 and self.received_offsets[i-1]+self.received[self.received_offsets[i-1]] > offset:
+                    RNS.log(f"Rejected stripe of {self} overlapping a received stripe", RNS.LOG_ERROR)
+                    return False
+                if i < len(self.received_offsets) and offset+len(stripe_data) > self.received_offsets[i]:
+                    RNS.log(f"Rejected stripe of {self} overlapping a received stripe", RNS.LOG_ERROR)
+                    return False
+
+                if not os.path.isfile(self.storagepath):
+                    open(self.storagepath, "wb").close()
+
+                with open(self.storagepath, "r+b") as storage_file:
+                    storage_file.seek(offset)
+                    storage_file.write(stripe_data)
+
+                self.received[offset] = len(stripe_data)
+                self.received_offsets.insert(i, offset)
+                self.transferred_size += len(stripe_data)
+                if offset == 0: self.metadata = metadata
+                if not resource.link in self.links: self.links.append(resource.link)
+
+                # Received stripes never overlap, so once their sizes
+                # add up to the total size, the payload is complete.
+                if self.transferred_size == self.total_size:
+                    with StripedResource.receiving_lock:
+                        StripedResource.receiving.pop(self.hash, None)
+
+                    with open(self.storagepath, "rb") as storage_file:
+                        if StripedResource.__hash_file(storage_file) == self.data_hash:
+                            self.status = Resource.COMPLETE
+                        else:
+                            RNS.log(f"Assembled data of {self} does not match the hash of the transfer", RNS.LOG_ERROR)
+                            self.status = Resource.FAILED
+
+                    concluded = True
+
+        self.__progress()
+        if concluded:
+            if self.status == Resource.COMPLETE: self.data = open(self.storagepath, "rb")
+            if self.callback != None:
+                try: self.callback(self)
+                except Exception as e: RNS.log(f"Error while executing striped resource assembled callback from {self}. The contained exception was: {e}", RNS.LOG_ERROR)
+
+            self.__remove_storage()
+
+        return True
+
+    def __remove_storage(self):
+        try:
+            if hasattr(self.data, "close") and callable(self.data.close): self.data.close()
+            if os.path.isfile(self.storagepath): os.unlink(self.storagepath)
+        except Exception as e:
+            RNS.log(f"Error while cleaning up striped resource files, the contained exception was: {e}", RNS.LOG_ERROR)
+
+    def cancel(self):
+        """
+        Cancels transferring the striped resource.
+        """
+        with self.lock:
+            if self.status >= Resource.COMPLETE: return
+            self.status = Resource.FAILED
+            if self.initiator:
+                self.__cancel_outstanding()
+            else:
+                with StripedResource.receiving_lock:
+                    StripedResource.receiving.pop(self.hash, None)
+
+        if self.initiator:
+            try: self.input_file.close()
+            except Exception as e: RNS.log(f"Error while closing striped resource input file: {e}", RNS.LOG_ERROR)
+        else:
+            self.__remove_storage()
+
+        if self.callback != None:
+            try: self.callback(self)
+            except Exception as e: RNS.log(f"Error while executing striped resource concluded callback from {self}. The contained exception was: {e}", RNS.LOG_ERROR)
+
+    def get_progress(self):
+        """
+        :returns: The current progress of the striped resource transfer as a *float* between 0.0 and 1.0.
+        """
+        if self.total_size == 0: return 1.0 if self.status == Resource.COMPLETE else 0.0
+        in_flight = 0
+        if self.initiator:
+            for offset, size, resource in list(self.outstanding.values()):
+                in_flight += resource.get_progress()*size
+
+        return min(1.0, (self.transferred_size+in_flight)/self.total_size)
+
+    def get_data_size(self):
+        """
+        :returns: The total data size of the striped resource.
+        """
+        return self.total_size
+
+    def get_links(self):
+        """
+        :returns: The list of links carrying the striped resource.
+        """
+        return self.links
+
+    def get_hash(self):
+        """
+        :returns: The hash of the striped resource.
+        """
+        return self.hash
+
+    def __str__(self):
+        return "<"+RNS.hexrep(self.hash,delimit=False)+"/"+str(len(self.links))+" links>"
+
 class ResourceAdvertisement:
     OVERHEAD             = 134
     HASHMAP_MAX_LEN      = math.floor((RNS.Link.MDU-OVERHEAD)/Resource.MAPHASH_LEN)
@@ -49,6 +49,7 @@ else:
 from RNS.vendor.configobj import ConfigObj
 import configparser
 import multiprocessing.connection
+import itertools
 import importlib.util
 import threading
 import signal
@@ -158,6 +159,7 @@ class Reticulum:
     CLEAN_INTERVAL   = 15*60
     PERSIST_INTERVAL = 60*60*12
     GRACIOUS_PERSIST_INTERVAL = 60*5
+    TABLE_PAGE_SIZE  = 512
 
     router           = None
     config           = None
@@ -303,7 +305,6 @@ class Reticulum:
         if not os.path.isdir(Reticulum.identitypath):  os.makedirs(Reticulum.identitypath)
         if not os.path.isdir(Reticulum.blackholepath): os.makedirs(Reticulum.blackholepath)
         if not os.path.isdir(Reticulum.interfacepath): os.makedirs(Reticulum.interfacepath)
-        if not os.path.isdir(os.path.join(Reticulum.cachepath, "announces")): os.makedirs(os.path.join(Reticulum.cachepath, "announces"))
 
         if os.path.isfile(self.configpath):
             try: self.config = ConfigObj(self.configpath)
@@ -319,6 +320,7 @@ class Reticulum:
 
         self.__apply_config()
         RNS.log(f"Utilising cryptography backend \"{RNS.Cryptography.Provider.backend()}\"", RNS.LOG_DEBUG)
+        self.__select_crypto_backends()
         RNS.log(f"Configuration loaded from {self.configpath}", RNS.LOG_VERBOSE)
 
         RNS.Identity.load_known_destinations()
@@ -540,6 +542,18 @@ class Reticulum:
                     v = self.config["reticulum"].as_bool(option)
                     if v == True: Reticulum.panic_on_interface_error = True
                 
+                if option == "max_receipts":
+                    v = self.config["reticulum"].as_int(option)
+                    if v > 0: RNS.Transport.MAX_RECEIPTS = v
+
+                if option == "idle_link_keepalive":
+                    v = self.config["reticulum"].as_int(option)
+                    if v > 0: RNS.Link.KEEPALIVE_IDLE = min(max(v, RNS.Link.KEEPALIVE_MIN), RNS.Link.KEEPALIVE_IDLE_MAX)
+                
+                if option == "batch_announce_verification":
+                    v = self.config["reticulum"].as_bool(option)
+                    RNS.Transport.announce_batching = v
+
                 if option == "use_implicit_proof":
                     v = self.config["reticulum"].as_bool(option)
                     if v == True:  Reticulum.__use_implicit_proof = True
@@ -1009,7 +1023,13 @@ class Reticulum:
         # Clean resource caches
         for filename in os.listdir(self.resourcepath):
             try:
-                if len(filename) == (RNS.Identity.HASHLENGTH//8)*2:
+                # Partially received resources are kept along with
+                # their metadata and resume state, so transfers can
+                # be resumed until the resource cache time expires.
+                # Partially received striped resources are stored
+                # under their truncated hash, with a .stripe suffix.
+                name = filename.split(".")[0]
+                if len(name) == (RNS.Identity.HASHLENGTH//8)*2 or (filename.endswith(".stripe") and len(name) == (RNS.Identity.TRUNCATED_HASHLENGTH//8)*2):
                     filepath = self.resourcepath + "/" + filename
                     mtime = os.path.getmtime(filepath)
                     age = now - mtime
@@ -1019,7 +1039,8 @@ class Reticulum:
             except Exception as e:
                 RNS.log("Error while cleaning resources cache, the contained exception was: "+str(e), RNS.LOG_ERROR)
 
-        # Clean packet caches
+        # Clean packet cache files left by earlier versions. New
+        # packets are cached in the packet cache segment files.
         for filename in os.listdir(self.cachepath):
             try:
                 if len(filename) == (RNS.Identity.HASHLENGTH//8)*2:
@@ -1028,9 +1049,24 @@ class Reticulum:
                     age = now - mtime
                     if age > RNS.Transport.DESTINATION_TIMEOUT:
                         os.unlink(filepath)
-            
+
             except Exception as e:
-                RNS.log("Error while cleaning resources cache, the contained exception was: "+str(e), RNS.LOG_ERROR)
+                RNS.log("Error while cleaning packet cache, the contained exception was: "+str(e), RNS.LOG_ERROR)
+
+    def __select_crypto_backends(self):
+        # Benchmark the available backends for each cryptographic
+        # primitive on first start, and cache the selection in the
+        # storage directory. The benchmark is only repeated if the
+        # Python runtime or the installed backends change.
+        try:
+            selection = RNS.Cryptography.Provider.select_fastest(Reticulum.storagepath+"/crypto_backends")
+            for primitive in selection:
+                entry = selection[primitive]
+                ops_str = f" at {RNS.prettyfrequency(entry['ops'], suffix='ops/s')}" if entry["ops"] != None else ""
+                RNS.log(f"Using {entry['backend']} backend for {primitive}{ops_str}", RNS.LOG_DEBUG)
+
+        except Exception as e:
+            RNS.log(f"Could not benchmark cryptography backends, using defaults. The contained exception was: {e}", RNS.LOG_ERROR)
 
     def __create_default_config(self):
         self.config = ConfigObj(__default_rns_config__)
@@ -1051,14 +1087,20 @@ class Reticulum:
 
                     if path == "path_table":
                         mh = call["max_hops"]
-                        rpc_connection.send(self.get_path_table(max_hops=mh))
+                        interface = call.get("interface"); prefix = call.get("prefix")
+                        if "stream" in call:
+                            for page in self.__table_pages(self.__path_table_entries(mh, interface, prefix), call["stream"]):
+                                rpc_connection.send(page)
+                        else:
+                            rpc_connection.send(self.get_path_table(max_hops=mh, interface=interface, prefix=prefix, offset=call.get("offset", 0), limit=call.get("limit")))
 
                     if path == "interface_stats":       rpc_connection.send(self.get_interface_stats())
-                    if path == "rate_table":            rpc_connection.send(self.get_rate_table())
+                    if path == "rate_table":            rpc_connection.send(self.get_rate_table(prefix=call.get("prefix"), offset=call.get("offset", 0), limit=call.get("limit")))
                     if path == "next_hop_if_name":      rpc_connection.send(self.get_next_hop_if_name(call["destination_hash"]))
                     if path == "next_hop":              rpc_connection.send(self.get_next_hop(call["destination_hash"]))
                     if path == "first_hop_timeout":     rpc_connection.send(self.get_first_hop_timeout(call["destination_hash"]))
                     if path == "link_count":            rpc_connection.send(self.get_link_count())
+                    if path == "keepalive_stats":       rpc_connection.send(self.get_keepalive_stats())
                     if path == "packet_rssi":           rpc_connection.send(self.get_packet_rssi(call["packet_hash"]))
                     if path == "packet_snr":            rpc_connection.send(self.get_packet_snr(call["packet_hash"]))
                     if path == "packet_q":              rpc_connection.send(self.get_packet_q(call["packet_hash"]))
@@ -1250,6 +1292,9 @@ class Reticulum:
             stats["txb"] = RNS.Transport.traffic_txb
             stats["rxs"] = RNS.Transport.speed_rx
             stats["txs"] = RNS.Transport.speed_tx
+            stats["crypto"] = RNS.Cryptography.Provider.stats()
+            stats["announce_verification"] = {"verified": RNS.Identity.announces_verified, "cached": RNS.Identity.announce_signature_hits,
+                                              "rate": RNS.Transport.announce_verify_rate, "batched": RNS.Transport.announce_batching}
             if Reticulum.transport_enabled():
                 stats["transport_id"] = RNS.Transport.identity.hash
                 stats["network_id"] = RNS.Transport.network_identity.hash if RNS.Transport.network_identity else None
@@ -1268,50 +1313,110 @@ class Reticulum:
 
             return stats
 
-    def get_path_table(self, max_hops=None):
+    def __path_table_entries(self, max_hops=None, interface=None, prefix=None):
+        for dst_hash, path_entry in RNS.Transport.path_table_snapshot():
+            if max_hops != None and path_entry.hops > max_hops: continue
+            if prefix != None and not dst_hash.startswith(prefix): continue
+            interface_str = str(path_entry.receiving_interface)
+            if interface != None and interface != interface_str and interface != getattr(path_entry.receiving_interface, "name", None): continue
+            yield {
+                "hash": dst_hash,
+                "timestamp": path_entry.timestamp,
+                "via": path_entry.next_hop,
+                "hops": path_entry.hops,
+                "expires": path_entry.expires,
+                "interface": interface_str,
+            }
+
+    def __rate_table_entries(self, prefix=None):
+        for dst_hash, rate_entry in tuple(RNS.Transport.announce_rate_table.items()):
+            if prefix != None and not dst_hash.startswith(prefix): continue
+            count, since = rate_entry.window()
+            # Clients from before the averaged rate was introduced
+            # only read a list of timestamps, so an evenly spaced
+            # list spanning the averaging window is included too.
+            spacing = (rate_entry.heard-since)/(count-1) if count > 1 else 0
+            yield {
+                "hash": dst_hash,
+                "last": rate_entry.last,
+                "rate_violations": rate_entry.rate_violations,
+                "blocked_until": rate_entry.blocked_until,
+                "count": count,
+                "since": since,
+                "timestamps": [since+i*spacing for i in range(count)],
+            }
+
+    @staticmethod
+    def __table_pages(entries, page_size):
+        page = []
+        for entry in entries:
+            page.append(entry)
+            if len(page) >= page_size:
+                yield page
+                page = []
+
+        if len(page) > 0: yield page
+        yield []
+
+    @staticmethod
+    def __table_slice(entries, offset=0, limit=None):
+        if limit == None: return list(itertools.islice(entries, offset, None))
+        else:             return list(itertools.islice(entries, offset, offset+limit))
+
+    def get_path_table(self, max_hops=None, interface=None, prefix=None, offset=0, limit=None):
+        """
+        Returns known paths as a list of dictionaries. The table is read
+        from a snapshot, so large tables can be listed without holding up
+        Transport. Filtering and paging happens on the instance that holds
+        the table.
+
+        :param max_hops: Only include paths with at most this many hops.
+        :param interface: Only include paths on the interface with this name.
+        :param prefix: Only include destinations whose hash starts with these *bytes*.
+        :param offset: Number of matching paths to skip.
+        :param limit: Maximum number of paths to return, or *None* for all.
+        """
         if self.is_connected_to_shared_instance:
             rpc_connection = self.get_rpc_client()
-            rpc_connection.send({"get": "path_table", "max_hops": max_hops})
+            rpc_connection.send({"get": "path_table", "max_hops": max_hops, "interface": interface, "prefix": prefix, "offset": offset, "limit": limit})
             response = rpc_connection.recv()
             return response
 
         else:
-            path_table = []
-            for dst_hash in RNS.Transport.path_table:
-                path_hops = RNS.Transport.path_table[dst_hash][2]
-                if max_hops == None or path_hops <= max_hops:
-                    entry = {
-                        "hash": dst_hash,
-                        "timestamp": RNS.Transport.path_table[dst_hash][0],
-                        "via": RNS.Transport.path_table[dst_hash][1],
-                        "hops": path_hops,
-                        "expires": RNS.Transport.path_table[dst_hash][3],
-                        "interface": str(RNS.Transport.path_table[dst_hash][5]),
-                    }
-                    path_table.append(entry)
-
-            return path_table
-
-    def get_rate_table(self):
+            return self.__table_slice(self.__path_table_entries(max_hops, interface, prefix), offset, limit)
+
+    def iter_path_table(self, max_hops=None, interface=None, prefix=None, page_size=TABLE_PAGE_SIZE):
+        """
+        Iterates over known paths, with the same filters as ``get_path_table``.
+        When connected to a shared instance, paths are streamed in pages of
+        *page_size* entries, instead of being sent in one large message.
+        """
+        if self.is_connected_to_shared_instance:
+            rpc_connection = self.get_rpc_client()
+            rpc_connection.send({"get": "path_table", "max_hops": max_hops, "interface": interface, "prefix": prefix, "stream": page_size})
+            try:
+                while True:
+                    # Instances that do not support streaming send the
+                    # whole table as one page, and close the connection
+                    try: page = rpc_connection.recv()
+                    except EOFError: break
+                    if len(page) == 0: break
+                    for entry in page: yield entry
+            finally:
+                rpc_connection.close()
+
+        else:
+            for entry in self.__path_table_entries(max_hops, interface, prefix): yield entry
+
+    def get_rate_table(self, prefix=None, offset=0, limit=None):
         if self.is_connected_to_shared_instance:
             rpc_connection = self.get_rpc_client()
-            rpc_connection.send({"get": "rate_table"})
+            rpc_connection.send({"get": "rate_table", "prefix": prefix, "offset": offset, "limit": limit})
             response = rpc_connection.recv()
             return response
 
         else:
-            rate_table = []
-            for dst_hash in RNS.Transport.announce_rate_table:
-                entry = {
-                    "hash": dst_hash,
-                    "last": RNS.Transport.announce_rate_table[dst_hash]["last"],
-                    "rate_violations": RNS.Transport.announce_rate_table[dst_hash]["rate_violations"],
-                    "blocked_until": RNS.Transport.announce_rate_table[dst_hash]["blocked_until"],
-                    "timestamps": RNS.Transport.announce_rate_table[dst_hash]["timestamps"],
-                }
-                rate_table.append(entry)
-
-            return rate_table
+            return self.__table_slice(self.__rate_table_entries(prefix), offset, limit)
 
     def drop_path(self, destination):
         if self.is_connected_to_shared_instance:
@@ -1333,7 +1438,7 @@ class Reticulum:
         else:
             dropped_count = 0
             for destination_hash in RNS.Transport.path_table:
-                if RNS.Transport.path_table[destination_hash][1] == transport_hash:
+                if RNS.Transport.path_table[destination_hash].next_hop == transport_hash:
                     RNS.Transport.expire_path(destination_hash)
                     dropped_count += 1
 
@@ -1400,6 +1505,18 @@ class Reticulum:
         else:
             return len(RNS.Transport.link_table)
 
+    def get_keepalive_stats(self):
+        if self.is_connected_to_shared_instance:
+            rpc_connection = self.get_rpc_client()
+            rpc_connection.send({"get": "keepalive_stats"})
+            response = rpc_connection.recv()
+            return response
+
+        else:
+            rates = [link.get_keepalive_rate() for link in RNS.Transport.active_links.copy()]
+            rates = [rate for rate in rates if rate != None]
+            return {"links": len(rates), "keepalives_per_hour": sum(rates)/len(rates) if len(rates) > 0 else 0}
+
     def get_packet_rssi(self, packet_hash):
         if self.is_connected_to_shared_instance:
             rpc_connection = self.get_rpc_client()
@@ -1668,6 +1785,43 @@ instance_name = default
 # panic_on_interface_error = No
 
 
+# The number of outstanding packet receipts Reticulum
+# keeps track of can be configured. If more packets are
+# sent without being proven or timing out, the oldest
+# receipts are culled. Programs sending very large
+# numbers of packets may need to increase this.
+# This is an optional directive, the default is 1024.
+
+# max_receipts = 1024
+
+
+# Links that carry no data still exchange keep-alive
+# packets, at an interval derived from the link RTT.
+# On systems holding many mostly idle links, such as
+# transport nodes, the keep-alive interval of idle links
+# can be gradually extended up to a maximum number of
+# seconds. Since transport nodes forwarding a link drop
+# it after 15 minutes without traffic, the interval is
+# never extended beyond 360 seconds, which is the
+# longest interval used on links with a high RTT. The
+# remote ends of such links must run a Reticulum
+# version that follows the extended interval. This is
+# an optional directive, and is disabled by default.
+
+# idle_link_keepalive = 360
+
+
+# On transport nodes receiving large numbers of
+# announces, signature verification can be made more
+# efficient by holding incoming announces back for up
+# to 50 milliseconds, and verifying their signatures
+# together in batches. Batches are spread over all
+# available processor cores. This is an optional
+# directive, and is disabled by default.
+
+# batch_announce_verification = No
+
+
 # If you're connecting to a large external network, you
 # can use one or more external blackhole list to block
 # spammy and excessive announces onto your network. This
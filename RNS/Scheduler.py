@@ -0,0 +1,224 @@
+# Reticulum License
+#
+# Copyright (c) 2016-2025 Mark Qvist
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# - The Software shall not be used in any kind of system which includes amongst
+#   its functions the ability to purposefully do harm to human beings.
+#
+# - The Software shall not be used, directly or indirectly, in the creation of
+#   an artificial intelligence, machine learning or language model training
+#   dataset, including but not limited to any use that contributes to the
+#   training or development of such a model or algorithm.
+#
+# - The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import RNS
+import time
+import heapq
+import itertools
+import threading
+
+class Timer:
+    """
+    A handle for a callback scheduled with :ref:`RNS.Scheduler<api-scheduler>`.
+    Timers are created by :func:`RNS.Scheduler.call_later` and
+    :func:`RNS.Scheduler.call_at`, and should not be instantiated directly.
+    """
+    __slots__ = ("deadline", "callback", "cancelled")
+
+    def __init__(self, deadline, callback):
+        self.deadline  = deadline
+        self.callback  = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Cancels the timer. If the callback has not been run yet,
+        it will not be run.
+        """
+        with Scheduler.condition:
+            if not self.cancelled:
+                self.cancelled = True
+                Scheduler._cancelled()
+
+
+class Scheduler:
+    """
+    A single heap-ordered timer queue, that runs all timers
+    of the Reticulum instance from one thread. Link watchdogs,
+    resource part timeouts and packet receipt timeouts are all
+    scheduled here, so the number of threads needed for timing
+    does not grow with the number of active links.
+
+    Timer callbacks are run on the scheduler thread, and must
+    not block. Anything that may block, such as transmitting
+    packets or running user supplied callbacks, should be
+    handed off with :func:`RNS.Scheduler.dispatch`.
+    """
+
+    # Cancelled timers are removed lazily when they
+    # reach the top of the heap. If they start to
+    # make up most of the heap, it is compacted.
+    COMPACT_THRESHOLD = 1024
+
+    # A timer is counted as late when it runs more
+    # than this many seconds after its deadline
+    LATE_THRESHOLD    = 0.25
+
+    # Work handed off by timer callbacks is run on
+    # a shared pool of up to this many workers
+    DISPATCH_WORKERS  = 4
+    DISPATCH_QUEUE    = 4096
+
+    heap       = []
+    counter    = itertools.count()
+    condition  = threading.Condition()
+    thread     = None
+    cancelled  = 0
+    executor   = None
+
+    fired         = 0
+    late          = 0
+    lateness      = 0.0
+    max_lateness  = 0.0
+    run_time      = 0.0
+
+    @staticmethod
+    def call_later(delay, callback):
+        """
+        Schedules a callback to be run after a delay.
+
+        :param delay: The delay in seconds.
+        :param callback: A function with no arguments.
+        :returns: A ``Timer`` instance, that can be used to cancel the callback.
+        """
+        return Scheduler.call_at(time.time()+max(delay, 0), callback)
+
+    @staticmethod
+    def call_at(deadline, callback):
+        """
+        Schedules a callback to be run at a specific time.
+
+        :param deadline: The time to run the callback at, as a UNIX timestamp.
+        :param callback: A function with no arguments.
+        :returns: A ``Timer`` instance, that can be used to cancel the callback.
+        """
+        timer = Timer(deadline, callback)
+        with Scheduler.condition:
+            heapq.heappush(Scheduler.heap, (deadline, next(Scheduler.counter), timer))
+            if Scheduler.thread == None:
+                Scheduler.thread = threading.Thread(target=Scheduler.__job, name="Timer Scheduler", daemon=True)
+                Scheduler.thread.start()
+            elif Scheduler.heap[0][2] == timer:
+                Scheduler.condition.notify()
+
+        return timer
+
+    @staticmethod
+    def dispatch(job):
+        """
+        Runs a function on a shared pool of worker threads. Timer
+        callbacks use this for work that may block, so only the
+        timing itself is done on the scheduler thread.
+
+        :param job: A function with no arguments.
+        """
+        with Scheduler.condition:
+            if Scheduler.executor == None:
+                Scheduler.executor = RNS.RequestExecutor(workers=Scheduler.DISPATCH_WORKERS, queue_limit=Scheduler.DISPATCH_QUEUE)
+
+        # If the queue is full, the job is run on a thread of
+        # its own, since dropping it could leave a link or a
+        # resource waiting for a packet that is never sent.
+        def rejected(): threading.Thread(target=job, daemon=True).start()
+        Scheduler.executor.submit(job, rejected=rejected)
+
+    @staticmethod
+    def pending():
+        """
+        :returns: The number of timers currently scheduled.
+        """
+        with Scheduler.condition:
+            return len(Scheduler.heap) - Scheduler.cancelled
+
+    @staticmethod
+    def stats():
+        """
+        Returns statistics about timers run by the scheduler.
+
+        :returns: A dictionary with the number of pending and fired timers, the mean and maximum lateness of fired timers in seconds, the number of late timers, and the mean run time of timer callbacks in seconds.
+        """
+        with Scheduler.condition:
+            fired = Scheduler.fired
+            return {
+                "pending": len(Scheduler.heap) - Scheduler.cancelled,
+                "fired": fired,
+                "late": Scheduler.late,
+                "mean_lateness": Scheduler.lateness/fired if fired > 0 else 0.0,
+                "max_lateness": Scheduler.max_lateness,
+                "mean_run_time": Scheduler.run_time/fired if fired > 0 else 0.0,
+            }
+
+    @staticmethod
+    def _cancelled():
+        with Scheduler.condition:
+            Scheduler.cancelled += 1
+            if Scheduler.cancelled > Scheduler.COMPACT_THRESHOLD and Scheduler.cancelled > len(Scheduler.heap)//2:
+                Scheduler.heap = [entry for entry in Scheduler.heap if not entry[2].cancelled]
+                heapq.heapify(Scheduler.heap)
+                Scheduler.cancelled = 0
+
+    @staticmethod
+    def __job():
+        while True:
+            with Scheduler.condition:
+                while True:
+                    while len(Scheduler.heap) > 0 and Scheduler.heap[0][2].cancelled:
+                        heapq.heappop(Scheduler.heap)
+                        Scheduler.cancelled -= 1
+
+                    if len(Scheduler.heap) == 0:
+                        Scheduler.condition.wait()
+                    else:
+                        wait_time = Scheduler.heap[0][0] - time.time()
+                        if wait_time <= 0:
+                            break
+                        Scheduler.condition.wait(wait_time)
+
+                deadline, _, timer = heapq.heappop(Scheduler.heap)
+                # Mark the timer as done, so a late cancel
+                # is not counted as a pending cancellation
+                timer.cancelled = True
+
+            started = time.time()
+            try:
+                timer.callback()
+            except Exception as e:
+                RNS.log("Error while running scheduled timer callback "+str(timer.callback)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+
+            now = time.time()
+            lateness = started-deadline
+            with Scheduler.condition:
+                Scheduler.fired    += 1
+                Scheduler.lateness += lateness
+                Scheduler.run_time += now-started
+                if lateness > Scheduler.max_lateness:
+                    Scheduler.max_lateness = lateness
+                if lateness > Scheduler.LATE_THRESHOLD:
+                    Scheduler.late += 1
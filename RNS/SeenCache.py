@@ -0,0 +1,67 @@
+# Reticulum License
+#
+# Copyright (c) 2016-2025 Mark Qvist
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# - The Software shall not be used in any kind of system which includes amongst
+#   its functions the ability to purposefully do harm to human beings.
+#
+# - The Software shall not be used, directly or indirectly, in the creation of
+#   an artificial intelligence, machine learning or language model training
+#   dataset, including but not limited to any use that contributes to the
+#   training or development of such a model or algorithm.
+#
+# - The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from collections import deque
+
+class SeenCache:
+    """
+    A bounded set of recently seen items. Membership checks and insertions
+    are constant time, and once the cache holds ``maxsize`` items, adding a
+    new item evicts the oldest one. Used by Transport for remembering
+    things like path request tags, where only the most recent items need
+    to be recognised as duplicates.
+    """
+    def __init__(self, maxsize):
+        if maxsize < 1: raise ValueError("Seen cache size must be at least 1")
+        self.maxsize = maxsize
+        self.items = set()
+        self.order = deque()
+
+    def add(self, item):
+        """
+        Adds an item to the cache.
+
+        :returns: *True* if the item was not already in the cache, otherwise *False*.
+        """
+        if item in self.items: return False
+        self.items.add(item)
+        self.order.append(item)
+        while len(self.order) > self.maxsize: self.items.discard(self.order.popleft())
+        return True
+
+    def clear(self):
+        self.items.clear()
+        self.order.clear()
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __len__(self):
+        return len(self.order)
@@ -0,0 +1,432 @@
+# Reticulum License
+#
+# Copyright (c) 2016-2025 Mark Qvist
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# - The Software shall not be used in any kind of system which includes amongst
+#   its functions the ability to purposefully do harm to human beings.
+#
+# - The Software shall not be used, directly or indirectly, in the creation of
+#   an artificial intelligence, machine learning or language model training
+#   dataset, including but not limited to any use that contributes to the
+#   training or development of such a model or algorithm.
+#
+# - The above copyright notice and this permission notice shall be included in
+#   all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+import time
+import struct
+import threading
+import RNS
+from RNS.Channel import Channel, MessageBase, SystemMessageTypes, ChannelException, CEType
+from typing import Callable
+from contextlib import AbstractContextManager
+
+class SessionDataMessage(MessageBase):
+    MSGTYPE = SystemMessageTypes.SMT_SESSION_DATA
+    """
+    Message type for ``Channel``, carrying data for
+    a single session. Uses a system-reserved message
+    type.
+    """
+
+    OVERHEAD = 2
+
+    def __init__(self, session_id: int = None, data: bytes = None):
+        self.session_id = session_id
+        self.data = data or bytes()
+
+    def pack(self) -> bytes:
+        return struct.pack(">H", self.session_id) + self.data
+
+    def unpack(self, raw):
+        self.session_id = struct.unpack(">H", raw[:2])[0]
+        self.data = raw[2:]
+
+
+class SessionControlMessage(MessageBase):
+    MSGTYPE = SystemMessageTypes.SMT_SESSION_CONTROL
+    """
+    Message type for ``Channel``, used to open and
+    close sessions, and to grant send credit. Uses
+    a system-reserved message type.
+    """
+
+    OPEN   = 0x00
+    CREDIT = 0x01
+    CLOSE  = 0x02
+
+    def __init__(self, operation: int = None, session_id: int = None, value: int = 0):
+        self.operation = operation
+        self.session_id = session_id
+        self.value = value
+
+    def pack(self) -> bytes:
+        return struct.pack(">BHI", self.operation, self.session_id, self.value)
+
+    def unpack(self, raw):
+        self.operation, self.session_id, self.value = struct.unpack(">BHI", raw[:7])
+
+
+class Session(AbstractContextManager):
+    """
+    A logical, bidirectional byte stream carried over a
+    :ref:`RNS.Link<api-link>`, alongside any number of other
+    sessions on the same link. Each session has its own flow
+    control, so a session whose data is not being read does
+    not hold up other sessions, and can be closed independently
+    of the link and of other sessions.
+
+      This class should not be instantiated directly. Use
+      :func:`RNS.Multiplexer.open_session` to open sessions, and
+      :func:`RNS.Multiplexer.set_session_callback` to accept
+      sessions opened by the remote peer.
+    """
+
+    OPEN   = 0x00
+    CLOSED = 0x01
+
+    WINDOW = 1024*64
+    """
+    The number of bytes a session will buffer for reading. The
+    remote peer can not send more data than this, before data
+    has been read from the session.
+    """
+
+    # If a credit update can't be sent because the channel
+    # is busy, it is retried after this many seconds.
+    CREDIT_RETRY_INTERVAL = 0.1
+
+    def __init__(self, multiplexer: Multiplexer, session_id: int):
+        self.multiplexer = multiplexer
+        self.session_id = session_id
+        self.status = Session.OPEN
+        self._condition = threading.Condition()
+        self._rx = bytearray()
+        self._tx_credit = Session.WINDOW
+        self._rx_consumed = 0
+        self._credit_timer = None
+        self._ready_callback: Callable[[int], None] | None = None
+        self._closed_callback: Callable[[Session], None] | None = None
+
+    def set_ready_callback(self, callback: Callable[[int], None] | None):
+        """
+        Registers a function to be called when data is available
+        to read from the session. Callbacks are run on the link's
+        receive thread, and should not block.
+
+        :param callback: A function with the signature *callback(ready_bytes)*.
+        """
+        self._ready_callback = callback
+
+    def set_closed_callback(self, callback: Callable[[Session], None] | None):
+        """
+        Registers a function to be called when the session is closed,
+        either locally, by the remote peer or because the link closed.
+
+        :param callback: A function with the signature *callback(session)*.
+        """
+        self._closed_callback = callback
+
+    def read(self, size: int = -1) -> bytes | None:
+        """
+        Reads data from the session.
+
+        :param size: The maximum number of bytes to read. If omitted, all available data is read.
+        :returns: Up to *size* bytes of data, an empty ``bytes`` object once the session is closed and all data has been read, or ``None`` if no data is available yet.
+        """
+        with self._condition:
+            if len(self._rx) == 0:
+                return bytes() if self.status == Session.CLOSED else None
+
+            if size < 0 or size > len(self._rx):
+                size = len(self._rx)
+
+            data = bytes(self._rx[:size])
+            del self._rx[:size]
+            self._rx_consumed += size
+            grant = self.status == Session.OPEN and self._rx_consumed >= Session.WINDOW//2
+
+        if grant:
+            self.__send_credit()
+
+        return data
+
+    def available(self) -> int:
+        """
+        :returns: The number of bytes available to read.
+        """
+        with self._condition:
+            return len(self._rx)
+
+    def write(self, data: bytes, timeout: float = None) -> int:
+        """
+        Writes data to the session, blocking until the remote peer
+        has granted enough credit and the link is ready to send.
+
+        :param data: The data to write.
+        :param timeout: An optional maximum time in seconds to wait for credit.
+        :returns: The number of bytes written, which is less than the length of *data* if the timeout expired or the session was closed.
+        :raises: ``IOError`` if the session is already closed.
+        """
+        if self.status == Session.CLOSED:
+            raise IOError("Attempt to write to closed session")
+
+        deadline = time.time()+timeout if timeout != None else None
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            remaining = deadline-time.time() if deadline != None else None
+            with self._condition:
+                if not self._condition.wait_for(lambda: self._tx_credit > 0 or self.status == Session.CLOSED, remaining):
+                    break
+                if self.status == Session.CLOSED:
+                    break
+                size = min(len(view)-written, self._tx_credit, self.multiplexer.mdu)
+
+            if not self.multiplexer._send(SessionDataMessage(self.session_id, bytes(view[written:written+size])), remaining):
+                break
+
+            with self._condition:
+                self._tx_credit -= size
+            written += size
+
+        return written
+
+    def close(self):
+        """
+        Closes the session. Data already written is delivered
+        to the remote peer before it sees the session close.
+        """
+        if self.status == Session.OPEN:
+            self.multiplexer._send_control(SessionControlMessage(SessionControlMessage.CLOSE, self.session_id))
+            self._closed()
+
+    def _receive(self, data: bytes):
+        with self._condition:
+            if self.status == Session.CLOSED:
+                return
+            self._rx.extend(data)
+            ready = len(self._rx)
+
+        if self._ready_callback != None:
+            try:
+                self._ready_callback(ready)
+            except Exception as e:
+                RNS.log("Error while executing ready callback for "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+
+    def _credit(self, credit: int):
+        with self._condition:
+            self._tx_credit += credit
+            self._condition.notify_all()
+
+    def _closed(self):
+        with self._condition:
+            if self.status == Session.CLOSED:
+                return
+            self.status = Session.CLOSED
+            if self._credit_timer != None:
+                self._credit_timer.cancel()
+                self._credit_timer = None
+            self._condition.notify_all()
+
+        self.multiplexer._remove(self)
+        if self._closed_callback != None:
+            try:
+                self._closed_callback(self)
+            except Exception as e:
+                RNS.log("Error while executing closed callback for "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+
+    def __send_credit(self):
+        with self._condition:
+            self._credit_timer = None
+            credit = self._rx_consumed
+            if self.status == Session.CLOSED or credit == 0:
+                return
+            self._rx_consumed -= credit
+
+        if not self.multiplexer._send(SessionControlMessage(SessionControlMessage.CREDIT, self.session_id, credit), 0):
+            # Credit updates are never waited for, since reads
+            # may happen on the thread that processes incoming
+            # acknowledgements for the channel.
+            with self._condition:
+                self._rx_consumed += credit
+                if self.status == Session.OPEN and self._credit_timer == None:
+                    self._credit_timer = RNS.Scheduler.call_later(Session.CREDIT_RETRY_INTERVAL, self.__send_credit)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __str__(self):
+        return "<Session "+str(self.session_id)+">"
+
+
+class Multiplexer:
+    """
+    Carries any number of :ref:`RNS.Session<api-session>` streams over
+    the ``Channel`` of a single :ref:`RNS.Link<api-link>`, so that
+    applications opening many short-lived sessions to the same
+    destination only pay for one link establishment, one set of
+    keepalives and one link table entry on each transport hop.
+
+      This class should not be instantiated directly. Use
+      :func:`RNS.Link.get_multiplexer` to get the multiplexer of
+      a link.
+    """
+
+    def __init__(self, channel: Channel, initiator: bool):
+        self.channel = channel
+        self.sessions = {}
+        self._lock = threading.RLock()
+        self._send_lock = threading.Lock()
+        self._session_callback: Callable[[Session], None] | None = None
+
+        # Each end allocates session IDs from its own half
+        # of the ID space, so sessions opened at the same
+        # time from both ends never collide.
+        self._id_base = 0x0000 if initiator else 0x8000
+        self._next_id = 0
+
+        self.channel._register_message_type(SessionDataMessage, is_system_type=True)
+        self.channel._register_message_type(SessionControlMessage, is_system_type=True)
+        self.channel.add_message_handler(self._handle_message)
+
+    @property
+    def mdu(self) -> int:
+        return self.channel.mdu - SessionDataMessage.OVERHEAD
+
+    def set_session_callback(self, callback: Callable[[Session], None] | None):
+        """
+        Registers a function to be called when the remote peer opens
+        a session. If no callback is registered, incoming sessions are
+        closed immediately.
+
+        :param callback: A function with the signature *callback(session)*.
+        """
+        self._session_callback = callback
+
+    def open_session(self, timeout: float = None) -> Session:
+        """
+        Opens a new session to the remote peer.
+
+        :param timeout: An optional maximum time in seconds to wait for the link to be ready to send.
+        :returns: A :ref:`RNS.Session<api-session>` instance.
+        :raises: ``IOError`` if the session could not be opened.
+        """
+        with self._lock:
+            if len([session_id for session_id in self.sessions if session_id & 0x8000 == self._id_base]) >= 0x8000:
+                raise IOError("No free session IDs on "+str(self))
+
+            while self._id_base+self._next_id in self.sessions:
+                self._next_id = (self._next_id+1) % 0x8000
+            session = Session(self, self._id_base+self._next_id)
+            self._next_id = (self._next_id+1) % 0x8000
+            self.sessions[session.session_id] = session
+
+        if not self._send(SessionControlMessage(SessionControlMessage.OPEN, session.session_id, Session.WINDOW), timeout):
+            self._remove(session)
+            raise IOError("Could not open session on "+str(self))
+
+        return session
+
+    def _send(self, message: MessageBase, timeout: float | None) -> bool:
+        deadline = time.time()+timeout if timeout != None else None
+        if not self._send_lock.acquire(timeout=max(0, timeout) if timeout != None else -1):
+            return False
+
+        try:
+            while True:
+                remaining = max(0, deadline-time.time()) if deadline != None else None
+                if not self.channel.wait_ready(remaining):
+                    return False
+
+                try:
+                    self.channel.send(message)
+                    return True
+
+                except ChannelException as e:
+                    if e.type != CEType.ME_LINK_NOT_READY:
+                        RNS.log("Error while sending session message on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+                        return False
+
+        finally:
+            self._send_lock.release()
+
+    def _send_control(self, message: SessionControlMessage):
+        if not self._send(message, 0):
+            def retry(): self._send_control(message)
+            RNS.Scheduler.call_later(Session.CREDIT_RETRY_INTERVAL, retry)
+
+    def _remove(self, session: Session):
+        with self._lock:
+            if self.sessions.get(session.session_id) == session:
+                self.sessions.pop(session.session_id)
+
+    def _handle_message(self, message: MessageBase) -> bool:
+        if isinstance(message, SessionDataMessage):
+            with self._lock:
+                session = self.sessions.get(message.session_id, None)
+            if session != None:
+                session._receive(message.data)
+            return True
+
+        elif isinstance(message, SessionControlMessage):
+            if message.operation == SessionControlMessage.OPEN:
+                self.__remote_opened(message.session_id)
+
+            else:
+                with self._lock:
+                    session = self.sessions.get(message.session_id, None)
+                if session != None:
+                    if message.operation == SessionControlMessage.CREDIT:
+                        session._credit(message.value)
+                    elif message.operation == SessionControlMessage.CLOSE:
+                        session._closed()
+            return True
+
+        return False
+
+    def __remote_opened(self, session_id: int):
+        with self._lock:
+            if session_id & 0x8000 == self._id_base or session_id in self.sessions:
+                RNS.log("Remote peer attempted to open session with invalid ID "+str(session_id)+" on "+str(self), RNS.LOG_DEBUG)
+                return
+            session = Session(self, session_id)
+            self.sessions[session_id] = session
+
+        if self._session_callback == None:
+            session.close()
+        else:
+            try:
+                self._session_callback(session)
+            except Exception as e:
+                RNS.log("Error while executing session callback on "+str(self)+". The contained exception was: "+str(e), RNS.LOG_ERROR)
+                session.close()
+
+    def _shutdown(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session._closed()
+
+    def __str__(self):
+        return "<Multiplexer on "+str(self.channel._outlet)+">"
@@ -34,12 +34,16 @@ import RNS
 import time
 import math
 import struct
+import heapq
 import inspect
 import threading
 from time import sleep
 from threading import Lock
+from collections import deque, OrderedDict
 from .vendor import umsgpack as umsgpack
 from RNS.Interfaces.BackboneInterface import BackboneInterface
+from RNS.SeenCache import SeenCache
+from RNS.PacketCache import PacketCache
 
 class Transport:
     """
@@ -87,18 +91,29 @@ class Transport:
     LINK_TIMEOUT                = RNS.Link.STALE_TIME * 1.25
     REVERSE_TIMEOUT             = 8*60         # Reverse table entries are removed after 8 minutes
     DESTINATION_TIMEOUT         = 60*60*24*7   # Destination table entries are removed if unused for one week
-    MAX_RECEIPTS                = 1024         # Maximum number of receipts to keep track of
-    MAX_RATE_TIMESTAMPS         = 16           # Maximum number of announce timestamps to keep per destination
+    MAX_RECEIPTS                = 1024         # Default maximum number of receipts to keep track of
+    MAX_RATE_TIMESTAMPS         = 16           # Number of announces the per-destination announce rate is averaged over
+    MAX_RATE_ENTRIES            = 131072       # Maximum number of destinations to keep announce rate info for
+    RATE_ENTRY_TIMEOUT          = 60*60*24     # Announce rate info is removed for destinations not heard for one day
     PERSIST_RANDOM_BLOBS        = 32           # Maximum number of random blobs per destination to persist to disk
     MAX_RANDOM_BLOBS            = 64           # Maximum number of random blobs per destination to keep in memory
 
+    ANNOUNCE_BATCH_WINDOW       = 0.05         # Maximum time an announce is held for batched signature verification
+    ANNOUNCE_BATCH_SIZE         = 64           # Maximum number of announce signatures verified per batch
+    ANNOUNCE_BATCH_QUEUE        = 1024         # Announces arriving while this many are queued are processed directly
+
     interfaces                  = []           # All active interfaces
     destinations                = []           # All active destinations
     pending_links               = []           # Links that are being established
     active_links                = []           # Links that are active
+    destination_index           = {}           # Active destinations, by destination hash
+    pending_link_index          = {}           # Links that are being established, by link ID
+    active_link_index           = {}           # Links that are active, by link ID
+    initiator_links             = {}           # Active links initiated here, by attached interface and link ID
     packet_hashlist             = set()        # A list of packet hashes for duplicate detection
     packet_hashlist_prev        = set()
-    receipts                    = []           # Receipts of all outgoing packets for proof processing
+    receipts                    = {}           # Receipts of all outgoing packets for proof processing, by packet hash
+    receipts_by_truncated_hash  = {}           # The same receipts by truncated packet hash, for implicit proofs
 
     # Notes on memory usage: 1 megabyte of memory can store approximately
     # 55.100 path table entries or approximately 22.300 link table entries.
@@ -108,16 +123,30 @@ class Transport:
     reverse_table               = {}           # A lookup table for storing packet hashes used to return proofs and replies
     link_table                  = {}           # A lookup table containing hops for links
     held_announces              = {}           # A table containing temporarily held announce-table entries
+    announce_heap               = []           # Retransmission deadlines for the announce table, as (time, destination hash)
     announce_handlers           = []           # A table storing externally registered announce handlers
     tunnels                     = {}           # A table storing tunnels to other transport instances
-    announce_rate_table         = {}           # A table for keeping track of announce rates
+    announce_rate_table         = OrderedDict()# A table for keeping track of announce rates, in the order destinations were last heard
     path_requests               = {}           # A table for storing path request timestamps
     path_states                 = {}           # A table for keeping track of path states
     blackholed_identities       = {}           # A table for keeping track of blackholed identities
     
     discovery_path_requests     = {}           # A table for keeping track of path requests on behalf of other nodes
-    discovery_pr_tags           = []           # A table for keeping track of tagged path requests
     max_pr_tags                 = 32000        # Maximum amount of unique path request tags to remember
+    discovery_pr_tags           = SeenCache(max_pr_tags) # A table for keeping track of tagged path requests
+
+    CULL_REVERSE                = 0x00         # Identifiers for the tables that are culled in expiry order
+    CULL_LINK                   = 0x01
+    CULL_PATH                   = 0x02
+    CULL_DISCOVERY              = 0x03
+    CULL_TUNNEL                 = 0x04
+    CULL_TUNNEL_PATH            = 0x05
+    cull_heaps                  = {CULL_REVERSE: [], CULL_LINK: [], CULL_PATH: [], CULL_DISCOVERY: [], CULL_TUNNEL: [], CULL_TUNNEL_PATH: []}
+    cull_scheduled              = {CULL_REVERSE: {}, CULL_LINK: {}, CULL_PATH: {}, CULL_DISCOVERY: {}, CULL_TUNNEL: {}, CULL_TUNNEL_PATH: {}}
+    interface_entries           = {}           # Culled table entries referencing each interface, by interface
+    entry_interfaces            = {}           # Interfaces referenced by each culled table entry, by (table, key)
+    path_table_version          = 0            # Incremented whenever paths are added, replaced or removed
+    path_table_snapshot_cache   = None         # The most recent path table snapshot and the version it was taken at
 
     # Transport control destinations are used
     # for control purposes like path requests
@@ -146,8 +175,7 @@ class Transport:
     job_interval                = 0.250
     links_last_checked          = 0.0
     links_check_interval        = 1.0
-    receipts_last_checked       = 0.0
-    receipts_check_interval     = 1.0
+    receipts_timeout_resolution = 1.0
     announces_last_checked      = 0.0
     announces_check_interval    = 1.0
     pending_prs_last_checked    = 0.0
@@ -163,6 +191,11 @@ class Transport:
     blackhole_last_checked      = 0
     blackhole_check_interval    = 60
     inbound_announce_lock       = Lock()
+    announce_batching           = False
+    announce_batch_queue        = deque()
+    announce_batch_condition    = threading.Condition()
+    announce_batcher            = None
+    receipts_lock               = Lock()
     interface_announcer         = None
     discovery_handler           = None
     blackhole_updater           = None
@@ -171,8 +204,14 @@ class Transport:
     traffic_txb                 = 0
     speed_rx                    = 0
     speed_tx                    = 0
+    announce_verify_rate        = 0
+    announce_verify_counter     = None
     traffic_captured            = None
 
+    packet_cache                = PacketCache()
+    interface_hashes            = {}
+    announce_references         = {}           # Number of paths and tunnel paths referring to each cached announce
+
     identity                    = None
     network_identity            = None
 
@@ -206,6 +245,16 @@ class Transport:
 
         Transport.reload_blackhole()
 
+        # Clients connected to a shared instance only keep
+        # packets in memory, since the cache on disk is owned
+        # by the shared instance.
+        if not Transport.owner.is_connected_to_shared_instance:
+            try:
+                Transport.packet_cache = PacketCache(os.path.join(RNS.Reticulum.cachepath, "packets"))
+                Transport.import_legacy_cache()
+            except Exception as e:
+                RNS.log("Could not open packet cache on disk, caching packets in memory only. The contained exception was: "+str(e), RNS.LOG_ERROR)
+
         # Create transport-specific destinations
         Transport.path_request_destination = RNS.Destination(None, RNS.Destination.IN, RNS.Destination.PLAIN, Transport.APP_NAME, "path", "request")
         Transport.path_request_destination.set_packet_callback(Transport.path_request_handler)
@@ -271,7 +320,7 @@ class Transport:
                             received_from = serialised_entry[2]
                             hops = serialised_entry[3]
                             expires = serialised_entry[4]
-                            random_blobs = serialised_entry[5]
+                            random_blobs = RandomBlobs(serialised_entry[5])
                             receiving_interface = Transport.find_interface_from_hash(serialised_entry[6])
                             announce_packet = Transport.get_cached_packet(serialised_entry[7], packet_type="announce")
                             blackholed = False
@@ -288,7 +337,9 @@ class Transport:
                                 # over an interface. It is cached with it's non-
                                 # increased hop-count.
                                 announce_packet.hops += 1
-                                Transport.path_table[destination_hash] = [timestamp, received_from, hops, expires, random_blobs, receiving_interface, announce_packet.packet_hash]
+                                Transport.path_table[destination_hash] = PathEntry(timestamp, received_from, hops, expires, random_blobs, receiving_interface, announce_packet.packet_hash)
+                                Transport.track_entry(Transport.CULL_PATH, destination_hash)
+                                Transport.reference_announce(announce_packet.packet_hash)
                                 RNS.log("Loaded path table entry for "+RNS.prettyhexrep(destination_hash)+" from storage", RNS.LOG_DEBUG)
                             else:
                                 RNS.log("Could not reconstruct path table entry from storage for "+RNS.prettyhexrep(destination_hash), RNS.LOG_DEBUG)
@@ -331,7 +382,7 @@ class Transport:
                             received_from = serialised_entry[2]
                             hops = serialised_entry[3]
                             expires = serialised_entry[4]
-                            random_blobs = list(set(serialised_entry[5]))
+                            random_blobs = RandomBlobs(list(set(serialised_entry[5])))
                             receiving_interface = Transport.find_interface_from_hash(serialised_entry[6])
                             announce_packet = Transport.get_cached_packet(serialised_entry[7], packet_type="announce")
 
@@ -343,12 +394,15 @@ class Transport:
                                 # increased hop-count.
                                 announce_packet.hops += 1
 
-                                tunnel_path = [timestamp, received_from, hops, expires, random_blobs, receiving_interface, announce_packet.packet_hash]
+                                tunnel_path = PathEntry(timestamp, received_from, hops, expires, random_blobs, receiving_interface, announce_packet.packet_hash)
                                 tunnel_paths[destination_hash] = tunnel_path
+                                Transport.reference_announce(tunnel_path.packet_hash)
 
                         if len(tunnel_paths) > 0:
                             tunnel = [tunnel_id, None, tunnel_paths, expires]
                             Transport.tunnels[tunnel_id] = tunnel
+                            Transport.track_entry(Transport.CULL_TUNNEL, tunnel_id)
+                            for destination_hash in tunnel_paths: Transport.track_entry(Transport.CULL_TUNNEL_PATH, (tunnel_id, destination_hash))
 
                     if len(Transport.path_table) == 1: specifier = "entry"
                     else: specifier = "entries"
@@ -372,6 +426,10 @@ class Transport:
             RNS.log("Transport instance "+str(Transport.identity)+" started", RNS.LOG_VERBOSE)
             Transport.start_time = time.time()
 
+        # Remove cached announces that no loaded path refers to
+        if not Transport.owner.is_connected_to_shared_instance:
+            Transport.clean_announce_cache()
+
         # Sort interfaces according to bitrate
         Transport.prioritize_interfaces()
 
@@ -445,6 +503,12 @@ class Transport:
                 Transport.traffic_txb += txb
                 Transport.speed_rx     = rxs
                 Transport.speed_tx     = txs
+
+                now = time.time(); verified = RNS.Identity.announces_verified
+                if Transport.announce_verify_counter != None:
+                    ts_diff = now-Transport.announce_verify_counter[0]
+                    Transport.announce_verify_rate = (verified-Transport.announce_verify_counter[1])/ts_diff
+                Transport.announce_verify_counter = [now, verified]
             
             except Exception as e:
                 RNS.log(f"An error occurred while counting interface traffic: {e}", RNS.LOG_ERROR)
@@ -469,7 +533,7 @@ class Transport:
                 # Process active and pending link lists
                 if time.time() > Transport.links_last_checked+Transport.links_check_interval:
 
-                    for link in Transport.pending_links:
+                    for link in Transport.pending_links.copy():
                         if link.status == RNS.Link.CLOSED:
                             # If we are not a Transport Instance, finding a pending link
                             # that was never activated will trigger an expiry of the path
@@ -491,91 +555,17 @@ class Transport:
                                             blocked_if = None
                                             path_requests[link.destination.hash] = blocked_if
 
-                            Transport.pending_links.remove(link)
+                            Transport.deregister_link(link)
 
-                    for link in Transport.active_links:
+                    for link in Transport.active_links.copy():
                         if link.status == RNS.Link.CLOSED:
-                            Transport.active_links.remove(link)
+                            Transport.deregister_link(link)
 
                     Transport.links_last_checked = time.time()
 
-                # Process receipts list for timed-out packets
-                if time.time() > Transport.receipts_last_checked+Transport.receipts_check_interval:
-                    while len(Transport.receipts) > Transport.MAX_RECEIPTS:
-                        culled_receipt = Transport.receipts.pop(0)
-                        culled_receipt.timeout = -1
-                        culled_receipt.check_timeout()
-                        should_collect = True
-
-                    for receipt in Transport.receipts:
-                        receipt.check_timeout()
-                        if receipt.status != RNS.PacketReceipt.SENT:
-                            if receipt in Transport.receipts:
-                                Transport.receipts.remove(receipt)
-
-                    Transport.receipts_last_checked = time.time()
-
                 # Process announces needing retransmission
                 if time.time() > Transport.announces_last_checked+Transport.announces_check_interval:
-                    completed_announces = []
-                    for destination_hash in Transport.announce_table:
-                        announce_entry = Transport.announce_table[destination_hash]
-                        if announce_entry[IDX_AT_RETRIES] > 0 and announce_entry[IDX_AT_RETRIES] >= Transport.LOCAL_REBROADCASTS_MAX:
-                            RNS.log("Completed announce processing for "+RNS.prettyhexrep(destination_hash)+", local rebroadcast limit reached", RNS.LOG_EXTREME)
-                            completed_announces.append(destination_hash)
-                        elif announce_entry[IDX_AT_RETRIES] > Transport.PATHFINDER_R:
-                            RNS.log("Completed announce processing for "+RNS.prettyhexrep(destination_hash)+", retry limit reached", RNS.LOG_EXTREME)
-                            completed_announces.append(destination_hash)
-                        else:
-                            if time.time() > announce_entry[IDX_AT_RTRNS_TMO]:
-                                announce_entry[IDX_AT_RTRNS_TMO] = time.time() + Transport.PATHFINDER_G + Transport.PATHFINDER_RW
-                                announce_entry[IDX_AT_RETRIES] += 1
-                                packet = announce_entry[IDX_AT_PACKET]
-                                block_rebroadcasts = announce_entry[IDX_AT_BLCK_RBRD]
-                                attached_interface = announce_entry[IDX_AT_ATTCHD_IF]
-                                announce_context = RNS.Packet.NONE
-                                if block_rebroadcasts: announce_context = RNS.Packet.PATH_RESPONSE
-                                announce_data = packet.data
-                                announce_identity = RNS.Identity.recall(packet.destination_hash)
-                                announce_destination = RNS.Destination(announce_identity, RNS.Destination.OUT, RNS.Destination.SINGLE, "unknown", "unknown");
-                                announce_destination.hash = packet.destination_hash
-                                announce_destination.hexhash = announce_destination.hash.hex()
-                                
-                                new_packet = RNS.Packet(
-                                    announce_destination,
-                                    announce_data,
-                                    RNS.Packet.ANNOUNCE,
-                                    context = announce_context,
-                                    header_type = RNS.Packet.HEADER_2,
-                                    transport_type = Transport.TRANSPORT,
-                                    transport_id = Transport.identity.hash,
-                                    attached_interface = attached_interface,
-                                    context_flag = packet.context_flag,
-                                )
-
-                                new_packet.hops = announce_entry[4]
-                                if block_rebroadcasts:
-                                    RNS.log("Rebroadcasting announce as path response for "+RNS.prettyhexrep(announce_destination.hash)+" with hop count "+str(new_packet.hops), RNS.LOG_DEBUG)
-                                else:
-                                    RNS.log("Rebroadcasting announce for "+RNS.prettyhexrep(announce_destination.hash)+" with hop count "+str(new_packet.hops), RNS.LOG_DEBUG)
-                                
-                                outgoing.append(new_packet)
-
-                                # This handles an edge case where a peer sends a past
-                                # request for a destination just after an announce for
-                                # said destination has arrived, but before it has been
-                                # rebroadcast locally. In such a case the actual announce
-                                # is temporarily held, and then reinserted when the path
-                                # request has been served to the peer.
-                                if destination_hash in Transport.held_announces:
-                                    held_entry = Transport.held_announces.pop(destination_hash)
-                                    Transport.announce_table[destination_hash] = held_entry
-                                    RNS.log("Reinserting held announce into table", RNS.LOG_DEBUG)
-
-                    for destination_hash in completed_announces:
-                        if destination_hash in Transport.announce_table:
-                            Transport.announce_table.pop(destination_hash)
-
+                    outgoing.extend(Transport.process_announce_table(time.time()))
                     Transport.announces_last_checked = time.time()
 
 
@@ -592,173 +582,169 @@ class Transport:
 
                     Transport.pending_prs_last_checked = time.time()
 
-                # Cull the path request tags list if it has reached its max size
-                if len(Transport.discovery_pr_tags) > Transport.max_pr_tags:
-                    Transport.discovery_pr_tags = Transport.discovery_pr_tags[len(Transport.discovery_pr_tags)-Transport.max_pr_tags:len(Transport.discovery_pr_tags)-1]
-
                 if time.time() > Transport.tables_last_culled + Transport.tables_cull_interval:
-                    # Remove unneeded path state entries
-                    stale_path_states = []
-                    for destination_hash in Transport.path_states:
-                        if not destination_hash in Transport.path_table:
-                            stale_path_states.append(destination_hash)
+                    now = time.time()
+                    stale_reverse_entries = set()
+                    stale_links = set()
+                    stale_paths = set()
+
+                    # Cull entries attached to interfaces that no longer
+                    # exist. Only the entries indexed for each removed
+                    # interface are examined.
+                    active_interfaces = set(Transport.interfaces)
+                    for interface in [i for i in Transport.interface_entries if not i in active_interfaces]:
+                        for table, key in Transport.interface_entries.pop(interface):
+                            if table == Transport.CULL_REVERSE:
+                                reverse_entry = Transport.reverse_table.get(key)
+                                if reverse_entry != None and interface in (reverse_entry.outbound_interface, reverse_entry.receiving_interface):
+                                    stale_reverse_entries.add(key)
+
+                            elif table == Transport.CULL_LINK:
+                                link_entry = Transport.link_table.get(key)
+                                if link_entry != None and link_entry.validated == True and interface in (link_entry.next_hop_interface, link_entry.receiving_interface):
+                                    stale_links.add(key)
+
+                            elif table == Transport.CULL_PATH:
+                                destination_entry = Transport.path_table.get(key)
+                                if destination_entry != None and destination_entry.receiving_interface == interface and not key in stale_paths:
+                                    stale_paths.add(key)
+                                    should_collect = True
+                                    RNS.log("Path to "+RNS.prettyhexrep(key)+" was removed since the attached interface no longer exists", RNS.LOG_DEBUG)
+
+                            elif table == Transport.CULL_TUNNEL:
+                                tunnel_entry = Transport.tunnels.get(key)
+                                if tunnel_entry != None and tunnel_entry[IDX_TT_IF] != None and tunnel_entry[IDX_TT_IF] == interface:
+                                    RNS.log(f"Removing non-existent tunnel interface {tunnel_entry[IDX_TT_IF]}", RNS.LOG_EXTREME)
+                                    tunnel_entry[IDX_TT_IF] = None
+                                    Transport.track_entry(Transport.CULL_TUNNEL, key)
 
                     # Cull the reverse table according to timeout
-                    stale_reverse_entries = []
-                    for truncated_packet_hash in Transport.reverse_table:
-                        reverse_entry = Transport.reverse_table[truncated_packet_hash]
-                        if time.time() > reverse_entry[IDX_RT_TIMESTAMP] + Transport.REVERSE_TIMEOUT:
-                            stale_reverse_entries.append(truncated_packet_hash)
-                        elif not reverse_entry[IDX_RT_OUTB_IF] in Transport.interfaces:
-                            stale_reverse_entries.append(truncated_packet_hash)
-                        elif not reverse_entry[IDX_RT_RCVD_IF] in Transport.interfaces:
-                            stale_reverse_entries.append(truncated_packet_hash)
+                    stale_reverse_entries.update(Transport.due_entries(Transport.CULL_REVERSE, now))
 
                     # Cull the link table according to timeout
-                    stale_links = []
-                    for link_id in Transport.link_table:
+                    for link_id in Transport.due_entries(Transport.CULL_LINK, now):
                         link_entry = Transport.link_table[link_id]
+                        stale_links.add(link_id)
 
-                        if link_entry[IDX_LT_VALIDATED] == True:
-                            if time.time() > link_entry[IDX_LT_TIMESTAMP] + Transport.LINK_TIMEOUT:
-                                stale_links.append(link_id)
-                            elif not link_entry[IDX_LT_NH_IF] in Transport.interfaces:
-                                stale_links.append(link_id)
-                            elif not link_entry[IDX_LT_RCVD_IF] in Transport.interfaces:
-                                stale_links.append(link_id)
-                        else:
-                            if time.time() > link_entry[IDX_LT_PROOF_TMO]:
-                                stale_links.append(link_id)
-
-                                last_path_request = 0
-                                if link_entry[IDX_LT_DSTHASH] in Transport.path_requests:
-                                    last_path_request = Transport.path_requests[link_entry[IDX_LT_DSTHASH]]
+                        if link_entry.validated != True:
+                            last_path_request = 0
+                            if link_entry.destination_hash in Transport.path_requests:
+                                last_path_request = Transport.path_requests[link_entry.destination_hash]
 
-                                lr_taken_hops = link_entry[IDX_LT_HOPS]
+                            lr_taken_hops = link_entry.hops
 
-                                path_request_throttle = time.time() - last_path_request < Transport.PATH_REQUEST_MI
-                                path_request_conditions = False
-                                
-                                # If the path has been invalidated between the time of
-                                # making the link request and now, try to rediscover it
-                                if not Transport.has_path(link_entry[IDX_LT_DSTHASH]):
-                                    RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry[IDX_LT_DSTHASH])+" since an attempted link was never established, and path is now missing", RNS.LOG_DEBUG)
-                                    path_request_conditions =True
-
-                                # If this link request was originated from a local client
-                                # attempt to rediscover a path to the destination, if this
-                                # has not already happened recently.
-                                elif not path_request_throttle and lr_taken_hops == 0:
-                                    RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry[IDX_LT_DSTHASH])+" since an attempted local client link was never established", RNS.LOG_DEBUG)
-                                    path_request_conditions = True
-
-                                # If the link destination was previously only 1 hop
-                                # away, this likely means that it was local to one
-                                # of our interfaces, and that it roamed somewhere else.
-                                # In that case, try to discover a new path, and mark
-                                # the old one as unresponsive.
-                                elif not path_request_throttle and Transport.hops_to(link_entry[IDX_LT_DSTHASH]) == 1:
-                                    RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry[IDX_LT_DSTHASH])+" since an attempted link was never established, and destination was previously local to an interface on this instance", RNS.LOG_DEBUG)
-                                    path_request_conditions = True
-                                    blocked_if = link_entry[IDX_LT_RCVD_IF]
-
-                                    # TODO: This might result in the path re-resolution
-                                    # only being able to happen once, since new path found
-                                    # after allowing update from higher hop-count path, after
-                                    # marking old path unresponsive, might be more than 1 hop away,
-                                    # thus dealocking us into waiting for a new announce all-together.
-                                    # Is this problematic, or does it actually not matter?
-                                    # Best would be to have full support for alternative paths,
-                                    # and score them according to number of unsuccessful tries or
-                                    # similar.
-                                    if RNS.Reticulum.transport_enabled():
-                                        if hasattr(link_entry[IDX_LT_RCVD_IF], "mode") and link_entry[IDX_LT_RCVD_IF].mode != RNS.Interfaces.Interface.Interface.MODE_BOUNDARY:
-                                            Transport.mark_path_unresponsive(link_entry[IDX_LT_DSTHASH])
-
-                                # If the link initiator is only 1 hop away,
-                                # this likely means that network topology has
-                                # changed. In that case, we try to discover a new path,
-                                # and mark the old one as potentially unresponsive.
-                                elif not path_request_throttle and lr_taken_hops == 1:
-                                    RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry[IDX_LT_DSTHASH])+" since an attempted link was never established, and link initiator is local to an interface on this instance", RNS.LOG_DEBUG)
-                                    path_request_conditions = True
-                                    blocked_if = link_entry[IDX_LT_RCVD_IF]
-
-                                    if RNS.Reticulum.transport_enabled():
-                                        if hasattr(link_entry[IDX_LT_RCVD_IF], "mode") and link_entry[IDX_LT_RCVD_IF].mode != RNS.Interfaces.Interface.Interface.MODE_BOUNDARY:
-                                            Transport.mark_path_unresponsive(link_entry[IDX_LT_DSTHASH])
-
-                                if path_request_conditions:
-                                    if not link_entry[IDX_LT_DSTHASH] in path_requests:
-                                        path_requests[link_entry[IDX_LT_DSTHASH]] = blocked_if
-
-                                    if not RNS.Reticulum.transport_enabled():
-                                        # Drop current path if we are not a transport instance, to
-                                        # allow using higher-hop count paths or reused announces
-                                        # from newly adjacent transport instances.
-                                        Transport.expire_path(link_entry[IDX_LT_DSTHASH])
+                            path_request_throttle = time.time() - last_path_request < Transport.PATH_REQUEST_MI
+                            path_request_conditions = False
+                            
+                            # If the path has been invalidated between the time of
+                            # making the link request and now, try to rediscover it
+                            if not Transport.has_path(link_entry.destination_hash):
+                                RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry.destination_hash)+" since an attempted link was never established, and path is now missing", RNS.LOG_DEBUG)
+                                path_request_conditions =True
+
+                            # If this link request was originated from a local client
+                            # attempt to rediscover a path to the destination, if this
+                            # has not already happened recently.
+                            elif not path_request_throttle and lr_taken_hops == 0:
+                                RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry.destination_hash)+" since an attempted local client link was never established", RNS.LOG_DEBUG)
+                                path_request_conditions = True
+
+                            # If the link destination was previously only 1 hop
+                            # away, this likely means that it was local to one
+                            # of our interfaces, and that it roamed somewhere else.
+                            # In that case, try to discover a new path, and mark
+                            # the old one as unresponsive.
+                            elif not path_request_throttle and Transport.hops_to(link_entry.destination_hash) == 1:
+                                RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry.destination_hash)+" since an attempted link was never established, and destination was previously local to an interface on this instance", RNS.LOG_DEBUG)
+                                path_request_conditions = True
+                                blocked_if = link_entry.receiving_interface
+
+                                # TODO: This might result in the path re-resolution
+                                # only being able to happen once, since new path found
+                                # after allowing update from higher hop-count path, after
+                                # marking old path unresponsive, might be more than 1 hop away,
+                                # thus dealocking us into waiting for a new announce all-together.
+                                # Is this problematic, or does it actually not matter?
+                                # Best would be to have full support for alternative paths,
+                                # and score them according to number of unsuccessful tries or
+                                # similar.
+                                if RNS.Reticulum.transport_enabled():
+                                    if hasattr(link_entry.receiving_interface, "mode") and link_entry.receiving_interface.mode != RNS.Interfaces.Interface.Interface.MODE_BOUNDARY:
+                                        Transport.mark_path_unresponsive(link_entry.destination_hash)
+
+                            # If the link initiator is only 1 hop away,
+                            # this likely means that network topology has
+                            # changed. In that case, we try to discover a new path,
+                            # and mark the old one as potentially unresponsive.
+                            elif not path_request_throttle and lr_taken_hops == 1:
+                                RNS.log("Trying to rediscover path for "+RNS.prettyhexrep(link_entry.destination_hash)+" since an attempted link was never established, and link initiator is local to an interface on this instance", RNS.LOG_DEBUG)
+                                path_request_conditions = True
+                                blocked_if = link_entry.receiving_interface
+
+                                if RNS.Reticulum.transport_enabled():
+                                    if hasattr(link_entry.receiving_interface, "mode") and link_entry.receiving_interface.mode != RNS.Interfaces.Interface.Interface.MODE_BOUNDARY:
+                                        Transport.mark_path_unresponsive(link_entry.destination_hash)
+
+                            if path_request_conditions:
+                                if not link_entry.destination_hash in path_requests:
+                                    path_requests[link_entry.destination_hash] = blocked_if
+
+                                if not RNS.Reticulum.transport_enabled():
+                                    # Drop current path if we are not a transport instance, to
+                                    # allow using higher-hop count paths or reused announces
+                                    # from newly adjacent transport instances.
+                                    Transport.expire_path(link_entry.destination_hash)
 
                     # Cull the path table
-                    stale_paths = []
-                    for destination_hash in Transport.path_table:
-                        destination_entry = Transport.path_table[destination_hash]
-                        attached_interface = destination_entry[IDX_PT_RVCD_IF]
-
-                        if attached_interface != None and hasattr(attached_interface, "mode") and attached_interface.mode == RNS.Interfaces.Interface.Interface.MODE_ACCESS_POINT:
-                            destination_expiry = destination_entry[IDX_PT_TIMESTAMP] + Transport.AP_PATH_TIME
-                        elif attached_interface != None and hasattr(attached_interface, "mode") and attached_interface.mode == RNS.Interfaces.Interface.Interface.MODE_ROAMING:
-                            destination_expiry = destination_entry[IDX_PT_TIMESTAMP] + Transport.ROAMING_PATH_TIME
-                        else:
-                            destination_expiry = destination_entry[IDX_PT_TIMESTAMP] + Transport.DESTINATION_TIMEOUT
-
-                        if time.time() > destination_expiry:
-                            stale_paths.append(destination_hash)
+                    for destination_hash in Transport.due_entries(Transport.CULL_PATH, now):
+                        if not destination_hash in stale_paths:
+                            stale_paths.add(destination_hash)
                             should_collect = True
                             RNS.log("Path to "+RNS.prettyhexrep(destination_hash)+" timed out and was removed", RNS.LOG_DEBUG)
-                        elif not attached_interface in Transport.interfaces:
-                            stale_paths.append(destination_hash)
-                            should_collect = True
-                            RNS.log("Path to "+RNS.prettyhexrep(destination_hash)+" was removed since the attached interface no longer exists", RNS.LOG_DEBUG)
 
                     # Cull the pending discovery path requests table
-                    stale_discovery_path_requests = []
-                    for destination_hash in Transport.discovery_path_requests:
-                        entry = Transport.discovery_path_requests[destination_hash]
-
-                        if time.time() > entry["timeout"]:
-                            stale_discovery_path_requests.append(destination_hash)
-                            should_collect = True
-                            RNS.log("Waiting path request for "+RNS.prettyhexrep(destination_hash)+" timed out and was removed", RNS.LOG_DEBUG)
+                    stale_discovery_path_requests = Transport.due_entries(Transport.CULL_DISCOVERY, now)
+                    for destination_hash in stale_discovery_path_requests:
+                        should_collect = True
+                        RNS.log("Waiting path request for "+RNS.prettyhexrep(destination_hash)+" timed out and was removed", RNS.LOG_DEBUG)
 
                     # Cull the tunnel table
-                    stale_tunnels = []; ti = 0
-                    for tunnel_id in Transport.tunnels:
-                        tunnel_entry = Transport.tunnels[tunnel_id]
-
-                        expires = tunnel_entry[IDX_TT_EXPIRES]
-                        if time.time() > expires:
-                            stale_tunnels.append(tunnel_id)
-                            should_collect = True
-                            RNS.log("Tunnel "+RNS.prettyhexrep(tunnel_id)+" timed out and was removed", RNS.LOG_EXTREME)
+                    stale_tunnels = Transport.due_entries(Transport.CULL_TUNNEL, now)
+                    for tunnel_id in stale_tunnels:
+                        should_collect = True
+                        RNS.log("Tunnel "+RNS.prettyhexrep(tunnel_id)+" timed out and was removed", RNS.LOG_EXTREME)
+
+                    # Cull announce rate entries for destinations that have
+                    # not been heard from in a while. The table is ordered
+                    # by when destinations were last heard, so only expired
+                    # entries are examined. Expired entries that are still
+                    # blocked are moved to the end of the table, so they
+                    # don't keep the entries behind them from being culled.
+                    ri = 0; requeued = 0
+                    while len(Transport.announce_rate_table) > requeued:
+                        destination_hash, rate_entry = next(iter(Transport.announce_rate_table.items()))
+                        if now < rate_entry.heard+Transport.RATE_ENTRY_TIMEOUT: break
+                        if now < rate_entry.blocked_until:
+                            Transport.announce_rate_table.move_to_end(destination_hash)
+                            requeued += 1
                         else:
-                            if tunnel_entry[IDX_TT_IF] and not tunnel_entry[IDX_TT_IF] in Transport.interfaces:
-                                RNS.log(f"Removing non-existent tunnel interface {tunnel_entry[IDX_TT_IF]}", RNS.LOG_EXTREME)
-                                tunnel_entry[IDX_TT_IF] = None
-
-                            stale_tunnel_paths = []
-                            tunnel_paths = tunnel_entry[IDX_TT_PATHS]
-                            for tunnel_path in tunnel_paths:
-                                tunnel_path_entry = tunnel_paths[tunnel_path]
-
-                                if time.time() > tunnel_path_entry[0] + Transport.DESTINATION_TIMEOUT:
-                                    stale_tunnel_paths.append(tunnel_path)
-                                    should_collect = True
-                                    RNS.log("Tunnel path to "+RNS.prettyhexrep(tunnel_path)+" timed out and was removed", RNS.LOG_EXTREME)
-
-                            for tunnel_path in stale_tunnel_paths:
-                                tunnel_paths.pop(tunnel_path)
-                                ti += 1
+                            Transport.announce_rate_table.pop(destination_hash)
+                            ri += 1
+
+                    if ri > 0:
+                        if ri == 1: RNS.log("Removed "+str(ri)+" announce rate entry", RNS.LOG_EXTREME)
+                        else: RNS.log("Removed "+str(ri)+" announce rate entries", RNS.LOG_EXTREME)
+
+                    ti = 0
+                    for tunnel_path_key in Transport.due_entries(Transport.CULL_TUNNEL_PATH, now):
+                        tunnel_id, tunnel_path = tunnel_path_key
+                        if not tunnel_id in stale_tunnels:
+                            Transport.release_announce(Transport.tunnels[tunnel_id][IDX_TT_PATHS].pop(tunnel_path).packet_hash)
+                            should_collect = True
+                            RNS.log("Tunnel path to "+RNS.prettyhexrep(tunnel_path)+" timed out and was removed", RNS.LOG_EXTREME)
+                            ti += 1
 
+                        Transport.untrack_entry(Transport.CULL_TUNNEL_PATH, tunnel_path_key)
 
                     if ti > 0:
                         if ti == 1: RNS.log("Removed "+str(ti)+" tunnel path", RNS.LOG_EXTREME)
@@ -767,6 +753,7 @@ class Transport:
                     i = 0
                     for truncated_packet_hash in stale_reverse_entries:
                         Transport.reverse_table.pop(truncated_packet_hash)
+                        Transport.untrack_entry(Transport.CULL_REVERSE, truncated_packet_hash)
                         i += 1
 
                     if i > 0:
@@ -776,16 +763,22 @@ class Transport:
                     i = 0
                     for link_id in stale_links:
                         Transport.link_table.pop(link_id)
+                        Transport.untrack_entry(Transport.CULL_LINK, link_id)
                         i += 1
 
                     if i > 0:
                         if i == 1: RNS.log("Released "+str(i)+" link", RNS.LOG_EXTREME)
                         else: RNS.log("Released "+str(i)+" links", RNS.LOG_EXTREME)
 
-                    i = 0
+                    # Path state entries are removed along with their paths
+                    i = 0; si = 0
                     for destination_hash in stale_paths:
-                        Transport.path_table.pop(destination_hash)
+                        Transport.release_announce(Transport.path_table.pop(destination_hash).packet_hash)
+                        Transport.untrack_entry(Transport.CULL_PATH, destination_hash)
                         i += 1
+                        if destination_hash in Transport.path_states:
+                            Transport.path_states.pop(destination_hash)
+                            si += 1
 
                     if i > 0:
                         if i == 1: RNS.log("Removed "+str(i)+" path", RNS.LOG_EXTREME)
@@ -794,6 +787,7 @@ class Transport:
                     i = 0
                     for destination_hash in stale_discovery_path_requests:
                         Transport.discovery_path_requests.pop(destination_hash)
+                        Transport.untrack_entry(Transport.CULL_DISCOVERY, destination_hash)
                         i += 1
 
                     if i > 0:
@@ -802,21 +796,18 @@ class Transport:
 
                     i = 0
                     for tunnel_id in stale_tunnels:
-                        Transport.tunnels.pop(tunnel_id)
+                        for tunnel_path in Transport.tunnels.pop(tunnel_id)[IDX_TT_PATHS].values():
+                            Transport.release_announce(tunnel_path.packet_hash)
+                        Transport.untrack_entry(Transport.CULL_TUNNEL, tunnel_id)
                         i += 1
 
                     if i > 0:
                         if i == 1: RNS.log("Removed "+str(i)+" tunnel", RNS.LOG_EXTREME)
                         else: RNS.log("Removed "+str(i)+" tunnels", RNS.LOG_EXTREME)
 
-                    i = 0
-                    for destination_hash in stale_path_states:
-                        Transport.path_states.pop(destination_hash)
-                        i += 1
-
-                    if i > 0:
-                        if i == 1: RNS.log("Removed "+str(i)+" path state entry", RNS.LOG_EXTREME)
-                        else: RNS.log("Removed "+str(i)+" path state entries", RNS.LOG_EXTREME)
+                    if si > 0:
+                        if si == 1: RNS.log("Removed "+str(si)+" path state entry", RNS.LOG_EXTREME)
+                        else: RNS.log("Removed "+str(si)+" path state entries", RNS.LOG_EXTREME)
 
                     Transport.tables_last_culled = time.time()
 
@@ -963,31 +954,28 @@ class Transport:
 
             if generate_receipt:
                 packet.receipt = RNS.PacketReceipt(packet)
-                Transport.receipts.append(packet.receipt)
+                Transport.add_receipt(packet.receipt)
             
-            # TODO: Enable when caching has been redesigned
-            # Transport.cache(packet)
+            Transport.cache(packet)
 
         # Check if we have a known path for the destination in the path table
         if packet.packet_type != RNS.Packet.ANNOUNCE and packet.destination.type != RNS.Destination.PLAIN and packet.destination.type != RNS.Destination.GROUP and packet.destination_hash in Transport.path_table:
-            outbound_interface = Transport.path_table[packet.destination_hash][IDX_PT_RVCD_IF]
+            outbound_interface = Transport.path_table[packet.destination_hash].receiving_interface
 
             # If there's more than one hop to the destination, and we know
             # a path, we insert the packet into transport by adding the next
             # transport nodes address to the header, and modifying the flags.
             # This rule applies both for "normal" transport, and when connected
             # to a local shared Reticulum instance.
-            if Transport.path_table[packet.destination_hash][IDX_PT_HOPS] > 1:
+            if Transport.path_table[packet.destination_hash].hops > 1:
                 if packet.header_type == RNS.Packet.HEADER_1:
                     # Insert packet into transport
-                    new_flags = (RNS.Packet.HEADER_2) << 6 | (Transport.TRANSPORT) << 4 | (packet.flags & 0b00001111)
-                    new_raw = struct.pack("!B", new_flags)
-                    new_raw += packet.raw[1:2]
-                    new_raw += Transport.path_table[packet.destination_hash][IDX_PT_NEXT_HOP]
-                    new_raw += packet.raw[2:]
+                    new_raw = bytearray(packet.raw)
+                    new_raw[0] = (RNS.Packet.HEADER_2) << 6 | (Transport.TRANSPORT) << 4 | (packet.flags & 0b00001111)
+                    new_raw[2:2] = Transport.path_table[packet.destination_hash].next_hop
                     packet_sent(packet)
-                    Transport.transmit(outbound_interface, new_raw)
-                    Transport.path_table[packet.destination_hash][IDX_PT_TIMESTAMP] = time.time()
+                    Transport.transmit(outbound_interface, bytes(new_raw))
+                    Transport.path_table[packet.destination_hash].timestamp = time.time()
                     sent = True
 
             # In the special case where we are connected to a local shared
@@ -997,17 +985,15 @@ class Transport:
             # one hop away would just be broadcast directly, but since we
             # are "behind" a shared instance, we need to get that instance
             # to transport it onto the network.
-            elif Transport.path_table[packet.destination_hash][IDX_PT_HOPS] == 1 and Transport.owner.is_connected_to_shared_instance:
+            elif Transport.path_table[packet.destination_hash].hops == 1 and Transport.owner.is_connected_to_shared_instance:
                 if packet.header_type == RNS.Packet.HEADER_1:
                     # Insert packet into transport
-                    new_flags = (RNS.Packet.HEADER_2) << 6 | (Transport.TRANSPORT) << 4 | (packet.flags & 0b00001111)
-                    new_raw = struct.pack("!B", new_flags)
-                    new_raw += packet.raw[1:2]
-                    new_raw += Transport.path_table[packet.destination_hash][IDX_PT_NEXT_HOP]
-                    new_raw += packet.raw[2:]
+                    new_raw = bytearray(packet.raw)
+                    new_raw[0] = (RNS.Packet.HEADER_2) << 6 | (Transport.TRANSPORT) << 4 | (packet.flags & 0b00001111)
+                    new_raw[2:2] = Transport.path_table[packet.destination_hash].next_hop
                     packet_sent(packet)
-                    Transport.transmit(outbound_interface, new_raw)
-                    Transport.path_table[packet.destination_hash][IDX_PT_TIMESTAMP] = time.time()
+                    Transport.transmit(outbound_interface, bytes(new_raw))
+                    Transport.path_table[packet.destination_hash].timestamp = time.time()
                     sent = True
 
             # If none of the above applies, we know the destination is
@@ -1044,7 +1030,7 @@ class Transport:
                                 should_transmit = False
 
                             elif interface.mode == RNS.Interfaces.Interface.Interface.MODE_ROAMING:
-                                local_destination = next((d for d in Transport.destinations if d.hash == packet.destination_hash), None)
+                                local_destination = Transport.destination_index.get(packet.destination_hash, None)
                                 if local_destination != None:
                                     # RNS.log("Allowing announce broadcast on roaming-mode interface from instance-local destination", RNS.LOG_EXTREME)
                                     pass
@@ -1065,7 +1051,7 @@ class Transport:
                                             should_transmit = False
 
                             elif interface.mode == RNS.Interfaces.Interface.Interface.MODE_BOUNDARY:
-                                local_destination = next((d for d in Transport.destinations if d.hash == packet.destination_hash), None)
+                                local_destination = Transport.destination_index.get(packet.destination_hash, None)
                                 if local_destination != None:
                                     # RNS.log("Allowing announce broadcast on boundary-mode interface from instance-local destination", RNS.LOG_EXTREME)
                                     pass
@@ -1095,7 +1081,7 @@ class Transport:
                                         interface.announce_allowed_at = 0
 
                                     if not hasattr(interface, "announce_queue"):
-                                            interface.announce_queue = []
+                                            interface.announce_queue = RNS.Interfaces.Interface.AnnounceQueue()
 
                                     queued_announces = True if len(interface.announce_queue) > 0 else False
                                     if not queued_announces and outbound_time > interface.announce_allowed_at and interface.bitrate != None and interface.bitrate != 0:
@@ -1106,59 +1092,21 @@ class Transport:
                                     else:
                                         should_transmit = False
                                         if not len(interface.announce_queue) >= RNS.Reticulum.MAX_QUEUED_ANNOUNCES:
-                                            should_queue = True
-
-                                            already_queued = False
-                                            for e in interface.announce_queue:
-                                                if e["destination"] == packet.destination_hash:
-                                                    already_queued = True
-                                                    existing_entry = e
-
+                                            # If an announce for this destination is already
+                                            # queued, it is replaced if this one is newer
                                             emission_timestamp = Transport.announce_emitted(packet)
-                                            if already_queued:
-                                                should_queue = False
-
-                                                if emission_timestamp > existing_entry["emitted"]:
-                                                    e["time"] = outbound_time
-                                                    e["hops"] = packet.hops
-                                                    e["emitted"] = emission_timestamp
-                                                    e["raw"] = packet.raw
-
-                                            if should_queue:
-                                                entry = {
-                                                    "destination": packet.destination_hash,
-                                                    "time": outbound_time,
-                                                    "hops": packet.hops,
-                                                    "emitted": Transport.announce_emitted(packet),
-                                                    "raw": packet.raw
-                                                }
-
-                                                queued_announces = True if len(interface.announce_queue) > 0 else False
-                                                interface.announce_queue.append(entry)
-
+                                            if interface.announce_queue.add(packet.destination_hash, packet.hops, emission_timestamp, packet.raw, outbound_time):
+                                                wait_time = max(interface.announce_allowed_at - time.time(), 0)
                                                 if not queued_announces:
-                                                    wait_time = max(interface.announce_allowed_at - time.time(), 0)
-                                                    timer = threading.Timer(wait_time, interface.process_announce_queue)
-                                                    timer.start()
-
-                                                    if wait_time < 1:
-                                                        wait_time_str = str(round(wait_time*1000,2))+"ms"
-                                                    else:
-                                                        wait_time_str = str(round(wait_time*1,2))+"s"
-
-                                                    ql_str = str(len(interface.announce_queue))
-                                                    RNS.log("Added announce to queue (height "+ql_str+") on "+str(interface)+" for processing in "+wait_time_str, RNS.LOG_EXTREME)
+                                                    interface.schedule_announce_queue(wait_time)
 
+                                                if wait_time < 1:
+                                                    wait_time_str = str(round(wait_time*1000,2))+"ms"
                                                 else:
-                                                    wait_time = max(interface.announce_allowed_at - time.time(), 0)
+                                                    wait_time_str = str(round(wait_time*1,2))+"s"
 
-                                                    if wait_time < 1:
-                                                        wait_time_str = str(round(wait_time*1000,2))+"ms"
-                                                    else:
-                                                        wait_time_str = str(round(wait_time*1,2))+"s"
-
-                                                    ql_str = str(len(interface.announce_queue))
-                                                    RNS.log("Added announce to queue (height "+ql_str+") on "+str(interface)+" for processing in "+wait_time_str, RNS.LOG_EXTREME)
+                                                ql_str = str(len(interface.announce_queue))
+                                                RNS.log("Added announce to queue (height "+ql_str+") on "+str(interface)+" for processing in "+wait_time_str, RNS.LOG_EXTREME)
 
                                         else: pass
                                 
@@ -1169,15 +1117,46 @@ class Transport:
                             Transport.add_packet_hash(packet.packet_hash)
                             stored_hash = True
 
+                        # The receipt must be registered before the packet
+                        # leaves, since a proof can arrive on another thread
+                        # before transmit returns on fast local interfaces.
+                        packet_sent(packet)
                         Transport.transmit(interface, packet.raw)
                         if packet.packet_type == RNS.Packet.ANNOUNCE:
                             interface.sent_announce()
-                        packet_sent(packet)
                         sent = True
 
         Transport.jobs_locked = False
         return sent
 
+    @staticmethod
+    def add_receipt(receipt):
+        culled = []
+        with Transport.receipts_lock:
+            Transport.receipts.pop(receipt.hash, None)
+            Transport.receipts[receipt.hash] = receipt
+            Transport.receipts_by_truncated_hash[receipt.truncated_hash] = receipt
+
+            # Receipts are kept in insertion order, so
+            # the oldest receipts are culled first
+            while len(Transport.receipts) > Transport.MAX_RECEIPTS:
+                culled_receipt = Transport.receipts.pop(next(iter(Transport.receipts)))
+                if Transport.receipts_by_truncated_hash.get(culled_receipt.truncated_hash) == culled_receipt:
+                    Transport.receipts_by_truncated_hash.pop(culled_receipt.truncated_hash)
+                culled.append(culled_receipt)
+
+        for culled_receipt in culled:
+            culled_receipt.timeout = -1
+            culled_receipt.check_timeout()
+
+    @staticmethod
+    def remove_receipt(receipt):
+        with Transport.receipts_lock:
+            if Transport.receipts.get(receipt.hash) == receipt:
+                Transport.receipts.pop(receipt.hash)
+            if Transport.receipts_by_truncated_hash.get(receipt.truncated_hash) == receipt:
+                Transport.receipts_by_truncated_hash.pop(receipt.truncated_hash)
+
     @staticmethod
     def add_packet_hash(packet_hash):
         if not Transport.owner.is_connected_to_shared_instance:
@@ -1237,6 +1216,48 @@ class Transport:
         RNS.log("Filtered packet with hash "+RNS.prettyhexrep(packet.packet_hash), RNS.LOG_EXTREME)
         return False
 
+    @staticmethod
+    def queue_announce(raw, interface):
+        with Transport.announce_batch_condition:
+            if len(Transport.announce_batch_queue) >= Transport.ANNOUNCE_BATCH_QUEUE: return False
+            Transport.announce_batch_queue.append((raw, interface, time.time()))
+            if Transport.announce_batcher == None:
+                Transport.announce_batcher = threading.Thread(target=Transport.announce_batch_loop, daemon=True)
+                Transport.announce_batcher.start()
+
+            Transport.announce_batch_condition.notify()
+            return True
+
+    @staticmethod
+    def announce_batch_loop():
+        while True:
+            with Transport.announce_batch_condition:
+                while len(Transport.announce_batch_queue) == 0: Transport.announce_batch_condition.wait()
+                deadline = Transport.announce_batch_queue[0][2]+Transport.ANNOUNCE_BATCH_WINDOW
+                while len(Transport.announce_batch_queue) < Transport.ANNOUNCE_BATCH_SIZE and time.time() < deadline:
+                    Transport.announce_batch_condition.wait(deadline-time.time())
+
+                batch = []
+                while len(batch) < Transport.ANNOUNCE_BATCH_SIZE and len(Transport.announce_batch_queue) > 0:
+                    batch.append(Transport.announce_batch_queue.popleft())
+
+            try:
+                packets = []
+                for raw, interface, _ in batch:
+                    packet = RNS.Packet(None, raw)
+                    if packet.unpack() and packet.packet_type == RNS.Packet.ANNOUNCE: packets.append(packet)
+
+                RNS.Identity.verify_announce_signatures(packets)
+
+            except Exception as e:
+                RNS.log(f"Error while verifying announce batch: {e}", RNS.LOG_ERROR)
+
+            for raw, interface, _ in batch:
+                try: Transport.process_inbound(raw, interface)
+                except Exception as e:
+                    RNS.log(f"Error while processing batched announce: {e}", RNS.LOG_ERROR)
+                    RNS.trace_exception(e)
+
     @staticmethod
     def inbound(raw, interface=None):
         # If interface access codes are enabled,
@@ -1302,6 +1323,16 @@ class Transport:
         else:
             return
 
+        # With announce batching enabled, announces are held
+        # back briefly, so their signatures can be verified
+        # together before they are processed.
+        if Transport.announce_batching and raw[0] & 0b00000011 == RNS.Packet.ANNOUNCE:
+            if Transport.queue_announce(raw, interface): return
+
+        Transport.process_inbound(raw, interface)
+
+    @staticmethod
+    def process_inbound(raw, interface=None):
         while (Transport.jobs_running):
             sleep(0.0005)
 
@@ -1370,16 +1401,15 @@ class Transport:
 
             if remember_packet_hash:
                 Transport.add_packet_hash(packet.packet_hash)
-                # TODO: Enable when caching has been redesigned
-                # Transport.cache(packet)
+                Transport.cache(packet)
             
             # Check special conditions for local clients connected
             # through a shared Reticulum instance
             from_local_client         = (packet.receiving_interface in Transport.local_client_interfaces)
-            for_local_client          = (packet.packet_type != RNS.Packet.ANNOUNCE) and (packet.destination_hash in Transport.path_table and Transport.path_table[packet.destination_hash][IDX_PT_HOPS] == 0)
-            for_local_client_link     = (packet.packet_type != RNS.Packet.ANNOUNCE) and (packet.destination_hash in Transport.link_table and Transport.link_table[packet.destination_hash][IDX_LT_RCVD_IF] in Transport.local_client_interfaces)
-            for_local_client_link    |= (packet.packet_type != RNS.Packet.ANNOUNCE) and (packet.destination_hash in Transport.link_table and Transport.link_table[packet.destination_hash][IDX_LT_NH_IF] in Transport.local_client_interfaces)
-            proof_for_local_client    = (packet.destination_hash in Transport.reverse_table) and (Transport.reverse_table[packet.destination_hash][IDX_RT_RCVD_IF] in Transport.local_client_interfaces)
+            for_local_client          = (packet.packet_type != RNS.Packet.ANNOUNCE) and (packet.destination_hash in Transport.path_table and Transport.path_table[packet.destination_hash].hops == 0)
+            for_local_client_link     = (packet.packet_type != RNS.Packet.ANNOUNCE) and (packet.destination_hash in Transport.link_table and Transport.link_table[packet.destination_hash].receiving_interface in Transport.local_client_interfaces)
+            for_local_client_link    |= (packet.packet_type != RNS.Packet.ANNOUNCE) and (packet.destination_hash in Transport.link_table and Transport.link_table[packet.destination_hash].next_hop_interface in Transport.local_client_interfaces)
+            proof_for_local_client    = (packet.destination_hash in Transport.reverse_table) and (Transport.reverse_table[packet.destination_hash].receiving_interface in Transport.local_client_interfaces)
 
             # Plain broadcast packets from local clients are sent
             # directly on all attached interfaces, since they are
@@ -1427,28 +1457,22 @@ class Transport:
                 if packet.transport_id != None and packet.packet_type != RNS.Packet.ANNOUNCE:
                     if packet.transport_id == Transport.identity.hash:
                         if packet.destination_hash in Transport.path_table:
-                            next_hop = Transport.path_table[packet.destination_hash][IDX_PT_NEXT_HOP]
-                            remaining_hops = Transport.path_table[packet.destination_hash][IDX_PT_HOPS]
+                            next_hop = Transport.path_table[packet.destination_hash].next_hop
+                            remaining_hops = Transport.path_table[packet.destination_hash].hops
                             
+                            # Transport headers are rewritten in place
+                            # on a single copy of the received frame
+                            new_raw = bytearray(packet.raw)
+                            new_raw[1] = packet.hops
                             if remaining_hops > 1:
                                 # Just increase hop count and transmit
-                                new_raw  = packet.raw[0:1]
-                                new_raw += struct.pack("!B", packet.hops)
-                                new_raw += next_hop
-                                new_raw += packet.raw[(RNS.Identity.TRUNCATED_HASHLENGTH//8)+2:]
+                                new_raw[2:(RNS.Identity.TRUNCATED_HASHLENGTH//8)+2] = next_hop
                             elif remaining_hops == 1:
                                 # Strip transport headers and transmit
-                                new_flags = (RNS.Packet.HEADER_1) << 6 | (Transport.BROADCAST) << 4 | (packet.flags & 0b00001111)
-                                new_raw = struct.pack("!B", new_flags)
-                                new_raw += struct.pack("!B", packet.hops)
-                                new_raw += packet.raw[(RNS.Identity.TRUNCATED_HASHLENGTH//8)+2:]
-                            elif remaining_hops == 0:
-                                # Just increase hop count and transmit
-                                new_raw  = packet.raw[0:1]
-                                new_raw += struct.pack("!B", packet.hops)
-                                new_raw += packet.raw[2:]
+                                new_raw[0] = (RNS.Packet.HEADER_1) << 6 | (Transport.BROADCAST) << 4 | (packet.flags & 0b00001111)
+                                del new_raw[2:(RNS.Identity.TRUNCATED_HASHLENGTH//8)+2]
 
-                            outbound_interface = Transport.path_table[packet.destination_hash][IDX_PT_RVCD_IF]
+                            outbound_interface = Transport.path_table[packet.destination_hash].receiving_interface
 
                             if packet.packet_type == RNS.Packet.LINKREQUEST:
                                 now = time.time()
@@ -1463,45 +1487,49 @@ class Transport:
                                     if outbound_interface.HW_MTU == None:
                                         RNS.log(f"No next-hop HW MTU, disabling link MTU upgrade", RNS.LOG_DEBUG)
                                         path_mtu = None
-                                        new_raw  = new_raw[:-RNS.Link.LINK_MTU_SIZE]
+                                        del new_raw[-RNS.Link.LINK_MTU_SIZE:]
                                     elif not outbound_interface.AUTOCONFIGURE_MTU and not outbound_interface.FIXED_MTU:
                                         RNS.log(f"Outbound interface doesn't support MTU autoconfiguration, disabling link MTU upgrade", RNS.LOG_DEBUG)
                                         path_mtu = None
-                                        new_raw  = new_raw[:-RNS.Link.LINK_MTU_SIZE]
+                                        del new_raw[-RNS.Link.LINK_MTU_SIZE:]
                                     else:
                                         if nh_mtu < path_mtu or (ph_mtu and ph_mtu < path_mtu):
                                             try:
                                                 path_mtu = min(nh_mtu, ph_mtu)
                                                 clamped_mtu = RNS.Link.signalling_bytes(path_mtu, mode)
                                                 RNS.log(f"Clamping link MTU to {RNS.prettysize(path_mtu)}", RNS.LOG_DEBUG)
-                                                new_raw  = new_raw[:-RNS.Link.LINK_MTU_SIZE]+clamped_mtu
+                                                new_raw[-RNS.Link.LINK_MTU_SIZE:] = clamped_mtu
                                             except Exception as e:
                                                 RNS.log(f"Dropping link request packet. The contained exception was: {e}", RNS.LOG_WARNING)
                                                 return
 
                                 # Entry format is
-                                link_entry = [  now,                            # 0: Timestamp,
-                                                next_hop,                       # 1: Next-hop transport ID
-                                                outbound_interface,             # 2: Next-hop interface
-                                                remaining_hops,                 # 3: Remaining hops
-                                                packet.receiving_interface,     # 4: Received on interface
-                                                packet.hops,                    # 5: Taken hops
-                                                packet.destination_hash,        # 6: Original destination hash
-                                                False,                          # 7: Validated
-                                                proof_timeout]                  # 8: Proof timeout timestamp
-
-                                Transport.link_table[RNS.Link.link_id_from_lr_packet(packet)] = link_entry
+                                link_entry = LinkEntry( now,                            # 0: Timestamp,
+                                                        next_hop,                       # 1: Next-hop transport ID
+                                                        outbound_interface,             # 2: Next-hop interface
+                                                        remaining_hops,                 # 3: Remaining hops
+                                                        packet.receiving_interface,     # 4: Received on interface
+                                                        packet.hops,                    # 5: Taken hops
+                                                        packet.destination_hash,        # 6: Original destination hash
+                                                        False,                          # 7: Validated
+                                                        proof_timeout)                  # 8: Proof timeout timestamp
+
+                                link_id = RNS.Link.link_id_from_lr_packet(packet)
+                                Transport.link_table[link_id] = link_entry
+                                Transport.track_entry(Transport.CULL_LINK, link_id)
 
                             else:
                                 # Entry format is
-                                reverse_entry = [   packet.receiving_interface, # 0: Received on interface
-                                                    outbound_interface,         # 1: Outbound interface
-                                                    time.time()]                # 2: Timestamp
+                                reverse_entry = ReverseEntry(   packet.receiving_interface, # 0: Received on interface
+                                                                outbound_interface,         # 1: Outbound interface
+                                                                time.time())                # 2: Timestamp
 
-                                Transport.reverse_table[packet.getTruncatedHash()] = reverse_entry
+                                truncated_packet_hash = packet.getTruncatedHash()
+                                Transport.reverse_table[truncated_packet_hash] = reverse_entry
+                                Transport.track_entry(Transport.CULL_REVERSE, truncated_packet_hash)
 
-                            Transport.transmit(outbound_interface, new_raw)
-                            Transport.path_table[packet.destination_hash][IDX_PT_TIMESTAMP] = time.time()
+                            Transport.transmit(outbound_interface, bytes(new_raw))
+                            Transport.path_table[packet.destination_hash].timestamp = time.time()
 
                         else:
                             # TODO: There should probably be some kind of REJECT
@@ -1518,23 +1546,23 @@ class Transport:
                         # the same for this link, direction doesn't
                         # matter, and we simply repeat the packet.
                         outbound_interface = None
-                        if link_entry[IDX_LT_NH_IF] == link_entry[IDX_LT_RCVD_IF]:
+                        if link_entry.next_hop_interface == link_entry.receiving_interface:
                             # But check that taken hops matches one
                             # of the expectede values.
-                            if packet.hops == link_entry[IDX_LT_REM_HOPS] or packet.hops == link_entry[IDX_LT_HOPS]:
-                                outbound_interface = link_entry[IDX_LT_NH_IF]
+                            if packet.hops == link_entry.remaining_hops or packet.hops == link_entry.hops:
+                                outbound_interface = link_entry.next_hop_interface
                         else:
                             # If interfaces differ, we transmit on
                             # the opposite interface of what the
                             # packet was received on.
-                            if packet.receiving_interface == link_entry[IDX_LT_NH_IF]:
+                            if packet.receiving_interface == link_entry.next_hop_interface:
                                 # Also check that expected hop count matches
-                                if packet.hops == link_entry[IDX_LT_REM_HOPS]:
-                                    outbound_interface = link_entry[IDX_LT_RCVD_IF]
-                            elif packet.receiving_interface == link_entry[IDX_LT_RCVD_IF]:
+                                if packet.hops == link_entry.remaining_hops:
+                                    outbound_interface = link_entry.receiving_interface
+                            elif packet.receiving_interface == link_entry.receiving_interface:
                                 # Also check that expected hop count matches
-                                if packet.hops == link_entry[IDX_LT_HOPS]:
-                                    outbound_interface = link_entry[IDX_LT_NH_IF]
+                                if packet.hops == link_entry.hops:
+                                    outbound_interface = link_entry.next_hop_interface
 
                         if outbound_interface != None:
                             # Add this packet to the filter hashlist if we
@@ -1542,11 +1570,10 @@ class Transport:
                             # to process it.
                             Transport.add_packet_hash(packet.packet_hash)
 
-                            new_raw = packet.raw[0:1]
-                            new_raw += struct.pack("!B", packet.hops)
-                            new_raw += packet.raw[2:]
-                            Transport.transmit(outbound_interface, new_raw)
-                            Transport.link_table[packet.destination_hash][IDX_LT_TIMESTAMP] = time.time()
+                            new_raw = bytearray(packet.raw)
+                            new_raw[1] = packet.hops
+                            Transport.transmit(outbound_interface, bytes(new_raw))
+                            Transport.link_table[packet.destination_hash].timestamp = time.time()
                         
                         # TODO: Test and possibly enable this at some point
                         # Transport.jobs_locked = False
@@ -1570,7 +1597,7 @@ class Transport:
                         Transport.jobs_locked = False
                         return
 
-                local_destination = next((d for d in Transport.destinations if d.hash == packet.destination_hash), None)
+                local_destination = Transport.destination_index.get(packet.destination_hash, None)
                 if local_destination == None and RNS.Identity.validate_announce(packet):
                     if packet.transport_id != None:
                         received_from = packet.transport_id
@@ -1581,17 +1608,17 @@ class Transport:
                         if RNS.Reticulum.transport_enabled() and packet.destination_hash in Transport.announce_table:
                             announce_entry = Transport.announce_table[packet.destination_hash]
                             
-                            if packet.hops-1 == announce_entry[IDX_AT_HOPS]:
+                            if packet.hops-1 == announce_entry.hops:
                                 RNS.log(f"Heard a rebroadcast of announce for {RNS.prettyhexrep(packet.destination_hash)} on {packet.receiving_interface}", RNS.LOG_EXTREME)
-                                announce_entry[IDX_AT_LCL_RBRD] += 1
-                                if announce_entry[IDX_AT_RETRIES] > 0:
-                                    if announce_entry[IDX_AT_LCL_RBRD] >= Transport.LOCAL_REBROADCASTS_MAX:
+                                announce_entry.local_rebroadcasts += 1
+                                if announce_entry.retries > 0:
+                                    if announce_entry.local_rebroadcasts >= Transport.LOCAL_REBROADCASTS_MAX:
                                         RNS.log("Completed announce processing for "+RNS.prettyhexrep(packet.destination_hash)+", local rebroadcast limit reached", RNS.LOG_EXTREME)
                                         if packet.destination_hash in Transport.announce_table: Transport.announce_table.pop(packet.destination_hash)
 
-                            if packet.hops-1 == announce_entry[IDX_AT_HOPS]+1 and announce_entry[IDX_AT_RETRIES] > 0:
+                            if packet.hops-1 == announce_entry.hops+1 and announce_entry.retries > 0:
                                 now = time.time()
-                                if now < announce_entry[IDX_AT_RTRNS_TMO]:
+                                if now < announce_entry.retransmit_timeout:
                                     RNS.log("Rebroadcasted announce for "+RNS.prettyhexrep(packet.destination_hash)+" has been passed on to another node, no further tries needed", RNS.LOG_EXTREME)
                                     if packet.destination_hash in Transport.announce_table:
                                         Transport.announce_table.pop(packet.destination_hash)
@@ -1605,19 +1632,19 @@ class Transport:
 
                     # First, check that the announce is not for a destination
                     # local to this system, and that hops are less than the max
-                    if (not any(packet.destination_hash == d.hash for d in Transport.destinations) and packet.hops < Transport.PATHFINDER_M+1):
+                    if (not packet.destination_hash in Transport.destination_index and packet.hops < Transport.PATHFINDER_M+1):
                         announce_emitted = Transport.announce_emitted(packet)
                         
                         random_blob = packet.data[RNS.Identity.KEYSIZE//8+RNS.Identity.NAME_HASH_LENGTH//8:RNS.Identity.KEYSIZE//8+RNS.Identity.NAME_HASH_LENGTH//8+10]
-                        random_blobs = []
+                        random_blobs = RandomBlobs()
                         with Transport.inbound_announce_lock:
                             if packet.destination_hash in Transport.path_table:
-                                random_blobs = Transport.path_table[packet.destination_hash][IDX_PT_RANDBLOBS]
+                                random_blobs = Transport.path_table[packet.destination_hash].random_blobs
 
                                 # If we already have a path to the announced
                                 # destination, but the hop count is equal or
                                 # less, we'll update our tables.
-                                if packet.hops <= Transport.path_table[packet.destination_hash][IDX_PT_HOPS]:
+                                if packet.hops <= Transport.path_table[packet.destination_hash].hops:
                                     # Make sure we haven't heard the random
                                     # blob before, so announces can't be
                                     # replayed to forge paths.
@@ -1635,7 +1662,7 @@ class Transport:
                                     # ignore it, unless the path is expired, or
                                     # the emission timestamp is more recent.
                                     now = time.time()
-                                    path_expires = Transport.path_table[packet.destination_hash][IDX_PT_EXPIRES]
+                                    path_expires = Transport.path_table[packet.destination_hash].expires
                                     
                                     path_announce_emitted = 0
                                     for path_random_blob in random_blobs:
@@ -1690,30 +1717,26 @@ class Transport:
 
                                 rate_blocked = False
                                 if packet.context != RNS.Packet.PATH_RESPONSE and packet.receiving_interface.announce_rate_target != None:
-                                    if not packet.destination_hash in Transport.announce_rate_table:
-                                        rate_entry = { "last": now, "rate_violations": 0, "blocked_until": 0, "timestamps": [now]}
-                                        Transport.announce_rate_table[packet.destination_hash] = rate_entry
+                                    rate_entry = Transport.announce_rate_table.get(packet.destination_hash)
+                                    if rate_entry == None: Transport.add_rate_entry(packet.destination_hash, now)
 
                                     else:
-                                        rate_entry = Transport.announce_rate_table[packet.destination_hash]
-                                        rate_entry["timestamps"].append(now)
+                                        rate_entry.heard_at(now)
+                                        Transport.announce_rate_table.move_to_end(packet.destination_hash)
 
-                                        while len(rate_entry["timestamps"]) > Transport.MAX_RATE_TIMESTAMPS:
-                                            rate_entry["timestamps"].pop(0)
+                                        current_rate = now - rate_entry.last
 
-                                        current_rate = now - rate_entry["last"]
+                                        if now > rate_entry.blocked_until:
+                                            if current_rate < packet.receiving_interface.announce_rate_target: rate_entry.rate_violations += 1
+                                            else: rate_entry.rate_violations = max(0, rate_entry.rate_violations-1)
 
-                                        if now > rate_entry["blocked_until"]:
-                                            if current_rate < packet.receiving_interface.announce_rate_target: rate_entry["rate_violations"] += 1
-                                            else: rate_entry["rate_violations"] = max(0, rate_entry["rate_violations"]-1)
-
-                                            if rate_entry["rate_violations"] > packet.receiving_interface.announce_rate_grace:
+                                            if rate_entry.rate_violations > packet.receiving_interface.announce_rate_grace:
                                                 rate_target = packet.receiving_interface.announce_rate_target
                                                 rate_penalty = packet.receiving_interface.announce_rate_penalty
-                                                rate_entry["blocked_until"] = rate_entry["last"] + rate_target + rate_penalty
+                                                rate_entry.blocked_until = rate_entry.last + rate_target + rate_penalty
                                                 rate_blocked = True
                                             else:
-                                                rate_entry["last"] = now
+                                                rate_entry.last = now
 
                                         else:
                                             rate_blocked = True
@@ -1735,8 +1758,7 @@ class Transport:
                                     expires            = now + Transport.PATHFINDER_E
                                 
                                 if not random_blob in random_blobs:
-                                    random_blobs.append(random_blob)
-                                    random_blobs = random_blobs[-Transport.MAX_RANDOM_BLOBS:]
+                                    random_blobs = random_blobs.added(random_blob, Transport.MAX_RANDOM_BLOBS)
 
                                 if (RNS.Reticulum.transport_enabled() or Transport.from_local_client(packet)) and packet.context != RNS.Packet.PATH_RESPONSE:
                                     # Insert announce into announce table for retransmission
@@ -1751,7 +1773,7 @@ class Transport:
                                             retransmit_timeout = now
                                             retries = Transport.PATHFINDER_R
 
-                                        Transport.announce_table[packet.destination_hash] = [
+                                        Transport.schedule_announce(packet.destination_hash, AnnounceEntry(
                                             now,                # 0: IDX_AT_TIMESTAMP
                                             retransmit_timeout, # 1: IDX_AT_RTRNS_TMO
                                             retries,            # 2: IDX_AT_RETRIES
@@ -1761,7 +1783,7 @@ class Transport:
                                             local_rebroadcasts, # 6: IDX_AT_LCL_RBRD
                                             block_rebroadcasts, # 7: IDX_AT_BLCK_RBRD
                                             attached_interface, # 8: IDX_AT_ATTCHD_IF
-                                        ]
+                                        ))
 
                                 # TODO: Check from_local_client once and store result
                                 elif Transport.from_local_client(packet) and packet.context == RNS.Packet.PATH_RESPONSE:
@@ -1773,7 +1795,7 @@ class Transport:
                                         retransmit_timeout = now
                                         retries = Transport.PATHFINDER_R
 
-                                        Transport.announce_table[packet.destination_hash] = [
+                                        Transport.schedule_announce(packet.destination_hash, AnnounceEntry(
                                             now,
                                             retransmit_timeout,
                                             retries,
@@ -1783,7 +1805,7 @@ class Transport:
                                             local_rebroadcasts,
                                             block_rebroadcasts,
                                             attached_interface
-                                        ]
+                                        ))
 
                                 # If we have any local clients connected, we re-
                                 # transmit the announce to them immediately
@@ -1865,8 +1887,12 @@ class Transport:
                                     new_announce.send()
 
                                 if not Transport.owner.is_connected_to_shared_instance: Transport.cache(packet, force_cache=True, packet_type="announce")
-                                path_table_entry = [now, received_from, announce_hops, expires, random_blobs, packet.receiving_interface, packet.packet_hash]
+                                path_table_entry = PathEntry(now, received_from, announce_hops, expires, random_blobs, packet.receiving_interface, packet.packet_hash)
+                                replaced_entry = Transport.path_table.get(packet.destination_hash, None)
                                 Transport.path_table[packet.destination_hash] = path_table_entry
+                                Transport.track_entry(Transport.CULL_PATH, packet.destination_hash)
+                                Transport.reference_announce(packet.packet_hash)
+                                if replaced_entry != None: Transport.release_announce(replaced_entry.packet_hash)
                                 RNS.log("Destination "+RNS.prettyhexrep(packet.destination_hash)+" is now "+str(announce_hops)+" hops away via "+RNS.prettyhexrep(received_from)+" on "+str(packet.receiving_interface), RNS.LOG_DEBUG)
 
                                 # If the receiving interface is a tunnel, we add the
@@ -1874,9 +1900,13 @@ class Transport:
                                 if hasattr(packet.receiving_interface, "tunnel_id") and packet.receiving_interface.tunnel_id != None:
                                     tunnel_entry = Transport.tunnels[packet.receiving_interface.tunnel_id]
                                     paths = tunnel_entry[IDX_TT_PATHS]
-                                    paths[packet.destination_hash] = [now, received_from, announce_hops, expires, random_blobs, None, packet.packet_hash]
+                                    replaced_entry = paths.get(packet.destination_hash, None)
+                                    paths[packet.destination_hash] = PathEntry(now, received_from, announce_hops, expires, random_blobs, None, packet.packet_hash)
+                                    Transport.reference_announce(packet.packet_hash)
+                                    if replaced_entry != None: Transport.release_announce(replaced_entry.packet_hash)
                                     expires = time.time() + Transport.DESTINATION_TIMEOUT
                                     tunnel_entry[IDX_TT_EXPIRES] = expires
+                                    Transport.track_entry(Transport.CULL_TUNNEL_PATH, (packet.receiving_interface.tunnel_id, packet.destination_hash))
                                     RNS.log("Path to "+RNS.prettyhexrep(packet.destination_hash)+" associated with tunnel "+RNS.prettyhexrep(packet.receiving_interface.tunnel_id), RNS.LOG_DEBUG)
 
                                 # Call externally registered callbacks from apps
@@ -1937,76 +1967,76 @@ class Transport:
             # Handling for link requests to local destinations
             elif packet.packet_type == RNS.Packet.LINKREQUEST:
                 if packet.transport_id == None or packet.transport_id == Transport.identity.hash:
-                    for destination in Transport.destinations:
-                        if destination.hash == packet.destination_hash and destination.type == packet.destination_type:
-                            path_mtu       = RNS.Link.mtu_from_lr_packet(packet)
-                            mode           = RNS.Link.mode_from_lr_packet(packet)
-                            if packet.receiving_interface.AUTOCONFIGURE_MTU or packet.receiving_interface.FIXED_MTU:
-                                nh_mtu     = packet.receiving_interface.HW_MTU
+                    destination = Transport.destination_index.get(packet.destination_hash, None)
+                    if destination != None and destination.type == packet.destination_type:
+                        path_mtu       = RNS.Link.mtu_from_lr_packet(packet)
+                        mode           = RNS.Link.mode_from_lr_packet(packet)
+                        if packet.receiving_interface.AUTOCONFIGURE_MTU or packet.receiving_interface.FIXED_MTU:
+                            nh_mtu     = packet.receiving_interface.HW_MTU
+                        else:
+                            nh_mtu     = RNS.Reticulum.MTU
+
+                        if path_mtu:
+                            if packet.receiving_interface.HW_MTU == None:
+                                RNS.log(f"No next-hop HW MTU, disabling link MTU upgrade", RNS.LOG_DEBUG) # TODO: Remove debug
+                                path_mtu = None
+                                packet.data  = packet.data[:-RNS.Link.LINK_MTU_SIZE]
                             else:
-                                nh_mtu     = RNS.Reticulum.MTU
+                                if nh_mtu < path_mtu:
+                                    try:
+                                        path_mtu = nh_mtu
+                                        clamped_mtu = RNS.Link.signalling_bytes(path_mtu, mode)
+                                        RNS.log(f"Clamping link MTU to {RNS.prettysize(nh_mtu)}", RNS.LOG_DEBUG) # TODO: Remove debug
+                                        packet.data  = packet.data[:-RNS.Link.LINK_MTU_SIZE]+clamped_mtu
+                                    except Exception as e:
+                                        RNS.log(f"Dropping link request packet to local destination. The contained exception was: {e}", RNS.LOG_WARNING)
+                                        return
 
-                            if path_mtu:
-                                if packet.receiving_interface.HW_MTU == None:
-                                    RNS.log(f"No next-hop HW MTU, disabling link MTU upgrade", RNS.LOG_DEBUG) # TODO: Remove debug
-                                    path_mtu = None
-                                    packet.data  = packet.data[:-RNS.Link.LINK_MTU_SIZE]
-                                else:
-                                    if nh_mtu < path_mtu:
-                                        try:
-                                            path_mtu = nh_mtu
-                                            clamped_mtu = RNS.Link.signalling_bytes(path_mtu, mode)
-                                            RNS.log(f"Clamping link MTU to {RNS.prettysize(nh_mtu)}", RNS.LOG_DEBUG) # TODO: Remove debug
-                                            packet.data  = packet.data[:-RNS.Link.LINK_MTU_SIZE]+clamped_mtu
-                                        except Exception as e:
-                                            RNS.log(f"Dropping link request packet to local destination. The contained exception was: {e}", RNS.LOG_WARNING)
-                                            return
-
-                            packet.destination = destination
-                            destination.receive(packet)
+                        packet.destination = destination
+                        destination.receive(packet)
             
             # Handling for local data packets
             elif packet.packet_type == RNS.Packet.DATA:
                 if packet.destination_type == RNS.Destination.LINK:
-                    for link in Transport.active_links:
-                        if link.link_id == packet.destination_hash:
-                            if link.attached_interface == packet.receiving_interface:
-                                packet.link = link
-                                if packet.context == RNS.Packet.CACHE_REQUEST:
-                                    cached_packet = Transport.get_cached_packet(packet.data)
-                                    if cached_packet != None:
-                                        cached_packet.unpack()
-                                        RNS.Packet(destination=link, data=cached_packet.data,
-                                                   packet_type=cached_packet.packet_type, context=cached_packet.context).send()
-
-                                    Transport.jobs_locked = False
-                                else:
-                                    link.receive(packet)
+                    link = Transport.active_link_index.get(packet.destination_hash, None)
+                    if link != None:
+                        if link.attached_interface == packet.receiving_interface:
+                            packet.link = link
+                            if packet.context == RNS.Packet.CACHE_REQUEST:
+                                cached_packet = Transport.get_cached_packet(packet.data)
+                                if cached_packet != None:
+                                    cached_packet.unpack()
+                                    RNS.Packet(destination=link, data=cached_packet.data,
+                                               packet_type=cached_packet.packet_type, context=cached_packet.context).send()
+
+                                Transport.jobs_locked = False
                             else:
-                                # In the strange and rare case that an interface
-                                # is partly malfunctioning, and a link-associated
-                                # packet is being received on an interface that
-                                # has failed sending, and transport has failed over
-                                # to another path, we remove this packet hash from
-                                # the filter hashlist so the link can receive the
-                                # packet when it finally arrives over another path.
-                                while packet.packet_hash in Transport.packet_hashlist:
-                                    Transport.packet_hashlist.remove(packet.packet_hash)
+                                link.receive(packet)
+                        else:
+                            # In the strange and rare case that an interface
+                            # is partly malfunctioning, and a link-associated
+                            # packet is being received on an interface that
+                            # has failed sending, and transport has failed over
+                            # to another path, we remove this packet hash from
+                            # the filter hashlist so the link can receive the
+                            # packet when it finally arrives over another path.
+                            while packet.packet_hash in Transport.packet_hashlist:
+                                Transport.packet_hashlist.remove(packet.packet_hash)
                 else:
-                    for destination in Transport.destinations:
-                        if destination.hash == packet.destination_hash and destination.type == packet.destination_type:
-                            packet.destination = destination
-                            if destination.receive(packet):
-                                if destination.proof_strategy == RNS.Destination.PROVE_ALL:
-                                    packet.prove()
-
-                                elif destination.proof_strategy == RNS.Destination.PROVE_APP:
-                                    if destination.callbacks.proof_requested:
-                                        try:
-                                            if destination.callbacks.proof_requested(packet):
-                                                packet.prove()
-                                        except Exception as e:
-                                            RNS.log("Error while executing proof request callback. The contained exception was: "+str(e), RNS.LOG_ERROR)
+                    destination = Transport.destination_index.get(packet.destination_hash, None)
+                    if destination != None and destination.type == packet.destination_type:
+                        packet.destination = destination
+                        if destination.receive(packet):
+                            if destination.proof_strategy == RNS.Destination.PROVE_ALL:
+                                packet.prove()
+
+                            elif destination.proof_strategy == RNS.Destination.PROVE_APP:
+                                if destination.callbacks.proof_requested:
+                                    try:
+                                        if destination.callbacks.proof_requested(packet):
+                                            packet.prove()
+                                    except Exception as e:
+                                        RNS.log("Error while executing proof request callback. The contained exception was: "+str(e), RNS.LOG_ERROR)
 
             # Handling for proofs and link-request proofs
             elif packet.packet_type == RNS.Packet.PROOF:
@@ -2015,8 +2045,8 @@ class Transport:
                     # needs to be transported
                     if (RNS.Reticulum.transport_enabled() or for_local_client_link or from_local_client) and packet.destination_hash in Transport.link_table:
                         link_entry = Transport.link_table[packet.destination_hash]
-                        if packet.hops == link_entry[IDX_LT_REM_HOPS]:
-                            if packet.receiving_interface == link_entry[IDX_LT_NH_IF]:
+                        if packet.hops == link_entry.remaining_hops:
+                            if packet.receiving_interface == link_entry.next_hop_interface:
                                 try:
                                     if len(packet.data) == RNS.Identity.SIGLENGTH//8+RNS.Link.ECPUBSIZE//2 or len(packet.data) == RNS.Identity.SIGLENGTH//8+RNS.Link.ECPUBSIZE//2+RNS.Link.LINK_MTU_SIZE:
                                         signalling_bytes = b""
@@ -2024,19 +2054,19 @@ class Transport:
                                             signalling_bytes = RNS.Link.signalling_bytes(RNS.Link.mtu_from_lp_packet(packet), RNS.Link.mode_from_lp_packet(packet))
 
                                         peer_pub_bytes = packet.data[RNS.Identity.SIGLENGTH//8:RNS.Identity.SIGLENGTH//8+RNS.Link.ECPUBSIZE//2]
-                                        peer_identity = RNS.Identity.recall(link_entry[IDX_LT_DSTHASH])
+                                        peer_identity = RNS.Identity.recall(link_entry.destination_hash)
                                         peer_sig_pub_bytes = peer_identity.get_public_key()[RNS.Link.ECPUBSIZE//2:RNS.Link.ECPUBSIZE]
 
                                         signed_data = packet.destination_hash+peer_pub_bytes+peer_sig_pub_bytes+signalling_bytes
                                         signature = packet.data[:RNS.Identity.SIGLENGTH//8]
 
                                         if peer_identity.validate(signature, signed_data):
-                                            RNS.log("Link request proof validated for transport via "+str(link_entry[IDX_LT_RCVD_IF]), RNS.LOG_EXTREME)
-                                            new_raw = packet.raw[0:1]
-                                            new_raw += struct.pack("!B", packet.hops)
-                                            new_raw += packet.raw[2:]
-                                            Transport.link_table[packet.destination_hash][IDX_LT_VALIDATED] = True
-                                            Transport.transmit(link_entry[IDX_LT_RCVD_IF], new_raw)
+                                            RNS.log("Link request proof validated for transport via "+str(link_entry.receiving_interface), RNS.LOG_EXTREME)
+                                            new_raw = bytearray(packet.raw)
+                                            new_raw[1] = packet.hops
+                                            Transport.link_table[packet.destination_hash].validated = True
+                                            Transport.track_entry(Transport.CULL_LINK, packet.destination_hash)
+                                            Transport.transmit(link_entry.receiving_interface, bytes(new_raw))
 
                                         else:
                                             RNS.log("Invalid link request proof in transport for link "+RNS.prettyhexrep(packet.destination_hash)+", dropping proof.", RNS.LOG_DEBUG)
@@ -2051,36 +2081,36 @@ class Transport:
                     else:
                         # Check if we can deliver it to a local
                         # pending link
-                        for link in Transport.pending_links:
-                            if link.link_id == packet.destination_hash:
-                                # We need to also allow an expected hops value of
-                                # PATHFINDER_M, since in some cases, the number of hops
-                                # to the destination will be unknown at link creation
-                                # time. The real chance of this occuring is likely to be
-                                # extremely small, and this allowance could probably
-                                # be discarded without major issues, but it is kept
-                                # for now to ensure backwards compatibility.
-
-                                # TODO: Probably reset check back to
-                                # if packet.hops == link.expected_hops:
-                                # within one of the next releases
-
-                                if packet.hops == link.expected_hops or link.expected_hops == RNS.Transport.PATHFINDER_M:
-                                    # Add this packet to the filter hashlist if we
-                                    # have determined that it's actually destined
-                                    # for this system, and then validate the proof
-                                    Transport.add_packet_hash(packet.packet_hash)
-                                    link.validate_proof(packet)
+                        link = Transport.pending_link_index.get(packet.destination_hash, None)
+                        if link != None:
+                            # We need to also allow an expected hops value of
+                            # PATHFINDER_M, since in some cases, the number of hops
+                            # to the destination will be unknown at link creation
+                            # time. The real chance of this occuring is likely to be
+                            # extremely small, and this allowance could probably
+                            # be discarded without major issues, but it is kept
+                            # for now to ensure backwards compatibility.
+
+                            # TODO: Probably reset check back to
+                            # if packet.hops == link.expected_hops:
+                            # within one of the next releases
+
+                            if packet.hops == link.expected_hops or link.expected_hops == RNS.Transport.PATHFINDER_M:
+                                # Add this packet to the filter hashlist if we
+                                # have determined that it's actually destined
+                                # for this system, and then validate the proof
+                                Transport.add_packet_hash(packet.packet_hash)
+                                link.validate_proof(packet)
 
                 elif packet.context == RNS.Packet.RESOURCE_PRF:
-                    for link in Transport.active_links:
-                        if link.link_id == packet.destination_hash:
-                            link.receive(packet)
+                    link = Transport.active_link_index.get(packet.destination_hash, None)
+                    if link != None:
+                        link.receive(packet)
                 else:
                     if packet.destination_type == RNS.Destination.LINK:
-                        for link in Transport.active_links:
-                            if link.link_id == packet.destination_hash:
-                                packet.link = link
+                        link = Transport.active_link_index.get(packet.destination_hash, None)
+                        if link != None:
+                            packet.link = link
                                 
                     if len(packet.data) == RNS.PacketReceipt.EXPL_LENGTH:
                         proof_hash = packet.data[:RNS.Identity.HASHLENGTH//8]
@@ -2090,29 +2120,23 @@ class Transport:
                     # Check if this proof needs to be transported
                     if (RNS.Reticulum.transport_enabled() or from_local_client or proof_for_local_client) and packet.destination_hash in Transport.reverse_table:
                         reverse_entry = Transport.reverse_table.pop(packet.destination_hash)
-                        if packet.receiving_interface == reverse_entry[IDX_RT_OUTB_IF]:
-                            RNS.log("Proof received on correct interface, transporting it via "+str(reverse_entry[IDX_RT_RCVD_IF]), RNS.LOG_EXTREME)
-                            new_raw = packet.raw[0:1]
-                            new_raw += struct.pack("!B", packet.hops)
-                            new_raw += packet.raw[2:]
-                            Transport.transmit(reverse_entry[IDX_RT_RCVD_IF], new_raw)
+                        Transport.untrack_entry(Transport.CULL_REVERSE, packet.destination_hash)
+                        if packet.receiving_interface == reverse_entry.outbound_interface:
+                            RNS.log("Proof received on correct interface, transporting it via "+str(reverse_entry.receiving_interface), RNS.LOG_EXTREME)
+                            new_raw = bytearray(packet.raw)
+                            new_raw[1] = packet.hops
+                            Transport.transmit(reverse_entry.receiving_interface, bytes(new_raw))
                         else:
                             RNS.log("Proof received on wrong interface, not transporting it.", RNS.LOG_DEBUG)
 
-                    for receipt in Transport.receipts:
-                        receipt_validated = False
-                        if proof_hash != None:
-                            # Only test validation if hash matches
-                            if receipt.hash == proof_hash:
-                                receipt_validated = receipt.validate_proof_packet(packet)
-                        else:
-                            # In case of an implicit proof, we have
-                            # to check every single outstanding receipt
-                            receipt_validated = receipt.validate_proof_packet(packet)
+                    # Explicit proofs carry the full hash of the proved
+                    # packet, while implicit proofs are addressed to
+                    # its truncated hash
+                    if proof_hash != None: receipt = Transport.receipts.get(proof_hash, None)
+                    else:                  receipt = Transport.receipts_by_truncated_hash.get(packet.destination_hash, None)
 
-                        if receipt_validated:
-                            if receipt in Transport.receipts:
-                                Transport.receipts.remove(receipt)
+                    if receipt != None and receipt.validate_proof_packet(packet):
+                        Transport.remove_receipt(receipt)
 
         Transport.jobs_locked = False
 
@@ -2166,6 +2190,7 @@ class Transport:
         if tunnel_id in Transport.tunnels:
             RNS.log(f"Voiding tunnel interface {Transport.tunnels[tunnel_id][IDX_TT_IF]}", RNS.LOG_EXTREME)
             Transport.tunnels[tunnel_id][IDX_TT_IF] = None
+            Transport.track_entry(Transport.CULL_TUNNEL, tunnel_id)
 
     @staticmethod
     def handle_tunnel(tunnel_id, interface):
@@ -2176,6 +2201,7 @@ class Transport:
             tunnel_entry = [tunnel_id, interface, paths, expires]
             interface.tunnel_id = tunnel_id
             Transport.tunnels[tunnel_id] = tunnel_entry
+            Transport.track_entry(Transport.CULL_TUNNEL, tunnel_id)
         else:
             RNS.log("Tunnel endpoint "+RNS.prettyhexrep(tunnel_id)+" reappeared. Restoring paths...", RNS.LOG_DEBUG)
             tunnel_entry = Transport.tunnels[tunnel_id]
@@ -2183,22 +2209,23 @@ class Transport:
             tunnel_entry[IDX_TT_EXPIRES] = expires
             interface.tunnel_id = tunnel_id
             paths = tunnel_entry[IDX_TT_PATHS]
+            Transport.track_entry(Transport.CULL_TUNNEL, tunnel_id)
 
             deprecated_paths = []
             for destination_hash, path_entry in paths.items():
-                received_from = path_entry[1]
-                announce_hops = path_entry[2]
-                expires = path_entry[3]
-                random_blobs = list(set(path_entry[4]))
+                received_from = path_entry.next_hop
+                announce_hops = path_entry.hops
+                expires = path_entry.expires
+                random_blobs = path_entry.random_blobs
                 receiving_interface = interface
-                packet_hash = path_entry[6]
-                new_entry = [time.time(), received_from, announce_hops, expires, random_blobs, receiving_interface, packet_hash]
+                packet_hash = path_entry.packet_hash
+                new_entry = PathEntry(time.time(), received_from, announce_hops, expires, random_blobs, receiving_interface, packet_hash)
 
                 should_add = False
                 if destination_hash in Transport.path_table:
                     old_entry = Transport.path_table[destination_hash]
-                    old_hops = old_entry[IDX_PT_HOPS]
-                    old_expires = old_entry[IDX_PT_EXPIRES]
+                    old_hops = old_entry.hops
+                    old_expires = old_entry.expires
                     if announce_hops <= old_hops or time.time() > old_expires: should_add = True
                     else: RNS.log("Did not restore path to "+RNS.prettyhexrep(destination_hash)+" because a newer path with fewer hops exist", RNS.LOG_DEBUG)
                 
@@ -2207,24 +2234,28 @@ class Transport:
                     else: RNS.log("Did not restore path to "+RNS.prettyhexrep(destination_hash)+" because it has expired", RNS.LOG_DEBUG)
 
                 if should_add:
+                    replaced_entry = Transport.path_table.get(destination_hash, None)
                     Transport.path_table[destination_hash] = new_entry
+                    Transport.track_entry(Transport.CULL_PATH, destination_hash)
+                    Transport.reference_announce(packet_hash)
+                    if replaced_entry != None: Transport.release_announce(replaced_entry.packet_hash)
                     RNS.log("Restored path to "+RNS.prettyhexrep(destination_hash)+" is now "+str(announce_hops)+" hops away via "+RNS.prettyhexrep(received_from)+" on "+str(receiving_interface), RNS.LOG_DEBUG)
                 else:
                     deprecated_paths.append(destination_hash)
 
             for deprecated_path in deprecated_paths:
                 RNS.log("Removing path to "+RNS.prettyhexrep(deprecated_path)+" from tunnel "+RNS.prettyhexrep(tunnel_id), RNS.LOG_DEBUG)
-                paths.pop(deprecated_path)
+                Transport.release_announce(paths.pop(deprecated_path).packet_hash)
 
     @staticmethod
     def register_destination(destination):
         destination.MTU = RNS.Reticulum.MTU
         if destination.direction == RNS.Destination.IN:
-            for registered_destination in Transport.destinations:
-                if destination.hash == registered_destination.hash:
-                    raise KeyError("Attempt to register an already registered destination.")
+            if destination.hash in Transport.destination_index:
+                raise KeyError("Attempt to register an already registered destination.")
             
             Transport.destinations.append(destination)
+            Transport.destination_index[destination.hash] = destination
 
             if Transport.owner.is_connected_to_shared_instance:
                 if destination.type == RNS.Destination.SINGLE:
@@ -2235,6 +2266,8 @@ class Transport:
 
     @staticmethod
     def deregister_destination(destination):
+        if Transport.destination_index.get(destination.hash, None) == destination:
+            Transport.destination_index.pop(destination.hash)
         if destination in Transport.destinations:
             Transport.destinations.remove(destination)
 
@@ -2243,21 +2276,38 @@ class Transport:
         RNS.log("Registering link "+str(link), RNS.LOG_EXTREME)
         if link.initiator:
             Transport.pending_links.append(link)
+            Transport.pending_link_index[link.link_id] = link
         else:
             Transport.active_links.append(link)
+            Transport.active_link_index[link.link_id] = link
 
     @staticmethod
     def activate_link(link):
         RNS.log("Activating link "+str(link), RNS.LOG_EXTREME)
-        if link in Transport.pending_links:
+        if Transport.pending_link_index.get(link.link_id, None) == link:
             if link.status != RNS.Link.ACTIVE:
                 raise IOError("Invalid link state for link activation: "+str(link.status))
+            Transport.pending_link_index.pop(link.link_id)
             Transport.pending_links.remove(link)
             Transport.active_links.append(link)
+            Transport.active_link_index[link.link_id] = link
+            if not link.attached_interface in Transport.initiator_links: Transport.initiator_links[link.attached_interface] = {}
+            Transport.initiator_links[link.attached_interface][link.link_id] = link
             link.status = RNS.Link.ACTIVE
         else:
             RNS.log("Attempted to activate a link that was not in the pending table", RNS.LOG_ERROR)
 
+    @staticmethod
+    def deregister_link(link):
+        if Transport.pending_link_index.get(link.link_id, None) == link: Transport.pending_link_index.pop(link.link_id, None)
+        if Transport.active_link_index.get(link.link_id, None)  == link: Transport.active_link_index.pop(link.link_id, None)
+        if link in Transport.pending_links: Transport.pending_links.remove(link)
+        if link in Transport.active_links: Transport.active_links.remove(link)
+        interface_links = Transport.initiator_links.get(link.attached_interface, None)
+        if interface_links != None and interface_links.get(link.link_id, None) == link:
+            interface_links.pop(link.link_id, None)
+            if len(interface_links) == 0: Transport.initiator_links.pop(link.attached_interface, None)
+
     @staticmethod
     def register_announce_handler(handler):
         """
@@ -2285,65 +2335,57 @@ class Transport:
 
     @staticmethod
     def find_interface_from_hash(interface_hash):
-        for interface in Transport.interfaces:
-            if interface.get_hash() == interface_hash:
-                return interface
+        # Interface hashes are indexed lazily, and the index is
+        # rebuilt whenever the set of interfaces has changed.
+        interface = Transport.interface_hashes.get(interface_hash, None)
+        if interface == None or interface.detached or len(Transport.interface_hashes) != len(Transport.interfaces):
+            Transport.interface_hashes = {interface.get_hash(): interface for interface in Transport.interfaces}
+            interface = Transport.interface_hashes.get(interface_hash, None)
 
-        return None
+        return interface
 
     @staticmethod
     def should_cache(packet):
-        # TODO: Rework the caching system. It's currently
-        # not very useful to even cache Resource proofs,
-        # disabling it for now, until redesigned.
-        # if packet.context == RNS.Packet.RESOURCE_PRF:
-        #     return True
+        # Resource proofs are cached, so that cache requests
+        # for lost proofs can be answered by any node along
+        # the path, without the resource being resent.
+        if packet.packet_type == RNS.Packet.PROOF and packet.context == RNS.Packet.RESOURCE_PRF:
+            return True
 
         return False
 
     @staticmethod
     def clean_cache():
         if not Transport.owner.is_connected_to_shared_instance:
-            Transport.clean_announce_cache()
+            Transport.packet_cache.clean(Transport.DESTINATION_TIMEOUT)
             Transport.cache_last_cleaned = time.time()
 
     @staticmethod
     def clean_announce_cache():
+        # Cached announces are removed as soon as no paths refer
+        # to them. This reconciles the cache with the loaded path
+        # and tunnel tables once at startup, to remove announces
+        # that were left behind by an earlier run.
         st = time.time()
-        target_path = os.path.join(RNS.Reticulum.cachepath, "announces")
-        active_paths = [Transport.path_table[dst_hash][6] for dst_hash in Transport.path_table]
-        tunnel_paths = list(set([path_dict[dst_hash][6] for path_dict in [Transport.tunnels[tunnel_id][2] for tunnel_id in Transport.tunnels] for dst_hash in path_dict]))
         removed = 0
-        for packet_hash in os.listdir(target_path):
-            remove = False
-            full_path = os.path.join(target_path, packet_hash)
-            if os.path.isfile(full_path):
-                try: target_hash = bytes.fromhex(packet_hash)
-                except: remove = True
-                if (not target_hash in active_paths) and (not target_hash in tunnel_paths): remove = True
-                if remove: os.unlink(full_path); removed += 1
+        for packet_hash in set(Transport.packet_cache.hashes(PacketCache.ANNOUNCE)).difference(Transport.announce_references):
+            Transport.packet_cache.remove(packet_hash); removed += 1
 
         if removed > 0:
             RNS.log(f"Removed {removed} cached announces in {RNS.prettytime(time.time()-st)}", RNS.LOG_DEBUG)
 
-    # When caching packets to storage, they are written
-    # exactly as they arrived over their interface. This
-    # means that they have not had their hop count
-    # increased yet! Take note of this when reading from
-    # the packet cache.
+    # When caching packets, they are stored exactly as
+    # they arrived over their interface. This means that
+    # they have not had their hop count increased yet!
+    # Take note of this when reading from the packet cache.
     @staticmethod
     def cache(packet, force_cache=False, packet_type=None):
         if force_cache or RNS.Transport.should_cache(packet):
             try:
-                packet_hash = RNS.hexrep(packet.get_hash(), delimit=False)
-                interface_reference = None
-                if packet.receiving_interface != None: interface_reference = str(packet.receiving_interface)
-                if packet_type == "announce": cachepath = os.path.join(RNS.Reticulum.cachepath, "announces", packet_hash)
-                else:                         cachepath = os.path.join(RNS.Reticulum.cachepath, packet_hash)
-
-                file = open(cachepath, "wb")
-                file.write(umsgpack.packb([packet.raw, interface_reference]))
-                file.close()
+                interface_hash = None
+                if packet.receiving_interface != None: interface_hash = packet.receiving_interface.get_hash()
+                kind = PacketCache.ANNOUNCE if packet_type == "announce" else PacketCache.PACKET
+                Transport.packet_cache.store(packet.get_hash(), packet.raw, interface_hash, kind)
 
             except Exception as e:
                 RNS.log("Error writing packet to cache. The contained exception was: "+str(e), RNS.LOG_ERROR)
@@ -2351,21 +2393,12 @@ class Transport:
     @staticmethod
     def get_cached_packet(packet_hash, packet_type=None):
         try:
-            packet_hash = RNS.hexrep(packet_hash, delimit=False)
-            if packet_type == "announce": path = os.path.join(RNS.Reticulum.cachepath, "announces", packet_hash)
-            else:                         path = os.path.join(RNS.Reticulum.cachepath, packet_hash)
-
-            if os.path.isfile(path):
-                file = open(path, "rb")
-                cached_data = umsgpack.unpackb(file.read())
-                file.close()
-
-                packet = RNS.Packet(None, cached_data[0])
-                interface_reference = cached_data[1]
-
-                for interface in Transport.interfaces:
-                    if str(interface) == interface_reference:
-                        packet.receiving_interface = interface
+            cached = Transport.packet_cache.get(packet_hash)
+            if cached != None:
+                raw, interface_hash = cached
+                packet = RNS.Packet(None, raw)
+                if interface_hash != None:
+                    packet.receiving_interface = Transport.find_interface_from_hash(interface_hash)
 
                 return packet
 
@@ -2376,6 +2409,44 @@ class Transport:
             RNS.log("The contained exception was: "+str(e), RNS.LOG_ERROR)
             return None
 
+    @staticmethod
+    def import_legacy_cache():
+        # Earlier versions stored each cached packet in a
+        # separate file, along with the name of the interface
+        # it was received on. Cached announces are moved into
+        # the packet cache, since persisted paths refer to them,
+        # and files that could not be imported are left in place.
+        # Other cached packets are left to expire as before.
+        announces_path = os.path.join(RNS.Reticulum.cachepath, "announces")
+        if not os.path.isdir(announces_path): return
+
+        imported = 0; failed = 0
+        for filename in os.listdir(announces_path):
+            full_path = os.path.join(announces_path, filename)
+            if len(filename) == (RNS.Identity.HASHLENGTH//8)*2 and os.path.isfile(full_path):
+                try:
+                    file = open(full_path, "rb")
+                    cached_data = umsgpack.unpackb(file.read())
+                    file.close()
+                    interface_hash = RNS.Identity.full_hash(cached_data[1].encode("utf-8")) if cached_data[1] != None else None
+                    Transport.packet_cache.store(bytes.fromhex(filename), cached_data[0], interface_hash, PacketCache.ANNOUNCE)
+                    os.unlink(full_path)
+                    imported += 1
+
+                except Exception as e:
+                    RNS.log(f"Could not import cached announce {filename}, the contained exception was: {e}", RNS.LOG_DEBUG)
+                    failed += 1
+
+        if imported > 0:
+            RNS.log(f"Imported {imported} announces from legacy cache files, and removed the imported files from {announces_path}", RNS.LOG_NOTICE)
+
+        if failed > 0:
+            RNS.log(f"Could not import {failed} announces from legacy cache files, the files were left in {announces_path}", RNS.LOG_WARNING)
+
+        if len(os.listdir(announces_path)) == 0:
+            os.rmdir(announces_path)
+            RNS.log(f"Removed empty legacy announce cache directory {announces_path}", RNS.LOG_VERBOSE)
+
     @staticmethod
     def cache_request_packet(packet):
         if len(packet.data) == RNS.Identity.HASHLENGTH/8:
@@ -2420,7 +2491,7 @@ class Transport:
         :param destination_hash: A destination hash as *bytes*.
         :returns: The number of hops to the specified destination, or ``RNS.Transport.PATHFINDER_M`` if the number of hops is unknown.
         """
-        if destination_hash in Transport.path_table: return Transport.path_table[destination_hash][IDX_PT_HOPS]
+        if destination_hash in Transport.path_table: return Transport.path_table[destination_hash].hops
         else: return Transport.PATHFINDER_M
 
     @staticmethod
@@ -2429,7 +2500,7 @@ class Transport:
         :param destination_hash: A destination hash as *bytes*.
         :returns: The destination hash as *bytes* for the next hop to the specified destination, or *None* if the next hop is unknown.
         """
-        if destination_hash in Transport.path_table: return Transport.path_table[destination_hash][IDX_PT_NEXT_HOP]
+        if destination_hash in Transport.path_table: return Transport.path_table[destination_hash].next_hop
         else: return None
 
     @staticmethod
@@ -2438,7 +2509,7 @@ class Transport:
         :param destination_hash: A destination hash as *bytes*.
         :returns: The interface for the next hop to the specified destination, or *None* if the interface is unknown.
         """
-        if destination_hash in Transport.path_table: return Transport.path_table[destination_hash][IDX_PT_RVCD_IF]
+        if destination_hash in Transport.path_table: return Transport.path_table[destination_hash].receiving_interface
         else: return None
 
     @staticmethod
@@ -2479,10 +2550,315 @@ class Transport:
         if interface != None: return ((1/interface.bitrate)*8)*RNS.Reticulum.MTU
         else: return 0
 
+    @staticmethod
+    def process_announce_table(now):
+        """
+        Completes announce-table entries that have reached their retry
+        limits, and creates retransmissions for those that are due. Only
+        entries whose retransmission deadline has come up are visited.
+
+        :returns: A list of packets to send.
+        """
+        outgoing = []
+        while len(Transport.announce_heap) > 0 and Transport.announce_heap[0][0] < now:
+            due, destination_hash = heapq.heappop(Transport.announce_heap)
+            announce_entry = Transport.announce_table.get(destination_hash, None)
+            if announce_entry == None: continue
+
+            if announce_entry.retries > 0 and announce_entry.retries >= Transport.LOCAL_REBROADCASTS_MAX:
+                RNS.log("Completed announce processing for "+RNS.prettyhexrep(destination_hash)+", local rebroadcast limit reached", RNS.LOG_EXTREME)
+                Transport.announce_table.pop(destination_hash)
+            elif announce_entry.retries > Transport.PATHFINDER_R:
+                RNS.log("Completed announce processing for "+RNS.prettyhexrep(destination_hash)+", retry limit reached", RNS.LOG_EXTREME)
+                Transport.announce_table.pop(destination_hash)
+            elif now > announce_entry.retransmit_timeout:
+                announce_entry.retransmit_timeout = now + Transport.PATHFINDER_G + Transport.PATHFINDER_RW
+                announce_entry.retries += 1
+                new_packet = Transport.announce_retransmission(destination_hash, announce_entry)
+                if new_packet != None:
+                    if announce_entry.block_rebroadcasts:
+                        RNS.log("Rebroadcasting announce as path response for "+RNS.prettyhexrep(destination_hash)+" with hop count "+str(new_packet.hops), RNS.LOG_DEBUG)
+                    else:
+                        RNS.log("Rebroadcasting announce for "+RNS.prettyhexrep(destination_hash)+" with hop count "+str(new_packet.hops), RNS.LOG_DEBUG)
+
+                    outgoing.append(new_packet)
+
+                # Entries that have now reached their retry limits are
+                # completed on the next pass, instead of staying in the
+                # table until their next retransmission time.
+                if announce_entry.retries >= Transport.LOCAL_REBROADCASTS_MAX or announce_entry.retries > Transport.PATHFINDER_R:
+                    heapq.heappush(Transport.announce_heap, (now, destination_hash))
+                else:
+                    heapq.heappush(Transport.announce_heap, (announce_entry.retransmit_timeout, destination_hash))
+
+                # This handles an edge case where a peer sends a past
+                # request for a destination just after an announce for
+                # said destination has arrived, but before it has been
+                # rebroadcast locally. In such a case the actual announce
+                # is temporarily held, and then reinserted when the path
+                # request has been served to the peer.
+                if destination_hash in Transport.held_announces:
+                    held_entry = Transport.held_announces.pop(destination_hash)
+                    Transport.schedule_announce(destination_hash, held_entry)
+                    RNS.log("Reinserting held announce into table", RNS.LOG_DEBUG)
+
+            # Otherwise, this is an outdated deadline for an entry
+            # that has since been rescheduled, and is skipped.
+
+        return outgoing
+
+    @staticmethod
+    def schedule_announce(destination_hash, announce_entry):
+        """
+        Inserts an entry into the announce table, and queues it for
+        retransmission at its retransmit timeout.
+        """
+        Transport.announce_table[destination_hash] = announce_entry
+        heapq.heappush(Transport.announce_heap, (announce_entry.retransmit_timeout, destination_hash))
+
+    @staticmethod
+    def announce_retransmission(destination_hash, announce_entry):
+        """
+        Creates the packet for retransmitting an announce-table entry
+        directly from the raw bytes of the received announce, by setting
+        the header type, transport ID, context and hop count. This
+        avoids recalling the identity and packing a new packet.
+        """
+        raw = announce_entry.packet.raw
+        DST_LEN = RNS.Reticulum.TRUNCATED_HASHLENGTH//8
+        if (raw[0] & 0b01000000) >> 6 == RNS.Packet.HEADER_2: offset = DST_LEN+2
+        else: offset = 2
+
+        if announce_entry.block_rebroadcasts: announce_context = RNS.Packet.PATH_RESPONSE
+        else: announce_context = RNS.Packet.NONE
+
+        flags = (RNS.Packet.HEADER_2) << 6 | (raw[0] & 0b00100000) | (Transport.TRANSPORT) << 4 | (raw[0] & 0b00001111)
+        new_raw = bytes((flags, announce_entry.hops))+Transport.identity.hash+raw[offset:offset+DST_LEN]+bytes((announce_context,))+raw[offset+DST_LEN+1:]
+        if len(new_raw) > RNS.Reticulum.MTU:
+            RNS.log("Retransmitted announce for "+RNS.prettyhexrep(destination_hash)+" would exceed MTU, not rebroadcasting", RNS.LOG_DEBUG)
+            return None
+
+        new_packet = RNS.Packet(None, new_raw, attached_interface=announce_entry.attached_interface)
+        new_packet.unpack()
+        new_packet.packed = True
+        new_packet.sent = False
+        new_packet.receipt = None
+        new_packet.destination = RebroadcastDestination(destination_hash)
+
+        # The packet hash covers neither the hop count nor the
+        # transport ID, so it is unchanged if the context is.
+        if raw[offset+DST_LEN] == announce_context: new_packet.packet_hash = announce_entry.packet.packet_hash
+
+        return new_packet
+
+    @staticmethod
+    def path_expiry(path_entry):
+        attached_interface = path_entry.receiving_interface
+        if attached_interface != None and hasattr(attached_interface, "mode") and attached_interface.mode == RNS.Interfaces.Interface.Interface.MODE_ACCESS_POINT:
+            return path_entry.timestamp + Transport.AP_PATH_TIME
+        elif attached_interface != None and hasattr(attached_interface, "mode") and attached_interface.mode == RNS.Interfaces.Interface.Interface.MODE_ROAMING:
+            return path_entry.timestamp + Transport.ROAMING_PATH_TIME
+        else:
+            return path_entry.timestamp + Transport.DESTINATION_TIMEOUT
+
+    @staticmethod
+    def cull_expiry(table, key):
+        """
+        Returns the time after which a culled table entry expires,
+        or ``None`` if the entry no longer exists.
+        """
+        if table == Transport.CULL_REVERSE:
+            reverse_entry = Transport.reverse_table.get(key)
+            if reverse_entry != None: return reverse_entry.timestamp + Transport.REVERSE_TIMEOUT
+
+        elif table == Transport.CULL_LINK:
+            link_entry = Transport.link_table.get(key)
+            if link_entry != None:
+                if link_entry.validated == True: return link_entry.timestamp + Transport.LINK_TIMEOUT
+                else: return link_entry.proof_timeout
+
+        elif table == Transport.CULL_PATH:
+            path_entry = Transport.path_table.get(key)
+            if path_entry != None: return Transport.path_expiry(path_entry)
+
+        elif table == Transport.CULL_DISCOVERY:
+            pr_entry = Transport.discovery_path_requests.get(key)
+            if pr_entry != None: return pr_entry["timeout"]
+
+        elif table == Transport.CULL_TUNNEL:
+            tunnel_entry = Transport.tunnels.get(key)
+            if tunnel_entry != None: return tunnel_entry[IDX_TT_EXPIRES]
+
+        elif table == Transport.CULL_TUNNEL_PATH:
+            tunnel_id, destination_hash = key
+            tunnel_entry = Transport.tunnels.get(tunnel_id)
+            if tunnel_entry != None:
+                tunnel_path_entry = tunnel_entry[IDX_TT_PATHS].get(destination_hash)
+                if tunnel_path_entry != None: return tunnel_path_entry.timestamp + Transport.DESTINATION_TIMEOUT
+
+        return None
+
+    @staticmethod
+    def cull_interfaces(table, key):
+        if table == Transport.CULL_REVERSE:
+            reverse_entry = Transport.reverse_table.get(key)
+            if reverse_entry != None: return (reverse_entry.outbound_interface, reverse_entry.receiving_interface)
+
+        elif table == Transport.CULL_LINK:
+            link_entry = Transport.link_table.get(key)
+            if link_entry != None: return (link_entry.next_hop_interface, link_entry.receiving_interface)
+
+        elif table == Transport.CULL_PATH:
+            path_entry = Transport.path_table.get(key)
+            if path_entry != None: return (path_entry.receiving_interface,)
+
+        elif table == Transport.CULL_TUNNEL:
+            tunnel_entry = Transport.tunnels.get(key)
+            if tunnel_entry != None and tunnel_entry[IDX_TT_IF] != None: return (tunnel_entry[IDX_TT_IF],)
+
+        return ()
+
+    @staticmethod
+    def track_entry(table, key):
+        """
+        Schedules a table entry for culling at its expiry time, and indexes
+        it by the interfaces it references. This must be called whenever an
+        entry is added, or changed in a way that can make it expire earlier
+        or reference other interfaces. Entries that are refreshed to expire
+        later are simply rescheduled when their old expiry time comes up.
+        """
+        if table == Transport.CULL_PATH: Transport.path_table_version += 1
+        expiry = Transport.cull_expiry(table, key)
+        if expiry == None:
+            Transport.untrack_entry(table, key)
+            return
+
+        scheduled = Transport.cull_scheduled[table]
+        if not key in scheduled or expiry < scheduled[key]:
+            scheduled[key] = expiry
+            heapq.heappush(Transport.cull_heaps[table], (expiry, key))
+
+        entry_ref = (table, key)
+        interfaces = Transport.cull_interfaces(table, key)
+        for interface in Transport.entry_interfaces.get(entry_ref, ()):
+            if not interface in interfaces: Transport.unindex_entry(interface, entry_ref)
+
+        for interface in interfaces:
+            if not interface in Transport.interface_entries: Transport.interface_entries[interface] = set()
+            Transport.interface_entries[interface].add(entry_ref)
+
+        if len(interfaces) > 0: Transport.entry_interfaces[entry_ref] = interfaces
+        elif entry_ref in Transport.entry_interfaces: Transport.entry_interfaces.pop(entry_ref)
+
+    @staticmethod
+    def untrack_entry(table, key):
+        if table == Transport.CULL_PATH: Transport.path_table_version += 1
+        entry_ref = (table, key)
+        if key in Transport.cull_scheduled[table]: Transport.cull_scheduled[table].pop(key)
+        if entry_ref in Transport.entry_interfaces:
+            for interface in Transport.entry_interfaces.pop(entry_ref): Transport.unindex_entry(interface, entry_ref)
+
+    @staticmethod
+    def unindex_entry(interface, entry_ref):
+        if interface in Transport.interface_entries:
+            entry_refs = Transport.interface_entries[interface]
+            entry_refs.discard(entry_ref)
+            if len(entry_refs) == 0: Transport.interface_entries.pop(interface)
+
+    @staticmethod
+    def reference_announce(packet_hash):
+        Transport.announce_references[packet_hash] = Transport.announce_references.get(packet_hash, 0)+1
+
+    @staticmethod
+    def release_announce(packet_hash):
+        """
+        Releases a reference to a cached announce, held by a path or a
+        tunnel path. Once no paths refer to the announce, it is removed
+        from the packet cache. This must be called whenever a path or
+        tunnel path is removed or replaced.
+        """
+        references = Transport.announce_references.get(packet_hash, 0)-1
+        if references > 0: Transport.announce_references[packet_hash] = references
+        else:
+            Transport.announce_references.pop(packet_hash, None)
+            Transport.packet_cache.remove(packet_hash)
+
+    @staticmethod
+    def add_rate_entry(destination_hash, now):
+        """
+        Starts tracking the announce rate for a destination. If the
+        table is full, the least recently heard destination that is
+        not currently blocked is evicted. Blocked entries are moved
+        to the end of the table instead, so evicting a destination
+        can never lift an active announce rate block.
+        """
+        Transport.announce_rate_table[destination_hash] = AnnounceRateEntry(now)
+        if len(Transport.announce_rate_table) > Transport.MAX_RATE_ENTRIES:
+            # The new entry is never blocked, so this always
+            # ends by evicting an entry, at worst the new one.
+            for i in range(len(Transport.announce_rate_table)):
+                oldest_hash, oldest_entry = next(iter(Transport.announce_rate_table.items()))
+                if now < oldest_entry.blocked_until: Transport.announce_rate_table.move_to_end(oldest_hash)
+                else:
+                    Transport.announce_rate_table.pop(oldest_hash)
+                    break
+
+    @staticmethod
+    def due_entries(table, now):
+        """
+        Returns the keys of all entries in a culled table that have expired
+        by ``now``. Only entries scheduled to expire by then are examined.
+        Entries that were refreshed since they were scheduled are put back
+        in the schedule, and entries that were removed by other means are
+        dropped from it.
+        """
+        expired = []
+        heap = Transport.cull_heaps[table]
+        scheduled = Transport.cull_scheduled[table]
+        while len(heap) > 0 and heap[0][0] < now:
+            due, key = heapq.heappop(heap)
+            if scheduled.get(key) != due: continue
+
+            scheduled.pop(key)
+            expiry = Transport.cull_expiry(table, key)
+            if expiry == None: Transport.untrack_entry(table, key)
+            elif now > expiry: expired.append(key)
+            else:
+                scheduled[key] = expiry
+                heapq.heappush(heap, (expiry, key))
+
+        return expired
+
+    @staticmethod
+    def reset_cull_index():
+        for table in Transport.cull_heaps:
+            Transport.cull_heaps[table] = []
+            Transport.cull_scheduled[table] = {}
+
+        Transport.interface_entries = {}
+        Transport.entry_interfaces = {}
+
+    @staticmethod
+    def path_table_snapshot():
+        """
+        Returns a snapshot of the path table as a tuple of
+        ``(destination_hash, entry)`` pairs. Snapshots are shared between
+        readers until paths are added or removed, and can be iterated by
+        other threads without blocking or racing with Transport.
+        """
+        cached = Transport.path_table_snapshot_cache
+        version = (Transport.path_table_version, len(Transport.path_table))
+        if cached == None or cached[0] != version:
+            cached = (version, tuple(Transport.path_table.items()))
+            Transport.path_table_snapshot_cache = cached
+
+        return cached[1]
+
     @staticmethod
     def expire_path(destination_hash):
         if destination_hash in Transport.path_table:
-            Transport.path_table[destination_hash][IDX_PT_TIMESTAMP] = 0
+            Transport.path_table[destination_hash].timestamp = 0
+            Transport.track_entry(Transport.CULL_PATH, destination_hash)
             Transport.tables_last_culled = 0
             return True
         else:
@@ -2568,7 +2944,7 @@ class Transport:
                 on_interface.announce_allowed_at = 0
 
             if not hasattr(on_interface, "announce_queue"):
-                on_interface.announce_queue = []
+                on_interface.announce_queue = RNS.Interfaces.Interface.AnnounceQueue()
 
             queued_announces = True if len(on_interface.announce_queue) > 0 else False
             if queued_announces:
@@ -2597,6 +2973,7 @@ class Transport:
                     response.append(Transport.owner.get_interface_stats())
                     if data[0] == True:
                         response.append(Transport.owner.get_link_count())
+                        response.append(Transport.owner.get_keepalive_stats())
 
                     return response
 
@@ -2621,18 +2998,10 @@ class Transport:
                         max_hops = data[2]
 
                     if command == "table":
-                        table = Transport.owner.get_path_table(max_hops=max_hops)
-                        response = []
-                        for path in table:
-                            if destination_hash == None or destination_hash == path["hash"]:
-                                response.append(path)
+                        response = Transport.owner.get_path_table(max_hops=max_hops, prefix=destination_hash)
 
                     elif command == "rates":
-                        table = Transport.owner.get_rate_table()
-                        response = []
-                        for path in table:
-                            if destination_hash == None or destination_hash == path["hash"]:
-                                response.append(path)
+                        response = Transport.owner.get_rate_table(prefix=destination_hash)
 
                     return response
 
@@ -2672,9 +3041,7 @@ class Transport:
 
                     unique_tag = destination_hash+tag_bytes
 
-                    if not unique_tag in Transport.discovery_pr_tags:
-                        Transport.discovery_pr_tags.append(unique_tag)
-
+                    if Transport.discovery_pr_tags.add(unique_tag):
                         Transport.path_request(
                             destination_hash,
                             Transport.from_local_client(packet),
@@ -2709,21 +3076,21 @@ class Transport:
         destination_exists_on_local_client = False
         if len(Transport.local_client_interfaces) > 0:
             if destination_hash in Transport.path_table:
-                destination_interface = Transport.path_table[destination_hash][IDX_PT_RVCD_IF]
+                destination_interface = Transport.path_table[destination_hash].receiving_interface
                 
                 if Transport.is_local_client_interface(destination_interface):
                     destination_exists_on_local_client = True
                     Transport.pending_local_path_requests[destination_hash] = attached_interface
         
-        local_destination = next((d for d in Transport.destinations if d.hash == destination_hash), None)
+        local_destination = Transport.destination_index.get(destination_hash, None)
         if local_destination != None:
             local_destination.announce(path_response=True, tag=tag, attached_interface=attached_interface)
             RNS.log("Answering path request for "+RNS.prettyhexrep(destination_hash)+interface_str+", destination is local to this system", RNS.LOG_DEBUG)
 
         elif (RNS.Reticulum.transport_enabled() or is_from_local_client) and (destination_hash in Transport.path_table):
-            packet = Transport.get_cached_packet(Transport.path_table[destination_hash][IDX_PT_PACKET], packet_type="announce")
-            next_hop = Transport.path_table[destination_hash][IDX_PT_NEXT_HOP]
-            received_from = Transport.path_table[destination_hash][IDX_PT_RVCD_IF]
+            packet = Transport.get_cached_packet(Transport.path_table[destination_hash].packet_hash, packet_type="announce")
+            next_hop = Transport.path_table[destination_hash].next_hop
+            received_from = Transport.path_table[destination_hash].receiving_interface
 
             if packet == None:
                 RNS.log("Could not retrieve announce packet from cache while answering path request for "+RNS.prettyhexrep(destination_hash), RNS.LOG_ERROR)
@@ -2733,7 +3100,7 @@ class Transport:
 
             else:
                 packet.unpack()
-                packet.hops = Transport.path_table[destination_hash][IDX_PT_HOPS]
+                packet.hops = Transport.path_table[destination_hash].hops
 
                 if requestor_transport_id != None and next_hop == requestor_transport_id:
                     # TODO: Find a bandwidth efficient way to invalidate our
@@ -2778,7 +3145,7 @@ class Transport:
                         held_entry = Transport.announce_table[packet.destination_hash]
                         Transport.held_announces[packet.destination_hash] = held_entry
                     
-                    Transport.announce_table[packet.destination_hash] = [now, retransmit_timeout, retries, received_from, announce_hops, packet, local_rebroadcasts, block_rebroadcasts, attached_interface]
+                    Transport.schedule_announce(packet.destination_hash, AnnounceEntry(now, retransmit_timeout, retries, received_from, announce_hops, packet, local_rebroadcasts, block_rebroadcasts, attached_interface))
 
         elif is_from_local_client:
             # Forward path request on all interfaces
@@ -2798,6 +3165,7 @@ class Transport:
                 RNS.log("Attempting to discover unknown path to "+RNS.prettyhexrep(destination_hash)+" on behalf of path request"+interface_str, RNS.LOG_DEBUG)
                 pr_entry = { "destination_hash": destination_hash, "timeout": time.time()+Transport.PATH_REQUEST_TIMEOUT, "requesting_interface": attached_interface }
                 Transport.discovery_path_requests[destination_hash] = pr_entry
+                Transport.track_entry(Transport.CULL_DISCOVERY, destination_hash)
 
                 for interface in Transport.interfaces:
                     if not interface == attached_interface:
@@ -2897,10 +3265,10 @@ class Transport:
 
     @staticmethod
     def shared_connection_disappeared():
-        for link in Transport.active_links:
+        for link in Transport.active_links.copy():
             link.teardown()
 
-        for link in Transport.pending_links:
+        for link in Transport.pending_links.copy():
             link.teardown()
 
         Transport.announce_table    = {}
@@ -2908,12 +3276,16 @@ class Transport:
         Transport.reverse_table     = {}
         Transport.link_table        = {}
         Transport.held_announces    = {}
+        Transport.announce_heap     = []
         Transport.tunnels           = {}
+        Transport.announce_references = {}
+        Transport.path_table_snapshot_cache = None
+        Transport.reset_cull_index()
 
     @staticmethod
     def shared_connection_reappeared():
         if Transport.owner.is_connected_to_shared_instance:
-            for registered_destination in Transport.destinations:
+            for registered_destination in Transport.destinations.copy():
                 if registered_destination.type == RNS.Destination.SINGLE:
                     registered_destination.announce(path_response=True)
 
@@ -2926,7 +3298,7 @@ class Transport:
                 if na > 0:
                     if na == 1: na_str = "1 announce"
                     else: na_str = str(na)+" announces"
-                    interface.announce_queue = []
+                    interface.announce_queue.clear()
                     RNS.log("Dropped "+na_str+" on "+str(interface), RNS.LOG_VERBOSE)
 
         gc.collect()
@@ -3011,7 +3383,7 @@ class Transport:
                     try:
                         # Get the destination entry from the destination table
                         de = Transport.path_table[destination_hash]
-                        interface_hash = de[IDX_PT_RVCD_IF].get_hash()
+                        interface_hash = de.receiving_interface.get_hash()
 
                         # Only store destination table entry if the associated
                         # interface is still active
@@ -3019,12 +3391,12 @@ class Transport:
                         if interface != None:
                             # Get the destination entry from the destination table
                             de = Transport.path_table[destination_hash]
-                            timestamp = de[IDX_PT_TIMESTAMP]
-                            received_from = de[IDX_PT_NEXT_HOP]
-                            hops = de[IDX_PT_HOPS]
-                            expires = de[IDX_PT_EXPIRES]
-                            random_blobs = de[IDX_PT_RANDBLOBS]
-                            packet_hash = de[IDX_PT_PACKET]
+                            timestamp = de.timestamp
+                            received_from = de.next_hop
+                            hops = de.hops
+                            expires = de.expires
+                            random_blobs = list(de.random_blobs)
+                            packet_hash = de.packet_hash
 
                             serialised_entry = [
                                 destination_hash,
@@ -3040,7 +3412,7 @@ class Transport:
                             serialised_destinations.append(serialised_entry)
 
                             # TODO: Reevaluate whether there is any cases where this is needed
-                            # Transport.cache(de[IDX_PT_PACKET], force_cache=True)
+                            # Transport.cache(de.packet_hash, force_cache=True)
 
                     except Exception as e: RNS.log(f"Skipping persist for path table entry due to error: {e}", RNS.LOG_ERROR)
 
@@ -3094,12 +3466,12 @@ class Transport:
                     for destination_hash in tunnel_paths:
                         de = tunnel_paths[destination_hash]
 
-                        timestamp = de[0]
-                        received_from = de[1]
-                        hops = de[2]
-                        expires = de[3]
-                        random_blobs = de[4][-Transport.PERSIST_RANDOM_BLOBS:]
-                        packet_hash = de[6]
+                        timestamp = de.timestamp
+                        received_from = de.next_hop
+                        hops = de.hops
+                        expires = de.expires
+                        random_blobs = list(de.random_blobs)[-Transport.PERSIST_RANDOM_BLOBS:]
+                        packet_hash = de.packet_hash
 
                         serialised_entry = [
                             destination_hash,
@@ -3231,7 +3603,10 @@ class Transport:
 
         for destination_hash in drop_destinations:
             try:
-                if destination_hash in Transport.path_table: Transport.path_table.pop(destination_hash)
+                if destination_hash in Transport.path_table:
+                    Transport.release_announce(Transport.path_table.pop(destination_hash).packet_hash)
+                    Transport.untrack_entry(Transport.CULL_PATH, destination_hash)
+                    if destination_hash in Transport.path_states: Transport.path_states.pop(destination_hash)
             except Exception as e:
                 RNS.log(f"Error while dropping blackhole-associated destination from path table: {e}", RNS.LOG_ERROR)
 
@@ -3310,4 +3685,147 @@ IDX_LT_PROOF_TMO = 8
 IDX_TT_TUNNEL_ID = 0
 IDX_TT_IF        = 1
 IDX_TT_PATHS     = 2
-IDX_TT_EXPIRES   = 3
\ No newline at end of file
+IDX_TT_EXPIRES   = 3
+
+# Table entry records. Each routing table entry is a slotted
+# record, which takes less memory than the list it replaces.
+# Fields can still be read and written by the indices above.
+class TableEntry:
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        return getattr(self, self.__slots__[index])
+
+    def __setitem__(self, index, value):
+        setattr(self, self.__slots__[index], value)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __iter__(self):
+        return (getattr(self, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return type(self).__name__+"("+", ".join(repr(value) for value in self)+")"
+
+class PathEntry(TableEntry):
+    __slots__ = ("timestamp", "next_hop", "hops", "expires", "random_blobs", "receiving_interface", "packet_hash")
+
+    def __init__(self, timestamp, next_hop, hops, expires, random_blobs, receiving_interface, packet_hash):
+        self.timestamp           = timestamp
+        self.next_hop            = next_hop
+        self.hops                = hops
+        self.expires             = expires
+        self.random_blobs        = random_blobs
+        self.receiving_interface = receiving_interface
+        self.packet_hash         = packet_hash
+
+class ReverseEntry(TableEntry):
+    __slots__ = ("receiving_interface", "outbound_interface", "timestamp")
+
+    def __init__(self, receiving_interface, outbound_interface, timestamp):
+        self.receiving_interface = receiving_interface
+        self.outbound_interface  = outbound_interface
+        self.timestamp           = timestamp
+
+class AnnounceEntry(TableEntry):
+    __slots__ = ("timestamp", "retransmit_timeout", "retries", "received_from", "hops", "packet", "local_rebroadcasts", "block_rebroadcasts", "attached_interface")
+
+    def __init__(self, timestamp, retransmit_timeout, retries, received_from, hops, packet, local_rebroadcasts, block_rebroadcasts, attached_interface):
+        self.timestamp           = timestamp
+        self.retransmit_timeout  = retransmit_timeout
+        self.retries             = retries
+        self.received_from       = received_from
+        self.hops                = hops
+        self.packet              = packet
+        self.local_rebroadcasts  = local_rebroadcasts
+        self.block_rebroadcasts  = block_rebroadcasts
+        self.attached_interface  = attached_interface
+
+# Stands in for the destination of announces that are
+# rebroadcast from the announce table, since sending
+# them only requires the destination hash and type.
+class RebroadcastDestination:
+    __slots__ = ("hash", "type")
+
+    def __init__(self, destination_hash):
+        self.hash = destination_hash
+        self.type = RNS.Destination.SINGLE
+
+class LinkEntry(TableEntry):
+    __slots__ = ("timestamp", "next_hop", "next_hop_interface", "remaining_hops", "receiving_interface", "hops", "destination_hash", "validated", "proof_timeout")
+
+    def __init__(self, timestamp, next_hop, next_hop_interface, remaining_hops, receiving_interface, hops, destination_hash, validated, proof_timeout):
+        self.timestamp           = timestamp
+        self.next_hop            = next_hop
+        self.next_hop_interface  = next_hop_interface
+        self.remaining_hops      = remaining_hops
+        self.receiving_interface = receiving_interface
+        self.hops                = hops
+        self.destination_hash    = destination_hash
+        self.validated           = validated
+        self.proof_timeout       = proof_timeout
+
+class AnnounceRateEntry:
+    """
+    Announce rate information for a destination. Instead of keeping a
+    list of recent announce timestamps, the interval between announces
+    is tracked as an exponentially weighted moving average over about
+    ``Transport.MAX_RATE_TIMESTAMPS`` announces.
+    """
+    __slots__ = ("last", "rate_violations", "blocked_until", "heard", "count", "interval")
+
+    def __init__(self, now):
+        self.last            = now
+        self.rate_violations = 0
+        self.blocked_until   = 0
+        self.heard           = now
+        self.count           = 1
+        self.interval        = None
+
+    def heard_at(self, now):
+        interval = now - self.heard
+        if self.interval == None: self.interval = interval
+        else: self.interval += (interval-self.interval) * 2/(Transport.MAX_RATE_TIMESTAMPS+1)
+        self.heard  = now
+        self.count += 1
+
+    def window(self):
+        """
+        :returns: A tuple of the number of announces the rate is averaged over, and the time the averaging window starts.
+        """
+        samples = min(self.count, Transport.MAX_RATE_TIMESTAMPS)
+        if self.interval == None: return samples, self.heard
+        else: return samples, self.heard - self.interval*(samples-1)
+
+class RandomBlobs(bytes):
+    """
+    The announce random blobs heard for a destination, packed into a
+    single bytes object instead of a list of small bytes objects.
+    Membership tests only match whole blobs, and iterating yields
+    the individual blobs.
+    """
+    __slots__ = ()
+    SIZE = 10
+
+    def __new__(cls, blobs=b""):
+        if isinstance(blobs, (bytes, bytearray)): return super().__new__(cls, blobs)
+        else: return super().__new__(cls, b"".join(blobs))
+
+    def __contains__(self, blob):
+        if len(blob) != RandomBlobs.SIZE: return False
+        position = self.find(blob)
+        while position != -1:
+            if position % RandomBlobs.SIZE == 0: return True
+            position = self.find(blob, position+1)
+
+        return False
+
+    def __iter__(self):
+        for position in range(0, len(self), RandomBlobs.SIZE): yield self[position:position+RandomBlobs.SIZE]
+
+    def added(self, blob, limit):
+        """
+        :returns: A copy of these blobs with *blob* added, keeping at most the *limit* newest blobs.
+        """
+        return RandomBlobs((self+blob)[-limit*RandomBlobs.SIZE:])
@@ -184,10 +184,7 @@ def listen(configdir, identitypath = None, verbosity = 0, quietness = 0, allowed
         else:
             file_path = os.path.abspath(os.path.expanduser(f"{data}"))
 
-        target_link = None
-        for link in RNS.Transport.active_links:
-            if link.link_id == link_id:
-                target_link = link
+        target_link = RNS.Transport.active_link_index.get(link_id, None)
 
         if not os.path.isfile(file_path):
             RNS.log("Client-requested file not found: "+str(file_path), RNS.LOG_VERBOSE)
@@ -209,7 +206,18 @@ def listen(configdir, identitypath = None, verbosity = 0, quietness = 0, allowed
                 return None
 
 
+    def resume_request(path, data, request_id, link_id, remote_identity, requested_at):
+        if not type(data) == bytes or len(data) != RNS.Identity.HASHLENGTH//8:
+            return 0
+        else:
+            return RNS.Resource.resumable_segments(data) or 0
+
     destination.set_link_established_callback(client_link_established)
+    if allow_all:
+        destination.register_request_handler("resume_state", response_generator=resume_request, allow=RNS.Destination.ALLOW_ALL)
+    else:
+        destination.register_request_handler("resume_state", response_generator=resume_request, allow=RNS.Destination.ALLOW_LIST, allowed_list=allowed_identity_hashes)
+
     if allow_fetch:
         if allow_all:
             RNS.log("Allowing unauthenticated fetch requests", RNS.LOG_WARNING)
@@ -613,7 +621,61 @@ def fetch(configdir, identitypath = None, verbosity = 0, quietness = 0, destinat
     RNS.exit(0)
 
 
-def send(configdir, identitypath = None, verbosity = 0, quietness = 0, destination = None, file = None, timeout = RNS.Transport.PATH_REQUEST_TIMEOUT, silent=False, phy_rates=False, no_compress=False):
+def resume_state_path(file_path, destination_hash):
+    stat = os.stat(file_path)
+    key = os.path.abspath(file_path).encode("utf-8")+str(stat.st_size).encode("utf-8")+str(stat.st_mtime_ns).encode("utf-8")+destination_hash
+    return RNS.Reticulum.storagepath+"/rncp_resume_"+RNS.hexrep(RNS.Identity.truncated_hash(key), delimit=False)
+
+def get_resume_hash(file_path, destination_hash):
+    try:
+        state_path = resume_state_path(file_path, destination_hash)
+        if os.path.isfile(state_path):
+            with open(state_path, "rb") as state_file:
+                original_hash = state_file.read()
+            if len(original_hash) == RNS.Identity.HASHLENGTH//8:
+                return original_hash
+
+    except Exception as e:
+        RNS.log(f"Could not read resume state for {file_path}: {e}", RNS.LOG_ERROR)
+
+    return None
+
+def set_resume_hash(file_path, destination_hash, original_hash):
+    try:
+        state_path = resume_state_path(file_path, destination_hash)
+        if original_hash == None:
+            if os.path.isfile(state_path): os.unlink(state_path)
+        else:
+            with open(state_path, "wb") as state_file:
+                state_file.write(original_hash)
+
+    except Exception as e:
+        RNS.log(f"Could not write resume state for {file_path}: {e}", RNS.LOG_ERROR)
+
+def query_resumable_segments(link, original_hash, timeout):
+    response = None
+    resolved = False
+    def response_received(request_receipt):
+        nonlocal response, resolved
+        response = request_receipt.response
+        resolved = True
+
+    def request_failed(request_receipt):
+        nonlocal resolved
+        resolved = True
+
+    # If the request could not be sent, for example because the
+    # link has closed, none of the callbacks will ever be called
+    if not link.request("resume_state", data=original_hash, response_callback=response_received, failed_callback=request_failed, timeout=timeout):
+        return 0
+
+    deadline = time.time()+timeout
+    while not resolved and time.time() < deadline: time.sleep(0.1)
+
+    if type(response) == int and response > 0: return response
+    else:                                      return 0
+
+def send(configdir, identitypath = None, verbosity = 0, quietness = 0, destination = None, file = None, timeout = RNS.Transport.PATH_REQUEST_TIMEOUT, silent=False, phy_rates=False, no_compress=False, resume=False):
     global current_resource, resource_done, link, speed, show_phy_rates, phy_got_total, phy_speed, identity
     targetloglevel = 3+verbosity-quietness
     show_phy_rates = phy_rates
@@ -713,12 +775,28 @@ def send(configdir, identitypath = None, verbosity = 0, quietness = 0, destinati
     link.identify(identity)
     auto_compress = True
     if no_compress: auto_compress = False
-    try: resource = RNS.Resource(open(file_path, "rb"), link, metadata=metadata, callback = sender_progress, progress_callback = sender_progress, auto_compress = auto_compress)
+
+    original_hash = None
+    segment_index = 1
+    if resume:
+        original_hash = get_resume_hash(file_path, destination_hash)
+        if original_hash != None:
+            received_segments = query_resumable_segments(link, original_hash, timeout)
+            if received_segments > 0:
+                segment_index = received_segments+1
+                if silent: print(f"Resuming transfer from segment {segment_index}")
+                else:      print(f"{erase_str}Resuming transfer from segment {segment_index}  ", end=es)
+            else:
+                original_hash = None
+
+    try: resource = RNS.Resource(open(file_path, "rb"), link, metadata=metadata, callback = sender_progress, progress_callback = sender_progress, auto_compress = auto_compress,
+                                 segment_index = segment_index, original_hash = original_hash)
     except Exception as e:
         print(f"Could not start transfer: {e}")
         RNS.exit(1)
 
     current_resource = resource
+    if resume and resource.split: set_resume_hash(file_path, destination_hash, resource.original_hash)
 
     while resource.status < RNS.Resource.TRANSFERRING:
         if not silent:
@@ -782,6 +860,7 @@ def send(configdir, identitypath = None, verbosity = 0, quietness = 0, destinati
             print(f"{erase_str}The transfer failed")
         RNS.exit(1)
     else:
+        if resume: set_resume_hash(file_path, destination_hash, None)
         if silent:
             print(str(file_path)+" copied to "+RNS.prettyhexrep(destination_hash))
         else:
@@ -813,6 +892,7 @@ def main():
         parser.add_argument('-i', metavar="identity", action='store', dest="identity", default=None, help="path to identity to use", type=str)
         parser.add_argument("-w", action="store", metavar="seconds", type=float, help="sender timeout before giving up", default=RNS.Transport.PATH_REQUEST_TIMEOUT)
         parser.add_argument('-P', '--phy-rates', action='store_true', default=False, help="display physical layer transfer rates")
+        parser.add_argument('-r', '--resume', action='store_true', default=False, help="resume a previously interrupted transfer")
         # parser.add_argument("--limit", action="store", metavar="files", type=float, help="maximum number of files to accept", default=None)
         parser.add_argument("--version", action="version", version="rncp {version}".format(version=__version__))
         
@@ -868,6 +948,7 @@ def main():
                 silent = args.silent,
                 phy_rates = args.phy_rates,
                 no_compress = args.no_compress,
+                resume = args.resume,
             )
 
         else:
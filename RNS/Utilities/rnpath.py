@@ -250,7 +250,7 @@ def program_setup(configdir, table, rates, drop, destination_hexhash, verbosity,
                 print(str(e))
                 sys.exit(1)
 
-        if not remote_link: table = sorted(reticulum.get_path_table(max_hops=max_hops), key=lambda e: (e["interface"], e["hops"]) )
+        if not remote_link: table = sorted(reticulum.iter_path_table(max_hops=max_hops, prefix=destination_hash), key=lambda e: (e["interface"], e["hops"]) )
         else:
             if not no_output:
                 print(output_rst_str, end="")
@@ -303,7 +303,7 @@ def program_setup(configdir, table, rates, drop, destination_hexhash, verbosity,
                 print(str(e))
                 sys.exit(1)
 
-        if not remote_link: table = reticulum.get_rate_table()
+        if not remote_link: table = reticulum.get_rate_table(prefix=destination_hash)
         else:
             if not no_output:
                 print(output_rst_str, end="")
@@ -340,11 +340,12 @@ def program_setup(configdir, table, rates, drop, destination_hexhash, verbosity,
                         displayed += 1
                         try:
                             last_str = pretty_date(int(entry["last"]))
-                            start_ts = entry["timestamps"][0]
+                            if "since" in entry: start_ts = entry["since"]; count = entry["count"]
+                            else:                start_ts = entry["timestamps"][0]; count = len(entry["timestamps"])
                             span = max(time.time() - start_ts, 3600.0)
                             span_hours = span/3600.0
-                            span_str = pretty_date(int(entry["timestamps"][0]))
-                            hour_rate = round(len(entry["timestamps"])/span_hours, 3)
+                            span_str = pretty_date(int(start_ts))
+                            hour_rate = round(count/span_hours, 3)
                             if hour_rate-int(hour_rate) == 0:
                                 hour_rate = int(hour_rate)
                             
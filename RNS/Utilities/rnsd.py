@@ -218,6 +218,43 @@ instance_name = default
 # panic_on_interface_error = No
 
 
+# The number of outstanding packet receipts Reticulum
+# keeps track of can be configured. If more packets are
+# sent without being proven or timing out, the oldest
+# receipts are culled. Programs sending very large
+# numbers of packets may need to increase this.
+# This is an optional directive, the default is 1024.
+
+# max_receipts = 1024
+
+
+# Links that carry no data still exchange keep-alive
+# packets, at an interval derived from the link RTT.
+# On systems holding many mostly idle links, such as
+# transport nodes, the keep-alive interval of idle links
+# can be gradually extended up to a maximum number of
+# seconds. Since transport nodes forwarding a link drop
+# it after 15 minutes without traffic, the interval is
+# never extended beyond 360 seconds, which is the
+# longest interval used on links with a high RTT. The
+# remote ends of such links must run a Reticulum
+# version that follows the extended interval. This is
+# an optional directive, and is disabled by default.
+
+# idle_link_keepalive = 360
+
+
+# On transport nodes receiving large numbers of
+# announces, signature verification can be made more
+# efficient by holding incoming announces back for up
+# to 50 milliseconds, and verifying their signatures
+# together in batches. Batches are spread over all
+# available processor cores. This is an optional
+# directive, and is disabled by default.
+
+# batch_announce_verification = No
+
+
 # When Transport is enabled, it is possible to allow the
 # Transport Instance to respond to probe requests from
 # the rnprobe utility. This can be a useful tool to test
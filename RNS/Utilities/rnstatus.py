@@ -112,7 +112,12 @@ def get_remote_status(destination_hash, include_lstats, identity, no_output=Fals
             else:
                 link_count = None
 
-            request_result = (status, link_count)
+            if len(response) > 2:
+                keepalive_stats = response[2]
+            else:
+                keepalive_stats = None
+
+            request_result = (status, link_count, keepalive_stats)
 
         request_concluded = True
 
@@ -144,7 +149,7 @@ def get_remote_status(destination_hash, include_lstats, identity, no_output=Fals
 
 def program_setup(configdir, dispall=False, verbosity=0, name_filter=None, json=False, astats=False, lstats=False, sorting=None, sort_reverse=False,
                   remote=None, management_identity=None, remote_timeout=RNS.Transport.PATH_REQUEST_TIMEOUT, must_exit=True, rns_instance=None,
-                  traffic_totals=False, discovered_interfaces=False, config_entries=False):
+                  traffic_totals=False, discovered_interfaces=False, config_entries=False, crypto_stats=False):
   
     if remote: require_shared = False
     else: require_shared = True
@@ -162,6 +167,7 @@ def program_setup(configdir, dispall=False, verbosity=0, name_filter=None, json=
         else: return
 
     link_count = None
+    keepalive_stats = None
     stats = None
 
     details = False
@@ -319,7 +325,7 @@ def program_setup(configdir, dispall=False, verbosity=0, name_filter=None, json=
             try:
                 remote_status = get_remote_status(destination_hash, lstats, identity, no_output=json, timeout=remote_timeout)
                 if remote_status != None:
-                    stats, link_count = remote_status
+                    stats, link_count, keepalive_stats = remote_status
             except Exception as e:
                 raise e
                   
@@ -332,6 +338,8 @@ def program_setup(configdir, dispall=False, verbosity=0, name_filter=None, json=
         if lstats:
             try: link_count = reticulum.get_link_count()
             except Exception as e: pass
+            try: keepalive_stats = reticulum.get_keepalive_stats()
+            except Exception as e: pass
 
         try: stats = reticulum.get_interface_stats()
         except Exception as e: pass
@@ -562,6 +570,10 @@ def program_setup(configdir, dispall=False, verbosity=0, name_filter=None, json=
             else:
                 lstr = f" {link_count} entr{ms} in link table"
 
+            if keepalive_stats != None and keepalive_stats["links"] > 0:
+                ls = "" if keepalive_stats["links"] == 1 else "s"
+                lstr += f", {keepalive_stats['links']} local link{ls} at {round(keepalive_stats['keepalives_per_hour'], 1)} keepalives/hour per link"
+
         if traffic_totals:
             rxb_str = "↓"+RNS.prettysize(stats["rxb"])
             txb_str = "↑"+RNS.prettysize(stats["txb"])
@@ -575,6 +587,18 @@ def program_setup(configdir, dispall=False, verbosity=0, name_filter=None, json=
             txstat  = txb_str+"  "+RNS.prettyspeed(stats["txs"])
             print(f"\n Totals       : {txstat}\n                {rxstat}")
 
+        if astats and "announce_verification" in stats and stats["announce_verification"] != None:
+            av = stats["announce_verification"]
+            bstr = " in batches" if av["batched"] else ""
+            print(f"\n Announces    : {round(av['rate'], 1)} signatures/s verified{bstr}\n                {av['verified']} verified, {av['cached']} cached")
+
+        if crypto_stats and "crypto" in stats and stats["crypto"] != None:
+            print("\n Cryptography :")
+            for primitive in stats["crypto"]:
+                entry = stats["crypto"][primitive]
+                ops_str = f"  {RNS.prettyfrequency(entry['ops'], suffix='ops/s')}" if entry["ops"] != None else ""
+                print(f"    {primitive:<9} : {entry['backend']:<9}{ops_str}")
+
         if "transport_id" in stats and stats["transport_id"] != None:
             print("\n Transport Instance "+RNS.prettyhexrep(stats["transport_id"])+" running")
             if "network_id" in stats and stats["network_id"] != None:
@@ -609,6 +633,7 @@ def main(must_exit=True, rns_instance=None):
         parser.add_argument("-A", "--announce-stats", action="store_true", help="show announce stats", default=False)
         parser.add_argument("-l", "--link-stats", action="store_true", help="show link stats", default=False)
         parser.add_argument("-t", "--totals", action="store_true", help="display traffic totals", default=False)
+        parser.add_argument("-c", "--crypto", action="store_true", help="show cryptography backends and benchmarks", default=False)
         parser.add_argument("-s", "--sort", action="store", help="sort interfaces by [rate, traffic, rx, tx, rxs, txs, announces, arx, atx, held]", default=None, type=str)
         parser.add_argument("-r", "--reverse", action="store_true", help="reverse sorting", default=False)
         parser.add_argument("-j", "--json", action="store_true", help="output in JSON format", default=False)
@@ -645,7 +670,7 @@ def main(must_exit=True, rns_instance=None):
                     program_setup(configdir = configarg, dispall = args.all, verbosity=args.verbose, name_filter=args.filter, json=args.json,
                                   astats=args.announce_stats, lstats=args.link_stats, sorting=args.sort, sort_reverse=args.reverse, remote=args.R,
                                   management_identity=args.i, remote_timeout=args.w, must_exit=False, rns_instance=reticulum, traffic_totals=args.totals,
-                                  discovered_interfaces=args.discovered, config_entries=args.D)
+                                  discovered_interfaces=args.discovered, config_entries=args.D, crypto_stats=args.crypto)
               
                 finally:
                     sys.stdout = old_stdout
@@ -660,7 +685,7 @@ def main(must_exit=True, rns_instance=None):
             program_setup(configdir = configarg, dispall = args.all, verbosity=args.verbose, name_filter=args.filter, json=args.json,
                           astats=args.announce_stats, lstats=args.link_stats, sorting=args.sort, sort_reverse=args.reverse, remote=args.R,
                           management_identity=args.i, remote_timeout=args.w, must_exit=must_exit, rns_instance=rns_instance, traffic_totals=args.totals,
-                          discovered_interfaces=args.discovered, config_entries=args.D)
+                          discovered_interfaces=args.discovered, config_entries=args.D, crypto_stats=args.crypto)
 
     except KeyboardInterrupt:
         print("")
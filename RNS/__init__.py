@@ -39,17 +39,19 @@ import threading
 from ._version import __version__
 
 from .Reticulum import Reticulum
+from .Scheduler import Scheduler
 from .Identity import Identity
 from .Link import Link, RequestReceipt
 from .Channel import MessageBase
 from .Buffer import Buffer, RawChannelReader, RawChannelWriter
+from .Session import Session, Multiplexer
 from .Transport import Transport
 from .Discovery import InterfaceAnnouncer
-from .Destination import Destination
+from .Destination import Destination, RequestExecutor
 from .Packet import Packet
 from .Packet import PacketReceipt
 from .Resolver import Resolver
-from .Resource import Resource, ResourceAdvertisement
+from .Resource import Resource, ResourceAdvertisement, StripedResource
 from .Cryptography import HKDF
 from .Cryptography import Hashes
 
@@ -5,6 +5,9 @@ from .hashes import TestSHA512
 from .identity import TestIdentity
 from .link import TestLink
 from .channel import TestChannel
+from .scheduler import TestScheduler
+from .seencache import TestSeenCache
+from .packetcache import TestPacketCache
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
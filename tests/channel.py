@@ -3,6 +3,7 @@ import threading
 import RNS
 from RNS.Channel import MessageState, ChannelOutletBase, Channel, MessageBase
 import RNS.Buffer
+from RNS.Buffer import StreamDataMessage
 from RNS.vendor import umsgpack
 from typing import Callable
 import contextlib
@@ -10,6 +11,10 @@ import typing
 import types
 import time
 import uuid
+import os
+import random
+import asyncio
+import struct
 import unittest
 
 
@@ -92,6 +97,7 @@ class ChannelOutletTest(ChannelOutletBase):
         self._rtt = rtt
         self._usable = True
         self.packets = []
+        self.acks = []
         self.lock = threading.RLock()
         self.packet_callback: Callable[[ChannelOutletBase, bytes], None] | None = None
 
@@ -122,6 +128,17 @@ class ChannelOutletTest(ChannelOutletBase):
     def timed_out(self):
         self.timeout_callbacks += 1
 
+    @property
+    def supports_batch_ack(self) -> bool:
+        return True
+
+    def send_ack(self, raw: bytes):
+        with self.lock:
+            self.acks.append(raw)
+
+    def set_packet_acknowledged(self, packet: Packet):
+        packet.delivered()
+
     def __str__(self):
         return str(self.link_id)
 
@@ -383,6 +400,202 @@ class TestChannel(unittest.TestCase):
 
         self.eat_own_dog_food(message, check)
 
+    def test_receive_out_of_order(self):
+        print("Channel test out of order reception")
+        decoded: [MessageBase] = []
+
+        def handle_message(message: MessageBase):
+            decoded.append(message)
+
+        self.h.channel.register_message_type(MessageTest)
+        self.h.channel.add_message_handler(handle_message)
+
+        # Deliver a full sequence space and then some, shuffled
+        # within the window, to exercise sequence wrap-around
+        count = Channel.SEQ_MODULUS + 1000
+        messages = []
+        random.seed(3751)
+        for start in range(0, count, Channel.WINDOW_MAX):
+            window = []
+            for sequence in range(start, min(start+Channel.WINDOW_MAX, count)):
+                message = MessageTest()
+                message.data = str(sequence)
+                messages.append(message)
+                window.append(RNS.Channel.Envelope(self.h.outlet, message, sequence=sequence % Channel.SEQ_MODULUS).pack())
+            random.shuffle(window)
+            for raw in window:
+                self.h.channel._receive(raw)
+                self.h.channel._receive(raw)
+
+        self.assertEqual(count, len(decoded))
+        self.assertEqual([m.data for m in messages], [m.data for m in decoded])
+
+    def test_batch_ack(self):
+        print("Channel test cumulative acknowledgements")
+        decoded: [MessageBase] = []
+
+        def handle_message(message: MessageBase):
+            decoded.append(message)
+
+        self.h.channel.register_message_type(MessageTest)
+        self.h.channel.add_message_handler(handle_message)
+
+        self.h.channel.enable_batch_ack()
+        self.assertEqual(1, len(self.h.outlet.acks))
+        offer = self.h.outlet.acks.pop()
+        self.assertFalse(self.h.channel._ack_batching)
+        self.h.channel._receive_ack(offer)
+        self.assertTrue(self.h.channel._ack_batching)
+
+        # The offer requests capabilities in return
+        self.assertEqual(1, len(self.h.outlet.acks))
+        reply = self.h.outlet.acks.pop()
+        self.assertFalse(reply[1] & Channel.CAP_REQUEST)
+
+        # A full batch is acknowledged immediately
+        for sequence in range(0, Channel.ACK_BATCH_SIZE):
+            self.h.channel._receive(RNS.Channel.Envelope(self.h.outlet, MessageTest(), sequence=sequence).pack())
+        self.assertEqual(Channel.ACK_BATCH_SIZE, len(decoded))
+        self.assertEqual(1, len(self.h.outlet.acks))
+        _, next_sequence, received = struct.unpack(">BHQ", self.h.outlet.acks.pop())
+        self.assertEqual(Channel.ACK_BATCH_SIZE, next_sequence)
+        self.assertEqual(0, received)
+
+        # Out of order envelopes are acknowledged selectively
+        # after the acknowledgement delay
+        self.h.channel._receive(RNS.Channel.Envelope(self.h.outlet, MessageTest(), sequence=Channel.ACK_BATCH_SIZE+1).pack())
+        self.assertEqual(0, len(self.h.outlet.acks))
+        time.sleep(self.h.channel._ack_delay()*2)
+        self.assertEqual(1, len(self.h.outlet.acks))
+        _, next_sequence, received = struct.unpack(">BHQ", self.h.outlet.acks.pop())
+        self.assertEqual(Channel.ACK_BATCH_SIZE, next_sequence)
+        self.assertEqual(0b10, received)
+
+        # Sent envelopes are delivered by a cumulative acknowledgement
+        envelopes = [self.h.channel.send(MessageTest()) for i in range(0, Channel.WINDOW)]
+        self.assertFalse(self.h.channel.is_ready_to_send())
+        self.h.channel._receive_ack(struct.pack(">BHQ", Channel.CTRL_ACK, Channel.WINDOW, 0))
+        for envelope in envelopes:
+            self.assertEqual(MessageState.MSGSTATE_DELIVERED, envelope.packet.state)
+            self.assertFalse(envelope.tracked)
+        self.assertEqual(0, len(self.h.channel._tx_ring))
+        self.assertTrue(self.h.channel.is_ready_to_send())
+
+    def test_coalescing(self):
+        print("Channel test coalescing")
+        decoded: [MessageBase] = []
+
+        def handle_message(message: MessageBase):
+            decoded.append(message)
+
+        self.h.channel.register_message_type(MessageTest)
+        self.h.channel.add_message_handler(handle_message)
+
+        # Messages are sent individually until the remote
+        # has signalled that it can receive coalesced messages
+        self.h.channel.enable_coalescing(latency=0.05)
+        self.h.channel.send(MessageTest())
+        self.assertEqual(1, len(self.h.outlet.packets))
+        first = self.h.outlet.packets[0]
+        first.delivered()
+        self.h.channel._receive_ack(self.h.outlet.acks.pop())
+        self.assertTrue(self.h.channel._is_coalescing())
+        self.h.outlet.packets.clear()
+
+        envelopes = [self.h.channel.send(MessageTest()) for i in range(0, 4)]
+        self.assertEqual(0, len(self.h.outlet.packets))
+        time.sleep(0.1)
+        self.assertEqual(1, len(self.h.outlet.packets))
+        packet = self.h.outlet.packets[0]
+        for envelope in envelopes:
+            self.assertEqual(packet, envelope.packet)
+            self.assertTrue(envelope.tracked)
+
+        # All coalesced envelopes are received from the packet
+        self.h.channel._receive(first.raw)
+        self.h.channel._receive(packet.raw)
+        self.assertEqual(len(envelopes)+1, len(decoded))
+        self.assertEqual([e.message.id for e in envelopes], [m.id for m in decoded[1:]])
+
+        # And concluded together with it
+        packet.delivered()
+        for envelope in envelopes:
+            self.assertFalse(envelope.tracked)
+        self.assertEqual(0, len(self.h.channel._tx_ring))
+
+        # A full packet is sent without waiting
+        self.h.outlet.packets.clear()
+        message = MessageTest()
+        message.data = "x" * 200
+        self.h.channel.send(message)
+        self.h.channel.send(message)
+        self.assertEqual(0, len(self.h.outlet.packets))
+        self.h.channel.send(message)
+        self.assertEqual(1, len(self.h.outlet.packets))
+        self.assertEqual(2, len(self.h.channel._tx_ring)-len(self.h.channel._coalesce_pending))
+
+    def test_coalescing_rate(self):
+        print("Channel test coalescing rate")
+
+        def run(coalesce: bool) -> (int, float):
+            with ProtocolHarness(self.rtt) as h:
+                h.channel.register_message_type(MessageTest)
+                if coalesce:
+                    h.channel.enable_coalescing(latency=0.005)
+                    h.channel._receive_ack(h.outlet.acks.pop())
+
+                count = 1000
+                sent = 0
+                started = time.process_time()
+                while sent < count:
+                    if h.channel.is_ready_to_send():
+                        h.channel.send(MessageTest())
+                        sent += 1
+                    else:
+                        time.sleep(0.001)
+                    for packet in list(h.outlet.packets):
+                        if packet.state != MessageState.MSGSTATE_DELIVERED:
+                            packet.delivered()
+
+                h.channel._flush_coalesced()
+                cpu_per_message = (time.process_time()-started)/count
+                return len(h.outlet.packets), cpu_per_message
+
+        plain_packets, plain_cpu = run(coalesce=False)
+        coalesced_packets, coalesced_cpu = run(coalesce=True)
+        print(f"Individual: {plain_packets} packets, {plain_cpu*1e6:.1f} us CPU per message")
+        print(f"Coalesced:  {coalesced_packets} packets, {coalesced_cpu*1e6:.1f} us CPU per message")
+        self.assertEqual(1000, plain_packets)
+        self.assertLess(coalesced_packets, plain_packets/2)
+
+    def test_receive_rate(self):
+        print("Channel test receive rate")
+        received = 0
+
+        def handle_message(message: MessageBase):
+            nonlocal received
+            received += 1
+
+        self.h.channel.register_message_type(MessageTest)
+        self.h.channel.add_message_handler(handle_message)
+
+        count = 20000
+        raws = []
+        message = MessageTest()
+        for start in range(0, count, Channel.WINDOW_MAX_FAST):
+            window = [RNS.Channel.Envelope(self.h.outlet, message, sequence=sequence % Channel.SEQ_MODULUS).pack()
+                      for sequence in range(start, min(start+Channel.WINDOW_MAX_FAST, count))]
+            window.reverse()
+            raws.extend(window)
+
+        started = time.time()
+        for raw in raws:
+            self.h.channel._receive(raw)
+        elapsed = time.time() - started
+
+        self.assertEqual(count, received)
+        print(f"Received {count} messages in reversed windows of {Channel.WINDOW_MAX_FAST} at {round(count/elapsed)} messages per second")
+
     def test_buffer_small_bidirectional(self):
         data = "Hello\n"
         with RNS.Buffer.create_bidirectional_buffer(0, 0, self.h.channel) as buffer:
@@ -450,6 +663,69 @@ class TestChannel(unittest.TestCase):
 
         self.assertSequenceEqual(data, decoded)
 
+    def test_buffer_ring(self):
+        reader = RNS.RawChannelReader(3, self.h.channel)
+        chunk = bytes(range(256))*2
+        expected = bytes()
+        received = bytes()
+        target = bytearray(700)
+
+        # Interleaved writes and reads wrap around the
+        # ring, and larger writes grow it
+        for i in range(0, 200):
+            data = chunk*(1+i%3) if i < 150 else chunk*80
+            reader._handle_message(StreamDataMessage(3, data))
+            expected += data
+            while True:
+                count = reader.readinto(target)
+                if count is None:
+                    break
+                received += target[:count]
+
+        self.assertEqual(expected, received)
+        self.assertIsNone(reader.readinto(target))
+        reader._handle_message(StreamDataMessage(3, eof=True))
+        self.assertEqual(0, reader.readinto(target))
+        reader.close()
+
+    def test_buffer_write_backpressure(self):
+        blocking = RNS.RawChannelWriter(0, self.h.channel, blocking=True)
+        nonblocking = RNS.RawChannelWriter(0, self.h.channel)
+        data = b"x"*16
+
+        for i in range(0, self.h.channel.window):
+            self.assertEqual(len(data), blocking.write(data))
+        self.assertFalse(self.h.channel.is_ready_to_send())
+        self.assertEqual(0, nonblocking.write(data))
+
+        # A blocking write waits for a delivery
+        written = None
+        def write_thread():
+            nonlocal written
+            written = blocking.write(data)
+        thread = threading.Thread(target=write_thread, daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        self.assertIsNone(written)
+        self.h.outlet.packets[0].delivered()
+        thread.join(1)
+        self.assertEqual(len(data), written)
+
+        # As does an asynchronous write
+        async def write_async():
+            return await nonblocking.write_async(data)
+        threading.Timer(0.05, self.h.outlet.packets[1].delivered).start()
+        self.assertEqual(len(data), asyncio.run(write_async()))
+
+        # Buffered writers in blocking mode wait for the
+        # channel, instead of raising BlockingIOError
+        sent = len(self.h.outlet.packets)
+        writer = RNS.Buffer.create_writer(0, self.h.channel, blocking=True)
+        writer.write(data)
+        threading.Timer(0.05, self.h.outlet.packets[2].delivered).start()
+        writer.flush()
+        self.assertEqual(sent+1, len(self.h.outlet.packets))
+
     def test_buffer_small_with_callback(self):
         callbacks = 0
         last_cb_value = None
@@ -472,6 +748,11 @@ class TestChannel(unittest.TestCase):
             self.h.channel._receive(packet.raw)
             packet.delivered()
 
+            # Ready callbacks are run asynchronously
+            timeout_at = time.time() + 1
+            while callbacks == 0 and time.time() < timeout_at:
+                time.sleep(0.001)
+
             self.assertEqual(1, callbacks)
             self.assertEqual(len(data), last_cb_value)
 
@@ -503,6 +784,98 @@ class TestChannel(unittest.TestCase):
             self.assertIsNotNone(result)
             self.assertTrue(len(result) == 0)
 
+    def test_sessions(self):
+        remote = ProtocolHarness(self.rtt)
+        try:
+            local_mux = RNS.Multiplexer(self.h.channel, True)
+            remote_mux = RNS.Multiplexer(remote.channel, False)
+            accepted = {}
+            closed = []
+            def session_opened(session):
+                accepted[session.session_id] = session
+                session.set_closed_callback(closed.append)
+            remote_mux.set_session_callback(session_opened)
+
+            def pump():
+                for source, target in [(self.h, remote), (remote, self.h)]:
+                    with source.outlet.lock:
+                        packets = [p for p in source.outlet.packets if p.state != MessageState.MSGSTATE_DELIVERED]
+                    for packet in packets:
+                        target.channel._receive(packet.raw)
+                        packet.delivered()
+
+            sessions = []
+            for i in range(0, 3):
+                sessions.append(local_mux.open_session())
+                pump()
+            self.assertEqual(sorted([s.session_id for s in sessions]), sorted(accepted.keys()))
+
+            for session in sessions:
+                self.assertEqual(8, session.write(b"session"+bytes([session.session_id])))
+                pump()
+            for session in sessions:
+                self.assertEqual(b"session"+bytes([session.session_id]), accepted[session.session_id].read())
+                self.assertIsNone(accepted[session.session_id].read())
+
+            # A session that is not being read stops its writer
+            # once the window is used up, without holding up the
+            # other sessions on the link
+            data = os.urandom(RNS.Session.WINDOW+1000)
+            written = None
+            def write_thread():
+                nonlocal written
+                written = sessions[0].write(data)
+            thread = threading.Thread(target=write_thread, daemon=True)
+            thread.start()
+
+            window = RNS.Session.WINDOW-8
+            timeout_at = time.time() + 5
+            while accepted[sessions[0].session_id].available() < window and time.time() < timeout_at:
+                pump()
+                time.sleep(0.001)
+            pump()
+            self.assertEqual(window, accepted[sessions[0].session_id].available())
+            self.assertTrue(thread.is_alive())
+
+            self.assertEqual(5, sessions[1].write(b"other"))
+            pump()
+            self.assertEqual(b"other", accepted[sessions[1].session_id].read())
+
+            # Reading grants credit and lets the writer finish
+            received = accepted[sessions[0].session_id].read()
+            timeout_at = time.time() + 5
+            while thread.is_alive() and time.time() < timeout_at:
+                pump()
+                time.sleep(0.001)
+            pump()
+            received += accepted[sessions[0].session_id].read()
+            self.assertEqual(len(data), written)
+            self.assertEqual(data, received)
+
+            # Closing delivers pending data before the close
+            sessions[1].write(b"last")
+            sessions[1].close()
+            self.assertRaises(IOError, sessions[1].write, b"more")
+            pump()
+            remote_session = accepted[sessions[1].session_id]
+            self.assertEqual(RNS.Session.CLOSED, remote_session.status)
+            self.assertEqual([remote_session], closed)
+            self.assertEqual(b"last", remote_session.read())
+            self.assertEqual(b"", remote_session.read())
+
+            # Sessions opened from the other end use separate IDs
+            remote_session = remote_mux.open_session()
+            pump()
+            self.assertNotIn(remote_session.session_id, [s.session_id for s in sessions])
+
+            # Closing the link closes all sessions
+            local_mux._shutdown()
+            for session in sessions:
+                self.assertEqual(RNS.Session.CLOSED, session.status)
+
+        finally:
+            remote.cleanup()
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -247,6 +247,115 @@ class TestIdentity(unittest.TestCase):
         print("    Max deviation from median: "+str(round(d_mpct, 1))+"%")
         print()
 
+    def test_3_token_bulk(self):
+        print("")
+        from RNS.Cryptography import HMAC, PKCS7
+        from RNS.Cryptography.AES import AES_256_CBC
+
+        key = RNS.Cryptography.Token.generate_key()
+        token = RNS.Cryptography.Token(key)
+
+        # Test decryption of known token with cached state
+        fid = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        self.assertEqual(fid.decrypt(bytes.fromhex(fixed_token)), bytes.fromhex(encrypted_message))
+
+        if RNS.Cryptography.backend() == "internal":
+            rounds = 200
+        else:
+            rounds = 5000
+
+        print("Token encryption, "+RNS.Cryptography.backend()+" backend:")
+        for mlen in [16, RNS.Link.MDU]:
+            messages = [os.urandom(mlen) for i in range(0, rounds)]
+
+            # Encryption with keys expanded for every message,
+            # as done before key schedules and HMAC state were
+            # kept by the token
+            start = time.time()
+            for msg in messages:
+                iv = os.urandom(16)
+                signed_parts = iv+AES_256_CBC.encrypt(PKCS7.pad(msg), key[32:], iv)
+                signed_parts + HMAC.new(key[:32], signed_parts).digest()
+            t_uncached = time.time() - start
+
+            start = time.time()
+            tokens = [token.encrypt(msg) for msg in messages]
+            t_single = time.time() - start
+
+            start = time.time()
+            bulk_tokens = token.encrypt_many(messages)
+            t_bulk = time.time() - start
+
+            self.assertEqual(len(bulk_tokens), len(messages))
+            self.assertEqual(len(set([t[:16] for t in bulk_tokens])), len(messages))
+            self.assertEqual(token.decrypt_many(tokens), messages)
+            self.assertEqual(token.decrypt_many(bulk_tokens), messages)
+            self.assertEqual([token.decrypt(t) for t in bulk_tokens], messages)
+
+            print("  "+str(mlen)+" byte messages:")
+            print("    Keys expanded per message : "+str(round(rounds/t_uncached))+" tokens/s")
+            print("    Token.encrypt()           : "+str(round(rounds/t_single))+" tokens/s")
+            print("    Token.encrypt_many()      : "+str(round(rounds/t_bulk))+" tokens/s")
+
+        tampered = bytearray(bulk_tokens[0]); tampered[-1] ^= 0xff
+        self.assertRaises(ValueError, token.decrypt_many, [bulk_tokens[1], bytes(tampered)])
+
+    def test_4_crypto_backends(self):
+        print("")
+        import tempfile
+        import RNS.Cryptography.Provider as cp
+
+        selected = cp.selected.copy()
+        try:
+            print("Cryptography backends:")
+            for primitive in cp.PRIMITIVES:
+                for backend in cp.available(primitive):
+                    if backend == cp.BACKEND_PYCA and not cp.use_pyca: continue
+                    cp.select(primitive, backend)
+
+                    # All backends must produce identical results
+                    # for the known keys, signatures and tokens
+                    fid = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+                    self.assertEqual(fid.hash, bytes.fromhex(fixed_keys[0][1]))
+                    self.assertEqual(fid.sign(signed_message.encode("utf-8")), bytes.fromhex(sig_from_key_0))
+                    self.assertTrue(fid.validate(bytes.fromhex(sig_from_key_0), signed_message.encode("utf-8")))
+                    self.assertFalse(fid.validate(bytes.fromhex(sig_from_key_0), signed_message.encode("utf-8")[1:]))
+                    self.assertEqual(fid.decrypt(bytes.fromhex(fixed_token)), bytes.fromhex(encrypted_message))
+
+                    peer = RNS.Identity()
+                    self.assertEqual(peer.decrypt(peer.encrypt(b"test")), b"test")
+                    self.assertEqual(fid.decrypt(fid.encrypt(b"test")), b"test")
+                    print("  "+primitive+" with "+backend+": "+str(round(cp.benchmark(primitive, backend, duration=0.02)))+" ops/s")
+
+            # libsodium rejects non-canonical signatures that the
+            # other backends accept, so it must only be offered
+            # for signatures when explicitly enabled
+            self.assertFalse(cp.SODIUM_SIGNATURES)
+            self.assertNotIn(cp.BACKEND_SODIUM, cp.available("ed25519"))
+            if cp.sodium_available():
+                from RNS.Cryptography.pure25519.basic import L
+                prv = cp.implementation("ed25519", cp.BACKEND_INTERNAL)[0].generate()
+                signature = prv.sign(b"test")
+                non_canonical = signature[:32]+(int.from_bytes(signature[32:], "little")+L).to_bytes(32, "little")
+                prv.public_key().verify(non_canonical, b"test")
+                sodium_public_key = cp.implementation("ed25519", cp.BACKEND_SODIUM)[1].from_public_bytes(prv.public_key().public_bytes())
+                self.assertRaises(ValueError, sodium_public_key.verify, non_canonical, b"test")
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                cache_path = os.path.join(tmpdir, "crypto_backends")
+                selection = cp.select_fastest(cache_path)
+                self.assertTrue(os.path.isfile(cache_path))
+                for primitive in cp.PRIMITIVES:
+                    self.assertIn(selection[primitive]["backend"], cp.available(primitive))
+                    self.assertGreater(selection[primitive]["ops"], 0)
+
+                # A matching cache must be used as is
+                for primitive in cp.PRIMITIVES: cp.select(primitive, cp.BACKEND_INTERNAL)
+                self.assertEqual(cp.select_fastest(cache_path), selection)
+
+        finally:
+            for primitive in selected: cp.select(primitive, selected[primitive])
+
     def size_str(self, num, suffix='B'):
         units = ['','K','M','G','T','P','E','Z']
         last_unit = 'Y'
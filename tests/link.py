@@ -15,7 +15,10 @@ from tests.channel import MessageTest
 from RNS.Channel import MessageBase
 from RNS.Buffer import StreamDataMessage
 from RNS.Interfaces.LocalInterface import LocalClientInterface
+from RNS.PacketCache import PacketCache
+from RNS.Transport import PathEntry, ReverseEntry, AnnounceEntry, RandomBlobs, AnnounceRateEntry, IDX_PT_TIMESTAMP, IDX_PT_HOPS, IDX_PT_RVCD_IF
 from math import ceil
+from contextlib import contextmanager
 
 APP_NAME = "rns_unit_tests"
 
@@ -55,6 +58,44 @@ def init_rns(caller=None):
 
         print("Done starting local RNS instance...")
 
+@contextmanager
+def transport_jobs_locked():
+    # Holds off the Transport job loop, so tables can be
+    # changed from a test without racing a culling pass.
+    while RNS.Transport.jobs_running: time.sleep(0.0005)
+    RNS.Transport.jobs_locked = True
+    try: yield
+    finally: RNS.Transport.jobs_locked = False
+
+ISOLATED_TABLES = ["announce_table", "path_table", "reverse_table", "link_table", "announce_heap", "tunnels", "announce_rate_table",
+                   "path_states", "discovery_path_requests", "interface_entries", "entry_interfaces", "announce_references"]
+
+@contextmanager
+def isolated_transport_tables():
+    # Swaps the routing tables of the running Transport instance
+    # for empty ones, so a test can fill them and have them culled
+    # by the job loop, without touching the state of the node.
+    with transport_jobs_locked():
+        saved = {name: getattr(RNS.Transport, name) for name in ISOLATED_TABLES}
+        saved_cull = (RNS.Transport.cull_heaps, RNS.Transport.cull_scheduled, RNS.Transport.path_table_snapshot_cache, RNS.Transport.packet_cache)
+        for name in ISOLATED_TABLES: setattr(RNS.Transport, name, type(saved[name])())
+        RNS.Transport.cull_heaps = {table: [] for table in saved_cull[0]}
+        RNS.Transport.cull_scheduled = {table: {} for table in saved_cull[1]}
+        RNS.Transport.path_table_snapshot_cache = None
+        RNS.Transport.packet_cache = PacketCache()
+
+    try: yield
+    finally:
+        with transport_jobs_locked():
+            for name in ISOLATED_TABLES: setattr(RNS.Transport, name, saved[name])
+            RNS.Transport.cull_heaps, RNS.Transport.cull_scheduled, RNS.Transport.path_table_snapshot_cache, RNS.Transport.packet_cache = saved_cull
+            RNS.Transport.path_table_version += 1
+
+def wait_for(condition, timeout=10):
+    timeout = time.time()+timeout
+    while not condition() and time.time() < timeout: time.sleep(0.05)
+    return condition()
+
 def close_rns():
     global c_rns
     if c_rns != None:
@@ -518,6 +559,111 @@ class TestLink(unittest.TestCase):
         time.sleep(LINK_UP_WAIT)
         self.assertEqual(l1.status, RNS.Link.CLOSED)
 
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_08_striped_resource(self):
+        if RNS.Cryptography.backend() == "internal":
+            print("Skipping striped resource test...")
+            return
+
+        init_rns(self)
+        print("")
+        print("Striped resource test")
+
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        self.assertEqual(id1.hash, bytes.fromhex(fixed_keys[0][1]))
+
+        RNS.Transport.request_path(bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+        time.sleep(0.2)
+
+        dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+        self.assertEqual(dest.hash, bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+
+        links = [RNS.Link(dest), RNS.Link(dest)]
+        timeout = time.time()+5
+        while any(l.status != RNS.Link.ACTIVE for l in links) and time.time() < timeout:
+            time.sleep(0.05)
+        for l in links: self.assertEqual(l.status, RNS.Link.ACTIVE)
+
+        resource_size = 3*1000*1000
+        data = os.urandom(resource_size)
+        metadata = {"name": "striped"}
+        print("Sending "+self.size_str(resource_size)+" striped resource over "+str(len(links))+" links...")
+        resource = RNS.StripedResource(data, links, metadata=metadata, callback=self.lr_callback, auto_compress=False)
+        start = time.time()
+
+        TestLink.large_resource_status = resource.status
+        while TestLink.large_resource_status < RNS.Resource.COMPLETE and time.time() < start+120:
+            time.sleep(0.01)
+
+        t = time.time() - start
+        self.assertEqual(resource.status, RNS.Resource.COMPLETE)
+        self.assertEqual(resource.get_progress(), 1.0)
+        print("Striped resource completed at "+self.size_str(resource.total_size/t, "b")+f"ps ({RNS.prettysize(resource.total_size)}, {RNS.prettyshorttime(t)})")
+
+        for l in links: l.teardown()
+        time.sleep(LINK_UP_WAIT)
+        for l in links: self.assertEqual(l.status, RNS.Link.CLOSED)
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_08b_striped_resource_receive(self):
+        import io
+        init_rns(self)
+        print("")
+        print("Striped resource receive test")
+
+        class StubLink:
+            def __init__(self, identity): self.identity = identity
+            def get_remote_identity(self): return self.identity
+
+        class StubResource:
+            def __init__(self, link, stripe_hash, offset, data, total_size, data_hash, status=RNS.Resource.COMPLETE):
+                self.link = link; self.status = status; self.data = io.BytesIO(data)
+                self.metadata = {RNS.StripedResource.METADATA_KEY: [stripe_hash, offset, total_size, None, data_hash]}
+
+        sender = RNS.Identity(); other = RNS.Identity()
+        link_a = StubLink(sender); link_b = StubLink(sender); foreign = StubLink(other)
+        data = os.urandom(3000); data_hash = RNS.Identity.full_hash(data)
+        concluded = []
+        def receive(link, offset, size, stripe_hash, total_size=len(data), digest=data_hash, payload=data):
+            resource = StubResource(link, stripe_hash, offset, payload[offset:offset+size], total_size, digest)
+            return RNS.StripedResource.receive(resource, callback=lambda r: concluded.append((r.status, r.data.read() if r.data else None)))
+
+        # Stripes out of bounds, from another identity, overlapping
+        # received ones, or with an oversized total are rejected
+        stripe_hash = RNS.Identity.get_random_hash()
+        striped = receive(link_a, 0, 1000, stripe_hash)
+        self.assertNotEqual(striped, None)
+        self.assertEqual(receive(link_b, 2500, 1000, stripe_hash, payload=data+bytes(1000)), None)
+        self.assertEqual(receive(foreign, 1000, 1000, stripe_hash), None)
+        self.assertEqual(receive(link_b, 500, 1000, stripe_hash), None)
+        self.assertEqual(receive(link_b, 1000, 1000, stripe_hash, total_size=4000), None)
+        self.assertEqual(receive(link_a, 0, 10, RNS.Identity.get_random_hash(), total_size=RNS.StripedResource.MAX_SIZE+1), None)
+        self.assertEqual(receive(link_a, 0, 1000, stripe_hash), striped)
+        self.assertEqual(concluded, [])
+
+        # Stripes from other links of the same sender complete the
+        # transfer, and the assembled data is checked against its hash
+        receive(link_b, 2000, 1000, stripe_hash)
+        receive(link_a, 1000, 1000, stripe_hash)
+        self.assertEqual(concluded, [(RNS.Resource.COMPLETE, data)])
+        self.assertFalse(os.path.isfile(striped.storagepath))
+
+        concluded.clear()
+        stripe_hash = RNS.Identity.get_random_hash()
+        corrupted = bytearray(data); corrupted[1500] ^= 0xff
+        receive(link_a, 0, 1500, stripe_hash)
+        striped = receive(link_a, 1500, 1500, stripe_hash, payload=bytes(corrupted))
+        self.assertEqual(concluded, [(RNS.Resource.FAILED, None)])
+        self.assertFalse(os.path.isfile(striped.storagepath))
+
+        # Cancelling an incoming transfer concludes it
+        concluded.clear()
+        striped = receive(link_a, 0, 1000, RNS.Identity.get_random_hash())
+        striped.cancel()
+        self.assertEqual(concluded, [(RNS.Resource.FAILED, None)])
+        self.assertFalse(os.path.isfile(striped.storagepath))
+        self.assertFalse(striped.hash in RNS.StripedResource.receiving)
+
     large_resource_status = None
     def lr_callback(self, resource):
         TestLink.large_resource_status = resource.status
@@ -624,12 +770,12 @@ class TestLink(unittest.TestCase):
         self.assertEqual("Hello back", rx_message.data)
         self.assertEqual(test_message.id, rx_message.id)
         self.assertNotEqual(test_message.not_serialized, rx_message.not_serialized)
-        self.assertEqual(0, len(l1._channel._rx_ring))
+        self.assertTrue(all(envelope is None for envelope in l1._channel._rx_ring))
 
         l1.teardown()
         time.sleep(LINK_UP_WAIT)
         self.assertEqual(l1.status, RNS.Link.CLOSED)
-        self.assertEqual(0, len(l1._channel._rx_ring))
+        self.assertTrue(all(envelope is None for envelope in l1._channel._rx_ring))
 
     @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
     def test_11_buffer_round_trip(self):
@@ -793,6 +939,946 @@ class TestLink(unittest.TestCase):
     def test_13_buffer_round_trip_big_slow(self):
         self.test_12_buffer_round_trip_big(local_bitrate=410)
 
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_14_forwarding_rate(self):
+        init_rns(self)
+        print("")
+        print("Testing transport forwarding rate...")
+
+        # Set up a relay between two interfaces, with a path
+        # to a destination two hops away on the outbound side.
+        # The inbound interface is registered as a local client
+        # so the instance transports packets received on it.
+        inbound_interface  = RelayTestInterface("Relay In")
+        outbound_interface = RelayTestInterface("Relay Out")
+        destination_hash   = RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8]
+        next_hop           = RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8]
+        path_entry         = PathEntry(time.time(), next_hop, 2, time.time()+3600, RandomBlobs(), outbound_interface, None)
+
+        num_packets = 20000
+        flags = RNS.Packet.HEADER_2 << 6 | RNS.Transport.TRANSPORT << 4 | RNS.Destination.SINGLE << 2 | RNS.Packet.DATA
+        header = bytes([flags, 1])+RNS.Transport.identity.hash+destination_hash+bytes([RNS.Packet.NONE])
+        frames = [header+os.urandom(RNS.Packet.ENCRYPTED_MDU) for i in range(0, num_packets)]
+
+        RNS.Transport.tables_last_culled = time.time()
+        RNS.Transport.path_table[destination_hash] = path_entry
+        RNS.Transport.local_client_interfaces.append(inbound_interface)
+        try:
+            start = time.time()
+            for frame in frames:
+                RNS.Transport.inbound(frame, inbound_interface)
+            duration = time.time()-start
+
+        finally:
+            RNS.Transport.local_client_interfaces.remove(inbound_interface)
+            RNS.Transport.path_table.pop(destination_hash, None)
+            for reverse_hash in [h for h in RNS.Transport.reverse_table if RNS.Transport.reverse_table[h].outbound_interface == outbound_interface]:
+                RNS.Transport.reverse_table.pop(reverse_hash, None)
+
+        self.assertEqual(len(outbound_interface.sent), num_packets)
+        forwarded = outbound_interface.sent[0]
+        self.assertEqual(forwarded[0], frames[0][0])
+        self.assertEqual(forwarded[1], 2)
+        self.assertEqual(forwarded[2:18], next_hop)
+        self.assertEqual(forwarded[18:], frames[0][18:])
+
+        print(f"Forwarded {num_packets} packets in {round(duration*1000, 2)}ms, {round(num_packets/duration)} packets per second")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_15_request_burst(self):
+        init_rns(self)
+        print("")
+        print("Testing request burst...")
+
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        self.assertEqual(id1.hash, bytes.fromhex(fixed_keys[0][1]))
+
+        RNS.Transport.request_path(bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+        time.sleep(0.2)
+
+        dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+        l1 = RNS.Link(dest)
+        time.sleep(LINK_UP_WAIT*2)
+        self.assertEqual(l1.status, RNS.Link.ACTIVE)
+
+        num_requests = 200
+        responses = {}
+        def response_received(receipt):
+            responses[receipt.request_id] = receipt.response
+
+        def answered(i):
+            return receipts[i] and receipts[i].request_id in responses
+
+        def settled(i):
+            return answered(i) or not receipts[i] or receipts[i].get_status() == RNS.RequestReceipt.FAILED
+
+        # Requests that could not be sent, or that were
+        # lost or rejected under load, are sent again
+        # until every request has been answered
+        start = time.time()
+        receipts = {}
+        for attempt in range(0, 4):
+            for i in range(0, num_requests):
+                if not i in receipts or not answered(i) and settled(i):
+                    receipts[i] = l1.request("/echo", data=i, response_callback=response_received, timeout=10)
+                    time.sleep(0.002)
+
+            wait_for(lambda: all([settled(i) for i in range(0, num_requests)]), timeout=15)
+            if all([answered(i) for i in range(0, num_requests)]): break
+
+        duration = time.time()-start
+
+        for i in range(0, num_requests):
+            self.assertTrue(answered(i))
+            self.assertEqual(responses[receipts[i].request_id], i)
+
+        # A failing handler sends no response, so the
+        # request times out on the requesting side
+        fail_receipt = l1.request("/fail", timeout=1)
+        self.assertTrue(wait_for(lambda: fail_receipt.get_status() == RNS.RequestReceipt.FAILED))
+
+        stats_receipt = l1.request("/stats", timeout=10)
+        timeout = time.time()+10
+        while stats_receipt.get_status() != RNS.RequestReceipt.READY and time.time() < timeout:
+            time.sleep(0.01)
+
+        self.assertEqual(stats_receipt.get_response()["/fail"]["failed"], 1)
+        stats = stats_receipt.get_response()["/echo"]
+        self.assertEqual(stats["failed"], 0)
+        self.assertGreaterEqual(stats["handled"], num_requests)
+        self.assertEqual(sum([bucket[1] for bucket in stats["histogram"]]), stats["handled"])
+        print(f"Handled {num_requests} requests in {round(duration*1000, 2)}ms, mean handler latency {round(stats['mean_latency']*1000, 3)}ms")
+
+        l1.teardown()
+        time.sleep(LINK_UP_WAIT)
+        self.assertEqual(l1.status, RNS.Link.CLOSED)
+
+        # Without a queue, requests are only accepted
+        # while a worker is available to handle them
+        executor = RNS.RequestExecutor(workers=1, queue_limit=0)
+        release = threading.Event()
+        self.assertTrue(executor.submit(release.wait))
+        self.assertTrue(wait_for(lambda: executor.pending() == 0))
+        self.assertFalse(executor.submit(lambda: None))
+        release.set()
+        self.assertTrue(wait_for(lambda: executor.idle == 1))
+        self.assertTrue(executor.submit(lambda: None))
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_16_establishment_rate(self):
+        init_rns(self)
+        print("")
+        print("Testing link establishment rate...")
+
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        self.assertEqual(id1.hash, bytes.fromhex(fixed_keys[0][1]))
+
+        RNS.Transport.request_path(bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+        time.sleep(0.2)
+
+        dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+
+        num_links = 100
+        start = time.time()
+        links = [RNS.Link(dest) for i in range(0, num_links)]
+
+        timeout = time.time()+30
+        while len([l for l in links if l.status == RNS.Link.ACTIVE]) < num_links and time.time() < timeout:
+            time.sleep(0.005)
+        duration = time.time()-start
+
+        established = len([l for l in links if l.status == RNS.Link.ACTIVE])
+        print(f"Established {established} links in {round(duration*1000, 2)}ms, {round(established/duration, 1)} links per second")
+        self.assertEqual(established, num_links)
+
+        for l in links:
+            l.teardown()
+        time.sleep(LINK_UP_WAIT*2)
+        for l in links:
+            self.assertEqual(l.status, RNS.Link.CLOSED)
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_17_session_round_trip(self):
+        init_rns(self)
+        print("")
+        print("Session round trip test")
+
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        self.assertEqual(id1.hash, bytes.fromhex(fixed_keys[0][1]))
+
+        RNS.Transport.request_path(bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+        time.sleep(0.2)
+
+        dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+
+        l1 = RNS.Link(dest)
+        time.sleep(LINK_UP_WAIT)
+        self.assertEqual(l1.status, RNS.Link.ACTIVE)
+
+        multiplexer = l1.get_multiplexer()
+        sessions = [multiplexer.open_session(timeout=5) for i in range(0, 4)]
+        self.assertEqual(len(set([s.session_id for s in sessions])), len(sessions))
+
+        received = {}
+        for session in sessions:
+            def handle_data(ready_bytes: int, session=session):
+                received[session.session_id] = received.get(session.session_id, b"") + session.read()
+            session.set_ready_callback(handle_data)
+
+        for session in sessions:
+            session.write(("Session "+str(session.session_id)).encode("utf-8"))
+
+        timeout = time.time()+5
+        while len(received) < len(sessions) and time.time() < timeout:
+            time.sleep(0.01)
+
+        for session in sessions:
+            self.assertEqual(("Session "+str(session.session_id)+" back").encode("utf-8"), received.get(session.session_id))
+
+        sessions[0].close()
+        time.sleep(0.5)
+        self.assertEqual(sessions[0].status, RNS.Session.CLOSED)
+
+        l1.teardown()
+        time.sleep(LINK_UP_WAIT)
+        self.assertEqual(l1.status, RNS.Link.CLOSED)
+        for session in sessions:
+            self.assertEqual(session.status, RNS.Session.CLOSED)
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_18_keepalive_scheduling(self):
+        global c_rns
+        init_rns(self)
+        print("")
+        print("Keepalive scheduling test")
+
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        self.assertEqual(id1.hash, bytes.fromhex(fixed_keys[0][1]))
+
+        RNS.Transport.request_path(bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+        time.sleep(0.2)
+
+        dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+
+        links = []
+        for i in range(0, 3):
+            links.append(RNS.Link(dest))
+            time.sleep(0.15)
+        time.sleep(LINK_UP_WAIT)
+        for l in links:
+            self.assertEqual(l.status, RNS.Link.ACTIVE)
+            l.keepalive = 1.0
+            l.stale_time = l.keepalive*RNS.Link.STALE_FACTOR
+
+        # The first link carries data for the duration of the
+        # test, and should not need to send any keepalives. The
+        # watchdogs only pick up the shortened interval after
+        # their current sleep, so this runs for a while.
+        end = time.time()+RNS.Link.WATCHDOG_MAX_SLEEP+4.5
+        while time.time() < end:
+            RNS.Packet(links[0], "data".encode("utf-8")).send()
+            time.sleep(0.1)
+
+        for l in links:
+            self.assertEqual(l.status, RNS.Link.ACTIVE)
+        self.assertEqual(links[0].keepalives, 0)
+        self.assertGreaterEqual(links[1].keepalives, 3)
+        self.assertGreaterEqual(links[2].keepalives, 3)
+        self.assertGreater(links[1].get_keepalive_rate(), 0)
+
+        stats = c_rns.get_keepalive_stats()
+        self.assertGreaterEqual(stats["links"], len(links))
+        self.assertGreater(stats["keepalives_per_hour"], 0)
+        links[0].teardown()
+
+        # Move one idle link off the schedule of the other by
+        # less than the coalescing window, after which the two
+        # should settle back into a shared schedule
+        keepalives = links[1].keepalives
+        while links[1].keepalives == keepalives:
+            time.sleep(0.005)
+        time.sleep(0.15)
+        links[2].send_keepalive()
+        time.sleep(2.5)
+        self.assertLess(abs(links[1].last_keepalive-links[2].last_keepalive), 0.1)
+
+        # The interval of idle links is not extended beyond the
+        # point where transport nodes would drop them from their
+        # link table
+        keepalive_idle = RNS.Link.KEEPALIVE_IDLE
+        try:
+            RNS.Link.KEEPALIVE_IDLE = 1800
+            links[1].keepalive = RNS.Link.KEEPALIVE_MAX*0.9
+            for i in range(0, 3):
+                links[1].last_data = 0
+                links[1]._Link__scheduled_keepalive()
+            self.assertEqual(links[1].keepalive, RNS.Link.KEEPALIVE_IDLE_MAX)
+            self.assertLessEqual(links[1].keepalive*RNS.Link.STALE_FACTOR*1.25, RNS.Transport.LINK_TIMEOUT)
+        finally:
+            RNS.Link.KEEPALIVE_IDLE = keepalive_idle
+
+        for l in links:
+            l.teardown()
+        time.sleep(LINK_UP_WAIT)
+        for l in links:
+            self.assertEqual(l.status, RNS.Link.CLOSED)
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_19_announce_batch_verification(self):
+        init_rns(self)
+        print("")
+        print("Testing batched announce verification...")
+
+        def announces(count):
+            packets = []
+            for i in range(0, count):
+                dst = RNS.Destination(RNS.Identity(), RNS.Destination.IN, RNS.Destination.SINGLE, APP_NAME, "batch", str(i))
+                ap  = dst.announce(send=False)
+                ap.pack()
+                RNS.Transport.deregister_destination(dst)
+                raw = bytearray(ap.raw)
+                # Corrupt the signature of every eighth announce
+                if i % 8 == 0: raw[-1] ^= 0xff
+                packets.append(bytes(raw))
+
+            return packets
+
+        def unpacked(raws):
+            packets = [RNS.Packet(None, raw) for raw in raws]
+            for packet in packets: packet.unpack()
+            return packets
+
+        count = 128
+        raws  = announces(count)
+
+        RNS.Identity.announce_signatures.clear()
+        verified = RNS.Identity.announces_verified
+        start = time.time()
+        expected = [RNS.Identity.validate_announce(p, only_validate_signature=True) for p in unpacked(raws)]
+        t_single = time.time()-start
+        self.assertEqual(expected, [i % 8 != 0 for i in range(0, count)])
+        self.assertEqual(RNS.Identity.announces_verified-verified, count)
+
+        # Full validation of the same announces must reuse
+        # the memoised signature results
+        verified = RNS.Identity.announces_verified
+        hits = RNS.Identity.announce_signature_hits
+        for p in unpacked(raws): RNS.Identity.validate_announce(p)
+        self.assertEqual(RNS.Identity.announces_verified, verified)
+        self.assertEqual(RNS.Identity.announce_signature_hits-hits, count)
+
+        workers = RNS.Identity.BATCH_VERIFY_WORKERS
+        try:
+            for batch_workers in [1, 2]:
+                RNS.Identity.BATCH_VERIFY_WORKERS = batch_workers
+                RNS.Identity.announce_signatures.clear()
+                start = time.time()
+                results = RNS.Identity.verify_announce_signatures(unpacked(raws))
+                t_batch = time.time()-start
+                self.assertEqual(results, expected)
+                print(f"Verified {count} announces at {round(count/t_single)} announces/s one by one, {round(count/t_batch)} announces/s in batch with {batch_workers} worker(s)")
+
+        finally:
+            RNS.Identity.BATCH_VERIFY_WORKERS = workers
+
+        # Announces received with batching enabled are held
+        # back, verified together, and then processed
+        raws = announces(16)
+        verified = RNS.Identity.announces_verified
+        try:
+            RNS.Transport.announce_batching = True
+            for raw in raws: RNS.Transport.inbound(raw, RNS.Transport.interfaces[0])
+            self.assertTrue(wait_for(lambda: RNS.Identity.announces_verified-verified >= len(raws)))
+
+        finally:
+            RNS.Transport.announce_batching = False
+
+        self.assertEqual(RNS.Identity.announces_verified-verified, len(raws))
+        for p in unpacked(raws):
+            if RNS.Identity.announce_signatures[RNS.Identity._announce_signature_key(p)]:
+                self.assertTrue(wait_for(lambda: RNS.Identity.recall(p.destination_hash) != None))
+            else:
+                self.assertEqual(RNS.Identity.recall(p.destination_hash), None)
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_20_link_registry_scale(self):
+        init_rns(self)
+        print("")
+        print("Testing link registry with 10k links...")
+
+        class StubLink:
+            def __init__(self):
+                self.link_id = os.urandom(RNS.Reticulum.TRUNCATED_HASHLENGTH//8)
+                self.initiator = True
+                self.status = RNS.Link.PENDING
+                self.attached_interface = None
+
+        count = 10000
+        stubs = [StubLink() for i in range(0, count)]
+        pending = len(RNS.Transport.pending_links); active = len(RNS.Transport.active_links)
+
+        try:
+            start = time.time()
+            for stub in stubs: RNS.Transport.register_link(stub)
+            t_register = time.time()-start
+
+            start = time.time()
+            for stub in stubs:
+                stub.status = RNS.Link.ACTIVE
+                RNS.Transport.activate_link(stub)
+            t_activate = time.time()-start
+            self.assertEqual(len(RNS.Transport.pending_links), pending)
+            self.assertEqual(len(RNS.Transport.active_links), active+count)
+            self.assertEqual(len(RNS.Transport.active_link_index), len(RNS.Transport.active_links))
+            self.assertEqual(len(RNS.Transport.initiator_links[None]), count)
+
+            start = time.time()
+            for stub in stubs: self.assertIs(RNS.Transport.active_link_index.get(stub.link_id), stub)
+            t_lookup = time.time()-start
+
+            # Lookup by scanning a list, as done before links
+            # were indexed by link ID
+            scanned = RNS.Transport.active_links.copy()
+            start = time.time()
+            for stub in stubs[-100:]: next((l for l in scanned if l.link_id == stub.link_id), None)
+            t_scan = (time.time()-start)/100*count
+
+            # A real link must keep working with the registry loaded
+            id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+            dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+            l1 = RNS.Link(dest)
+            time.sleep(LINK_UP_WAIT)
+            self.assertEqual(l1.status, RNS.Link.ACTIVE)
+            self.assertIs(RNS.Transport.active_link_index.get(l1.link_id), l1)
+            receipts = [RNS.Packet(l1, os.urandom(32)).send() for i in range(0, 10)]
+            timeout = time.time()+5
+            while any(r.status != RNS.PacketReceipt.DELIVERED for r in receipts) and time.time() < timeout: time.sleep(0.01)
+            self.assertTrue(all(r.status == RNS.PacketReceipt.DELIVERED for r in receipts))
+            l1.teardown()
+            time.sleep(0.5)
+            self.assertEqual(RNS.Transport.active_link_index.get(l1.link_id), None)
+
+            # A link that was never established stays pending until
+            # Transport has reaped it and expired the path
+            unreachable = RNS.Destination(RNS.Identity(), RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "unreachable")
+            l2 = RNS.Link(unreachable)
+            l2.teardown()
+            self.assertIs(RNS.Transport.pending_link_index.get(l2.link_id), l2)
+            self.assertTrue(wait_for(lambda: RNS.Transport.pending_link_index.get(l2.link_id) == None, timeout=5))
+            self.assertFalse(l2 in RNS.Transport.pending_links)
+
+            start = time.time()
+            for stub in stubs: RNS.Transport.deregister_link(stub)
+            t_deregister = time.time()-start
+
+        finally:
+            for stub in stubs: RNS.Transport.deregister_link(stub)
+
+        self.assertEqual(len(RNS.Transport.active_links), active)
+        self.assertFalse(None in RNS.Transport.initiator_links)
+        print(f"Registered {count} links in {round(t_register*1000, 2)}ms, activated in {round(t_activate*1000, 2)}ms, deregistered in {round(t_deregister*1000, 2)}ms")
+        print(f"Looked up {count} links in {round(t_lookup*1000, 2)}ms, list scanning would take {round(t_scan*1000, 2)}ms")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_21_table_culling_scale(self):
+        init_rns(self)
+        print("")
+        print("Testing table culling with 20k paths and reverse entries...")
+
+        interface = CullTestInterface("Cull Test")
+        count = 20000; now = time.time()
+        destination_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, count)]
+        reverse_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, count)]
+
+        with isolated_transport_tables():
+            try:
+                with transport_jobs_locked():
+                    RNS.Transport.interfaces.append(interface)
+                    for destination_hash in destination_hashes:
+                        RNS.Transport.path_table[destination_hash] = PathEntry(now, destination_hash, 2, now+3600, RandomBlobs(), interface, None)
+                        RNS.Transport.track_entry(RNS.Transport.CULL_PATH, destination_hash)
+                    for reverse_hash in reverse_hashes:
+                        RNS.Transport.reverse_table[reverse_hash] = ReverseEntry(interface, interface, now)
+                        RNS.Transport.track_entry(RNS.Transport.CULL_REVERSE, reverse_hash)
+
+                start = time.time()
+                self.assertEqual(RNS.Transport.due_entries(RNS.Transport.CULL_PATH, time.time()), [])
+                self.assertEqual(RNS.Transport.due_entries(RNS.Transport.CULL_REVERSE, time.time()), [])
+                t_cull = time.time()-start
+
+                # Examine every entry, as done before tables
+                # were culled in expiry order
+                start = time.time()
+                for destination_hash in destination_hashes:
+                    destination_entry = RNS.Transport.path_table[destination_hash]
+                    if time.time() > RNS.Transport.path_expiry(destination_entry): pass
+                    elif not destination_entry.receiving_interface in RNS.Transport.interfaces: pass
+                for reverse_hash in reverse_hashes:
+                    reverse_entry = RNS.Transport.reverse_table[reverse_hash]
+                    if time.time() > reverse_entry.timestamp + RNS.Transport.REVERSE_TIMEOUT: pass
+                    elif not reverse_entry.outbound_interface in RNS.Transport.interfaces: pass
+                    elif not reverse_entry.receiving_interface in RNS.Transport.interfaces: pass
+                t_scan = time.time()-start
+
+                # Expired paths are culled on the next run, and
+                # all other entries are left alone
+                with transport_jobs_locked():
+                    for destination_hash in destination_hashes[:10]: RNS.Transport.expire_path(destination_hash)
+                self.assertTrue(wait_for(lambda: not any(h in RNS.Transport.path_table for h in destination_hashes[:10])))
+                self.assertTrue(all(h in RNS.Transport.path_table for h in destination_hashes[10:]))
+                self.assertTrue(all(h in RNS.Transport.reverse_table for h in reverse_hashes))
+
+                # Removing the interface culls everything attached to it.
+                # The interface index is cleared at the start of a culling
+                # pass, so the tables themselves are waited on.
+                with transport_jobs_locked():
+                    RNS.Transport.interfaces.remove(interface)
+                    RNS.Transport.tables_last_culled = 0
+                self.assertTrue(wait_for(lambda: not any(h in RNS.Transport.path_table for h in destination_hashes)))
+                self.assertTrue(wait_for(lambda: not any(h in RNS.Transport.reverse_table for h in reverse_hashes)))
+                self.assertFalse(interface in RNS.Transport.interface_entries)
+
+            finally:
+                with transport_jobs_locked():
+                    if interface in RNS.Transport.interfaces: RNS.Transport.interfaces.remove(interface)
+
+        print(f"Culling {2*count} entries with none due took {round(t_cull*1000, 3)}ms, scanning them took {round(t_scan*1000, 2)}ms")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_22_path_table_memory(self):
+        import tracemalloc
+        print("")
+        print("Testing path table memory usage with 20k paths...")
+
+        count = 20000; now = time.time()
+        blob_count = RNS.Transport.MAX_RANDOM_BLOBS
+        interface = CullTestInterface("Memory Test")
+        blobs = [[os.urandom(RandomBlobs.SIZE) for j in range(0, blob_count)] for i in range(0, 100)]
+
+        def build(as_records):
+            table = {}
+            tracemalloc.start()
+            for i in range(0, count):
+                random_blobs = [bytes(bytearray(blob)) for blob in blobs[i%100]]
+                destination_hash = os.urandom(RNS.Reticulum.TRUNCATED_HASHLENGTH//8)
+                next_hop = os.urandom(RNS.Reticulum.TRUNCATED_HASHLENGTH//8)
+                packet_hash = os.urandom(RNS.Identity.HASHLENGTH//8)
+                if as_records: table[destination_hash] = PathEntry(now, next_hop, 2, now+3600, RandomBlobs(random_blobs), interface, packet_hash)
+                else: table[destination_hash] = [now, next_hop, 2, now+3600, random_blobs, interface, packet_hash]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return table, size/count
+
+        lists, list_size = build(False); del lists
+        records, record_size = build(True)
+
+        # Records keep supporting access by table index
+        entry = next(iter(records.values()))
+        self.assertEqual(entry[IDX_PT_HOPS], 2)
+        self.assertIs(entry[IDX_PT_RVCD_IF], interface)
+        entry[IDX_PT_TIMESTAMP] = 0
+        self.assertEqual(entry.timestamp, 0)
+        self.assertEqual(len(list(entry.random_blobs)), blob_count)
+        self.assertTrue(blobs[0][0] in entry.random_blobs)
+        self.assertFalse(blobs[0][0][1:]+blobs[0][1][:1] in entry.random_blobs)
+
+        self.assertLess(record_size, list_size/2)
+        print(f"Path entries with {blob_count} random blobs use {round(record_size)} bytes as records, {round(list_size)} bytes as lists")
+        print(f"One million paths would use {self.size_str(record_size*1e6)}, down from {self.size_str(list_size*1e6)}")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_23_path_table_snapshot(self):
+        init_rns(self)
+        print("")
+        print("Testing path table snapshots and paged RPC access...")
+
+        # Snapshots are shared until paths are added or removed
+        count = 20000; now = time.time()
+        interface = CullTestInterface("Snapshot Test")
+        destination_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, count)]
+        with isolated_transport_tables():
+            with transport_jobs_locked():
+                for destination_hash in destination_hashes:
+                    RNS.Transport.path_table[destination_hash] = PathEntry(now, destination_hash, 2, now+3600, RandomBlobs(), interface, None)
+                    RNS.Transport.track_entry(RNS.Transport.CULL_PATH, destination_hash)
+
+            start = time.time()
+            snapshot = RNS.Transport.path_table_snapshot()
+            t_snapshot = time.time()-start
+            self.assertIs(RNS.Transport.path_table_snapshot(), snapshot)
+            self.assertEqual(len(snapshot), len(RNS.Transport.path_table))
+
+            with transport_jobs_locked():
+                RNS.Transport.path_table.pop(destination_hashes[0])
+                RNS.Transport.untrack_entry(RNS.Transport.CULL_PATH, destination_hashes[0])
+            self.assertIsNot(RNS.Transport.path_table_snapshot(), snapshot)
+            self.assertFalse(destination_hashes[0] in dict(RNS.Transport.path_table_snapshot()))
+            self.assertTrue(destination_hashes[0] in dict(snapshot))
+
+        # Make sure the shared instance knows some paths
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        for aspect in ["snapshot_a", "snapshot_b", "snapshot_c"]:
+            RNS.Destination(id1, RNS.Destination.IN, RNS.Destination.SINGLE, APP_NAME, aspect).announce()
+        time.sleep(0.5)
+
+        full = c_rns.get_path_table()
+        self.assertGreaterEqual(len(full), 3)
+        streamed = list(c_rns.iter_path_table(page_size=2))
+        self.assertEqual(sorted(e["hash"] for e in streamed), sorted(e["hash"] for e in full))
+
+        paged = []
+        for offset in range(0, len(full), 2): paged.extend(c_rns.get_path_table(offset=offset, limit=2))
+        self.assertEqual(sorted(e["hash"] for e in paged), sorted(e["hash"] for e in full))
+
+        destination_hash = full[0]["hash"]
+        self.assertEqual([e["hash"] for e in c_rns.get_path_table(prefix=destination_hash)], [destination_hash])
+        self.assertEqual(len(c_rns.get_path_table(prefix=destination_hash[:1]+bytes([destination_hash[1]^0xFF]))), len([e for e in full if e["hash"][:2] == destination_hash[:1]+bytes([destination_hash[1]^0xFF])]))
+        self.assertEqual(c_rns.get_path_table(max_hops=-1), [])
+        self.assertEqual(len(c_rns.get_path_table(interface=full[0]["interface"])), len([e for e in full if e["interface"] == full[0]["interface"]]))
+
+        print(f"Snapshot of {count} paths took {round(t_snapshot*1000, 2)}ms, listed {len(full)} shared instance paths in pages")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_24_announce_rate_table(self):
+        import tracemalloc
+        init_rns(self)
+        print("")
+        print("Testing announce rate table...")
+
+        # The averaged rate matches the rate computed from
+        # a list of the most recent announce timestamps
+        now = time.time()-20*60
+        rate_entry = AnnounceRateEntry(now); timestamps = [now]
+        for i in range(1, 20):
+            rate_entry.heard_at(now+i*60); timestamps.append(now+i*60)
+        timestamps = timestamps[-RNS.Transport.MAX_RATE_TIMESTAMPS:]
+        count, since = rate_entry.window()
+        self.assertEqual(count, len(timestamps))
+        self.assertAlmostEqual(since, timestamps[0], places=3)
+
+        # Entries for destinations that have not been heard from
+        # in a while are culled, while recent ones are kept
+        count = 10000; now = time.time()
+        stale_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, count)]
+        recent_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, count)]
+        with isolated_transport_tables():
+            with transport_jobs_locked():
+                tracemalloc.start()
+                for destination_hash in stale_hashes: RNS.Transport.announce_rate_table[destination_hash] = AnnounceRateEntry(now-RNS.Transport.RATE_ENTRY_TIMEOUT-1)
+                entry_size = tracemalloc.get_traced_memory()[0]/count
+                tracemalloc.stop()
+                for destination_hash in recent_hashes: RNS.Transport.announce_rate_table[destination_hash] = AnnounceRateEntry(now)
+                RNS.Transport.tables_last_culled = 0
+
+            self.assertTrue(wait_for(lambda: not any(h in RNS.Transport.announce_rate_table for h in stale_hashes)))
+            self.assertTrue(all(h in RNS.Transport.announce_rate_table for h in recent_hashes))
+
+        # Expired entries that are still blocked are kept, and
+        # don't hold back culling of the entries behind them
+        with isolated_transport_tables():
+            with transport_jobs_locked():
+                for destination_hash in stale_hashes[:2]:
+                    RNS.Transport.announce_rate_table[destination_hash] = AnnounceRateEntry(now-RNS.Transport.RATE_ENTRY_TIMEOUT-1)
+                RNS.Transport.announce_rate_table[stale_hashes[0]].blocked_until = now+3600
+                RNS.Transport.tables_last_culled = 0
+
+            self.assertTrue(wait_for(lambda: not stale_hashes[1] in RNS.Transport.announce_rate_table))
+            self.assertIn(stale_hashes[0], RNS.Transport.announce_rate_table)
+
+        # Evicting entries from a full table never lifts a block
+        max_rate_entries = RNS.Transport.MAX_RATE_ENTRIES
+        with isolated_transport_tables():
+            with transport_jobs_locked():
+                try:
+                    RNS.Transport.MAX_RATE_ENTRIES = 2
+                    RNS.Transport.add_rate_entry(stale_hashes[0], now)
+                    RNS.Transport.add_rate_entry(stale_hashes[1], now)
+                    RNS.Transport.announce_rate_table[stale_hashes[0]].blocked_until = now+3600
+                    RNS.Transport.add_rate_entry(stale_hashes[2], now)
+                    self.assertEqual(list(RNS.Transport.announce_rate_table), [stale_hashes[2], stale_hashes[0]])
+
+                    RNS.Transport.announce_rate_table[stale_hashes[2]].blocked_until = now+3600
+                    RNS.Transport.add_rate_entry(stale_hashes[3], now)
+                    self.assertEqual(sorted(RNS.Transport.announce_rate_table), sorted(stale_hashes[0:1]+stale_hashes[2:3]))
+
+                finally:
+                    RNS.Transport.MAX_RATE_ENTRIES = max_rate_entries
+
+        # Rate table entries served over RPC still include the
+        # timestamps list that older clients read
+        with isolated_transport_tables():
+            with transport_jobs_locked():
+                RNS.Transport.announce_rate_table[recent_hashes[0]] = rate_entry
+            entry = next(c_rns._Reticulum__rate_table_entries())
+            self.assertEqual(len(entry["timestamps"]), entry["count"])
+            self.assertAlmostEqual(entry["timestamps"][0], entry["since"], places=3)
+            self.assertAlmostEqual(entry["timestamps"][-1], rate_entry.heard, places=3)
+
+        self.assertTrue(isinstance(c_rns.get_rate_table(), list))
+        print(f"Culled {count} stale announce rate entries, using {round(entry_size)} bytes per entry")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_25_announce_retransmission_scale(self):
+        init_rns(self)
+        print("")
+        print("Testing announce retransmission with 100k tracked announces...")
+
+        identity = RNS.Identity()
+        destination = RNS.Destination(identity, RNS.Destination.IN, RNS.Destination.SINGLE, "test", "retransmission")
+        announce_packet = destination.announce(send=False); announce_packet.pack()
+        received = RNS.Packet(None, announce_packet.raw); received.unpack()
+
+        # Retransmissions created from the received raw bytes
+        # are identical to ones packed from a new packet
+        for block_rebroadcasts in [False, True]:
+            announce_entry = AnnounceEntry(time.time(), 0, 0, destination.hash, 3, received, 0, block_rebroadcasts, None)
+            new_packet = RNS.Transport.announce_retransmission(destination.hash, announce_entry)
+            packed = RNS.Packet(destination, received.data, RNS.Packet.ANNOUNCE, header_type=RNS.Packet.HEADER_2, transport_type=RNS.Transport.TRANSPORT,
+                                transport_id=RNS.Transport.identity.hash, context_flag=received.context_flag,
+                                context=RNS.Packet.PATH_RESPONSE if block_rebroadcasts else RNS.Packet.NONE)
+            packed.hops = 3; packed.pack()
+            self.assertEqual(new_packet.raw, packed.raw)
+            self.assertEqual(new_packet.packet_hash, packed.packet_hash)
+            self.assertEqual(new_packet.hops, 3)
+
+        # Retransmissions can be sent like any other packet
+        interface = CullTestInterface("Retransmission Test")
+        interface.OUT = True; interface.sent = []
+        interface.process_outgoing = lambda data: interface.sent.append(data)
+        with transport_jobs_locked(): RNS.Transport.interfaces.append(interface)
+        try:
+            announce_entry = AnnounceEntry(time.time(), 0, 0, destination.hash, 3, received, 0, False, interface)
+            new_packet = RNS.Transport.announce_retransmission(destination.hash, announce_entry)
+            self.assertEqual(new_packet.send(), None)
+            self.assertEqual(interface.sent, [new_packet.raw])
+        finally:
+            with transport_jobs_locked(): RNS.Transport.interfaces.remove(interface)
+
+        count = 100000; due_count = 1000
+        destination_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, count)]
+        last_checked = RNS.Transport.announces_last_checked
+        with isolated_transport_tables():
+            try:
+                # Keep the job loop from processing the table while
+                # the retransmission passes are timed directly
+                with transport_jobs_locked():
+                    RNS.Transport.announces_last_checked = time.time()+3600
+                    now = time.time()
+                    for destination_hash in destination_hashes[due_count:]:
+                        RNS.Transport.schedule_announce(destination_hash, AnnounceEntry(now, now+3600, 0, destination_hash, 3, received, 0, False, None))
+                    for destination_hash in destination_hashes[:due_count]:
+                        RNS.Transport.schedule_announce(destination_hash, AnnounceEntry(now, now, 0, destination_hash, 3, received, 0, False, None))
+
+                started = time.process_time()
+                outgoing = RNS.Transport.process_announce_table(now+1)
+                due_time = time.process_time()-started
+                self.assertEqual(len(outgoing), due_count)
+
+                started = time.process_time()
+                for i in range(0, 100): self.assertEqual(len(RNS.Transport.process_announce_table(now+2)), 0)
+                idle_time = (time.process_time()-started)/100
+
+                for destination_hash in destination_hashes[:due_count]:
+                    self.assertEqual(RNS.Transport.announce_table[destination_hash].retries, 1)
+
+            finally:
+                RNS.Transport.announces_last_checked = last_checked
+
+        print(f"Created {due_count} retransmissions in {round(due_time*1000, 2)}ms, idle pass over {count} announces took {round(idle_time*1e6, 2)}µs")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_26_announce_queue(self):
+        init_rns(self)
+        print("")
+        print("Testing interface announce queue...")
+
+        # Announces with the fewest hops are sent first, and among
+        # those, the one that has been queued the longest. Queued
+        # announces are replaced by newer ones, and expire.
+        now = time.time()
+        queue = RNS.Interfaces.Interface.AnnounceQueue()
+        self.assertTrue(queue.add(b"a", 3, 1, b"a1", now))
+        self.assertTrue(queue.add(b"b", 2, 1, b"b1", now+1))
+        self.assertTrue(queue.add(b"c", 2, 1, b"c1", now+2))
+        self.assertFalse(queue.add(b"b", 4, 0, b"b0", now+3))
+        self.assertFalse(queue.add(b"a", 1, 2, b"a2", now+4))
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.pop(now+5) for i in range(0, 4)], [b"a2", b"b1", b"c1", None])
+
+        queue = RNS.Interfaces.Interface.AnnounceQueue()
+        queue.add(b"a", 1, 1, b"a1", now)
+        queue.add(b"b", 2, 1, b"b1", now+RNS.Reticulum.QUEUED_ANNOUNCE_LIFE)
+        self.assertEqual(queue.pop(now+RNS.Reticulum.QUEUED_ANNOUNCE_LIFE+1), b"b1")
+        self.assertEqual(len(queue), 0)
+
+        # Adding and popping from several threads at once never
+        # loses or duplicates announces
+        queue = RNS.Interfaces.Interface.AnnounceQueue()
+        popped = []
+        def fill(offset):
+            for i in range(offset, offset+2000): queue.add(i.to_bytes(16, "big"), i%8, 1, i.to_bytes(16, "big"), now)
+        def drain():
+            for i in range(0, 2000):
+                raw = queue.pop(now)
+                if raw != None: popped.append(raw)
+        workers = [threading.Thread(target=fill, args=(i*2000,)) for i in range(0, 4)]+[threading.Thread(target=drain) for i in range(0, 2)]
+        for worker in workers: worker.start()
+        for worker in workers: worker.join()
+        while len(queue) > 0: popped.append(queue.pop(now))
+        self.assertEqual(sorted(popped), sorted(i.to_bytes(16, "big") for i in range(0, 8000)))
+
+        # Only one wakeup is armed per interface at a time
+        interface = CullTestInterface("Announce Timer Test")
+        interface.schedule_announce_queue(3600)
+        timer = interface.announce_queue_timer
+        interface.schedule_announce_queue(0)
+        self.assertIs(interface.announce_queue_timer, timer)
+        timer.cancel()
+
+        # Draining a large queue on an interface takes one
+        # scheduler wakeup per announce, and announces are
+        # transmitted by workers, not the scheduler thread
+        count = 5000
+        interface = CullTestInterface("Announce Queue Test")
+        interface.announce_cap = 1e9; interface.sent = []; senders = set()
+        def process_outgoing(data):
+            senders.add(threading.current_thread().name)
+            interface.sent.append(data)
+        interface.process_outgoing = process_outgoing
+        interface.announce_queue = RNS.Interfaces.Interface.AnnounceQueue()
+        now = time.time()
+        for i in range(0, count):
+            interface.announce_queue.add(i.to_bytes(16, "big"), (count-i)%8, 1, i.to_bytes(16, "big")+bytes(150), now)
+
+        threads = threading.active_count(); peak_threads = threads
+        fired = RNS.Scheduler.stats()["fired"]
+        started = time.time()
+        interface.schedule_announce_queue(0)
+        timeout = time.time()+30
+        while len(interface.sent) < count and time.time() < timeout:
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.01)
+        drain_time = time.time()-started
+
+        self.assertEqual(len(interface.sent), count)
+        self.assertGreaterEqual(RNS.Scheduler.stats()["fired"]-fired, count)
+        self.assertNotIn("Timer Scheduler", senders)
+        # Allow for the scheduler and dispatch threads being started
+        self.assertLessEqual(peak_threads, threads+1+RNS.Scheduler.DISPATCH_WORKERS)
+        self.assertEqual(len(interface.announce_queue), 0)
+        hops = [(count-int.from_bytes(raw[:16], "big"))%8 for raw in interface.sent]
+        self.assertEqual(hops, sorted(hops))
+        print(f"Sent {count} queued announces in {round(drain_time*1000, 2)}ms")
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_27_announce_cache_references(self):
+        import tempfile, shutil
+        init_rns(self)
+        print("")
+        print("Testing cached announce reference tracking...")
+
+        interface = CullTestInterface("Announce Cache Test")
+        now = time.time()
+        destination_hashes = [RNS.Identity.get_random_hash()[:RNS.Reticulum.TRUNCATED_HASHLENGTH//8] for i in range(0, 3)]
+        packet_hashes = [RNS.Identity.get_random_hash() for i in range(0, 3)]
+
+        # The test instance is connected to a shared instance, and
+        # only caches packets in memory, so a cache on disk is used
+        cache_path = tempfile.mkdtemp()
+        with isolated_transport_tables():
+            cache = RNS.Transport.packet_cache = PacketCache(cache_path)
+            for packet_hash in packet_hashes: cache.store(packet_hash, packet_hash+bytes(100), None, PacketCache.ANNOUNCE)
+
+            # The first two paths share an announce, and the
+            # third announce is not referred to by any path
+            try:
+                with transport_jobs_locked():
+                    RNS.Transport.interfaces.append(interface)
+                    for destination_hash in destination_hashes[:2]:
+                        RNS.Transport.path_table[destination_hash] = PathEntry(now, destination_hash, 2, now+3600, RandomBlobs(), interface, packet_hashes[0])
+                        RNS.Transport.track_entry(RNS.Transport.CULL_PATH, destination_hash)
+                        RNS.Transport.reference_announce(packet_hashes[0])
+
+                    RNS.Transport.clean_announce_cache()
+
+                self.assertTrue(packet_hashes[0] in cache)
+                self.assertFalse(packet_hashes[1] in cache)
+                self.assertFalse(packet_hashes[2] in cache)
+
+                # Announces are removed from the cache once
+                # the last path referring to them is culled
+                for i in range(0, 2):
+                    with transport_jobs_locked(): RNS.Transport.expire_path(destination_hashes[i])
+                    self.assertTrue(wait_for(lambda: not destination_hashes[i] in RNS.Transport.path_table))
+                    self.assertEqual(packet_hashes[0] in cache, i == 0)
+
+                self.assertFalse(packet_hashes[0] in RNS.Transport.announce_references)
+
+            finally:
+                with transport_jobs_locked():
+                    if interface in RNS.Transport.interfaces: RNS.Transport.interfaces.remove(interface)
+                cache.close(); shutil.rmtree(cache_path)
+
+    @skipIf(os.getenv('SKIP_NORMAL_TESTS') != None, "Skipping")
+    def test_28_resource_resume(self):
+        init_rns(self)
+        print("")
+        print("Split resource resume test")
+
+        id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
+        RNS.Transport.request_path(bytes.fromhex("fb48da0e82e6e01ba0c014513f74540d"))
+        time.sleep(0.2)
+        dest = RNS.Destination(id1, RNS.Destination.OUT, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
+
+        def request(link, path, data):
+            receipt = link.request(path, data=data, timeout=10)
+            self.assertTrue(wait_for(lambda: receipt.get_status() in [RNS.RequestReceipt.READY, RNS.RequestReceipt.FAILED]))
+            self.assertEqual(receipt.get_status(), RNS.RequestReceipt.READY)
+            return receipt.get_response()
+
+        concluded = []
+        resource_timeout = 120
+        data = os.urandom(2*RNS.Resource.MAX_EFFICIENT_SIZE+64*1024)
+
+        # Tear down the link as soon as the first of
+        # three segments has been proven by the receiver
+        l1 = RNS.Link(dest)
+        self.assertTrue(wait_for(lambda: l1.status == RNS.Link.ACTIVE))
+        resource = RNS.Resource(data, l1, timeout=resource_timeout, callback=concluded.append, auto_compress=False)
+        self.assertEqual(resource.total_segments, 3)
+        self.assertTrue(wait_for(lambda: resource.status >= RNS.Resource.COMPLETE, timeout=resource_timeout))
+        self.assertEqual(resource.status, RNS.Resource.COMPLETE)
+        original_hash = resource.original_hash
+        try:
+            l1.teardown()
+            self.assertTrue(wait_for(lambda: l1.status == RNS.Link.CLOSED))
+
+            l2 = RNS.Link(dest)
+            self.assertTrue(wait_for(lambda: l2.status == RNS.Link.ACTIVE))
+            self.assertEqual(request(l2, "/resume_state", original_hash), 1)
+
+            # A segment that does not directly follow the
+            # persisted resume state must be rejected
+            stale = RNS.Resource(data, l2, timeout=resource_timeout, callback=concluded.append, auto_compress=False, segment_index=3, original_hash=original_hash)
+            self.assertTrue(wait_for(lambda: stale in concluded))
+            self.assertEqual(stale.status, RNS.Resource.REJECTED)
+            self.assertEqual(request(l2, "/resume_state", original_hash), 1)
+
+            resumed = RNS.Resource(data, l2, timeout=resource_timeout, callback=concluded.append, auto_compress=False, segment_index=2, original_hash=original_hash)
+            self.assertTrue(wait_for(lambda: resumed in concluded or (resumed.next_segment != None and resumed.next_segment in concluded), timeout=resource_timeout))
+            self.assertEqual(concluded[-1].status, RNS.Resource.COMPLETE)
+            self.assertEqual(concluded[-1].segment_index, 3)
+            self.assertEqual(request(l2, "/received", original_hash), RNS.Identity.full_hash(data))
+            self.assertEqual(request(l2, "/resume_state", original_hash), 0)
+            l2.teardown()
+
+        finally:
+            # Remove the partially received data and resume
+            # state left in the shared storage by the receiver
+            for suffix in ["", ".meta", ".resume"]:
+                path = RNS.Reticulum.resourcepath+"/"+original_hash.hex()+suffix
+                if os.path.isfile(path): os.unlink(path)
+
     def size_str(self, num, suffix='B'):
         units = ['','K','M','G','T','P','E','Z']
         last_unit = 'Y'
@@ -812,6 +1898,34 @@ class TestLink(unittest.TestCase):
 
         return "%.2f%s%s" % (num, last_unit, suffix)
 
+class RelayTestInterface:
+    HW_MTU = None
+    AUTOCONFIGURE_MTU = False
+    FIXED_MTU = False
+
+    def __init__(self, name):
+        self.name = name
+        self.sent = []
+
+    def process_outgoing(self, data):
+        self.sent.append(data)
+
+    def __str__(self):
+        return "RelayTestInterface["+self.name+"]"
+
+class CullTestInterface(RNS.Interfaces.Interface.Interface):
+    OUT = False
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def process_outgoing(self, data):
+        pass
+
+    def __str__(self):
+        return "CullTestInterface["+self.name+"]"
+
 if __name__ == '__main__':
     unittest.main(verbosity=1)
 
@@ -825,8 +1939,15 @@ def targets(yp=False):
         if yp:
             yappi.start()
 
+    received_hashes = {}
     def resource_concluded(resource):
         print("Resource concluded")
+        if RNS.StripedResource.is_stripe(resource):
+            RNS.StripedResource.receive(resource, callback=striped_resource_concluded)
+
+        if resource.split and resource.status == RNS.Resource.COMPLETE and hasattr(resource.data, "read"):
+            received_hashes[resource.original_hash] = RNS.Identity.full_hash(resource.data.read())
+
         if yp:
             try:
                 yappi.stop()
@@ -845,6 +1966,9 @@ def targets(yp=False):
             rx_pr = (resource.link.attached_interface.rxb*8)/resource.link.attached_interface.rxptime
             print("Average RX proccessing rate: "+size_str(rx_pr, "b")+"ps")
 
+    def striped_resource_concluded(striped_resource):
+        print("Striped resource concluded")
+
     def link_established(link):
         print("Link established")
         link.set_resource_strategy(RNS.Link.ACCEPT_ALL)
@@ -885,12 +2009,46 @@ def targets(yp=False):
 
         buffer = RNS.Buffer.create_bidirectional_buffer(0, 0, channel, handle_buffer)
 
+        def session_opened(session):
+            def handle_session(ready_bytes: int):
+                data = session.read()
+                if data:
+                    # Writes can wait for the channel to be ready,
+                    # so they must not run on the receive thread
+                    threading.Thread(target=session.write, args=[data + " back".encode("utf-8")], daemon=True).start()
+            session.set_ready_callback(handle_session)
+
+        link.get_multiplexer().set_session_callback(session_opened)
+
     m_rns = RNS.Reticulum("./tests/rnsconfig", logdest=RNS.LOG_FILE, loglevel=RNS.LOG_EXTREME)
     id1 = RNS.Identity.from_bytes(bytes.fromhex(fixed_keys[0][0]))
     d1 = RNS.Destination(id1, RNS.Destination.IN, RNS.Destination.SINGLE, APP_NAME, "link", "establish")
     d1.set_proof_strategy(RNS.Destination.PROVE_ALL)
     d1.set_link_established_callback(link_established)
 
+    def echo_request(path, data, request_id, link_id, remote_identity, requested_at):
+        return data
+
+    def stats_request(path, data, request_id, link_id, remote_identity, requested_at):
+        return d1.get_request_stats()
+
+    d1.register_request_handler("/echo", response_generator=echo_request, allow=RNS.Destination.ALLOW_ALL, concurrency=4)
+    d1.register_request_handler("/stats", response_generator=stats_request, allow=RNS.Destination.ALLOW_ALL)
+
+    def fail_request(path, data, request_id, link_id, remote_identity, requested_at):
+        raise ValueError("Request handler failure")
+
+    d1.register_request_handler("/fail", response_generator=fail_request, allow=RNS.Destination.ALLOW_ALL)
+
+    def resume_state_request(path, data, request_id, link_id, remote_identity, requested_at):
+        return RNS.Resource.resumable_segments(data) or 0
+
+    def received_request(path, data, request_id, link_id, remote_identity, requested_at):
+        return received_hashes.get(data)
+
+    d1.register_request_handler("/resume_state", response_generator=resume_state_request, allow=RNS.Destination.ALLOW_ALL)
+    d1.register_request_handler("/received", response_generator=received_request, allow=RNS.Destination.ALLOW_ALL)
+
     while True:
         time.sleep(1)
 
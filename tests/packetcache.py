@@ -0,0 +1,126 @@
+import unittest
+
+import os
+import time
+import shutil
+import tempfile
+from RNS.PacketCache import PacketCache
+
+class TestPacketCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_0_memory_tier(self):
+        cache = PacketCache(memory_entries=3)
+        for i in range(0, 4): cache.store(bytes([i]), bytes([i])*8, b"if")
+
+        # Only the most recently used packets are kept
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.get(bytes([0])), None)
+        self.assertEqual(cache.get(bytes([1])), (bytes([1])*8, b"if"))
+        cache.store(bytes([4]), bytes([4])*8)
+        self.assertTrue(bytes([1]) in cache)
+        self.assertFalse(bytes([2]) in cache)
+
+        self.assertTrue(cache.remove(bytes([1])))
+        self.assertFalse(cache.remove(bytes([1])))
+        self.assertEqual(cache.get(bytes([1])), None)
+
+    def test_1_persistence(self):
+        cache = PacketCache(self.path, memory_entries=2)
+        packets = {os.urandom(32): os.urandom(200) for i in range(0, 100)}
+        hashes = list(packets.keys())
+        for packet_hash in hashes[:50]: cache.store(packet_hash, packets[packet_hash], b"if", PacketCache.ANNOUNCE)
+        for packet_hash in hashes[50:]: cache.store(packet_hash, packets[packet_hash])
+        for packet_hash in hashes[:10]: cache.remove(packet_hash)
+
+        # Packets evicted from memory are read back from disk
+        self.assertEqual(cache.get(hashes[20]), (packets[hashes[20]], b"if"))
+        self.assertEqual(len(cache.hashes(PacketCache.ANNOUNCE)), 40)
+        cache.close()
+
+        # Removals survive reloading, and an incomplete
+        # record at the end of a segment is discarded
+        segment = os.path.join(self.path, sorted(os.listdir(self.path))[-1])
+        with open(segment, "ab") as file: file.write(b"\x00\x00\x01\x00\x93")
+        cache = PacketCache(self.path)
+        self.assertEqual(len(cache), 90)
+        self.assertEqual(cache.get(hashes[5]), None)
+        self.assertEqual(cache.get(hashes[99]), (packets[hashes[99]], None))
+        self.assertEqual(set(cache.hashes(PacketCache.ANNOUNCE)), set(hashes[10:50]))
+
+        # Only plain packets expire
+        time.sleep(0.1)
+        cache.clean(0.05)
+        self.assertEqual(len(cache), 40)
+        self.assertEqual(cache.get(hashes[30]), (packets[hashes[30]], b"if"))
+        cache.close()
+
+    def test_2_compaction(self):
+        cache = PacketCache(self.path, memory_entries=1, segment_size=16*1024)
+        announces = {os.urandom(32): os.urandom(400) for i in range(0, 20)}
+        for packet_hash in announces: cache.store(packet_hash, announces[packet_hash], kind=PacketCache.ANNOUNCE)
+        for i in range(0, 2000):
+            packet_hash = os.urandom(32)
+            cache.store(packet_hash, os.urandom(400))
+            cache.remove(packet_hash)
+
+        # Segments are removed once most of their data is dead,
+        # and live announces are moved to newer segments
+        cache.clean(3600)
+        self.assertLess(sum(os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path)), 64*1024)
+        for packet_hash in announces: self.assertEqual(cache.get(packet_hash)[0], announces[packet_hash])
+        cache.close()
+
+        cache = PacketCache(self.path)
+        self.assertEqual(len(cache), len(announces))
+        for packet_hash in announces: self.assertEqual(cache.get(packet_hash)[0], announces[packet_hash])
+        cache.close()
+
+    def test_2a_packet_limit(self):
+        cache = PacketCache(self.path, memory_entries=1, max_packets=10)
+        announces = [os.urandom(32) for i in range(0, 5)]
+        for packet_hash in announces: cache.store(packet_hash, os.urandom(100), kind=PacketCache.ANNOUNCE)
+        packets = [os.urandom(32) for i in range(0, 25)]
+        for i in range(0, len(packets)): cache.store(packets[i], os.urandom(100), timestamp=time.time()+i)
+
+        # Only the newest packets are kept on disk, and
+        # announces are never evicted to make room
+        self.assertEqual(len(cache), 15)
+        self.assertEqual(set(cache.hashes(PacketCache.PACKET)), set(packets[15:]))
+        self.assertEqual(set(cache.hashes(PacketCache.ANNOUNCE)), set(announces))
+        cache.close()
+
+        # The limit also applies when loading a cache
+        cache = PacketCache(self.path, max_packets=5)
+        self.assertEqual(set(cache.hashes(PacketCache.PACKET)), set(packets[20:]))
+        self.assertEqual(len(cache), 10)
+        cache.close()
+
+    def test_3_performance(self):
+        print("")
+        count = 20000
+        packets = [(os.urandom(32), os.urandom(160)) for i in range(0, count)]
+        cache = PacketCache(self.path)
+
+        st = time.time()
+        for packet_hash, raw in packets: cache.store(packet_hash, raw, None, PacketCache.ANNOUNCE)
+        store_time = time.time()-st
+        st = time.time()
+        for packet_hash, raw in packets: cache.get(packet_hash)
+        get_time = time.time()-st
+        cache.close()
+
+        st = time.time()
+        cache = PacketCache(self.path)
+        load_time = time.time()-st
+        self.assertEqual(len(cache), count)
+        cache.close()
+        print(f"Stored {count} packets in {round(store_time*1000, 2)}ms, read them in {round(get_time*1000, 2)}ms, loaded index in {round(load_time*1000, 2)}ms")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+import unittest
+
+import time
+import random
+import threading
+import RNS
+
+class TestScheduler(unittest.TestCase):
+
+    def test_0_order(self):
+        fired = []
+        done = threading.Event()
+        delays = [0.05, 0.01, 0.03, 0.02, 0.04]
+        for delay in delays:
+            RNS.Scheduler.call_later(delay, lambda d=delay: fired.append(d))
+        RNS.Scheduler.call_later(0.1, done.set)
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual(sorted(delays), fired)
+
+    def test_1_cancel(self):
+        fired = []
+        done = threading.Event()
+        timers = [RNS.Scheduler.call_later(0.01*i, lambda i=i: fired.append(i)) for i in range(0, 10)]
+        for timer in timers[::2]:
+            timer.cancel()
+        RNS.Scheduler.call_later(0.2, done.set)
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual([1, 3, 5, 7, 9], fired)
+
+        # Cancelling a fired timer has no effect. Timers of
+        # other tests may still be pending on the scheduler,
+        # so only the timers of this test are checked.
+        timers[1].cancel()
+        self.assertTrue(all(timer.cancelled for timer in timers))
+
+    def test_2_precision(self):
+        print("")
+        timer_count = 10000
+        fired = 0
+        lateness = 0.0
+        max_lateness = 0.0
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def callback(deadline):
+            nonlocal fired, lateness, max_lateness
+            late = time.time()-deadline
+            with lock:
+                fired += 1
+                lateness += late
+                max_lateness = max(max_lateness, late)
+                if fired == timer_count:
+                    done.set()
+
+        timers = []
+        st = time.time()
+        for i in range(0, timer_count):
+            deadline = st+0.5+random.random()
+            timers.append(RNS.Scheduler.call_at(deadline, lambda d=deadline: callback(d)))
+        scheduling_time = time.time()-st
+
+        # Timers that are cancelled and replaced, as
+        # when a link watchdog is rescheduled
+        for i in range(0, timer_count):
+            RNS.Scheduler.call_later(10, lambda: None).cancel()
+
+        self.assertTrue(done.wait(10))
+        print(f"Scheduled {timer_count} timers in {round(scheduling_time*1000, 2)}ms, {round(scheduling_time/timer_count*1e6, 2)}µs per timer")
+        print(f"Mean firing lateness {round(lateness/timer_count*1000, 3)}ms, max {round(max_lateness*1000, 3)}ms")
+        self.assertTrue(all(timer.cancelled for timer in timers))
+        self.assertEqual(1, len([t for t in threading.enumerate() if t.name == "Timer Scheduler"]))
+
+    def test_3_dispatch(self):
+        threads = []
+        done = threading.Event()
+        def job():
+            threads.append(threading.current_thread().name)
+            done.set()
+
+        # Work handed off by a timer does not run on,
+        # or hold up, the scheduler thread
+        RNS.Scheduler.call_later(0.01, lambda: RNS.Scheduler.dispatch(job))
+        self.assertTrue(done.wait(2))
+        self.assertNotEqual("Timer Scheduler", threads[0])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
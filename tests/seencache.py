@@ -0,0 +1,53 @@
+import unittest
+
+import os
+import time
+from RNS.SeenCache import SeenCache
+
+class TestSeenCache(unittest.TestCase):
+
+    def test_0_membership(self):
+        cache = SeenCache(4)
+        self.assertTrue(cache.add(b"a"))
+        self.assertFalse(cache.add(b"a"))
+        self.assertTrue(b"a" in cache)
+        self.assertFalse(b"b" in cache)
+        self.assertEqual(len(cache), 1)
+
+        cache.clear()
+        self.assertFalse(b"a" in cache)
+        self.assertEqual(len(cache), 0)
+        self.assertRaises(ValueError, SeenCache, 0)
+
+    def test_1_eviction(self):
+        cache = SeenCache(3)
+        for item in range(0, 5): self.assertTrue(cache.add(item))
+
+        # Exactly the oldest items are evicted
+        self.assertEqual(len(cache), 3)
+        self.assertEqual([i in cache for i in range(0, 5)], [False, False, True, True, True])
+
+        # Re-adding a seen item does not refresh it
+        self.assertFalse(cache.add(2))
+        self.assertTrue(cache.add(5))
+        self.assertFalse(2 in cache)
+        self.assertTrue(3 in cache)
+
+    def test_2_performance(self):
+        print("")
+        size = 32000
+        tags = [os.urandom(32) for i in range(0, size*2)]
+        cache = SeenCache(size)
+
+        st = time.time()
+        for tag in tags: cache.add(tag)
+        for tag in tags: tag in cache
+        duration = time.time()-st
+
+        self.assertEqual(len(cache), size)
+        self.assertFalse(tags[size-1] in cache)
+        self.assertTrue(tags[size] in cache)
+        print(f"Added and checked {len(tags)} tags in {round(duration*1000, 2)}ms")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)